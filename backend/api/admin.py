@@ -4,8 +4,8 @@ Allows real-time adjustments to video processing parameters.
 """
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional, get_args
 from pathlib import Path
 import json
 import os
@@ -15,6 +15,12 @@ router = APIRouter()
 # Path to config file
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "core", "config.json")
 
+# Oil painting variants compiled into the native engine (see fast_processor.cpp)
+EngineVariant = Literal["region", "multiscale", "box", "directional"]
+
+# Edge-preserving smoothing used by the region variant (see smoothing.cpp)
+SmoothingBackend = Literal["bilateral", "guided", "domain_transform", "bilateral_downsampled"]
+
 class StylizationConfig(BaseModel):
     """Configuration model for image processing parameters"""
     bilateral_diameter: int = 15
@@ -26,7 +32,23 @@ class StylizationConfig(BaseModel):
     edge_blend_factor: float = 0.2
     psychedelic_amplitude: float = 0.01
     psychedelic_frequency: float = 20.0
-    process_every_nth_frame: int = 3
+    process_every_nth_frame: int = 1  # Full effect on every Nth unique frame (after dedup), the rest are rebuilt
+    temporal_mode: Literal["hold", "blend", "flow"] = "flow"  # How skipped frames are rebuilt
+    engine_variant: EngineVariant = "region"
+    smoothing_backend: SmoothingBackend = "bilateral"
+    smoothing_quality: int = 2  # 1 (fastest) - 3 (closest to bilateral)
+    incremental: bool = False  # Re-stylize only tiles that changed since the previous frame
+    incremental_tile_size: int = 64
+    incremental_threshold: float = 3.0  # Mean abs luma difference that marks a tile as changed
+    background_model: bool = False  # Cache the stylized static scene, only stylize moving foreground
+    background_restyle_seconds: float = 3.0  # Re-stylize the cached background this often
+    background_lighting_threshold: float = 8.0  # Mean luma shift that forces an early re-stylize
+    tiled: bool = False  # Run the per-pixel stages tile by tile (parallel within a frame)
+    tiled_tile_size: int = Field(128, ge=16)  # Working-resolution pixels (any size tiles exactly)
+    dedup_mode: Literal["off", "exact", "perceptual"] = "exact"  # Reuse output for repeated input frames
+    dedup_threshold: float = 1.0  # Perceptual: max mean abs luma difference of 32x18 thumbnails
+    profile_engine: bool = False  # Time each engine operation (segment_stats and /metrics)
+    working_height: int = 540  # Rows the effect runs at - picks the source rendition and the downsample factor
 
 # In-memory config (loaded on startup)
 current_config = StylizationConfig()
@@ -67,35 +89,112 @@ async def reset_config():
 @router.get("/status")
 async def get_status():
     """Get current processor status"""
-    from backend.core.processor import get_processor_status
-    return get_processor_status()
+    from backend.core import streams
+    return get_registered_stream(streams.DEFAULT_STREAM).pipeline.get_processor_status()
+
+def parse_origins(request: dict) -> Optional[list]:
+    """The optional 'origins' list of hosts in a request body"""
+    origins = request.get("origins")
+    if origins is not None and (not isinstance(origins, list) or not all(isinstance(o, str) for o in origins)):
+        raise HTTPException(status_code=400, detail="'origins' must be a list of hosts")
+    return origins
+
+def get_registered_stream(stream_id: str):
+    """A registered stream (see streams.py), or 404"""
+    from backend.core import streams
+    stream = streams.get_stream(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail=f"Unknown stream: {stream_id}")
+    return stream
 
 @router.post("/stream-url")
 async def update_stream_url(request: dict):
-    """Update the stream base URL"""
+    """Update the stream base URL, and optionally its alternative origins (hosts)"""
+    from backend.core import streams
+    return await update_registered_stream_url(streams.DEFAULT_STREAM, request)
+
+@router.get("/streams")
+async def list_streams():
+    """List the registered streams and the shared CPU scheduler's queues"""
+    from backend.core import streams
+    return streams.get_streams_status()
+
+@router.post("/streams")
+async def add_stream(request: dict):
+    """Add a stream: {"id", "url", "origins" (optional), "config" (optional, defaults to the admin config)}"""
+    from backend.core import streams
+    if "id" not in request or "url" not in request:
+        raise HTTPException(status_code=400, detail="Missing 'id' or 'url' field")
+    origins = parse_origins(request)
+    if streams.get_stream(request["id"]) is not None:
+        raise HTTPException(status_code=409, detail=f"Stream {request['id']} already exists")
+    try:
+        config = StylizationConfig(**request["config"]) if request.get("config") is not None else None
+        stream = streams.add_stream(request["id"], request["url"], origins, config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return stream.snapshot()
+
+@router.delete("/streams/{stream_id}")
+async def remove_stream(stream_id: str):
+    """Stop a stream and delete its segments"""
+    from backend.core import streams
+    get_registered_stream(stream_id)
+    try:
+        await streams.remove_stream(stream_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"success": True, "id": stream_id}
+
+@router.get("/streams/{stream_id}/status")
+async def get_stream_status(stream_id: str):
+    """Get one stream's processor status"""
+    return get_registered_stream(stream_id).pipeline.get_processor_status()
+
+@router.get("/streams/{stream_id}/config", response_model=StylizationConfig)
+async def get_stream_config(stream_id: str):
+    """Get one stream's stylization configuration"""
+    return get_registered_stream(stream_id).config
+
+@router.post("/streams/{stream_id}/config", response_model=StylizationConfig)
+async def update_stream_config(stream_id: str, config: StylizationConfig):
+    """Update one stream's stylization configuration (the default stream's is the admin config)"""
+    from backend.core import streams
+    get_registered_stream(stream_id)
+    if stream_id == streams.DEFAULT_STREAM:
+        return await update_config(config)
+    streams.set_stream_config(stream_id, config)
+    return config
+
+@router.post("/streams/{stream_id}/stream-url")
+async def update_registered_stream_url(stream_id: str, request: dict):
+    """Update one stream's base URL, and optionally its alternative origins (hosts)"""
+    from backend.core import streams
+    stream = get_registered_stream(stream_id)
     if "url" not in request:
         raise HTTPException(status_code=400, detail="Missing 'url' field")
+    origins = parse_origins(request)
 
     stream_url = request["url"]
+    streams.set_stream_url(stream_id, stream_url, origins)
 
-    # Store in processor module
-    from backend.core import processor
-    processor.STREAM_BASE_URL = stream_url
-
-    print(f"🔄 Stream URL updated to: {stream_url}")
+    print(f"🔄 Stream {stream_id} URL updated to: {stream_url}")
 
     return {
         "success": True,
-        "url": stream_url
+        "stream": stream_id,
+        "url": stream_url,
+        "origins": [origin.host for origin in stream.pipeline.get_origin_pool().origins]
     }
 
 @router.get("/frames/{segment_id}/{frame_number}.jpg")
 async def get_frame(segment_id: str, frame_number: int):
     """Serve a specific processed frame image"""
     # Get the base directory where frames are stored
-    from backend.core.processor import FRAMES_DIR
+    from backend.core import streams
+    frames_dir = get_registered_stream(streams.DEFAULT_STREAM).pipeline.frames_dir
 
-    frame_path = Path(FRAMES_DIR) / segment_id / f"{frame_number}.jpg"
+    frame_path = Path(frames_dir) / segment_id / f"{frame_number}.jpg"
 
     if not frame_path.exists():
         raise HTTPException(status_code=404, detail="Frame not found")
@@ -170,74 +269,21 @@ async def update_processing_code(request: dict):
     language = request.get("language", "cpp")
 
     if language == "cpp":
-        # Update C++ code
-        cpp_path = Path(__file__).parent.parent / "core" / "fast_processor.cpp"
-
-        try:
-            # Backup current code
-            backup_path = cpp_path.with_suffix('.cpp.bak')
-            if cpp_path.exists():
-                with open(cpp_path, 'r') as f:
-                    with open(backup_path, 'w') as bf:
-                        bf.write(f.read())
-
-            # Write new code
-            with open(cpp_path, 'w') as f:
-                f.write(new_code)
-
-            # Rebuild the C++ extension
-            import subprocess
-            base_dir = Path(__file__).parent.parent.parent
-
-            print("🔨 Rebuilding C++ extension...")
-            result = subprocess.run(
-                ["python3", "setup.py", "build_ext", "--inplace"],
-                cwd=str(base_dir),
-                capture_output=True,
-                text=True
-            )
-
-            if result.returncode != 0:
-                # Restore backup on failure
-                if backup_path.exists():
-                    with open(backup_path, 'r') as bf:
-                        with open(cpp_path, 'w') as f:
-                            f.write(bf.read())
-
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"C++ build failed:\n{result.stderr}"
-                )
-
-            print("✅ C++ extension rebuilt successfully!")
-
-            # Enable C++ processor
-            from backend.core import image_processing
-            image_processing.USE_CPP = True
+        # Build in a background process - compiling inside this handler would
+        # freeze the event loop (and segment serving) for the whole compile
+        from backend.core import engine_loader
 
-            # Reimport to get new version
-            try:
-                import fast_processor
-                import importlib
-                importlib.reload(fast_processor)
-            except Exception as e:
-                print(f"Warning: Could not reload C++ module: {e}")
+        build = await engine_loader.start_build(new_code)
 
-            return {
-                "success": True,
-                "message": "C++ code updated and rebuilt successfully",
-                "requires_restart": False
-            }
-
-        except HTTPException:
-            raise
-        except Exception as e:
-            # Restore backup on error
-            if backup_path.exists():
-                with open(backup_path, 'r') as bf:
-                    with open(cpp_path, 'w') as f:
-                        f.write(bf.read())
-            raise HTTPException(status_code=500, detail=f"Failed to update C++ code: {str(e)}")
+        return {
+            "success": True,
+            "message": "C++ build started, new engine switches in at the next segment",
+            "build_id": build["build_id"],
+            "version": build["version"],
+            "status": build["status"],
+            "poll_url": f"/api/admin/engine/builds/{build['build_id']}",
+            "requires_restart": False
+        }
 
     else:
         # Python code update (existing logic)
@@ -280,11 +326,12 @@ async def update_processing_code(request: dict):
             importlib.reload(image_processing)
 
             # Update the reference in processor module
-            from backend.core import processor
+            from backend.core import processor, streams
             processor.process_frame_fast_blobs = image_processing.process_frame_fast_blobs
 
             # Mark the current latest segment - next segment after this will have new effects
-            last_segment = max(processor.ready_segments) if processor.ready_segments else None
+            ready_segments = get_registered_stream(streams.DEFAULT_STREAM).pipeline.ready_segments
+            last_segment = max(ready_segments) if ready_segments else None
             first_new_segment = last_segment + 1 if last_segment else None
 
             print(f"🔄 Code updated - new effects will apply starting from segment {first_new_segment}")
@@ -306,6 +353,66 @@ async def update_processing_code(request: dict):
 
             raise HTTPException(status_code=500, detail=f"Failed to update code: {str(e)}")
 
+@router.get("/engine")
+async def get_engine():
+    """Get loaded native engine versions and which one is active"""
+    from backend.core import engine_loader
+    return engine_loader.get_engine_status()
+
+@router.get("/engine/variants")
+async def get_engine_variants():
+    """List oil painting engine variants with their last benchmark results"""
+    from backend.core.processor import DATA_DIR
+
+    results_path = os.path.join(DATA_DIR, "benchmarks", "engine_variants.json")
+    benchmark = None
+    if os.path.exists(results_path):
+        with open(results_path, 'r') as f:
+            benchmark = json.load(f)
+
+    return {
+        "variants": list(get_args(EngineVariant)),
+        "smoothing_backends": list(get_args(SmoothingBackend)),
+        "current": current_config.engine_variant,
+        "current_smoothing": current_config.smoothing_backend,
+        "benchmark": benchmark
+    }
+
+@router.get("/engine/builds/{build_id}")
+async def get_engine_build(build_id: str):
+    """Poll the status of a background engine build"""
+    from backend.core import engine_loader
+
+    build = engine_loader.get_build(build_id)
+    if build is None:
+        raise HTTPException(status_code=404, detail="Build not found")
+    return build
+
+@router.post("/engine/activate")
+async def activate_engine(request: dict):
+    """Switch to an already loaded engine version at the next segment boundary"""
+    if "version" not in request:
+        raise HTTPException(status_code=400, detail="Missing 'version' field")
+
+    from backend.core import engine_loader
+    try:
+        engine_loader.activate(request["version"])
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {"success": True, **engine_loader.get_engine_status()}
+
+@router.post("/engine/rollback")
+async def rollback_engine():
+    """Roll back to the previously active engine at the next segment boundary"""
+    from backend.core import engine_loader
+
+    version = engine_loader.rollback()
+    if version is None:
+        raise HTTPException(status_code=409, detail="No previous engine to roll back to")
+
+    return {"success": True, "rollback_to": version, **engine_loader.get_engine_status()}
+
 # Load config from file on module import
 def load_config():
     global current_config
@@ -1,4 +1,4 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse, HTMLResponse, FileResponse, Response
 import os
 from pathlib import Path
@@ -7,12 +7,6 @@ import time
 
 router = APIRouter()
 
-# Base paths
-BASE_DIR = Path(__file__).parent.parent.parent
-DATA_DIR = BASE_DIR / "data"
-PROCESSED_DIR = DATA_DIR / "processed"
-RAW_DIR = DATA_DIR / "raw"
-
 # Abbey Road stream headers
 EARTHCAM_HEADERS = {
     'Accept': '*/*',
@@ -23,12 +17,9 @@ EARTHCAM_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
 }
 
-@router.get("/stream")
-async def stream():
-    """Serve the M3U8 playlist from local filesystem"""
+def playlist_response(playlist_path: Path):
+    """Serve a processed M3U8 playlist from local filesystem"""
     try:
-        playlist_path = DATA_DIR / "current_playlist.m3u8"
-
         if not playlist_path.exists():
             empty_playlist = "#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:6\n"
             return StreamingResponse(
@@ -54,11 +45,10 @@ async def stream():
             status_code=500
         )
 
-@router.get("/segments/{segment_id}.ts")
-async def get_segment(segment_id: str):
-    """Serve individual video segments from local filesystem"""
+def segment_response(segment_dir: Path, segment_id: str):
+    """Serve an individual video segment from local filesystem"""
     try:
-        segment_path = PROCESSED_DIR / f"{segment_id}.ts"
+        segment_path = segment_dir / f"{segment_id}.ts"
 
         if not segment_path.exists():
             return Response(content=b"Segment not found", status_code=404)
@@ -75,39 +65,20 @@ async def get_segment(segment_id: str):
         print(f"Error serving segment {segment_id}: {e}")
         return Response(content=b"Error serving segment", status_code=500)
 
-@router.get("/raw")
-async def raw_stream():
-    """Serve the raw stream M3U8 playlist using locally saved segments"""
+def raw_playlist_response(pipeline, segment_url):
+    """Serve a raw stream M3U8 playlist using a pipeline's locally saved segments"""
     try:
-        # Import here to get the current state
-        from backend.core.processor import ready_segments
-
-        if len(ready_segments) < 3:
+        # Mirrors the processed playlist's window so both play the same segments
+        playlist_segments = list(pipeline.published_window)
+        if len(playlist_segments) < 3:
             empty_playlist = "#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:6\n"
             return Response(
                 content=empty_playlist,
                 media_type='application/x-mpegURL'
             )
 
-        # Sort segments (oldest to newest)
-        sorted_segments = sorted(ready_segments)
-
-        # Use a sliding window of segments
-        num_segments = min(10, len(sorted_segments))
-        playlist_segments = sorted_segments[:num_segments]
-
-        # Build M3U8 content for raw stream
-        m3u8_content = (
-            f"#EXTM3U\n"
-            f"#EXT-X-VERSION:3\n"
-            f"#EXT-X-TARGETDURATION:6\n"
-            f"#EXT-X-MEDIA-SEQUENCE:{playlist_segments[0]}\n"
-        )
-
-        for segment in playlist_segments:
-            # Use local raw segment endpoint
-            segment_url = f"http://localhost:8000/api/raw-segments/{segment}.ts"
-            m3u8_content += f"#EXTINF:6.0,\n{segment_url}\n"
+        # Build M3U8 content for raw stream, using the local raw segment endpoint
+        m3u8_content = pipeline.render_playlist(playlist_segments, segment_url)
 
         return Response(
             content=m3u8_content,
@@ -128,26 +99,66 @@ async def raw_stream():
             status_code=500
         )
 
+def stream_pipeline_for(stream_id: str):
+    """The StreamPipeline of a registered stream (see streams.py)"""
+    from backend.core import streams
+    stream = streams.get_stream(stream_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail=f"Unknown stream: {stream_id}")
+    return stream.pipeline
+
+# The unprefixed routes serve the default stream
+
+@router.get("/stream")
+async def stream():
+    """Serve the M3U8 playlist from local filesystem"""
+    pipeline = stream_pipeline_for("default")
+    return playlist_response(Path(pipeline.data_dir) / "current_playlist.m3u8")
+
+@router.get("/segments/{segment_id}.ts")
+async def get_segment(segment_id: str):
+    """Serve individual video segments from local filesystem"""
+    pipeline = stream_pipeline_for("default")
+    return segment_response(Path(pipeline.processed_dir), segment_id)
+
+@router.get("/raw")
+async def raw_stream():
+    """Serve the raw stream M3U8 playlist using locally saved segments"""
+    return raw_playlist_response(
+        stream_pipeline_for("default"), lambda segment: f"http://localhost:8000/api/raw-segments/{segment}.ts"
+    )
+
 @router.get("/raw-segments/{segment_id}.ts")
 async def raw_segment(segment_id: str):
     """Serve individual raw video segments from local filesystem"""
-    try:
-        segment_path = RAW_DIR / f"{segment_id}.ts"
-
-        if not segment_path.exists():
-            return Response(content=b"Segment not found", status_code=404)
-
-        return FileResponse(
-            segment_path,
-            media_type='video/mp2t',
-            headers={
-                'Cache-Control': 'max-age=3600',
-                'Access-Control-Allow-Origin': '*'
-            }
-        )
-    except Exception as e:
-        print(f"Error serving raw segment {segment_id}: {e}")
-        return Response(content=b"Error serving segment", status_code=500)
+    pipeline = stream_pipeline_for("default")
+    return segment_response(Path(pipeline.raw_dir), segment_id)
+
+@router.get("/streams/{stream_id}/stream")
+async def stream_playlist(stream_id: str):
+    """Serve one stream's processed M3U8 playlist"""
+    pipeline = stream_pipeline_for(stream_id)
+    return playlist_response(Path(pipeline.data_dir) / "current_playlist.m3u8")
+
+@router.get("/streams/{stream_id}/segments/{segment_id}.ts")
+async def stream_segment(stream_id: str, segment_id: str):
+    """Serve one stream's processed video segments"""
+    pipeline = stream_pipeline_for(stream_id)
+    return segment_response(Path(pipeline.processed_dir), segment_id)
+
+@router.get("/streams/{stream_id}/raw")
+async def stream_raw_playlist(stream_id: str):
+    """Serve one stream's raw M3U8 playlist"""
+    pipeline = stream_pipeline_for(stream_id)
+    return raw_playlist_response(
+        pipeline, lambda segment: f"http://localhost:8000/api/streams/{stream_id}/raw-segments/{segment}.ts"
+    )
+
+@router.get("/streams/{stream_id}/raw-segments/{segment_id}.ts")
+async def stream_raw_segment(stream_id: str, segment_id: str):
+    """Serve one stream's raw video segments"""
+    pipeline = stream_pipeline_for(stream_id)
+    return segment_response(Path(pipeline.raw_dir), segment_id)
 
 @router.get("/", response_class=HTMLResponse)
 async def main():
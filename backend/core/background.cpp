@@ -0,0 +1,183 @@
+#include "background.h"
+#include <algorithm>
+#include <cmath>
+#include <vector>
+
+// Foreground covering more than this is cheaper to stylize as one frame
+static const double FULL_FRAME_FOREGROUND = 0.5;
+
+// MOG2 settings: ~10s of history at 30fps, 5 mixtures per pixel
+static const int MOG2_HISTORY = 300;
+static const int MOG2_MIXTURES = 5;
+
+BackgroundModel::BackgroundModel(int restyle_interval, float lighting_threshold, int max_model_pixels, int halo)
+    : restyle_interval(std::max(1, restyle_interval)),
+      lighting_threshold(lighting_threshold),
+      max_model_pixels(std::max(1, max_model_pixels)),
+      halo(std::max(0, halo)) {
+    reset();
+}
+
+void BackgroundModel::reset() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    mog2_ = cv::createBackgroundSubtractorMOG2(MOG2_HISTORY, 16.0, true);
+    mog2_->setNMixtures(MOG2_MIXTURES);
+    stylized_background_.release();
+    styled_luma_mean_ = -1.0;
+    frames_since_restyle_ = 0;
+    restyling_ = false;
+    generation_++;
+    frames = 0;
+    restyles = 0;
+    last_foreground_fraction = 0.0;
+}
+
+cv::Size BackgroundModel::model_size(const cv::Size& working) const {
+    // Halve until the model fits the pixel budget (bounds MOG2 memory)
+    cv::Size size = working;
+    while (size.area() > max_model_pixels && size.width > 1 && size.height > 1) {
+        size = cv::Size(size.width / 2, size.height / 2);
+    }
+    return size;
+}
+
+size_t BackgroundModel::memory_bytes() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    size_t bytes = stylized_background_.total() * stylized_background_.elemSize();
+    if (!stylized_background_.empty()) {
+        // Per model pixel and mixture: weight + variance + 3 channel means (float)
+        cv::Size size = model_size(stylized_background_.size());
+        bytes += static_cast<size_t>(size.area()) * MOG2_MIXTURES * 5 * sizeof(float);
+    }
+    return bytes;
+}
+
+cv::Mat BackgroundModel::composite(const cv::Mat& working,
+                                   const std::function<cv::Mat(const cv::Mat&)>& stylize) {
+    cv::Mat background;
+    cv::Mat foreground_small;
+    cv::Mat background_full;         // Set when this call re-stylizes the background
+    double luma_mean = 0.0;
+    long long generation = 0;
+
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        frames++;
+
+        // STEP 1: Update the background model at model resolution
+        cv::Size size = model_size(working.size());
+        cv::Mat small;
+        cv::resize(working, small, size, 0, 0, cv::INTER_AREA);
+
+        if (!stylized_background_.empty() && stylized_background_.size() != working.size()) {
+            // Working resolution changed - the cached background is useless
+            stylized_background_.release();
+            restyling_ = false;
+            generation_++;
+        }
+        mog2_->apply(small, foreground_small);
+
+        // STEP 2: Re-stylize the background periodically or when lighting shifts
+        cv::Mat small_gray;
+        cv::cvtColor(small, small_gray, cv::COLOR_BGR2GRAY);
+        luma_mean = cv::mean(small_gray)[0];
+        bool lighting_shift = styled_luma_mean_ >= 0.0
+                              && std::abs(luma_mean - styled_luma_mean_) > lighting_threshold;
+
+        if (!restyling_
+            && (stylized_background_.empty() || frames_since_restyle_ >= restyle_interval || lighting_shift)) {
+            // This call re-stylizes - the background image is copied out, the
+            // stylize itself runs after the lock is released
+            cv::Mat background_small;
+            mog2_->getBackgroundImage(background_small);
+            if (background_small.empty()) {
+                background_full = working;
+            } else {
+                cv::resize(background_small, background_full, working.size(), 0, 0, cv::INTER_LINEAR);
+            }
+            restyling_ = true;
+            generation = generation_;
+            frames_since_restyle_ = 0;
+        } else {
+            frames_since_restyle_++;
+        }
+
+        // Published backgrounds are never modified in place, so sharing is safe
+        background = stylized_background_;
+    }
+
+    if (!background_full.empty()) {
+        cv::Mat stylized = stylize(background_full);
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            if (generation == generation_) {
+                stylized_background_ = stylized;
+                styled_luma_mean_ = luma_mean;
+                restyling_ = false;
+                restyles++;
+            }
+        }
+        background = stylized;
+    }
+
+    // STEP 3: Clean up the foreground mask (MOG2 marks shadows as 127 - keep them,
+    // shadows of moving people move too)
+    cv::threshold(foreground_small, foreground_small, 0, 255, cv::THRESH_BINARY);
+    cv::Mat kernel = cv::getStructuringElement(cv::MORPH_ELLIPSE, cv::Size(3, 3));
+    cv::morphologyEx(foreground_small, foreground_small, cv::MORPH_OPEN, kernel);
+    cv::dilate(foreground_small, foreground_small, kernel, cv::Point(-1, -1), 2);
+
+    double fraction = static_cast<double>(cv::countNonZero(foreground_small)) / foreground_small.total();
+    last_foreground_fraction = fraction;
+
+    if (fraction > FULL_FRAME_FOREGROUND || background.empty()) {
+        // Also while another caller stylizes the first background
+        return stylize(working);
+    }
+    if (fraction == 0.0) {
+        return background.clone();
+    }
+
+    cv::Mat foreground;
+    cv::resize(foreground_small, foreground, working.size(), 0, 0, cv::INTER_NEAREST);
+
+    // STEP 4: Stylize each foreground blob with a halo of context
+    cv::Mat labels, stats, centroids;
+    int count = cv::connectedComponentsWithStats(foreground_small, labels, stats, centroids, 8);
+
+    const double scale_x = static_cast<double>(working.cols) / foreground_small.cols;
+    const double scale_y = static_cast<double>(working.rows) / foreground_small.rows;
+    const cv::Rect frame_rect(0, 0, working.cols, working.rows);
+
+    std::vector<cv::Rect> boxes;
+    for (int i = 1; i < count; i++) {
+        cv::Rect box(static_cast<int>(stats.at<int>(i, cv::CC_STAT_LEFT) * scale_x),
+                     static_cast<int>(stats.at<int>(i, cv::CC_STAT_TOP) * scale_y),
+                     static_cast<int>(std::ceil(stats.at<int>(i, cv::CC_STAT_WIDTH) * scale_x)),
+                     static_cast<int>(std::ceil(stats.at<int>(i, cv::CC_STAT_HEIGHT) * scale_y)));
+        box &= frame_rect;
+        if (box.area() > 0) {
+            boxes.push_back(box);
+        }
+    }
+
+    // Stylize in parallel into separate buffers (boxes can overlap), then composite
+    std::vector<cv::Mat> patches(boxes.size());
+    std::vector<cv::Rect> inners(boxes.size());
+    cv::parallel_for_(cv::Range(0, static_cast<int>(boxes.size())), [&](const cv::Range& range) {
+        for (int i = range.start; i < range.end; i++) {
+            cv::Rect context(boxes[i].x - halo, boxes[i].y - halo,
+                             boxes[i].width + 2 * halo, boxes[i].height + 2 * halo);
+            context &= frame_rect;
+            inners[i] = cv::Rect(boxes[i].x - context.x, boxes[i].y - context.y, boxes[i].width, boxes[i].height);
+            patches[i] = stylize(working(context));
+        }
+    });
+
+    cv::Mat result = background.clone();
+    for (size_t i = 0; i < boxes.size(); i++) {
+        patches[i](inners[i]).copyTo(result(boxes[i]), foreground(boxes[i]));
+    }
+
+    return result;
+}
@@ -0,0 +1,59 @@
+#pragma once
+
+#include <opencv2/opencv.hpp>
+#include <opencv2/video.hpp>
+#include <atomic>
+#include <functional>
+#include <mutex>
+
+/*
+ * Background model cache for fixed cameras (implemented in background.cpp).
+ *
+ * Keeps a MOG2 background of the working-resolution input (at a reduced model
+ * resolution so memory stays bounded) and a stylized copy of that background.
+ * The background is only re-stylized every restyle_interval frames or when
+ * the lighting shifts; per frame only the foreground (cars, pedestrians) is
+ * stylized and composited on top.
+ *
+ * Long-lived: one model per stream, shared by concurrent segments. Reset it
+ * when the stream changes. The lock only covers the model update; the
+ * background is re-stylized outside it (by one caller at a time), so other
+ * composites keep using the previous stylized background meanwhile.
+ */
+class BackgroundModel {
+public:
+    BackgroundModel(int restyle_interval = 90,
+                    float lighting_threshold = 8.0f,
+                    int max_model_pixels = 320 * 180,
+                    int halo = 16);
+
+    // Returns the stylized working frame: cached stylized background with the
+    // freshly stylized foreground composited on top
+    cv::Mat composite(const cv::Mat& working, const std::function<cv::Mat(const cv::Mat&)>& stylize);
+
+    void reset();
+
+    // Approximate bytes held by the model (MOG2 mixtures + cached images)
+    size_t memory_bytes();
+
+    int restyle_interval;
+    float lighting_threshold;
+    int max_model_pixels;
+    int halo;
+
+    // Statistics since construction / reset (read from other threads)
+    std::atomic<long long> frames{0};
+    std::atomic<long long> restyles{0};
+    std::atomic<double> last_foreground_fraction{0.0};
+
+private:
+    cv::Size model_size(const cv::Size& working) const;
+
+    std::mutex mutex_;
+    cv::Ptr<cv::BackgroundSubtractorMOG2> mog2_;
+    cv::Mat stylized_background_;   // working resolution
+    double styled_luma_mean_ = -1.0; // mean luma of the input when the background was stylized
+    int frames_since_restyle_ = 0;
+    bool restyling_ = false;         // A caller is stylizing a new background outside the lock
+    long long generation_ = 0;       // Bumped by reset / resolution changes - a restyle started before is dropped
+};
@@ -0,0 +1,140 @@
+"""
+Duplicate-frame detection - webcam feeds repeat frames (encoder hiccups,
+low-light frame doubling). A repeat of the previous frame reuses the previous
+processed output instead of running the engine again.
+
+- exact:      64-bit hash of the decoded Y (luma) plane, only bit-identical
+              frames match
+- perceptual: 32x18 luma thumbnail, frames match when the mean absolute
+              difference is at most the threshold (tolerates re-encoding noise)
+
+Dedup runs before temporal subsampling: repeats are dropped first and
+process_every_nth_frame then picks every Nth of the remaining unique frames.
+On a feed that doubles every frame, N=2 runs the effect on every 4th decoded
+frame - the keyframes are spaced in pictures, not in decoded frames.
+"""
+import hashlib
+
+import cv2
+import numpy as np
+
+try:
+    import xxhash
+except ImportError:  # Optional - hashlib is ~10x slower but still well under a millisecond
+    xxhash = None
+
+DEDUP_MODES = ("off", "exact", "perceptual")
+
+# Perceptual fingerprint size (16:9, keeps 2.7k pixels per frame)
+THUMB_SIZE = (32, 18)
+
+# 8-bit pixel formats whose first plane is the Y plane
+PLANAR_LUMA_FORMATS = {"yuv420p", "yuvj420p", "yuv422p", "yuvj422p", "yuv444p", "yuvj444p", "nv12", "nv21", "gray"}
+
+
+def _luma(frame):
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+def _hash(data) -> bytes:
+    data = np.ascontiguousarray(data)
+    if xxhash is not None:
+        return xxhash.xxh3_64_digest(data)
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+def decoded_luma(av_frame):
+    """
+    The Y plane of a decoded PyAV frame, without the row padding, or None for
+    formats whose first plane isn't 8-bit luma (packed RGB, high bit depth).
+    """
+    if av_frame.format.name not in PLANAR_LUMA_FORMATS:
+        return None
+    plane = av_frame.planes[0]
+    rows = np.frombuffer(plane, np.uint8).reshape(-1, plane.line_size)
+    return rows[:av_frame.height, :av_frame.width]
+
+
+def decoded_fingerprint(av_frame, mode: str):
+    """
+    Exact-mode fingerprint of a PyAV frame, hashed from the decoder's luma
+    plane before any colour conversion. None when the frame has to be
+    fingerprinted after conversion instead (other modes and formats).
+    """
+    if mode != "exact":
+        return None
+    luma = decoded_luma(av_frame)
+    return _hash(luma) if luma is not None else None
+
+
+def fingerprint(frame, mode: str):
+    """
+    Cheap per-frame fingerprint: bytes digest (exact) or a float thumbnail (perceptual).
+    """
+    if mode == "exact":
+        return _hash(_luma(frame))
+
+    if mode == "perceptual":
+        thumb = cv2.resize(_luma(frame), THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        return thumb.astype(np.float32)
+
+    raise ValueError(f"Unknown dedup mode: {mode}")
+
+
+def matches(a, b, mode: str, threshold: float) -> bool:
+    """True if two fingerprints belong to the same picture."""
+    if mode == "exact":
+        return a == b
+    return float(np.mean(np.abs(a - b))) <= threshold
+
+
+def find_duplicates(frames, mode: str = "exact", threshold: float = 1.0, map_fn=map, fingerprints=None):
+    """
+    Compares each frame with the one before it.
+
+    map_fn: used to fingerprint the frames, e.g. executor.map to spread the
+    hashing over the segment's thread pool.
+    fingerprints: per frame, one already taken at decode (decoded_fingerprint)
+    or None to fingerprint that frame here.
+
+    Returns a list with, per frame, the index of the earlier frame whose output
+    it can reuse (always the first frame of a run of repeats), or None if the
+    frame has to be rendered.
+    """
+    sources = [None] * len(frames)
+    if mode == "off" or not frames:
+        return sources
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown dedup mode: {mode}")
+
+    if fingerprints is None:
+        fingerprints = [None] * len(frames)
+    missing = [i for i, value in enumerate(fingerprints) if value is None]
+    if missing:
+        fingerprints = list(fingerprints)
+        for i, value in zip(missing, map_fn(lambda i: fingerprint(frames[i], mode), missing)):
+            fingerprints[i] = value
+
+    previous = fingerprints[0]
+    for i in range(1, len(frames)):
+        current = fingerprints[i]
+        if matches(previous, current, mode, threshold):
+            sources[i] = sources[i - 1] if sources[i - 1] is not None else i - 1
+            # Perceptual: keep comparing against the run's first frame so slow
+            # drift can't chain many "almost equal" frames together
+            if mode == "perceptual":
+                continue
+        previous = current
+    return sources
+
+
+def expand(unique_outputs, sources):
+    """
+    Spreads the outputs rendered for unique frames back over the full frame list,
+    repeats sharing their source frame's output.
+    """
+    outputs = []
+    rendered = iter(unique_outputs)
+    for source in sources:
+        outputs.append(next(rendered) if source is None else outputs[source])
+    return outputs
@@ -0,0 +1,292 @@
+"""
+Native engine versioning - hot-swappable builds of the C++ extension.
+
+Builds run in a background process (never inside the event loop) and produce
+versioned extension modules (fast_processor_v<hash>.so). Every successful build
+is loaded side by side with the previous ones, because a loaded extension can't
+be replaced in-process. Switching engines is a pointer flip that only takes
+effect at the next segment boundary, so rollback is the same flip backwards.
+"""
+import asyncio
+import glob
+import hashlib
+import importlib.util
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from backend.core import python_engine
+
+# Base paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+SOURCE_PATH = os.path.join(BASE_DIR, "backend", "core", "fast_processor.cpp")
+CORE_DIR = os.path.dirname(SOURCE_PATH)
+ENGINES_DIR = os.path.join(BASE_DIR, "build", "engines")
+
+# Builds kept for the poll endpoint (oldest are dropped first)
+MAX_TRACKED_BUILDS = 20
+
+# Engine state - guarded by engine_lock since segments pick it up from worker threads
+engine_lock = threading.Lock()
+loaded_engines = {}                 # version -> loaded extension module
+active_version = None               # version used by segments being started now
+pending_version = None              # version to switch to at the next segment boundary
+engine_history = deque(maxlen=10)   # previously active versions, newest first
+
+# Build tracking
+builds = OrderedDict()              # build_id -> build record
+build_lock = asyncio.Lock()         # one compile at a time, it's CPU heavy
+build_tasks = set()                 # running builds - the loop only keeps weak references to tasks
+
+# The NumPy/OpenCV engine is always loaded - fallback without a compiler, and
+# a reference to switch to when comparing builds
+loaded_engines["python"] = python_engine
+active_version = "python"
+
+# Adopt the in-place build (make build-cpp) as the initial engine
+try:
+    import fast_processor
+    loaded_engines["inplace"] = fast_processor
+    active_version = "inplace"
+except ImportError:
+    print("⚠️  No native engine built, segments use the Python engine")
+
+
+def linked_sources() -> list[str]:
+    """
+    The other C++ sources and headers compiled into every build (setup.py links
+    fast_oil_painting.cpp, smoothing.cpp, incremental.cpp, background.cpp and
+    profiling.cpp next to the submitted fast_processor.cpp).
+    """
+    paths = glob.glob(os.path.join(CORE_DIR, "*.cpp")) + glob.glob(os.path.join(CORE_DIR, "*.h"))
+    return sorted(path for path in paths if path != SOURCE_PATH)
+
+
+def source_version(code: str) -> str:
+    """
+    Returns the version tag for a C++ source: a short hash of its content and
+    of every source linked with it, so a change to any of them is a new build.
+    Identical sources map to the same version and are only built once.
+    """
+    digest = hashlib.sha1(code.encode("utf-8"))
+    for path in linked_sources():
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def module_name_for(version: str) -> str:
+    """Extension module name for a versioned build."""
+    return f"fast_processor_v{version}"
+
+
+def _load_extension(name: str, path: str):
+    """
+    Loads a compiled extension from an explicit path under its own module name,
+    so it can live next to every other loaded version.
+    """
+    spec = importlib.util.spec_from_file_location(name, path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load extension {name} from {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[name] = module
+    return module
+
+
+def _prepare_source(code: str) -> str:
+    """
+    Makes the module name overridable for sources that still hard-code it,
+    e.g. code pasted from before versioned builds existed.
+    """
+    return re.sub(r"PYBIND11_MODULE\(\s*fast_processor\s*,", "PYBIND11_MODULE(ENGINE_MODULE_NAME,", code)
+
+
+def _lower_priority():
+    """Runs in the compiler child process - keep it from starving segment processing."""
+    try:
+        os.nice(10)
+    except OSError:
+        pass
+
+
+async def start_build(code: str) -> dict:
+    """
+    Queues a background build of the given C++ source.
+    Returns the build record immediately; poll get_build() for progress.
+    """
+    version = source_version(code)
+    build_id = uuid.uuid4().hex[:12]
+    build = {
+        "build_id": build_id,
+        "version": version,
+        "status": "queued",
+        "queued_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "log": "",
+    }
+
+    builds[build_id] = build
+    while len(builds) > MAX_TRACKED_BUILDS:
+        builds.popitem(last=False)
+
+    if version in loaded_engines:
+        # Same source already built and loaded - just switch to it
+        build["status"] = "ready"
+        build["finished_at"] = time.time()
+        build["log"] = "Version already loaded, reusing existing build"
+        activate(version)
+        return build
+
+    task = asyncio.create_task(_run_build(build, code))
+    build_tasks.add(task)
+    task.add_done_callback(_build_done)
+    return build
+
+
+def _build_done(task: asyncio.Task):
+    build_tasks.discard(task)
+    # _run_build records its own failures - anything else (e.g. cancellation) is logged here
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ Engine build task failed: {task.exception()!r}")
+
+
+async def _run_build(build: dict, code: str):
+    """
+    Compiles one engine version in a separate process and loads the result.
+    The event loop only awaits the child process, so segment serving continues.
+    """
+    version = build["version"]
+    name = module_name_for(version)
+    build_dir = os.path.join(ENGINES_DIR, version)
+    source_file = os.path.join(build_dir, "fast_processor.cpp")
+
+    async with build_lock:
+        build["status"] = "building"
+        build["started_at"] = time.time()
+        print(f"🔨 Building engine {version} in background...")
+
+        try:
+            os.makedirs(build_dir, exist_ok=True)
+            with open(source_file, "w") as f:
+                f.write(_prepare_source(code))
+
+            env = dict(os.environ, ENGINE_MODULE_NAME=name, ENGINE_SOURCE=source_file)
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "setup.py", "build_ext",
+                "--build-lib", build_dir,
+                "--build-temp", os.path.join(build_dir, "tmp"),
+                cwd=BASE_DIR,
+                env=env,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                preexec_fn=_lower_priority if os.name == "posix" else None,
+            )
+            output, _ = await proc.communicate()
+            build["log"] = output.decode("utf-8", errors="replace")[-20000:]
+
+            if proc.returncode != 0:
+                build["status"] = "failed"
+                print(f"❌ Engine {version} build failed")
+                return
+
+            built = [f for f in os.listdir(build_dir) if f.startswith(name) and f.endswith((".so", ".pyd"))]
+            if not built:
+                build["status"] = "failed"
+                build["log"] += f"\nNo extension module named {name} was produced"
+                return
+
+            module = _load_extension(name, os.path.join(build_dir, built[0]))
+            with engine_lock:
+                loaded_engines[version] = module
+
+            # Persist the source so GET /code shows what is running
+            if os.path.exists(SOURCE_PATH):
+                shutil.copyfile(SOURCE_PATH, SOURCE_PATH + ".bak")
+            with open(SOURCE_PATH, "w") as f:
+                f.write(code)
+
+            activate(version)
+            build["status"] = "ready"
+            print(f"✅ Engine {version} built, switching at next segment")
+
+        except Exception as e:
+            build["status"] = "failed"
+            build["log"] += f"\n{e}"
+            print(f"❌ Engine {version} build error: {e}")
+        finally:
+            build["finished_at"] = time.time()
+            # Object files aren't needed once the module is linked
+            shutil.rmtree(os.path.join(build_dir, "tmp"), ignore_errors=True)
+
+
+def get_build(build_id: str) -> dict | None:
+    """Returns the build record for the poll endpoint (None if unknown)."""
+    return builds.get(build_id)
+
+
+def activate(version: str):
+    """
+    Schedules a loaded engine version to become active at the next segment boundary.
+    """
+    global pending_version
+    with engine_lock:
+        if version not in loaded_engines:
+            raise KeyError(f"Engine version {version} is not loaded")
+        pending_version = version
+
+
+def rollback() -> str | None:
+    """
+    Switches back to the previously active engine (at the next segment boundary).
+    Returns the version being rolled back to, or None if there is no history.
+    """
+    global pending_version
+    with engine_lock:
+        if not engine_history:
+            return None
+        pending_version = engine_history[0]
+        return pending_version
+
+
+def acquire_engine():
+    """
+    Called once at the start of each segment. Applies any pending switch and
+    returns (version, module) - the segment keeps this engine for all its frames,
+    so a switch never lands mid-segment.
+    """
+    global active_version, pending_version
+    with engine_lock:
+        if pending_version is not None and pending_version != active_version:
+            if active_version is not None:
+                # Drop any older entry so the history reads like an undo stack
+                if active_version in engine_history:
+                    engine_history.remove(active_version)
+                engine_history.appendleft(active_version)
+            if pending_version in engine_history:
+                engine_history.remove(pending_version)
+            active_version = pending_version
+            print(f"🔀 Switched to engine {active_version}")
+        pending_version = None
+
+        if active_version is None:
+            return None, None
+        return active_version, loaded_engines[active_version]
+
+
+def get_engine_status() -> dict:
+    """Returns engine versions for the admin API."""
+    with engine_lock:
+        return {
+            "active": active_version,
+            "pending": pending_version,
+            "loaded": list(loaded_engines.keys()),
+            "history": list(engine_history),
+        }
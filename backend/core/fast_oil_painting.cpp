@@ -1,4 +1,4 @@
-#include <opencv2/opencv.hpp>
+#include "fast_oil_painting.h"
 #include <cmath>
 
 /*
@@ -15,9 +15,9 @@
  */
 
 cv::Mat fast_oil_painting(const cv::Mat& input,
-                          int brush_size = 9,
-                          int intensity_levels = 16,
-                          float edge_threshold = 30.0f) {
+                          int brush_size,
+                          int intensity_levels,
+                          float edge_threshold) {
     /*
      * Fast oil painting approximation using separable filters and quantization
      *
@@ -35,8 +35,8 @@ cv::Mat fast_oil_painting(const cv::Mat& input,
     // Fine detail blur
     cv::GaussianBlur(input, blurred1, cv::Size(brush_size, brush_size), 2.0);
 
-    // Coarse detail blur
-    cv::GaussianBlur(input, blurred2, cv::Size(brush_size * 2, brush_size * 2), 4.0);
+    // Coarse detail blur (Gaussian kernels must be odd)
+    cv::GaussianBlur(input, blurred2, cv::Size(brush_size * 2 + 1, brush_size * 2 + 1), 4.0);
 
     // STEP 2: Edge detection for edge-aware blending
     cv::Mat gray, edges;
@@ -103,8 +103,8 @@ cv::Mat fast_oil_painting(const cv::Mat& input,
 
 // Alternative: SUPER FAST version using only box filters (separable, fastest possible)
 cv::Mat super_fast_oil_painting(const cv::Mat& input,
-                                 int brush_size = 7,
-                                 int intensity_levels = 12) {
+                                 int brush_size,
+                                 int intensity_levels) {
     /*
      * Ultra-fast approximation using only box filters (O(1) complexity!)
      * Box filters are constant time regardless of kernel size
@@ -141,8 +141,8 @@ cv::Mat super_fast_oil_painting(const cv::Mat& input,
 
 // Oil painting with "directional" brush strokes
 cv::Mat directional_oil_painting(const cv::Mat& input,
-                                  int brush_size = 9,
-                                  int intensity_levels = 16) {
+                                  int brush_size,
+                                  int intensity_levels) {
     /*
      * Creates directional brush stroke effect by using anisotropic filtering
      * Still fast because it uses separable filters
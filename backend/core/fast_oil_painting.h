@@ -0,0 +1,24 @@
+#pragma once
+
+#include <opencv2/opencv.hpp>
+
+/*
+ * Oil painting engine variants (implemented in fast_oil_painting.cpp).
+ * Selected by name from process_frame_cpp via the engine_variant argument.
+ */
+
+// Multi-scale Gaussian blur blended by a Canny edge mask, then posterized
+cv::Mat fast_oil_painting(const cv::Mat& input,
+                          int brush_size = 9,
+                          int intensity_levels = 16,
+                          float edge_threshold = 30.0f);
+
+// Box filter + posterize - cheapest variant
+cv::Mat super_fast_oil_painting(const cv::Mat& input,
+                                 int brush_size = 7,
+                                 int intensity_levels = 12);
+
+// Gaussian smoothing + posterize (directional strokes not implemented yet)
+cv::Mat directional_oil_painting(const cv::Mat& input,
+                                  int brush_size = 9,
+                                  int intensity_levels = 16);
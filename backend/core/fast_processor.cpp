@@ -1,7 +1,18 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
+#include <pybind11/stl.h>
 #include <opencv2/opencv.hpp>
+#include <algorithm>
 #include <cmath>
+#include <memory>
+#include <string>
+#include <vector>
+
+#include "background.h"
+#include "fast_oil_painting.h"
+#include "incremental.h"
+#include "profiling.h"
+#include "smoothing.h"
 
 namespace py = pybind11;
 
@@ -9,7 +20,10 @@ namespace py = pybind11;
 cv::Mat fast_oil_painting_effect(const cv::Mat& input,
                                   int brush_size = 9,
                                   int intensity_levels = 16,
-                                  float edge_strength = 0.3f) {
+                                  float edge_strength = 0.3f,
+                                  const std::string& smoothing_backend = "bilateral",
+                                  int smoothing_quality = 2,
+                                  FrameProfile* profile = nullptr) {
     /*
      * CREATIVE REGION-BASED PAINTING APPROACH
      *
@@ -22,10 +36,14 @@ cv::Mat fast_oil_painting_effect(const cv::Mat& input,
 
     cv::Mat result;
 
-    // STEP 1: BILATERAL FILTER for edge-preserving smoothing (creates regions)
-    // This is faster on small images and creates natural region boundaries
+    // STEP 1: EDGE-PRESERVING SMOOTHING (creates regions)
+    // Bilateral by default; guided / domain transform / downsampled bilateral
+    // are constant-cost alternatives (see smoothing.cpp)
     cv::Mat smoothed;
-    cv::bilateralFilter(input, smoothed, 9, 75, 75);
+    {
+        ScopedOpTimer timer(profile, PROFILE_SMOOTHING);
+        smoothed = edge_preserving_smooth(input, smoothing_backend, smoothing_quality);
+    }
 
     // STEP 2: AGGRESSIVE POSTERIZATION - Create flat color regions
     cv::Mat posterized = smoothed.clone();
@@ -94,8 +112,43 @@ cv::Mat fast_oil_painting_effect(const cv::Mat& input,
     return result;
 }
 
-// Fast psychedelic distortion in C++
-cv::Mat apply_distortion_cpp(cv::Mat& image, int frame_number, float amplitude, float frequency, int total_frames) {
+// Named oil painting engine variants, selectable per segment from Python
+const std::vector<std::string> ENGINE_VARIANTS = {
+    "region",       // bilateral + posterize + outlines (fast_oil_painting_effect)
+    "multiscale",   // edge-blended multi-scale Gaussian (fast_oil_painting)
+    "box",          // box filter + posterize (super_fast_oil_painting)
+    "directional"   // Gaussian + posterize (directional_oil_painting)
+};
+
+cv::Mat apply_oil_variant(const cv::Mat& input,
+                          const std::string& variant,
+                          int brush_size,
+                          int intensity_levels,
+                          float edge_strength,
+                          const std::string& smoothing_backend = "bilateral",
+                          int smoothing_quality = 2,
+                          FrameProfile* profile = nullptr) {
+    if (variant == "region") {
+        return fast_oil_painting_effect(input, brush_size, intensity_levels, edge_strength,
+                                        smoothing_backend, smoothing_quality, profile);
+    }
+    if (variant == "multiscale") {
+        return fast_oil_painting(input, brush_size, intensity_levels);
+    }
+    if (variant == "box") {
+        return super_fast_oil_painting(input, brush_size, intensity_levels);
+    }
+    if (variant == "directional") {
+        return directional_oil_painting(input, brush_size, intensity_levels);
+    }
+    throw std::invalid_argument("Unknown engine variant: " + variant);
+}
+
+// Fast psychedelic distortion in C++, for one rectangle of the output.
+// Maps are built for the rectangle only; sampling reads the whole image, so
+// any rectangle matches the same pixels of the full-frame result.
+cv::Mat apply_distortion_rect(const cv::Mat& image, const cv::Rect& rect, int frame_number,
+                              float amplitude, float frequency, int total_frames) {
     // Calculate time parameter
     float time = (frame_number % total_frames) * (2.0f * M_PI / total_frames);
 
@@ -103,8 +156,8 @@ cv::Mat apply_distortion_cpp(cv::Mat& image, int frame_number, float amplitude,
     int width = image.cols;
 
     // Pre-calculate distortion maps
-    cv::Mat map_x(height, width, CV_32FC1);
-    cv::Mat map_y(height, width, CV_32FC1);
+    cv::Mat map_x(rect.height, rect.width, CV_32FC1);
+    cv::Mat map_y(rect.height, rect.width, CV_32FC1);
 
     float width_amp = width * amplitude;
     float height_amp = height * amplitude;
@@ -112,15 +165,17 @@ cv::Mat apply_distortion_cpp(cv::Mat& image, int frame_number, float amplitude,
     float height_freq = frequency / height;
 
     // Vectorized calculation of distortion
-    for (int y = 0; y < height; y++) {
-        float* ptr_x = map_x.ptr<float>(y);
-        float* ptr_y = map_y.ptr<float>(y);
+    for (int ry = 0; ry < rect.height; ry++) {
+        int y = rect.y + ry;
+        float* ptr_x = map_x.ptr<float>(ry);
+        float* ptr_y = map_y.ptr<float>(ry);
         float y_dist = std::sin(time + y * height_freq) * height_amp;
 
-        for (int x = 0; x < width; x++) {
+        for (int rx = 0; rx < rect.width; rx++) {
+            int x = rect.x + rx;
             float x_dist = std::sin(time + x * width_freq) * width_amp;
-            ptr_x[x] = x + x_dist;
-            ptr_y[x] = y + y_dist;
+            ptr_x[rx] = x + x_dist;
+            ptr_y[rx] = y + y_dist;
         }
     }
 
@@ -129,6 +184,71 @@ cv::Mat apply_distortion_cpp(cv::Mat& image, int frame_number, float amplitude,
     return result;
 }
 
+cv::Mat apply_distortion_cpp(cv::Mat& image, int frame_number, float amplitude, float frequency, int total_frames) {
+    return apply_distortion_rect(image, cv::Rect(0, 0, image.cols, image.rows),
+                                 frame_number, amplitude, frequency, total_frames);
+}
+
+// Context (working-resolution pixels) a tile needs around it so its oil painting
+// matches the full-frame result: filter radius of the smoothing plus the
+// outline / morphology passes each variant runs afterwards
+int oil_variant_halo(const std::string& variant, int brush_size,
+                     const std::string& smoothing_backend, int smoothing_quality) {
+    if (variant == "region") {
+        int smoothing = 4;                                          // bilateral d=9
+        if (smoothing_backend == "guided") smoothing = 12;          // two box passes + upsampling
+        if (smoothing_backend == "bilateral_downsampled") smoothing = 16;
+        if (smoothing_backend == "domain_transform") smoothing = 24; // recursive, ~3 sigma
+        return smoothing + 4;                                       // Sobel + close + 5x5 blur
+    }
+    if (variant == "multiscale") {
+        return brush_size + 4;                                      // (2b+1) Gaussian + Canny/dilate/close
+    }
+    return brush_size / 2 + 2;                                      // box / directional + close
+}
+
+// Grid a tile's oil painting context is aligned to: the region variant's
+// guided and bilateral_downsampled smoothing work at 1/2 or 1/4 resolution,
+// and only match the full frame on crops that start and end on that grid
+int oil_variant_alignment(const std::string& variant, const std::string& smoothing_backend, int smoothing_quality) {
+    return variant == "region" ? smoothing_scale(smoothing_backend, smoothing_quality) : 1;
+}
+
+// Whether oil_variant_halo is exact: the multiscale variant runs Canny, whose
+// hysteresis follows weak edges any distance, and domain_transform is a
+// recursive filter with unbounded support. A frame that isn't a multiple of
+// the alignment is downsampled by a slightly different ratio than any aligned
+// crop. Tiled mode paints those on the whole frame (the later chains still
+// run tile by tile).
+bool oil_variant_tiles_exactly(const std::string& variant, const std::string& smoothing_backend,
+                               int smoothing_quality, const cv::Size& size) {
+    if (variant == "multiscale") return false;
+    if (variant == "region" && smoothing_backend == "domain_transform") return false;
+    int alignment = oil_variant_alignment(variant, smoothing_backend, smoothing_quality);
+    return size.width % alignment == 0 && size.height % alignment == 0;
+}
+
+// Splits a frame into tile_size x tile_size rectangles
+std::vector<cv::Rect> frame_tiles(const cv::Size& size, int tile_size) {
+    std::vector<cv::Rect> tiles;
+    for (int y = 0; y < size.height; y += tile_size) {
+        for (int x = 0; x < size.width; x += tile_size) {
+            tiles.emplace_back(x, y, std::min(tile_size, size.width - x), std::min(tile_size, size.height - y));
+        }
+    }
+    return tiles;
+}
+
+// Source index for every destination index of an INTER_NEAREST resize
+std::vector<int> nearest_indices(int dst, int src) {
+    std::vector<int> indices(dst);
+    double scale = static_cast<double>(src) / dst;
+    for (int i = 0; i < dst; i++) {
+        indices[i] = std::min(static_cast<int>(std::floor(i * scale)), src - 1);
+    }
+    return indices;
+}
+
 // Fast blob processing in C++ - Salvador Dali surrealist oil painting effect
 py::array_t<uint8_t> process_frame_cpp(
     py::array_t<uint8_t> input_frame,
@@ -154,7 +274,15 @@ py::array_t<uint8_t> process_frame_cpp(
     int morph_kernel_size,
     bool apply_opening,
     int apply_closing_iterations,
-    int edge_blur_amount
+    int edge_blur_amount,
+    const std::string& engine_variant,
+    const std::string& smoothing_backend,
+    int smoothing_quality,
+    py::object state,
+    py::object background,
+    bool tiled,
+    int tile_size,
+    py::object profile_frame
 ) {
     // Get input buffer info
     py::buffer_info buf = input_frame.request();
@@ -162,6 +290,12 @@ py::array_t<uint8_t> process_frame_cpp(
     if (buf.ndim != 3) {
         throw std::runtime_error("Input should be 3-dimensional (H, W, C)");
     }
+    if (std::find(ENGINE_VARIANTS.begin(), ENGINE_VARIANTS.end(), engine_variant) == ENGINE_VARIANTS.end()) {
+        throw std::invalid_argument("Unknown engine variant: " + engine_variant);
+    }
+    if (std::find(SMOOTHING_BACKENDS.begin(), SMOOTHING_BACKENDS.end(), smoothing_backend) == SMOOTHING_BACKENDS.end()) {
+        throw std::invalid_argument("Unknown smoothing backend: " + smoothing_backend);
+    }
 
     int original_height = buf.shape[0];
     int original_width = buf.shape[1];
@@ -169,127 +303,344 @@ py::array_t<uint8_t> process_frame_cpp(
     // Create OpenCV Mat from numpy array (no copy)
     cv::Mat frame(original_height, original_width, CV_8UC3, (uint8_t*)buf.ptr);
 
-    // SPEED BOOST: Always downsample for artistic effect (2x faster with minimal quality loss)
-    // Process at 50% resolution, then upscale - the artistic effect hides any artifacts
+    FrameState* frame_state = state.is_none() ? nullptr : state.cast<FrameState*>();
+    BackgroundModel* background_model = background.is_none() ? nullptr : background.cast<BackgroundModel*>();
+    // Per call, so segments with different profile_engine settings can share the
+    // engine; None follows set_profiling
+    bool profiling = profile_frame.is_none() ? profiling_enabled() : profile_frame.cast<bool>();
+
+    // Output is allocated up front so everything below can run without the GIL,
+    // letting several frames (and segments) render on different threads at once
+    auto result_array = py::array_t<uint8_t>({original_height, original_width, 3});
+    uint8_t* output = static_cast<uint8_t*>(result_array.request().ptr);
+
+    py::gil_scoped_release release;
+
+    // Per-operation timings, only when profiling is on (see profiling.h)
+    std::unique_ptr<FrameProfile> frame_profile;
+    std::chrono::steady_clock::time_point frame_start;
+    if (profiling) {
+        frame_profile.reset(new FrameProfile());
+        frame_start = std::chrono::steady_clock::now();
+    }
+    FrameProfile* profile = frame_profile.get();
+
+    // SPEED BOOST: Downsample for artistic effect (2x faster with minimal quality loss)
+    // Process at 1/downsample_factor resolution, then upscale - the artistic effect hides any artifacts
     cv::Mat working_frame;
-    int work_width = original_width / 2;   // 960px width
-    int work_height = original_height / 2; // 540px height
+    int factor = std::max(1, downsample_factor);
+    int work_width = original_width / factor;   // 960px width for 1080p at 2
+    int work_height = original_height / factor; // 540px height
 
     // Fast downsample using INTER_AREA (best for downsampling)
-    cv::resize(frame, working_frame, cv::Size(work_width, work_height), 0, 0, cv::INTER_AREA);
-
-    // SURREALIST TECHNIQUE: Apply enhanced psychedelic distortion for melting effect
-    cv::Mat distorted = apply_distortion_cpp(
-        working_frame,
-        frame_number,
-        psychedelic_amplitude,
-        psychedelic_frequency,
-        psychedelic_total_frames
-    );
+    {
+        ScopedOpTimer timer(profile, PROFILE_DOWNSAMPLE);
+        cv::resize(frame, working_frame, cv::Size(work_width, work_height), 0, 0, cv::INTER_AREA);
+    }
 
-    // FAST OIL PAINTING: Custom matrix-based approach (10-100x faster!)
-    if (use_stylization) {
-        // Use our custom fast oil painting instead of slow cv::stylization
-        // Parameters tuned for Dali-esque effect:
-        // - brush_size: Controls stroke size (from stylize_sigma_s)
-        // - intensity_levels: Posterization (from quantization_levels)
-        // - edge_strength: Edge preservation (from stylize_sigma_r)
+    // Use our custom fast oil painting instead of slow cv::stylization
+    // Parameters tuned for Dali-esque effect:
+    // - brush_size: Controls stroke size (from stylize_sigma_s)
+    // - intensity_levels: Posterization (from quantization_levels)
+    // - edge_strength: Edge preservation (from stylize_sigma_r)
+    int brush_size = static_cast<int>(stylize_sigma_s / 6);  // Convert sigma to brush size
+    brush_size = std::max(3, std::min(15, brush_size));  // Clamp to odd values
+    if (brush_size % 2 == 0) brush_size++;  // Ensure odd
+
+    float edge_strength = stylize_sigma_r;  // Use directly
+
+    auto oil_painting = [&](const cv::Mat& image) {
+        ScopedOpTimer timer(profile, PROFILE_OIL_PAINT);
+        return apply_oil_variant(image, engine_variant, brush_size, quantization_levels, edge_strength,
+                                 smoothing_backend, smoothing_quality, profile);
+    };
+
+    // CACHED MODES: The distortion moves every pixel on every frame, so
+    // stylize the undistorted frame, then distort
+    // - background: cached stylized background + freshly stylized foreground
+    // - incremental: only tiles that changed since the previous frame
+    cv::Mat stylized;
+    bool cached = use_stylization && (background_model || frame_state);
+    if (cached) {
+        ScopedOpTimer timer(profile, PROFILE_CACHED_STYLIZE);
+        stylized = background_model
+            ? background_model->composite(working_frame, oil_painting)
+            : frame_state->stylize(working_frame, oil_painting);
+    }
 
-        int brush_size = static_cast<int>(stylize_sigma_s / 6);  // Convert sigma to brush size
-        brush_size = std::max(3, std::min(15, brush_size));  // Clamp to odd values
-        if (brush_size % 2 == 0) brush_size++;  // Ensure odd
+    // The pipeline runs in per-pixel chains split by the two steps that need the
+    // whole frame (CLAHE and Canny). In tiled mode each chain runs tile by tile
+    // (tile plus a halo wide enough for its filters) so a tile's intermediates
+    // stay in cache, and tiles run in parallel. Otherwise the whole frame is a
+    // single tile.
+    const cv::Rect frame_rect(0, 0, work_width, work_height);
+    std::vector<cv::Rect> tiles = tiled && tile_size > 0
+        ? frame_tiles(working_frame.size(), tile_size)
+        : std::vector<cv::Rect>{frame_rect};
+
+    int halo_a = use_stylization && !cached
+        ? oil_variant_halo(engine_variant, brush_size, smoothing_backend, smoothing_quality)
+        : 0;
+    int align_a = use_stylization ? oil_variant_alignment(engine_variant, smoothing_backend, smoothing_quality) : 1;
+    std::vector<cv::Rect> tiles_a = use_stylization && !cached
+            && !oil_variant_tiles_exactly(engine_variant, smoothing_backend, smoothing_quality, working_frame.size())
+        ? std::vector<cv::Rect>{frame_rect}
+        : tiles;
+    int morph_radius = morph_kernel_size / 2;
+    int halo_b = (apply_opening ? 2 * morph_radius : 0) + apply_closing_iterations * 2 * morph_radius;
+    int halo_c = edge_blur_amount / 2;
+
+    // The distorted color frame is only kept for detail enhancement
+    cv::Mat distorted;
+    if (detail_enhance) {
+        distorted.create(working_frame.size(), CV_8UC3);
+    }
+    cv::Mat gray(working_frame.size(), CV_8U);
+
+    // STAGE A: distortion + oil painting + grayscale
+    auto stage_a = [&](const cv::Rect& rect) {
+        cv::Mat painted;
+        if (cached) {
+            ScopedOpTimer timer(profile, PROFILE_DISTORTION);
+            painted = apply_distortion_rect(stylized, rect, frame_number,
+                                            psychedelic_amplitude, psychedelic_frequency, psychedelic_total_frames);
+        } else {
+            // Halo, widened out to the alignment grid (frame edges are on it)
+            int x0 = std::max(0, rect.x - halo_a) / align_a * align_a;
+            int y0 = std::max(0, rect.y - halo_a) / align_a * align_a;
+            int x1 = std::min(work_width, (rect.x + rect.width + halo_a + align_a - 1) / align_a * align_a);
+            int y1 = std::min(work_height, (rect.y + rect.height + halo_a + align_a - 1) / align_a * align_a);
+            cv::Rect context(x0, y0, x1 - x0, y1 - y0);
+
+            // SURREALIST TECHNIQUE: Apply enhanced psychedelic distortion for melting effect
+            {
+                ScopedOpTimer timer(profile, PROFILE_DISTORTION);
+                painted = apply_distortion_rect(working_frame, context, frame_number,
+                                                psychedelic_amplitude, psychedelic_frequency, psychedelic_total_frames);
+            }
 
-        float edge_strength = stylize_sigma_r;  // Use directly
+            // FAST OIL PAINTING: Custom matrix-based approach (10-100x faster!)
+            if (use_stylization) {
+                painted = oil_painting(painted);
+            }
+            painted = painted(rect - context.tl());
+        }
+        if (detail_enhance) {
+            painted.copyTo(distorted(rect));
+        }
+        ScopedOpTimer timer(profile, PROFILE_GRAYSCALE);
+        cv::cvtColor(painted, gray(rect), cv::COLOR_BGR2GRAY);
+    };
 
-        distorted = fast_oil_painting_effect(distorted, brush_size, quantization_levels, edge_strength);
-    }
+    cv::parallel_for_(cv::Range(0, static_cast<int>(tiles_a.size())), [&](const cv::Range& range) {
+        for (int i = range.start; i < range.end; i++) {
+            stage_a(tiles_a[i]);
+        }
+    });
 
-    // DETAIL ENHANCEMENT: For richer texture
+    // DETAIL ENHANCEMENT: For richer texture (whole frame)
     if (detail_enhance) {
         cv::Mat enhanced;
-        cv::detailEnhance(distorted, enhanced, detail_sigma_s, detail_sigma_r);
-        distorted = enhanced;
+        {
+            ScopedOpTimer timer(profile, PROFILE_DETAIL_ENHANCE);
+            cv::detailEnhance(distorted, enhanced, detail_sigma_s, detail_sigma_r);
+        }
+        ScopedOpTimer timer(profile, PROFILE_GRAYSCALE);
+        cv::cvtColor(enhanced, gray, cv::COLOR_BGR2GRAY);
     }
 
-    // Convert to grayscale
-    cv::Mat gray;
-    cv::cvtColor(distorted, gray, cv::COLOR_BGR2GRAY);
-
     // SKIP SLOW BILATERAL FILTER - already smoothed in oil painting function
     cv::Mat smooth = gray;
 
     // TONAL MAPPING: Smooth gradients like oil paint
     if (use_adaptive_threshold) {
-        // Adaptive histogram equalization for depth and atmosphere
+        // Adaptive histogram equalization for depth and atmosphere (whole frame)
+        ScopedOpTimer timer(profile, PROFILE_CLAHE);
         cv::Ptr<cv::CLAHE> clahe = cv::createCLAHE(2.0, cv::Size(8, 8));
         clahe->apply(smooth, smooth);
     }
 
-    // Gentle quantization for tonal variation
+    // Nearest-neighbour upsample tables (INTER_NEAREST preserves painterly edges)
+    std::vector<int> src_x = nearest_indices(original_width, work_width);
+    std::vector<int> src_y = nearest_indices(original_height, work_height);
+
     float level_step = 255.0f / (quantization_levels - 1);
-    cv::Mat quantized(smooth.size(), CV_8U);
+    cv::Mat kernel = cv::Mat::ones(morph_kernel_size, morph_kernel_size, CV_8U);
+
+    // STAGE B: quantize + morphology
+    cv::Mat quantized_frame(working_frame.size(), CV_8U);
+
+    auto stage_b = [&](const cv::Rect& rect) {
+        cv::Rect context = cv::Rect(rect.x - halo_b, rect.y - halo_b,
+                                    rect.width + 2 * halo_b, rect.height + 2 * halo_b) & frame_rect;
+        cv::Mat tone = smooth(context);
 
-    for (int y = 0; y < smooth.rows; y++) {
-        const uint8_t* smooth_ptr = smooth.ptr<uint8_t>(y);
-        uint8_t* quant_ptr = quantized.ptr<uint8_t>(y);
+        // Gentle quantization for tonal variation
+        cv::Mat quantized(tone.size(), CV_8U);
 
-        for (int x = 0; x < smooth.cols; x++) {
-            float val = smooth_ptr[x] / level_step + 0.5f;
-            val = std::floor(val) * level_step;
-            quant_ptr[x] = static_cast<uint8_t>(std::min(255.0f, std::max(0.0f, val)));
+        {
+            ScopedOpTimer timer(profile, PROFILE_QUANTIZE);
+            for (int y = 0; y < tone.rows; y++) {
+                const uint8_t* smooth_ptr = tone.ptr<uint8_t>(y);
+                uint8_t* quant_ptr = quantized.ptr<uint8_t>(y);
+
+                for (int x = 0; x < tone.cols; x++) {
+                    float val = smooth_ptr[x] / level_step + 0.5f;
+                    val = std::floor(val) * level_step;
+                    quant_ptr[x] = static_cast<uint8_t>(std::min(255.0f, std::max(0.0f, val)));
+                }
+            }
         }
-    }
 
-    // MINIMAL MORPHOLOGY: Preserve painterly texture
-    cv::Mat kernel = cv::Mat::ones(morph_kernel_size, morph_kernel_size, CV_8U);
+        // MINIMAL MORPHOLOGY: Preserve painterly texture
+        {
+            ScopedOpTimer timer(profile, PROFILE_MORPHOLOGY);
+            if (apply_opening) {
+                cv::morphologyEx(quantized, quantized, cv::MORPH_OPEN, kernel);
+            }
 
-    if (apply_opening) {
-        cv::morphologyEx(quantized, quantized, cv::MORPH_OPEN, kernel);
-    }
+            for (int i = 0; i < apply_closing_iterations; i++) {
+                cv::morphologyEx(quantized, quantized, cv::MORPH_CLOSE, kernel);
+            }
+        }
 
-    for (int i = 0; i < apply_closing_iterations; i++) {
-        cv::morphologyEx(quantized, quantized, cv::MORPH_CLOSE, kernel);
-    }
+        quantized(rect - context.tl()).copyTo(quantized_frame(rect));
+    };
+
+    cv::parallel_for_(cv::Range(0, static_cast<int>(tiles.size())), [&](const cv::Range& range) {
+        for (int i = range.start; i < range.end; i++) {
+            stage_b(tiles[i]);
+        }
+    });
 
     // PAINTERLY EDGES: Skip entirely if disabled for performance
-    if (edge_blend_factor > 0.0f) {
-        cv::Mat edges;
-        cv::Canny(quantized, edges, canny_threshold_1, canny_threshold_2);
-        cv::GaussianBlur(edges, edges, cv::Size(edge_blur_amount, edge_blur_amount), 0);
-
-        // Blend edges
-        cv::Mat edges_scaled(edges.size(), CV_8U);
-        for (int y = 0; y < edges.rows; y++) {
-            const uint8_t* edges_ptr = edges.ptr<uint8_t>(y);
-            uint8_t* scaled_ptr = edges_scaled.ptr<uint8_t>(y);
-
-            for (int x = 0; x < edges.cols; x++) {
-                float scaled = edges_ptr[x] * edge_blend_factor;
-                scaled_ptr[x] = static_cast<uint8_t>(std::min(255.0f, scaled));
+    // (Canny's hysteresis follows edges any distance, so it runs on the whole frame)
+    bool painterly_edges = edge_blend_factor > 0.0f;
+    cv::Mat edges_frame;
+    if (painterly_edges) {
+        ScopedOpTimer timer(profile, PROFILE_CANNY);
+        cv::Canny(quantized_frame, edges_frame, canny_threshold_1, canny_threshold_2);
+    }
+
+    // STAGE C: edge blur + blend + upsample to the output buffer
+    auto stage_c = [&](const cv::Rect& rect) {
+        cv::Mat quantized = quantized_frame(rect);
+
+        if (painterly_edges) {
+            cv::Rect context = cv::Rect(rect.x - halo_c, rect.y - halo_c,
+                                        rect.width + 2 * halo_c, rect.height + 2 * halo_c) & frame_rect;
+            cv::Mat edges;
+            {
+                ScopedOpTimer timer(profile, PROFILE_EDGE_BLUR);
+                cv::GaussianBlur(edges_frame(context), edges, cv::Size(edge_blur_amount, edge_blur_amount), 0);
+            }
+            edges = edges(rect - context.tl());
+
+            // Blend edges
+            ScopedOpTimer timer(profile, PROFILE_EDGE_BLEND);
+            cv::Mat blended(rect.size(), CV_8U);
+            for (int y = 0; y < edges.rows; y++) {
+                const uint8_t* edges_ptr = edges.ptr<uint8_t>(y);
+                const uint8_t* quant_ptr = quantized.ptr<uint8_t>(y);
+                uint8_t* blended_ptr = blended.ptr<uint8_t>(y);
+
+                for (int x = 0; x < edges.cols; x++) {
+                    uint8_t scaled = static_cast<uint8_t>(std::min(255.0f, edges_ptr[x] * edge_blend_factor));
+                    blended_ptr[x] = cv::saturate_cast<uint8_t>(quant_ptr[x] + scaled);
+                }
+            }
+            quantized = blended;
+        }
+
+        // Upsample back to original size and convert grayscale to BGR in one pass,
+        // writing this tile's output pixels straight into the numpy buffer
+        ScopedOpTimer timer(profile, PROFILE_UPSAMPLE);
+        int y_begin = std::lower_bound(src_y.begin(), src_y.end(), rect.y) - src_y.begin();
+        int y_end = std::lower_bound(src_y.begin(), src_y.end(), rect.y + rect.height) - src_y.begin();
+        int x_begin = std::lower_bound(src_x.begin(), src_x.end(), rect.x) - src_x.begin();
+        int x_end = std::lower_bound(src_x.begin(), src_x.end(), rect.x + rect.width) - src_x.begin();
+
+        for (int y = y_begin; y < y_end; y++) {
+            const uint8_t* src_ptr = quantized.ptr<uint8_t>(src_y[y] - rect.y);
+            uint8_t* out_ptr = output + (static_cast<size_t>(y) * original_width + x_begin) * 3;
+            for (int x = x_begin; x < x_end; x++) {
+                uint8_t value = src_ptr[src_x[x] - rect.x];
+                *out_ptr++ = value;
+                *out_ptr++ = value;
+                *out_ptr++ = value;
             }
         }
+    };
 
-        cv::add(quantized, edges_scaled, quantized);
+    cv::parallel_for_(cv::Range(0, static_cast<int>(tiles.size())), [&](const cv::Range& range) {
+        for (int i = range.start; i < range.end; i++) {
+            stage_c(tiles[i]);
+        }
+    });
+
+    if (profile) {
+        profile->add(PROFILE_TOTAL, std::chrono::duration_cast<std::chrono::nanoseconds>(
+            std::chrono::steady_clock::now() - frame_start).count());
+        commit_frame_profile(*profile);
     }
 
-    // Upsample back to original size (INTER_NEAREST preserves painterly edges)
-    cv::resize(quantized, quantized, cv::Size(original_width, original_height), 0, 0, cv::INTER_NEAREST);
+    return result_array;
+}
 
-    // Convert grayscale to BGR
-    cv::Mat result;
-    cv::cvtColor(quantized, result, cv::COLOR_GRAY2BGR);
+// Run a single oil painting variant on a BGR image (used by the variant benchmark)
+py::array_t<uint8_t> oil_paint_cpp(py::array_t<uint8_t, py::array::c_style> input_frame,
+                                   const std::string& variant,
+                                   int brush_size,
+                                   int intensity_levels,
+                                   float edge_strength) {
+    py::buffer_info buf = input_frame.request();
 
-    // Create output numpy array
-    auto result_array = py::array_t<uint8_t>({original_height, original_width, 3});
+    if (buf.ndim != 3 || buf.shape[2] != 3) {
+        throw std::runtime_error("Input should be 3-dimensional (H, W, 3)");
+    }
+
+    int height = buf.shape[0];
+    int width = buf.shape[1];
+    cv::Mat frame(height, width, CV_8UC3, (uint8_t*)buf.ptr);
+
+    cv::Mat result = apply_oil_variant(frame, variant, brush_size, intensity_levels, edge_strength);
+
+    auto result_array = py::array_t<uint8_t>({height, width, 3});
     py::buffer_info result_buf = result_array.request();
+    std::memcpy(result_buf.ptr, result.data, height * width * 3);
 
-    // Copy data
-    std::memcpy(result_buf.ptr, result.data, original_height * original_width * 3);
+    return result_array;
+}
+
+// Run a single smoothing backend on a BGR image (used by the smoothing benchmark)
+py::array_t<uint8_t> smooth_cpp(py::array_t<uint8_t, py::array::c_style> input_frame,
+                                const std::string& backend,
+                                int quality) {
+    py::buffer_info buf = input_frame.request();
+
+    if (buf.ndim != 3 || buf.shape[2] != 3) {
+        throw std::runtime_error("Input should be 3-dimensional (H, W, 3)");
+    }
+
+    int height = buf.shape[0];
+    int width = buf.shape[1];
+    cv::Mat frame(height, width, CV_8UC3, (uint8_t*)buf.ptr);
+
+    cv::Mat result = edge_preserving_smooth(frame, backend, quality);
+
+    auto result_array = py::array_t<uint8_t>({height, width, 3});
+    py::buffer_info result_buf = result_array.request();
+    std::memcpy(result_buf.ptr, result.data, height * width * 3);
 
     return result_array;
 }
 
-PYBIND11_MODULE(fast_processor, m) {
+// Versioned hot-swap builds compile this as fast_processor_v<hash> (see engine_loader.py)
+#ifndef ENGINE_MODULE_NAME
+#define ENGINE_MODULE_NAME fast_processor
+#endif
+
+PYBIND11_MODULE(ENGINE_MODULE_NAME, m) {
     m.doc() = "Fast C++ image processing for Salvador Dali surrealist oil painting effects";
 
     m.def("process_frame", &process_frame_cpp,
@@ -311,12 +662,101 @@ PYBIND11_MODULE(fast_processor, m) {
           py::arg("quantization_levels") = 16,       // Smooth oil paint transitions
           py::arg("use_adaptive_threshold") = true,  // Adaptive toning for depth
           py::arg("edge_blend_factor") = 0.15f,      // Subtle painterly edges
-          py::arg("downsample_factor") = 1,          // FULL RESOLUTION for quality!
+          py::arg("downsample_factor") = 2,          // Half resolution, 1 = full
           py::arg("canny_threshold_1") = 50,
           py::arg("canny_threshold_2") = 150,
           py::arg("morph_kernel_size") = 3,
           py::arg("apply_opening") = false,
           py::arg("apply_closing_iterations") = 1,
-          py::arg("edge_blur_amount") = 5
+          py::arg("edge_blur_amount") = 5,
+          py::arg("engine_variant") = "region",
+          py::arg("smoothing_backend") = "bilateral",
+          py::arg("smoothing_quality") = 2,
+          py::arg("state") = py::none(),
+          py::arg("background") = py::none(),
+          py::arg("tiled") = false,
+          py::arg("tile_size") = 128,
+          py::arg("profile") = py::none()            // Time operations (None: as set by set_profiling)
     );
+
+    // Module-local: every hot-swapped engine version (see engine_loader.py) defines
+    // its own classes, which would otherwise clash in pybind11's global registry
+    py::class_<FrameState>(m, "FrameState", py::module_local(),
+                           "Per-segment tile cache for incremental stylization (pass as state=)")
+        .def(py::init<int, float, int>(),
+             py::arg("tile_size") = 64,
+             py::arg("threshold") = 3.0f,
+             py::arg("halo") = 16)
+        .def("reset", &FrameState::reset)
+        .def_readonly("tile_size", &FrameState::tile_size)
+        .def_readonly("threshold", &FrameState::threshold)
+        .def_readonly("halo", &FrameState::halo)
+        .def_readonly("frames", &FrameState::frames)
+        .def_readonly("tiles_total", &FrameState::tiles_total)
+        .def_readonly("tiles_recomputed", &FrameState::tiles_recomputed)
+        .def_readonly("last_fraction", &FrameState::last_fraction)
+        .def_property_readonly("recompute_fraction", [](const FrameState& s) {
+            return s.tiles_total ? static_cast<double>(s.tiles_recomputed) / s.tiles_total : 1.0;
+        });
+
+    py::class_<BackgroundModel>(m, "BackgroundModel", py::module_local(),
+                                "Long-lived stylized background cache for fixed cameras (pass as background=)")
+        .def(py::init<int, float, int, int>(),
+             py::arg("restyle_interval") = 90,
+             py::arg("lighting_threshold") = 8.0f,
+             py::arg("max_model_pixels") = 320 * 180,
+             py::arg("halo") = 16)
+        .def("reset", &BackgroundModel::reset)
+        .def("memory_bytes", &BackgroundModel::memory_bytes)
+        .def_readonly("restyle_interval", &BackgroundModel::restyle_interval)
+        .def_readonly("lighting_threshold", &BackgroundModel::lighting_threshold)
+        .def_readonly("max_model_pixels", &BackgroundModel::max_model_pixels)
+        .def_readonly("halo", &BackgroundModel::halo)
+        .def_property_readonly("frames", [](const BackgroundModel& b) { return b.frames.load(); })
+        .def_property_readonly("restyles", [](const BackgroundModel& b) { return b.restyles.load(); })
+        .def_property_readonly("last_foreground_fraction",
+                               [](const BackgroundModel& b) { return b.last_foreground_fraction.load(); });
+
+    m.def("oil_paint", &oil_paint_cpp,
+          "Apply a single oil painting engine variant to a BGR frame",
+          py::arg("input_frame"),
+          py::arg("variant") = "region",
+          py::arg("brush_size") = 9,
+          py::arg("intensity_levels") = 16,
+          py::arg("edge_strength") = 0.3f
+    );
+
+    m.def("engine_variants", []() { return ENGINE_VARIANTS; },
+          "Names accepted by the engine_variant argument of process_frame");
+
+    m.def("smooth", &smooth_cpp,
+          "Apply a single edge-preserving smoothing backend to a BGR frame",
+          py::arg("input_frame"),
+          py::arg("backend") = "bilateral",
+          py::arg("quality") = 2
+    );
+
+    m.def("smoothing_backends", []() { return SMOOTHING_BACKENDS; },
+          "Names accepted by the smoothing_backend argument of process_frame");
+
+    m.def("set_profiling", &set_profiling,
+          "Turn per-operation timing on or off for process_frame calls without profile= (off by default)",
+          py::arg("enabled"));
+
+    m.def("profiling_enabled", &profiling_enabled);
+
+    m.def("take_thread_profile", []() {
+        long long frames = 0;
+        py::dict ops;
+        for (const OpTotal& total : take_thread_profile(frames)) {
+            py::dict entry;
+            entry["ms"] = total.ms;
+            entry["calls"] = total.calls;
+            ops[py::str(total.op)] = entry;
+        }
+        py::dict result;
+        result["frames"] = frames;
+        result["ops"] = ops;
+        return result;
+    }, "Per-operation totals of the frames this thread processed since the last call, then clears them");
 }
@@ -0,0 +1,234 @@
+"""
+Source HTTP clients - one tuned, instrumented client per process for the
+chunklist polls and segment downloads, shared by the asyncio processor
+(create_async_client) and the Celery tasks (get_sync_client).
+
+- Pool limits sized for ingest: polls, a few concurrent downloads, hedges,
+  prefetch and origin probes, across a handful of origins
+- Keep-alive connections outlive a segment interval (httpx's default 5 s
+  expiry is shorter than the 6 s between segments, so every download would
+  open a new connection)
+- HTTP/2 multiplexing with HTTP2=1 (needs the h2 package: httpx[http2])
+- DNS answers cached for DNS_CACHE_SECONDS, dropped when a connect fails
+
+Requests, newly opened connections (reuse rate = 1 - opened / requests), pool
+connections by state and DNS cache hits are exported as metrics.
+"""
+import asyncio
+import importlib.util
+import ipaddress
+import os
+import socket
+import threading
+import time
+
+import httpcore
+import httpx
+
+from backend.core import metrics
+
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 30.0              # Seconds an idle connection is kept
+CONNECT_TIMEOUT = 5.0
+DEFAULT_TIMEOUT = 10.0               # Per-request timeouts override this
+DNS_CACHE_SECONDS = 60.0
+
+HTTP2_REQUESTED = os.getenv('HTTP2', '0') == '1'
+HTTP2_ENABLED = HTTP2_REQUESTED and importlib.util.find_spec("h2") is not None
+if HTTP2_REQUESTED and not HTTP2_ENABLED:
+    print("⚠️  HTTP2=1 but the h2 package isn't installed (pip install 'httpx[http2]'), using HTTP/1.1")
+
+_transports = {}                     # Client name -> instrumented transport (the latest one)
+_sync_clients = {}
+_sync_clients_lock = threading.Lock()
+
+
+class DNSCache:
+    """Resolved address per (host, port), shared by every client in the process."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.entries = {}            # (host, port) -> (address, expires at)
+        self.lock = threading.Lock()
+
+    def get(self, host: str, port: int) -> str | None:
+        with self.lock:
+            entry = self.entries.get((host, port))
+        if entry is not None and entry[1] > time.monotonic():
+            metrics.DNS_LOOKUPS_TOTAL.inc(result="hit")
+            return entry[0]
+        metrics.DNS_LOOKUPS_TOTAL.inc(result="miss")
+        return None
+
+    def put(self, host: str, port: int, address: str):
+        with self.lock:
+            self.entries[(host, port)] = (address, time.monotonic() + self.ttl)
+
+    def forget(self, host: str, port: int):
+        with self.lock:
+            self.entries.pop((host, port), None)
+
+
+dns_cache = DNSCache(DNS_CACHE_SECONDS)
+
+
+def is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class CachingAsyncBackend(httpcore.AsyncNetworkBackend):
+    """
+    Network backend that connects to the cached address for a host and counts
+    new connections. TLS still verifies and sends SNI for the host name -
+    httpcore passes it to start_tls separately.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if is_ip_address(host):
+            address = host
+        else:
+            address = dns_cache.get(host, port)
+            if address is None:
+                infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+                address = infos[0][4][0]
+                dns_cache.put(host, port, address)
+        try:
+            stream = await self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+        except Exception:
+            dns_cache.forget(host, port)  # The next connect looks it up again
+            raise
+        metrics.HTTP_CONNECTIONS_OPENED_TOTAL.inc(client=self.name)
+        return stream
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self.backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds):
+        await self.backend.sleep(seconds)
+
+
+class CachingSyncBackend(httpcore.NetworkBackend):
+    """CachingAsyncBackend for the blocking client."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.backend = httpcore.SyncBackend()
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if is_ip_address(host):
+            address = host
+        else:
+            address = dns_cache.get(host, port)
+            if address is None:
+                address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4][0]
+                dns_cache.put(host, port, address)
+        try:
+            stream = self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+        except Exception:
+            dns_cache.forget(host, port)
+            raise
+        metrics.HTTP_CONNECTIONS_OPENED_TOTAL.inc(client=self.name)
+        return stream
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self.backend.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds):
+        self.backend.sleep(seconds)
+
+
+class InstrumentedAsyncTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, name: str, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        # httpx doesn't take a network backend, its connection pool does
+        self._pool._network_backend = CachingAsyncBackend(name)
+
+    async def handle_async_request(self, request):
+        metrics.HTTP_REQUESTS_TOTAL.inc(client=self.name)
+        return await super().handle_async_request(request)
+
+
+class InstrumentedSyncTransport(httpx.HTTPTransport):
+    def __init__(self, name: str, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self._pool._network_backend = CachingSyncBackend(name)
+
+    def handle_request(self, request):
+        metrics.HTTP_REQUESTS_TOTAL.inc(client=self.name)
+        return super().handle_request(request)
+
+
+def client_settings() -> dict:
+    return {
+        "http2": HTTP2_ENABLED,
+        "limits": httpx.Limits(max_connections=MAX_CONNECTIONS,
+                               max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                               keepalive_expiry=KEEPALIVE_EXPIRY),
+    }
+
+
+def create_async_client(name: str) -> httpx.AsyncClient:
+    """A tuned client for the event loop (close it with `async with` or aclose())."""
+    transport = InstrumentedAsyncTransport(name, **client_settings())
+    _transports[name] = transport
+    return httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT))
+
+
+def get_sync_client(name: str) -> httpx.Client:
+    """
+    The process's blocking client for `name`, created on first use - after a
+    Celery worker forks, so connections aren't shared across processes.
+    """
+    with _sync_clients_lock:
+        client = _sync_clients.get(name)
+        if client is None:
+            transport = InstrumentedSyncTransport(name, **client_settings())
+            _transports[name] = transport
+            client = httpx.Client(transport=transport,
+                                  timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT))
+            _sync_clients[name] = client
+        return client
+
+
+def pool_connections() -> dict:
+    """{(client, state): connections} for active (serving a request) and idle pool connections."""
+    counts = {}
+    for name, transport in list(_transports.items()):
+        connections = transport._pool.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        counts[(name, "active")] = len(connections) - idle
+        counts[(name, "idle")] = idle
+    return counts
+
+
+metrics.HTTP_POOL_CONNECTIONS.callback = pool_connections
+
+
+def get_client_stats() -> dict:
+    """Per-client requests, opened connections, reuse rate and pool usage for the admin status API."""
+    requests = metrics.HTTP_REQUESTS_TOTAL.snapshot()
+    opened = metrics.HTTP_CONNECTIONS_OPENED_TOTAL.snapshot()
+    pool = pool_connections()
+    stats = {}
+    for name in _transports:
+        count = requests.get(name, 0)
+        stats[name] = {
+            "requests": count,
+            "connections_opened": opened.get(name, 0),
+            "reuse_rate": round(max(0.0, 1 - opened.get(name, 0) / count), 3) if count else None,
+            "active": pool.get((name, "active"), 0),
+            "idle": pool.get((name, "idle"), 0),
+            "http2": HTTP2_ENABLED,
+        }
+    return stats
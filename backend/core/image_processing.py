@@ -1,8 +1,8 @@
 import cv2
 import numpy as np
-import os
 import math
-import shutil
+
+from backend.core import python_engine
 
 # Try to import the fast C++ processor
 try:
@@ -71,15 +71,26 @@ def apply_psychedelic_distortion(image, frame_number, amplitude=0.02, frequency=
 
     return distorted_image
 
-def process_frame_fast_blobs(frame_data):
+def process_frame_fast_blobs(frame_data, engine=None, settings=None, state=None, background=None):
     """
     Creates a Salvador Dali-inspired surrealist oil painting effect with melting forms,
     dream-like atmosphere, and painterly textures
+
+    engine: native extension module to render with (pinned per segment by the
+    processor so hot-swapped builds switch at segment boundaries). Defaults to
+    the in-place fast_processor build, or python_engine if it isn't built.
+    settings: per-segment snapshot of the stream config (see StreamPipeline.get_segment_settings).
+    state: engine FrameState for incremental (changed tiles only) stylization.
+    background: engine BackgroundModel - cached stylized background, only the
+    moving foreground is stylized (takes precedence over state).
+
+    Returns the processed BGR frame (None on error). Frame skipping and saving
+    are handled by the processor (see temporal.py).
     """
     # ========== SALVADOR DALI STYLE - ORIGINAL QUALITY, PARALLEL PROCESSING ==========
     # DOWNSAMPLING - Process at lower resolution for SPEED
     downsample_factor = 2            # 50% resolution = 4x fewer pixels = MUCH faster!
-    process_every_nth_frame = 1      # Process ALL frames
+    working_height = None            # Rows to work at - sets downsample_factor per frame
 
     # SUBTLE MELTING EFFECT - Less psychedelic
     psychedelic_amplitude = 0.01     # Subtle warping (was 0.035)
@@ -116,44 +127,44 @@ def process_frame_fast_blobs(frame_data):
     apply_opening = False            # Keep texture detail
     apply_closing_iterations = 1     # Minimal smoothing
 
+    # ENGINE VARIANT: Which oil painting implementation the C++ engine runs
+    engine_variant = "region"        # region | multiscale | box | directional
+    smoothing_backend = "bilateral"  # bilateral | guided | domain_transform | bilateral_downsampled
+    smoothing_quality = 2            # 1 (fastest) - 3 (closest to bilateral)
+
+    # TILED EXECUTION: Run each stage chain tile by tile (cache-sized, parallel)
+    tiled = False
+    tile_size = 128
+
     # ===================================================================
 
+    # Per-segment overrides from the admin config
+    if settings:
+        engine_variant = settings.get("engine_variant", engine_variant)
+        smoothing_backend = settings.get("smoothing_backend", smoothing_backend)
+        smoothing_quality = settings.get("smoothing_quality", smoothing_quality)
+        tiled = settings.get("tiled", tiled)
+        tile_size = settings.get("tiled_tile_size", tile_size)
+        working_height = settings.get("working_height", working_height)
+
     # Unpack frame data
     segment_number, frame_number, frame, edge_color, background_color, lty, ltmnth, ltd, lth, ltm = frame_data
 
+    # A smaller source rendition is already close to the working resolution
+    # (see renditions.py) - downsample it less, never below working_height
+    if working_height:
+        downsample_factor = max(1, frame.shape[0] // int(working_height))
+
     try:
         # Convert segment_number to int if it's a string
         if isinstance(segment_number, str):
             segment_number = int(segment_number)
 
-        # Only process every Nth frame for performance
-        if frame_number % process_every_nth_frame != 0:
-            base_frame = (frame_number // process_every_nth_frame) * process_every_nth_frame
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            frames_dir = os.path.join(base_dir, "data", "frames", str(segment_number))
-            base_path = os.path.join(frames_dir, f"{base_frame}.jpg")
-            dest_path = os.path.join(frames_dir, f"{frame_number}.jpg")
-
-            # Wait a bit for base frame to be created if needed
-            import time
-            max_wait = 5  # seconds
-            wait_count = 0
-            while not os.path.exists(base_path) and wait_count < max_wait * 10:
-                time.sleep(0.1)
-                wait_count += 1
-
-            if os.path.exists(base_path):
-                shutil.copy2(base_path, dest_path)
-                return True
-            else:
-                # Base frame doesn't exist, skip this frame
-                return False
-
-        # ALWAYS use C++ implementation - no Python fallback!
-        if not USE_CPP:
-            raise RuntimeError("C++ processor not available! Run ./build_cpp.sh to build it.")
-
-        carbonized_bgr = fast_processor.process_frame(
+        # C++ engine when built, otherwise the NumPy/OpenCV port of the same pipeline
+        if engine is None:
+            engine = fast_processor if USE_CPP else python_engine
+
+        carbonized_bgr = engine.process_frame(
             frame,
             frame_number,
             psychedelic_amplitude,
@@ -177,106 +188,20 @@ def process_frame_fast_blobs(frame_data):
             morph_kernel_size,
             apply_opening,
             apply_closing_iterations,
-            edge_blur_amount
+            edge_blur_amount,
+            engine_variant,
+            smoothing_backend,
+            smoothing_quality,
+            state=state,
+            background=background,
+            tiled=tiled,
+            tile_size=tile_size,
+            profile=bool(settings.get("profile_engine")) if settings else None
         )
 
-        # No Python fallback - deleted for performance
-        if False:
-            # Python fallback implementation
-            # Store original dimensions
-            original_height, original_width = frame.shape[:2]
-
-            # Downsample for faster processing
-            if downsample_factor > 1:
-                small_width = original_width // downsample_factor
-                small_height = original_height // downsample_factor
-                frame_small = cv2.resize(frame, (small_width, small_height), interpolation=cv2.INTER_AREA)
-            else:
-                frame_small = frame
-
-            # SURREALIST TECHNIQUE: Apply enhanced psychedelic distortion for melting effect
-            distorted_frame = apply_psychedelic_distortion(
-                frame_small, frame_number,
-                amplitude=psychedelic_amplitude,
-                frequency=psychedelic_frequency,
-                total_frames=psychedelic_total_frames
-            )
-
-            # OIL PAINTING EFFECT: Try faster edge-preserving filter
-            if use_edge_preserving:
-                # Edge preserving filter - MUCH faster than stylization
-                distorted_frame = cv2.edgePreservingFilter(
-                    distorted_frame,
-                    flags=edge_preserve_flags,
-                    sigma_s=edge_preserve_sigma_s,
-                    sigma_r=edge_preserve_sigma_r
-                )
-            elif use_oil_painting:
-                # Try xphoto oil painting filter if available
-                try:
-                    distorted_frame = cv2.xphoto.oilPainting(
-                        distorted_frame,
-                        oil_painting_size,
-                        oil_painting_dynRatio
-                    )
-                except:
-                    pass  # Fall back if not available
-
-            # Convert to grayscale
-            gray = cv2.cvtColor(distorted_frame, cv2.COLOR_BGR2GRAY)
-
-            # ATMOSPHERIC DEPTH: Gentle bilateral smoothing
-            smooth = cv2.bilateralFilter(gray, bilateral_d, bilateral_sigma_color, bilateral_sigma_space)
-
-            # TONAL MAPPING: Smooth gradients like oil paint
-            if use_adaptive_threshold:
-                # Adaptive histogram equalization for depth and atmosphere
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-                smooth = clahe.apply(smooth)
-
-            # Gentle quantization for tonal variation
-            level_step = 255.0 / (quantization_levels - 1)
-            quantized = np.floor(smooth / level_step + 0.5) * level_step
-            quantized = quantized.astype(np.uint8)
-
-            # MINIMAL MORPHOLOGY: Preserve painterly texture
-            kernel = np.ones((morph_kernel_size, morph_kernel_size), np.uint8)
-
-            if apply_opening:
-                quantized = cv2.morphologyEx(quantized, cv2.MORPH_OPEN, kernel)
-
-            for _ in range(apply_closing_iterations):
-                quantized = cv2.morphologyEx(quantized, cv2.MORPH_CLOSE, kernel)
-
-            # PAINTERLY EDGES: Skip entirely if disabled
-            if edge_blend_factor > 0:
-                edges = cv2.Canny(quantized, canny_threshold_1, canny_threshold_2)
-                edges = cv2.GaussianBlur(edges, (edge_blur_amount, edge_blur_amount), 0)
-                edges_scaled = (edges * edge_blend_factor).astype(np.uint8)
-                quantized = cv2.add(quantized, edges_scaled)
-
-            # Upsample back to original size if we downsampled
-            if downsample_factor > 1:
-                quantized = cv2.resize(quantized, (original_width, original_height), interpolation=cv2.INTER_NEAREST)
-
-            # Create output frame - pure blobs without edge overlays
-            carbonized_bgr = np.zeros((original_height, original_width, 3), dtype=np.uint8)
-            carbonized_bgr[:, :, 0] = quantized
-            carbonized_bgr[:, :, 1] = quantized
-            carbonized_bgr[:, :, 2] = quantized
-
-        # Save the processed frame
-        # Use absolute path from BASE_DIR
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-        frames_dir = os.path.join(base_dir, "data", "frames", str(segment_number))
-        os.makedirs(frames_dir, exist_ok=True)
-        frame_path = os.path.join(frames_dir, f"{frame_number}.jpg")
-
-        cv2.imwrite(frame_path, carbonized_bgr)
-
-        return True
+        return carbonized_bgr
     except Exception as e:
         print(f"Error processing fast blob frame: {e}")
         import traceback
         traceback.print_exc()
-        return e
\ No newline at end of file
+        return None
\ No newline at end of file
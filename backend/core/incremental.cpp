@@ -0,0 +1,121 @@
+#include "incremental.h"
+#include <algorithm>
+#include <vector>
+
+// Change detection runs on luma downsampled by this factor (cheap SAD)
+static const int LUMA_SCALE = 4;
+
+FrameState::FrameState(int tile_size, float threshold, int halo)
+    : tile_size(std::max(LUMA_SCALE, tile_size - tile_size % LUMA_SCALE)),
+      threshold(threshold),
+      halo(std::max(0, halo)) {}
+
+void FrameState::reset() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    reference_luma_.release();
+    output_.release();
+    frames = 0;
+    tiles_total = 0;
+    tiles_recomputed = 0;
+    last_fraction = 1.0;
+}
+
+cv::Mat FrameState::stylize(const cv::Mat& working,
+                            const std::function<cv::Mat(const cv::Mat&)>& stylize) {
+    std::lock_guard<std::mutex> lock(mutex_);
+
+    cv::Mat gray, luma;
+    cv::cvtColor(working, gray, cv::COLOR_BGR2GRAY);
+    cv::resize(gray, luma, cv::Size(working.cols / LUMA_SCALE, working.rows / LUMA_SCALE), 0, 0, cv::INTER_AREA);
+
+    const int tiles_x = (working.cols + tile_size - 1) / tile_size;
+    const int tiles_y = (working.rows + tile_size - 1) / tile_size;
+    const int tile_count = tiles_x * tiles_y;
+    frames++;
+    tiles_total += tile_count;
+
+    // First frame (or resolution change): stylize everything
+    if (output_.empty() || output_.size() != working.size()) {
+        output_ = stylize(working);
+        reference_luma_ = luma.clone();
+        tiles_recomputed += tile_count;
+        last_fraction = 1.0;
+        return output_.clone();
+    }
+
+    // STEP 1: Find changed tiles - mean absolute luma difference per tile
+    const int luma_tile = tile_size / LUMA_SCALE;
+    std::vector<uchar> changed(tile_count, 0);
+    int changed_count = 0;
+
+    for (int ty = 0; ty < tiles_y; ty++) {
+        for (int tx = 0; tx < tiles_x; tx++) {
+            cv::Rect luma_rect = cv::Rect(tx * luma_tile, ty * luma_tile, luma_tile, luma_tile)
+                                 & cv::Rect(0, 0, luma.cols, luma.rows);
+            if (luma_rect.area() == 0) {
+                continue;
+            }
+            double sad = cv::norm(luma(luma_rect), reference_luma_(luma_rect), cv::NORM_L1);
+            if (sad / luma_rect.area() > threshold) {
+                changed[ty * tiles_x + tx] = 1;
+                changed_count++;
+            }
+        }
+    }
+
+    tiles_recomputed += changed_count;
+    last_fraction = static_cast<double>(changed_count) / tile_count;
+    if (changed_count == 0) {
+        return output_.clone();
+    }
+
+    // STEP 2: Merge horizontal runs of changed tiles so neighbors share one halo
+    std::vector<cv::Rect> runs;
+    for (int ty = 0; ty < tiles_y; ty++) {
+        int tx = 0;
+        while (tx < tiles_x) {
+            if (!changed[ty * tiles_x + tx]) {
+                tx++;
+                continue;
+            }
+            int start = tx;
+            while (tx < tiles_x && changed[ty * tiles_x + tx]) {
+                tx++;
+            }
+            runs.push_back(cv::Rect(start * tile_size, ty * tile_size, (tx - start) * tile_size, tile_size)
+                           & cv::Rect(0, 0, working.cols, working.rows));
+        }
+    }
+
+    // STEP 3: Re-stylize each run with a halo of context, keep only the run itself
+    const cv::Rect frame_rect(0, 0, working.cols, working.rows);
+    cv::parallel_for_(cv::Range(0, static_cast<int>(runs.size())), [&](const cv::Range& range) {
+        for (int i = range.start; i < range.end; i++) {
+            const cv::Rect& run = runs[i];
+            cv::Rect context(run.x - halo, run.y - halo, run.width + 2 * halo, run.height + 2 * halo);
+            context &= frame_rect;
+
+            cv::Mat stylized = stylize(working(context));
+            cv::Rect inner(run.x - context.x, run.y - context.y, run.width, run.height);
+            stylized(inner).copyTo(output_(run));
+        }
+    });
+
+    // STEP 4: Changed tiles get a new reference; unchanged ones keep theirs so
+    // slow drift still accumulates until it crosses the threshold
+    for (int ty = 0; ty < tiles_y; ty++) {
+        for (int tx = 0; tx < tiles_x; tx++) {
+            if (!changed[ty * tiles_x + tx]) {
+                continue;
+            }
+            cv::Rect luma_rect = cv::Rect(tx * luma_tile, ty * luma_tile, luma_tile, luma_tile)
+                                 & cv::Rect(0, 0, luma.cols, luma.rows);
+            if (luma_rect.area() > 0) {
+                luma(luma_rect).copyTo(reference_luma_(luma_rect));
+            }
+        }
+    }
+
+    // Copy out - output_ keeps changing with the next frame
+    return output_.clone();
+}
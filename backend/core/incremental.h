@@ -0,0 +1,43 @@
+#pragma once
+
+#include <opencv2/opencv.hpp>
+#include <functional>
+#include <mutex>
+
+/*
+ * Incremental stylization for fixed cameras (implemented in incremental.cpp).
+ *
+ * The working frame is split into tiles. Each tile's downsampled luma is
+ * compared (mean absolute difference) against the luma it had when it was last
+ * stylized; only changed tiles - plus a halo of context for the filters - go
+ * through the expensive smoothing/posterize path. Unchanged tiles reuse the
+ * previous output.
+ *
+ * One FrameState belongs to one sequence of frames (a segment) and must be fed
+ * frames in order.
+ */
+class FrameState {
+public:
+    FrameState(int tile_size = 64, float threshold = 3.0f, int halo = 16);
+
+    // Stylizes `working` (BGR, working resolution), recomputing only changed
+    // tiles with `stylize`. Returns the full stylized frame.
+    cv::Mat stylize(const cv::Mat& working, const std::function<cv::Mat(const cv::Mat&)>& stylize);
+
+    void reset();
+
+    int tile_size;
+    float threshold;
+    int halo;
+
+    // Statistics since construction / reset
+    long long frames = 0;
+    long long tiles_total = 0;
+    long long tiles_recomputed = 0;
+    double last_fraction = 1.0;
+
+private:
+    std::mutex mutex_;
+    cv::Mat reference_luma_;   // luma at 1/LUMA_SCALE of each tile when it was last stylized
+    cv::Mat output_;           // stylized working frame
+};
@@ -0,0 +1,415 @@
+"""
+Pipeline instrumentation - latency histograms and event counters, exported in
+Prometheus text format at /metrics.
+
+Recording is a lock, a bisect and a deque append per observation, so it stays
+on in production. Histograms keep cumulative buckets for Prometheus (which
+computes quantiles across scrapes) plus the most recent observations per
+series for the p50/p95/p99 shown on /api/admin/status.
+
+Metrics recorded by a stream's pipeline carry a stream label (the stream id,
+see streams.py), so each stream's status shows its own numbers; the engine,
+HTTP client and scheduler ones are shared by every stream.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Recent observations kept per histogram series for status quantiles
+RECENT_SAMPLES = 512
+
+# Bucket bounds in seconds
+SEGMENT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 6.0, 8.0, 12.0, 20.0, 30.0, 60.0)
+FRAME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.03, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0)
+
+_registry = []
+
+
+def _label_text(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def _matching_key(names, key, match):
+    """key without the labels in match, or None if it doesn't have those values."""
+    rest = []
+    for name, value in zip(names, key):
+        if name not in match:
+            rest.append(value)
+        elif value != str(match[name]):
+            return None
+    return tuple(rest)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic event count, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self, **match) -> dict:
+        """
+        {label values joined by ',' (or "total"): count} for the status API.
+        Keyword labels (e.g. stream="default") keep only that series, summed
+        over the other labels.
+        """
+        result = {}
+        with self.lock:
+            for key, value in self.values.items():
+                rest = _matching_key(self.label_names, key, match)
+                if rest is not None:
+                    result[",".join(rest) or "total"] = result.get(",".join(rest) or "total", 0) + value
+        return result
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_label_text(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """
+    Current value, optionally split by labels. Either set(), or read at export
+    time from callback() -> {label values tuple: value}.
+    """
+
+    def __init__(self, name: str, documentation: str, labels=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.callback = callback
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self.lock:
+            self.values[key] = value
+
+    def _current(self) -> dict:
+        if self.callback is not None:
+            return {tuple(str(value) for value in key): value for key, value in self.callback().items()}
+        with self.lock:
+            return dict(self.values)
+
+    def snapshot(self, **match) -> dict:
+        """{label values joined by ',' (or "total"): value} for the status API, filtered like Counter's."""
+        result = {}
+        for key, value in self._current().items():
+            rest = _matching_key(self.label_names, key, match)
+            if rest is not None:
+                result[",".join(rest) or "total"] = result.get(",".join(rest) or "total", 0) + value
+        return result
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self._current().items()):
+            lines.append(f"{self.name}{_label_text(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Latency distribution in seconds, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=SEGMENT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts, sum, count, recent]
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, seconds: float, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = bisect_left(self.buckets, seconds)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0, deque(maxlen=RECENT_SAMPLES)]
+                self.series[key] = series
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+            series[3].append(seconds)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the with-block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantiles(self, **match) -> dict:
+        """
+        {label values: {p50, p95, p99, count}} in milliseconds over recent
+        observations. Keyword labels keep only matching series, merged over
+        the other labels.
+        """
+        recent = {}
+        with self.lock:
+            for key, series in self.series.items():
+                rest = _matching_key(self.label_names, key, match)
+                if rest is not None:
+                    samples, count = recent.get(rest, ([], 0))
+                    recent[rest] = (samples + list(series[3]), count + series[2])
+        result = {}
+        for key, (samples, count) in recent.items():
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99)) * 1000.0
+            result[",".join(key) or "total"] = {
+                "p50": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+                "p99": round(float(p99), 2),
+                "count": count,
+            }
+        return result
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, count, _) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = ("le", _format_value(bound))
+                    lines.append(f"{self.name}_bucket{_label_text(self.label_names, key, le)} {cumulative}")
+                labels = _label_text(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Pipeline metrics
+# ---------------------------------------------------------------------------
+
+# stream: stream id (see streams.py), "default" for the stream /api/stream serves
+# stage: playlist_fetch, download, decode, download_wait, encode, disk_write, publish, end_to_end
+SEGMENT_STAGE_SECONDS = Histogram(
+    "livestream_segment_stage_seconds",
+    "Time spent per segment in each pipeline stage",
+    labels=("stream", "stage")
+)
+FRAME_EFFECT_SECONDS = Histogram(
+    "livestream_frame_effect_seconds",
+    "Time to render the full effect on one frame",
+    labels=("stream",),
+    buckets=FRAME_BUCKETS
+)
+# op: the engine's internal operations (see profiling.h), only with profile_engine on
+ENGINE_OP_SECONDS = Histogram(
+    "livestream_engine_op_seconds",
+    "Time per frame spent in each engine operation",
+    labels=("op",),
+    buckets=FRAME_BUCKETS
+)
+# Source availability (segment complete at the origin) -> processed playlist publish
+LIVE_EDGE_LAG_SECONDS = Histogram(
+    "livestream_live_edge_lag_seconds",
+    "How far the processed playlist trails the source when a segment is published",
+    labels=("stream",)
+)
+# result: new, unchanged (same body), not_modified (304), error
+PLAYLIST_POLLS_TOTAL = Counter(
+    "livestream_playlist_polls_total",
+    "Source chunklist polls by result",
+    labels=("stream", "result")
+)
+DOWNLOAD_FIRST_BYTE_SECONDS = Histogram(
+    "livestream_download_first_byte_seconds",
+    "Time from a segment request to its first body bytes",
+    labels=("stream",)
+)
+# winner: primary, hedge (the second request delivered first) or none (both failed)
+HEDGED_DOWNLOADS_TOTAL = Counter(
+    "livestream_hedged_downloads_total",
+    "Segment downloads that sent a second, hedged request",
+    labels=("stream", "winner")
+)
+# origin: the edge's host[:port]; result: ok, error
+ORIGIN_REQUESTS_TOTAL = Counter(
+    "livestream_origin_requests_total",
+    "Chunklist and segment requests per source origin by result",
+    labels=("origin", "result")
+)
+# kind: playlist (poll retried on the next origin), download (retry sent to another
+# origin), resume (a download cut off mid-body continued with a Range request)
+ORIGIN_FAILOVERS_TOTAL = Counter(
+    "livestream_origin_failovers_total",
+    "Requests moved to another origin after one failed",
+    labels=("stream", "kind")
+)
+# client: processor (asyncio ingest) or tasks (Celery workers)
+HTTP_REQUESTS_TOTAL = Counter(
+    "livestream_http_requests_total",
+    "Requests sent by the source HTTP clients",
+    labels=("client",)
+)
+# Connection reuse rate = 1 - opened / requests
+HTTP_CONNECTIONS_OPENED_TOTAL = Counter(
+    "livestream_http_connections_opened_total",
+    "New TCP connections opened by the source HTTP clients",
+    labels=("client",)
+)
+# state: active (serving a request), idle (kept alive for reuse); read from the pools at export
+HTTP_POOL_CONNECTIONS = Gauge(
+    "livestream_http_pool_connections",
+    "Connections in the source HTTP clients' pools",
+    labels=("client", "state")
+)
+# result: hit (cached address used), miss (looked up)
+DNS_LOOKUPS_TOTAL = Counter(
+    "livestream_dns_lookups_total",
+    "Source host name resolutions by DNS cache result",
+    labels=("result",)
+)
+# rendition: WIDTHxHEIGHT of the master playlist variant, "default" without a master
+SOURCE_BYTES_TOTAL = Counter(
+    "livestream_source_bytes_total",
+    "Segment bytes downloaded from the source by rendition",
+    labels=("stream", "rendition")
+)
+RENDITION_SWITCHES_TOTAL = Counter(
+    "livestream_rendition_switches_total",
+    "Times ingest moved to another master playlist variant",
+    labels=("stream",)
+)
+# result: hit (fetched before it was listed), late (the poll got there first), miss
+PREFETCH_TOTAL = Counter(
+    "livestream_prefetch_total",
+    "Speculative fetches of the next segment by result",
+    labels=("stream", "result")
+)
+SEGMENTS_TOTAL = Counter(
+    "livestream_segments_total",
+    "Segments by outcome (published, download_failed, invalid, process_failed, late)",
+    labels=("stream", "outcome")
+)
+# reason: sync, truncated, no_pat, no_pmt, no_video, short (see ts_validation.py)
+SEGMENTS_INVALID_TOTAL = Counter(
+    "livestream_segments_invalid_total",
+    "Downloaded segments rejected by the TS integrity check, re-fetched ones included",
+    labels=("stream", "reason")
+)
+PROCESSING_SAVED_SECONDS_TOTAL = Counter(
+    "livestream_processing_saved_seconds_total",
+    "Estimated processing time not spent on rejected segments (recent average per segment)",
+    labels=("stream",)
+)
+# reason: out_of_window (left the source window before we polled), source_gap (EXT-X-GAP)
+SEGMENTS_MISSED_TOTAL = Counter(
+    "livestream_segments_missed_total",
+    "Source segments that were never downloaded",
+    labels=("stream", "reason")
+)
+SEGMENTS_BACKFILLED_TOTAL = Counter(
+    "livestream_segments_backfilled_total",
+    "Segments published that were queued behind a newer live-edge segment",
+    labels=("stream",)
+)
+FRAMES_DROPPED_TOTAL = Counter(
+    "livestream_frames_dropped_total",
+    "Frames whose effect failed and were left out of the segment",
+    labels=("stream",)
+)
+RETRIES_TOTAL = Counter(
+    "livestream_retries_total",
+    "Retried network requests",
+    labels=("stream", "operation")
+)
+ERRORS_TOTAL = Counter(
+    "livestream_errors_total",
+    "Failed operations that were not retried",
+    labels=("stream", "operation")
+)
+FALLBACKS_TOTAL = Counter(
+    "livestream_fallbacks_total",
+    "Times a slower fallback path was taken (python_engine, frame_copy)",
+    labels=("kind",)
+)
+SCHEDULER_TASKS_QUEUED = Gauge(
+    "livestream_scheduler_tasks_queued",
+    "Frame tasks waiting for a shared CPU worker by stream",
+    labels=("stream",)
+)
+SCHEDULER_BUSY_SECONDS_TOTAL = Counter(
+    "livestream_scheduler_busy_seconds_total",
+    "Shared CPU worker seconds spent on each stream's frame tasks",
+    labels=("stream",)
+)
+
+
+def observe_engine_profile(profile: dict):
+    """Records one frame's take_thread_profile() result."""
+    for op, entry in profile["ops"].items():
+        ENGINE_OP_SECONDS.observe(entry["ms"] / 1000.0, op=op)
+
+
+def get_latency_summary(stream: str) -> dict:
+    """One stream's stage quantiles and counters for the admin status API."""
+    return {
+        "stages_ms": SEGMENT_STAGE_SECONDS.quantiles(stream=stream),
+        "frame_effect_ms": FRAME_EFFECT_SECONDS.quantiles(stream=stream).get("total"),
+        "live_edge_lag_ms": LIVE_EDGE_LAG_SECONDS.quantiles(stream=stream).get("total"),
+        "segments": SEGMENTS_TOTAL.snapshot(stream=stream),
+        "playlist_polls": PLAYLIST_POLLS_TOTAL.snapshot(stream=stream),
+        "prefetch": PREFETCH_TOTAL.snapshot(stream=stream),
+        "download_first_byte_ms": DOWNLOAD_FIRST_BYTE_SECONDS.quantiles(stream=stream).get("total"),
+        "hedged_downloads": HEDGED_DOWNLOADS_TOTAL.snapshot(stream=stream),
+        "origin_failovers": ORIGIN_FAILOVERS_TOTAL.snapshot(stream=stream),
+        "source_bytes": SOURCE_BYTES_TOTAL.snapshot(stream=stream),
+        "missed": SEGMENTS_MISSED_TOTAL.snapshot(stream=stream),
+        "invalid": SEGMENTS_INVALID_TOTAL.snapshot(stream=stream),
+        "processing_saved_s": round(PROCESSING_SAVED_SECONDS_TOTAL.snapshot(stream=stream).get("total", 0), 1),
+        "backfilled": SEGMENTS_BACKFILLED_TOTAL.snapshot(stream=stream).get("total", 0),
+        "frames_dropped": FRAMES_DROPPED_TOTAL.snapshot(stream=stream).get("total", 0),
+        "retries": RETRIES_TOTAL.snapshot(stream=stream),
+        "errors": ERRORS_TOTAL.snapshot(stream=stream),
+        "scheduler_busy_s": round(SCHEDULER_BUSY_SECONDS_TOTAL.snapshot(stream=stream).get("total", 0), 1),
+    }
+
+
+def get_shared_summary() -> dict:
+    """Metrics shared by every stream (engine and origins) for the admin status API."""
+    return {
+        "engine_ops_ms": ENGINE_OP_SECONDS.quantiles(),
+        "fallbacks": FALLBACKS_TOTAL.snapshot(),
+        "origin_requests": ORIGIN_REQUESTS_TOTAL.snapshot(),
+    }
@@ -0,0 +1,157 @@
+"""
+Origin selection - equivalent edges serving the same stream, scored by recent
+latency and errors so requests go to the healthiest one.
+
+Each origin keeps a smoothed latency (time to the chunklist response, or to a
+segment's first body bytes) and a smoothed error rate, which also halves every
+ERROR_HALF_LIFE seconds so an origin that recovered isn't held to old errors.
+Its score is the latency inflated by the error rate, lower is better. An origin that fails
+several times in a row is benched (5 s, doubling up to a minute) and ranks
+after every other one until that ends. Origins that haven't been sampled for
+PROBE_SECONDS are due a probe, so a recovered or faster edge gets noticed
+(see StreamPipeline.probe_origins).
+"""
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from backend.core import metrics
+
+LATENCY_SMOOTHING = 0.2
+ERROR_SMOOTHING = 0.2
+ERROR_WEIGHT = 10.0          # An error rate of 0.1 doubles an origin's score
+ERROR_HALF_LIFE = 15.0       # Seconds
+UNKNOWN_LATENCY = 0.5        # Seconds, for an origin without samples yet
+BENCH_AFTER_FAILURES = 3
+BENCH_SECONDS = 5.0
+MAX_BENCH_SECONDS = 60.0
+PROBE_SECONDS = 30.0
+
+
+class OriginRequestError(Exception):
+    """A request to a specific origin failed (the cause is chained)."""
+
+    def __init__(self, origin, cause):
+        super().__init__(f"{origin.host}: {cause!r}")
+        self.origin = origin
+
+
+def origin_urls(base_url: str, hosts) -> list[str]:
+    """
+    base_url first, then the same path on each alternative host. Hosts are
+    "host[:port]" (base_url's scheme) or "scheme://host[:port]".
+    """
+    base = urlsplit(base_url)
+    urls = [base_url]
+    for host in hosts:
+        parts = urlsplit(host if "://" in host else f"{base.scheme}://{host}")
+        url = urlunsplit((parts.scheme, parts.netloc, base.path, base.query, base.fragment))
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
+class Origin:
+    """One edge's base URL and its recent behaviour."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.host = urlsplit(base_url).netloc
+        self.latency = None              # Smoothed seconds, None until sampled
+        self.error_rate = 0.0            # Smoothed fraction of failed requests, as of error_updated
+        self.error_updated = 0.0         # Monotonic time
+        self.consecutive_failures = 0
+        self.benched_until = 0.0         # Monotonic time
+        self.last_sampled = 0.0          # Monotonic time of the last recorded request
+        self.requests = 0
+        self.failures = 0
+
+    def errors(self, now: float) -> float:
+        """The error rate decayed to now."""
+        return self.error_rate * 0.5 ** ((now - self.error_updated) / ERROR_HALF_LIFE)
+
+    def score(self, now: float) -> float:
+        latency = UNKNOWN_LATENCY if self.latency is None else self.latency
+        score = latency * (1 + ERROR_WEIGHT * self.errors(now))
+        if now < self.benched_until:
+            score += MAX_BENCH_SECONDS  # Behind every origin that isn't benched
+        return score
+
+
+class OriginPool:
+    """The origins for one stream, ranked by score."""
+
+    def __init__(self, base_urls: list[str]):
+        self.base_urls = list(base_urls)
+        self.origins = [Origin(url) for url in self.base_urls]
+        self.lock = threading.Lock()
+
+    def ranked(self) -> list[Origin]:
+        """All origins, best first (configuration order breaks ties)."""
+        now = time.monotonic()
+        with self.lock:
+            return sorted(self.origins, key=lambda origin: origin.score(now))
+
+    def due_for_probe(self) -> list[Origin]:
+        """
+        Origins other than the best that haven't been sampled for PROBE_SECONDS
+        and aren't benched. They count as sampled now, so each is handed out once.
+        """
+        now = time.monotonic()
+        ranked = self.ranked()
+        with self.lock:
+            due = [origin for origin in ranked[1:]
+                   if now - origin.last_sampled >= PROBE_SECONDS and now >= origin.benched_until]
+            for origin in due:
+                origin.last_sampled = now
+            return due
+
+    def record_success(self, origin: Origin, seconds: float):
+        now = time.monotonic()
+        with self.lock:
+            self._sample_latency(origin, seconds)
+            origin.error_rate = (1 - ERROR_SMOOTHING) * origin.errors(now)
+            origin.error_updated = now
+            origin.consecutive_failures = 0
+            origin.requests += 1
+        metrics.ORIGIN_REQUESTS_TOTAL.inc(origin=origin.host, result="ok")
+
+    def record_latency(self, origin: Origin, seconds: float):
+        """A latency lower bound, e.g. a request abandoned after a hedge won - not a success or failure."""
+        with self.lock:
+            self._sample_latency(origin, seconds)
+
+    def record_failure(self, origin: Origin):
+        now = time.monotonic()
+        with self.lock:
+            origin.error_rate = ERROR_SMOOTHING + (1 - ERROR_SMOOTHING) * origin.errors(now)
+            origin.error_updated = now
+            origin.consecutive_failures += 1
+            origin.requests += 1
+            origin.failures += 1
+            origin.last_sampled = now
+            if origin.consecutive_failures >= BENCH_AFTER_FAILURES:
+                bench = BENCH_SECONDS * 2 ** (origin.consecutive_failures - BENCH_AFTER_FAILURES)
+                origin.benched_until = now + min(MAX_BENCH_SECONDS, bench)
+        metrics.ORIGIN_REQUESTS_TOTAL.inc(origin=origin.host, result="error")
+
+    def _sample_latency(self, origin: Origin, seconds: float):
+        origin.latency = seconds if origin.latency is None else (
+            LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * origin.latency
+        )
+        origin.last_sampled = time.monotonic()
+
+    def snapshot(self) -> list:
+        """Per-origin scores for the admin status API, best first."""
+        now = time.monotonic()
+        ranked = self.ranked()
+        with self.lock:
+            return [{
+                "host": origin.host,
+                "score": round(origin.score(now), 3),
+                "latency_ms": round(origin.latency * 1000.0, 1) if origin.latency is not None else None,
+                "error_rate": round(origin.errors(now), 3),
+                "requests": origin.requests,
+                "failures": origin.failures,
+                "benched_s": round(max(0.0, origin.benched_until - now), 1),
+            } for origin in ranked]
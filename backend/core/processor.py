@@ -1,38 +1,89 @@
 """
 Main stream processor - replaces Celery tasks with asyncio.
 Handles fetching, downloading, processing, and uploading video segments.
+
+A StreamPipeline holds everything one stream needs - its source URL and
+origins, config, data directory, segment queues, published playlist and
+background model - and run() is its ingest loop. streams.py keeps one
+pipeline per camera; the tunables below are shared by all of them.
 """
 import asyncio
 import os
+import random
 import shutil
+import threading
 import time
-from collections import deque
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError
+from datetime import datetime, timezone
+from functools import partial
 from io import BytesIO
 
 import av
+import cv2
 import ffmpeg
 import httpx
 import m3u8
 import pytz
 from dotenv import load_dotenv
 
+from backend.core import dedup, engine_loader, http_client, metrics, scheduler, temporal
 from backend.core.image_processing import get_colors, process_frame_fast_blobs
+from backend.core.origins import OriginPool, OriginRequestError, origin_urls
+from backend.core.renditions import choose_rendition, is_master_url, parse_master
+from backend.core.segment_stream import SegmentStream, StreamAborted
+from backend.core.ts_validation import InvalidSegment, TSValidator, validate_segment
 
 load_dotenv(override=True)
 
-# In-memory state (replaces Redis)
-recent_segments = deque(maxlen=10)
-ready_segments = deque(maxlen=10)
-processing_lock = asyncio.Lock()
-
-# Performance tracking
-processing_times = deque(maxlen=10)  # Track last 10 segment processing times
-download_times = deque(maxlen=10)    # Track last 10 download times
-
-# Stream configuration (can be updated via API)
-STREAM_BASE_URL = 'https://videos-3.earthcam.com/fecnetwork/AbbeyRoadHD1.flv/chunklist_w'
+# Segment timelines and output sequence numbers kept per stream
+MAX_TIMELINE = 30
+
+# Backfill: the playlist is published in order, so a segment still being
+# backfilled holds back newer ones - for at most BACKFILL_HOLD_SECONDS
+BACKFILL_HOLD_SECONDS = 12.0
+BACKFILL_CONCURRENCY = 2
+SEQUENCE_RESTART_MARGIN = 10         # Sequence this far behind what we've seen = source restarted
+
+# Chunklist polling (see StreamPipeline.next_poll_delay)
+MIN_POLL_SECONDS = 0.25
+MAX_FAST_POLL_SECONDS = 1.0
+DEFAULT_POLL_SECONDS = 2.0
+CADENCE_SMOOTHING = 0.3
+
+# Segment downloads (see StreamPipeline.download_segment): a second, hedged
+# request goes out when the first hasn't delivered its first bytes within the
+# recent p95, and retries back off with jitter until the segment would leave
+# the source window
+HEDGING_ENABLED = os.getenv('HEDGE_DOWNLOADS', '1') != '0'
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_SECONDS = 1.0
+HEDGE_MIN_SECONDS = 0.1
+HEDGE_MAX_SECONDS = 2.0
+MAX_DOWNLOAD_ATTEMPTS = 5
+RETRY_BASE_BACKOFF = 0.2
+RETRY_MAX_BACKOFF = 2.0
+DEFAULT_DOWNLOAD_BUDGET = 30.0       # Seconds, when the source window isn't known
+DOWNLOAD_STALL_SECONDS = 5.0         # No bytes for this long = the origin failed
+
+# Speculative prefetch (see StreamPipeline.prefetch_segment): segment ids are
+# sequential, so the next one can be fetched before the chunklist lists it
+PREFETCH_ENABLED = os.getenv('PREFETCH_SEGMENTS', '1') != '0'
+PREFETCH_MAX_MISSES = 3
+PREFETCH_RETRY_SECONDS = 0.25
+PREFETCH_MAX_RETRY_SECONDS = 1.0
+
+# Default stream configuration (set in .env e.g. to a local origin emulator -
+# see benchmarks/origin.py; a stream's URL can be updated via the API)
+STREAM_BASE_URL = os.getenv(
+    'STREAM_BASE_URL',
+    'https://videos-3.earthcam.com/fecnetwork/AbbeyRoadHD1.flv/chunklist_w'
+)
+# Equivalent edges serving the same paths as STREAM_BASE_URL, e.g.
+# "videos-1.earthcam.com,videos-2.earthcam.com" - each request goes to the
+# best-scoring one and fails over to the next (see origins.py)
+STREAM_ORIGINS = [host.strip() for host in os.getenv('STREAM_ORIGINS', '').split(',') if host.strip()]
+PLAYLIST_SEGMENT_URL = "http://localhost:8000/api/segments/{segment}.ts"
 
 # Abbey Road stream headers
 EARTHCAM_HEADERS = {
@@ -50,403 +101,1547 @@ EARTHCAM_HEADERS = {
     'sec-ch-ua-platform': '"macOS"'
 }
 
-# Base paths
+# Base paths - the default stream's data lives directly under DATA_DIR
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
-FRAMES_DIR = os.path.join(DATA_DIR, "frames")
-SEGMENTS_DIR = os.path.join(DATA_DIR, "segments")  # Temporary: for processing
-RAW_DIR = os.path.join(DATA_DIR, "raw")  # Persistent: raw .ts files for playback
-PROCESSED_DIR = os.path.join(DATA_DIR, "processed")  # Persistent: processed .ts files for playback
-
-# Ensure directories exist
-os.makedirs(FRAMES_DIR, exist_ok=True)
-os.makedirs(SEGMENTS_DIR, exist_ok=True)
-os.makedirs(RAW_DIR, exist_ok=True)
-os.makedirs(PROCESSED_DIR, exist_ok=True)
-
-
-async def fetch_new_segment(client: httpx.AsyncClient) -> str | None:
-    """
-    Fetches the latest segment ID from the configured stream.
-    Returns the segment ID if it's new, None otherwise.
-    """
-    try:
-        url = f"{STREAM_BASE_URL}{int(time.time())}.m3u8"
-        response = await client.get(url, headers=EARTHCAM_HEADERS, timeout=10.0)
-        response.raise_for_status()
-
-        playlist = m3u8.loads(response.text)
-        if playlist.segments:
-            # Extract segment ID from URI
-            segment_id = playlist.segments[0].uri.split('_')[-1].split('.')[0]
-
-            # Check if it's new
-            if segment_id not in recent_segments:
-                print(f"✨ New segment found: {segment_id}")
-                return segment_id
-            else:
-                print(f"⏭️  Segment {segment_id} already processed")
-                return None
-    except Exception as e:
-        print(f"❌ Error fetching segment: {e}")
-        return None
-
-
-async def download_segment(client: httpx.AsyncClient, segment_id: str) -> bytes | None:
-    """
-    Downloads a video segment from the Abbey Road stream.
-    Returns the raw .ts file content.
-    """
-    download_start = time.time()
-
-    segment_dir = os.path.join(SEGMENTS_DIR, segment_id)
-    segment_file = os.path.join(segment_dir, f"{segment_id}.ts")
-
-    # Check if already downloaded by another process
-    if os.path.exists(segment_file):
-        print(f"⏭️  Segment {segment_id} already downloaded")
-        with open(segment_file, 'rb') as f:
-            return f.read()
-
-    # Create directory
-    os.makedirs(segment_dir, exist_ok=True)
 
-    # Download with retries
-    for attempt in range(3):
-        try:
-            # Generate fresh timestamp for each attempt to avoid stale URLs
-            timestamp = int(time.time())
-            # Derive segment URL from STREAM_BASE_URL by replacing chunklist_w with media_w
-            segment_base_url = STREAM_BASE_URL.replace('/chunklist_w', '/media_w')
-            url = f"{segment_base_url}{timestamp}_{segment_id}.ts"
-            print(f"📥 Downloading segment {segment_id} (attempt {attempt + 1}/3, ts={timestamp})...")
-
-            response = await client.get(url, headers=EARTHCAM_HEADERS, timeout=30.0)
-            response.raise_for_status()
-
-            content = response.content
-
-            # Save to disk
-            with open(segment_file, 'wb') as f:
-                f.write(content)
-
-            download_time = time.time() - download_start
-            download_times.append(download_time)
-            print(f"✅ Downloaded segment {segment_id} ({len(content) / 1024 / 1024:.2f} MB) in {download_time:.2f}s")
-            return content
-
-        except Exception as e:
-            print(f"⚠️  Download attempt {attempt + 1} failed: {e}")
-            if attempt < 2:
-                await asyncio.sleep(0.2)
-            else:
-                print(f"❌ Failed to download segment {segment_id} after 3 attempts")
-                return None
 
+class ResumeMismatch(Exception):
+    """A resumed download's origin has a different file than the one the body started from."""
 
-def process_segment_sync(segment_id: str) -> bytes | None:
-    """
-    Processes a video segment synchronously (CPU-bound, runs in thread pool).
-    Extracts frames, applies effects, encodes back to video.
-    Returns the encoded .ts video content.
-    """
-    process_start = time.time()
 
-    try:
-        segment_file = os.path.join(SEGMENTS_DIR, segment_id, f"{segment_id}.ts")
-        frames_dir = os.path.join(FRAMES_DIR, segment_id)
-        os.makedirs(frames_dir, exist_ok=True)
-
-        # Get London time for color scheme
-        london_time = datetime.now(pytz.timezone('Europe/London'))
-        edge_color, background_color = get_colors(london_time.hour, london_time.minute)
-
-        print(f"🎨 Processing segment {segment_id}...")
-
-        # Open video container
-        container = av.open(segment_file)
-
-        # Prepare frame data for processing
-        frame_data = [
-            (segment_id, frame_number, frame.to_ndarray(format='bgr24'),
-             edge_color, background_color,
-             london_time.year, london_time.month, london_time.day,
-             london_time.hour, london_time.minute)
-            for frame_number, frame in enumerate(container.decode(container.streams.video[0]))
-        ]
-
-        # Process frames in parallel
-        import multiprocessing
-        max_workers = min(multiprocessing.cpu_count(), 8)
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            list(executor.map(process_frame_fast_blobs, frame_data))
-
-        container.close()
-
-        print(f"🎬 Encoding segment {segment_id}...")
-
-        # Check if frames were actually created
-        frame_files = sorted([f for f in os.listdir(frames_dir) if f.endswith('.jpg')])
-        if not frame_files:
-            print(f"❌ No frames found in {frames_dir}")
-            return None
+class StreamClosed(Exception):
+    """The stream was removed while one of its segments was being processed."""
 
-        print(f"📊 Found {len(frame_files)} frame files to encode")
-
-        # Verify frame numbering is consecutive
-        frame_numbers = sorted([int(f.replace('.jpg', '')) for f in frame_files])
-        print(f"🎬 Frame range: {frame_numbers[0]} to {frame_numbers[-1]}")
-
-        # Encode frames to video using FFmpeg with explicit start number
-        out, err = (
-            ffmpeg
-            .input(f'{frames_dir}/%d.jpg',
-                   framerate=30,
-                   start_number=0,
-                   f='image2')
-            .output('pipe:',
-                    vcodec='libx264',
-                    crf=25,
-                    pix_fmt='yuv420p',
-                    format='mpegts',
-                    **{'loglevel': 'warning'})
-            .run(capture_stdout=True, capture_stderr=True)
-        )
-
-        if err:
-            stderr_output = err.decode('utf-8')
-            print(f"⚠️  FFmpeg stderr: {stderr_output[:500]}")
-            # Check for actual errors (FFmpeg writes normal output to stderr too)
-            if 'error' in stderr_output.lower() or 'invalid' in stderr_output.lower():
-                print(f"❌ FFmpeg encountered errors")
 
-        process_time = time.time() - process_start
-        processing_times.append(process_time)
-        print(f"✅ Processed segment {segment_id} ({len(out) / 1024 / 1024:.2f} MB) in {process_time:.2f}s")
-        return out
+def content_length(response: httpx.Response) -> int | None:
+    """Full size of the file behind a response: the Content-Range total for a 206, else Content-Length."""
+    if response.status_code == 206:
+        total = response.headers.get("content-range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("content-length", "")
+    return int(length) if length.isdigit() else None
 
-    except Exception as e:
-        print(f"❌ Error processing segment {segment_id}: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
 
-
-async def process_segment_async(segment_id: str) -> bytes | None:
+def save_frame(frames_dir: str, frame_number: int, frame) -> bool:
     """
-    Wrapper to run CPU-bound processing in a thread pool.
+    Writes a processed frame as JPEG for the encoder.
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, process_segment_sync, segment_id)
-
-
-async def generate_m3u8_playlist() -> bool:
-    """
-    Generates an M3U8 playlist from processed segments.
-    Uses a sliding window approach to ensure smooth continuous playback.
-    """
-    try:
-        # Need at least 3 segments minimum to start
-        if len(ready_segments) < 3:
-            print(f"⏭️  Only {len(ready_segments)} segments ready, need at least 3 to start playback")
-            return False
-
-        # Sort segments (oldest to newest)
-        sorted_segments = sorted(ready_segments)
-
-        # Use a sliding window of segments - always keep 10 segments in the playlist
-        # This mimics how the raw stream works
-        num_segments = min(10, len(sorted_segments))
-
-        # Start from oldest and take consecutive segments
-        playlist_segments = sorted_segments[:num_segments]
-
-        if not playlist_segments:
-            print("⏭️  No segments available for playlist")
-            return False
-
-        # Build M3U8 content similar to live streaming
-        m3u8_content = (
-            f"#EXTM3U\n"
-            f"#EXT-X-VERSION:3\n"
-            f"#EXT-X-TARGETDURATION:6\n"
-            f"#EXT-X-MEDIA-SEQUENCE:{playlist_segments[0]}\n"
-        )
-
-        for segment in playlist_segments:
-            # Use local API endpoint instead of S3
-            segment_url = f"http://localhost:8000/api/segments/{segment}.ts"
-            m3u8_content += f"#EXTINF:6.0,\n{segment_url}\n"
-
-        # Save playlist locally
-        playlist_path = os.path.join(DATA_DIR, "current_playlist.m3u8")
-        with open(playlist_path, 'w') as f:
-            f.write(m3u8_content)
-
-        print(f"📝 Playlist: segments {playlist_segments[0]}-{playlist_segments[-1]} ({len(playlist_segments)} segments)")
-        return True
-
-    except Exception as e:
-        print(f"❌ Error generating playlist: {e}")
+    if frame is None:
         return False
+    return cv2.imwrite(os.path.join(frames_dir, f"{frame_number}.jpg"), frame)
 
 
-async def cleanup_old_segments(segment_id: str):
+def link_frame(frames_dir: str, source_number: int, frame_number: int) -> bool:
     """
-    Removes old segment files to save disk space.
-    Keeps only the most recent segments.
+    Reuses an already written JPEG for a repeated frame (hard link, copy as fallback).
     """
+    source = os.path.join(frames_dir, f"{source_number}.jpg")
+    target = os.path.join(frames_dir, f"{frame_number}.jpg")
+    if not os.path.exists(source):
+        return False
     try:
-        if len(recent_segments) >= 10:
-            # Remove oldest segment (deque automatically keeps only last 10)
-            oldest = recent_segments[-1]
-
-            # Remove temporary directories (frames and segments used for processing)
-            for base_dir in [FRAMES_DIR, SEGMENTS_DIR]:
-                old_dir = os.path.join(base_dir, oldest)
-                if os.path.exists(old_dir):
-                    shutil.rmtree(old_dir)
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+        metrics.FALLBACKS_TOTAL.inc(kind="frame_copy")
+    return True
 
-            # Remove old raw and processed segment files
-            raw_file = os.path.join(RAW_DIR, f"{oldest}.ts")
-            if os.path.exists(raw_file):
-                os.remove(raw_file)
 
-            processed_file = os.path.join(PROCESSED_DIR, f"{oldest}.ts")
-            if os.path.exists(processed_file):
-                os.remove(processed_file)
-
-            print(f"🗑️  Cleaned up old segment: {oldest}")
-    except Exception as e:
-        print(f"⚠️  Error cleaning up: {e}")
-
-
-async def process_pipeline(client: httpx.AsyncClient, segment_id: str):
+class StreamPipeline:
     """
-    Main processing pipeline for a single segment.
-    Downloads → Processes → Saves locally → Updates playlist.
-    Processes segments in parallel for speed.
+    One stream's ingest → process → publish pipeline and all of its state.
+
+    stream_id names the stream in logs, metrics and the CPU scheduler. config
+    is the stream's StylizationConfig (None = the admin config, as for the
+    default stream). playlist_segment_url formats a segment id into the URI
+    the published playlist lists.
     """
-    try:
-        # Add to recent segments
-        recent_segments.appendleft(segment_id)
 
-        # Download
-        ts_content = await download_segment(client, segment_id)
-        if not ts_content:
-            print(f"⏭️  Skipping segment {segment_id} - download failed (likely 404, stream moved on)")
-            return
+    def __init__(self, stream_id: str = "default", base_url: str = STREAM_BASE_URL, origins: list | None = None,
+                 config=None, data_dir: str = DATA_DIR, playlist_segment_url: str = PLAYLIST_SEGMENT_URL):
+        self.id = stream_id
+        self.base_url = base_url
+        self.origins = list(origins or [])
+        self.config = config
+        self.playlist_segment_url = playlist_segment_url
+        self.set_data_dir(data_dir)
+        self.background_tasks = set()            # Pipelines, prefetches and probes - cancelled when the stream stops
+
+        # Set by close() when the stream is removed. Segment work checks it before each
+        # stage and write, and remove_stream waits (wait_idle) for the segment threads
+        # still running before it deletes data_dir
+        self.closed = False
+        self.segment_threads = 0                  # Threads in run_segment_work right now
+        self.segment_threads_done = threading.Condition()
+
+        # In-memory state (replaces Redis)
+        self.recent_segments = deque(maxlen=10)
+        self.ready_segments = deque(maxlen=10)
+        self.processing_lock = asyncio.Lock()
+
+        # Performance tracking
+        self.processing_times = deque(maxlen=10)  # Track last 10 segment processing times
+        self.download_times = deque(maxlen=10)    # Track last 10 download times
+        self.segment_stats = deque(maxlen=10)     # Per-segment render stats, newest first
+
+        # Glass-to-glass timeline per segment id (oldest first): when the segment became
+        # available at the source, when its content was captured (EXT-X-PROGRAM-DATE-TIME)
+        # and the unix time each pipeline stage finished
+        self.segment_timeline = OrderedDict()
+        self.last_live_edge_lag = None            # Seconds from source availability to publish, newest segment
+
+        # Ingest state: the highest media sequence number seen in the source chunklist,
+        # and the segments queued but not yet published or abandoned (segment id ->
+        # time queued)
+        self.last_media_sequence = None
+        self.pending_segments = {}
+        self.published_through = None             # Newest segment id in the published playlist
+        self.published_window = []                # Segment ids in the current playlist, oldest first
+        self.published_sequences = OrderedDict()  # Segment id -> (output media sequence, discontinuity sequence)
+        self.ready_backfills = set()              # Backfilled segment ids that are ready but not published yet
+        self.backfill_semaphore = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+        self.live_edge_active = 0                 # Live-edge segments being processed (backfills wait for 0)
+        self.live_edge_idle = asyncio.Event()
+        self.live_edge_idle.set()
+
+        # Chunklist polling (see next_poll_delay). The URL stays the same between polls
+        # so the origin can answer conditional requests with 304 Not Modified.
+        self.chunklist_session = int(time.time())
+        self.playlist_validators = {}             # If-None-Match / If-Modified-Since for the next poll
+        self.last_playlist_text = None
+        self.last_advance_at = None               # When we saw the live edge move (None until we have)
+        self.segment_cadence = None               # Smoothed seconds between new segments
+        self.expected_segment_duration = None     # Newest segment's EXTINF, else EXT-X-TARGETDURATION
+        self.target_duration = None
+        self.overdue_polls = 0                    # Unchanged polls since the next segment was due
+        self.live_edge_id = None                  # Newest segment id listed in the chunklist
+
+        # Segment downloads
+        self.first_byte_times = deque(maxlen=200)  # Recent seconds from request to first body bytes
+        self.source_window_seconds = None         # Duration of the segments listed in the chunklist
+
+        # Speculative prefetch
+        self.prefetch_target = None               # Segment id the prefetcher is (or was last) after
+        self.prefetch_requests = {}               # Segment id -> in-flight prefetch request, shared with download_segment
+        self.prefetched_segments = {}             # Segment id -> prefetched bytes not yet picked up by a pipeline
+        self.prefetch_misses = 0                  # Consecutive misses - prefetch turns itself off at PREFETCH_MAX_MISSES
+
+        # Long-lived stylized background cache (see background.cpp), shared across segments.
+        # Keyed by the engine version and parameters it was built with - a hot-swapped
+        # engine can't use another build's model object.
+        self.background_model = None
+        self.background_model_key = None
+        self.background_model_lock = threading.Lock()
+
+        self.origin_pool = None                   # OriginPool for the current base_url/origins
+        # base_url may be a master playlist (.../playlist.m3u8) - ingest then
+        # follows one of its variants, picked for the stream config's working_height
+        # (see renditions.py)
+        self.renditions = []                      # Variants the master lists, smallest first
+        self.selected_rendition = None            # Rendition being ingested (None without a master)
+        self.rendition_working_height = None      # working_height the selection was made for
+
+    def set_data_dir(self, data_dir: str):
+        """Points the frames, raw and processed directories (and the playlist) at data_dir."""
+        self.data_dir = data_dir
+        self.frames_dir = os.path.join(data_dir, "frames")
+        self.raw_dir = os.path.join(data_dir, "raw")
+        self.processed_dir = os.path.join(data_dir, "processed")
+        for path in (self.frames_dir, self.raw_dir, self.processed_dir):
+            os.makedirs(path, exist_ok=True)
+
+    def spawn(self, coro) -> asyncio.Task:
+        """Runs coro in the background, cancelled with the stream's ingest loop."""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
+    def check_open(self):
+        """Raises StreamClosed once the stream has been closed."""
+        if self.closed:
+            raise StreamClosed(f"stream {self.id} was removed")
+
+    def close(self):
+        """Stops the stream's segment work at its next check - it's being removed."""
+        with self.segment_threads_done:
+            self.closed = True
+
+    def run_segment_work(self, fn, *args):
+        """
+        Runs fn(*args) for a segment on a worker thread, counted for wait_idle.
+        Returns None without running it once the stream is closed.
+        """
+        with self.segment_threads_done:
+            if self.closed:
+                return None
+            self.segment_threads += 1
+        try:
+            return fn(*args)
+        finally:
+            with self.segment_threads_done:
+                self.segment_threads -= 1
+                self.segment_threads_done.notify_all()
+
+    async def wait_idle(self):
+        """Waits for the segment threads still running (cancelling their tasks doesn't stop them)."""
+        def wait():
+            with self.segment_threads_done:
+                self.segment_threads_done.wait_for(lambda: self.segment_threads == 0)
+        await asyncio.to_thread(wait)
+
+    def note_segment_available(self, segment_id: str, segment, first_seen: float):
+        """
+        Starts a segment's timeline from its source playlist entry. With a source
+        EXT-X-PROGRAM-DATE-TIME the segment was complete at the source at PDT +
+        duration; without one, the time we first saw it is the best (late) estimate.
+        """
+        duration = float(segment.duration or 6.0)
+        program_date_time = segment.current_program_date_time or segment.program_date_time
+        if program_date_time is not None:
+            if program_date_time.tzinfo is None:
+                program_date_time = program_date_time.replace(tzinfo=timezone.utc)
+            capture_start = program_date_time.timestamp()
+            available = capture_start + duration
+            source = "program_date_time"
+        else:
+            available = first_seen
+            capture_start = available - duration
+            source = "first_seen"
+
+        # A prefetched segment already has stages (and its rendition); the
+        # playlist entry only fills in when it was captured and available
+        previous = self.segment_timeline.get(segment_id, {})
+        stages = previous.get("stages", {"discovered": first_seen})
+        self.segment_timeline[segment_id] = {
+            "capture_start": capture_start,
+            "duration": duration,
+            "available": min(available, stages["discovered"]),
+            "availability_source": source,
+            "stages": stages,
+        }
+        if "rendition" in previous:
+            self.segment_timeline[segment_id]["rendition"] = previous["rendition"]
+        while len(self.segment_timeline) > MAX_TIMELINE:
+            self.segment_timeline.popitem(last=False)
+
+    def mark_stage(self, segment_id: str, stage: str) -> float | None:
+        """Records that a stage finished now. Returns seconds since source availability."""
+        timeline = self.segment_timeline.get(segment_id)
+        if timeline is None:
+            return None
+        now = time.time()
+        timeline["stages"][stage] = now
+        return now - timeline["available"]
+
+    def record_published(self, segment: int):
+        """
+        Counts a segment as published, with its live-edge lag, once a playlist
+        write actually lists it - segments held back (fewer than 3 ready, or
+        behind a backfill) are counted by the later write that includes them.
+        """
+        segment_id = str(segment)
+        metrics.SEGMENTS_TOTAL.inc(outcome="published", stream=self.id)
+        if segment in self.ready_backfills:
+            self.ready_backfills.discard(segment)
+            metrics.SEGMENTS_BACKFILLED_TOTAL.inc(stream=self.id)
+
+        # Live-edge lag: how far behind the source the processed playlist is
+        lag = self.mark_stage(segment_id, "published")
+        if lag is not None:
+            self.last_live_edge_lag = lag
+            metrics.LIVE_EDGE_LAG_SECONDS.observe(max(0.0, lag), stream=self.id)
+            print(f"⏱️  Segment {segment_id} published {lag:.1f}s after it was available at the source")
+
+    def note_segment_rendition(self, segment_id: str, rendition):
+        """Records which source rendition a segment comes from (a change starts a discontinuity)."""
+        timeline = self.segment_timeline.get(segment_id)
+        if timeline is not None and rendition is not None:
+            timeline["rendition"] = rendition.label
+
+    def playlist_entry(self, segment_id) -> str:
+        """
+        EXTINF (plus EXT-X-PROGRAM-DATE-TIME when the capture time is known) for a
+        segment, without the URI line.
+        """
+        timeline = self.segment_timeline.get(str(segment_id))
+        if timeline is None:
+            return "#EXTINF:6.0,\n"
+        program_date_time = datetime.fromtimestamp(timeline["capture_start"], timezone.utc)
+        stamp = program_date_time.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+        return f"#EXT-X-PROGRAM-DATE-TIME:{stamp}\n#EXTINF:{timeline['duration']:.3f},\n"
+
+    async def fetch_new_segments(self, client: httpx.AsyncClient) -> list[str]:
+        """
+        Fetches the stream's chunklist and queues every segment we haven't seen,
+        diffed by media sequence number. Returns their IDs oldest first - the last
+        one is the live edge, any before it are backfill (e.g. after a slow poll,
+        or the whole window on startup).
+        Sequence numbers that left the window before we saw them, and EXT-X-GAP
+        entries, are counted as missed.
+        """
+        try:
+            await self.select_rendition(client)
+            with metrics.SEGMENT_STAGE_SECONDS.time(stage="playlist_fetch", stream=self.id):
+                response = await self.fetch_chunklist(client)
+            if response.status_code == 304:
+                self.note_poll(0)
+                metrics.PLAYLIST_POLLS_TOTAL.inc(result="not_modified", stream=self.id)
+                return []
+            response.raise_for_status()
 
-        # Save raw segment for playback
-        raw_file = os.path.join(RAW_DIR, f"{segment_id}.ts")
-        with open(raw_file, 'wb') as f:
-            f.write(ts_content)
-        print(f"💾 Saved raw segment {segment_id}")
+            self.playlist_validators.clear()
+            if response.headers.get("etag"):
+                self.playlist_validators["If-None-Match"] = response.headers["etag"]
+            if response.headers.get("last-modified"):
+                self.playlist_validators["If-Modified-Since"] = response.headers["last-modified"]
+
+            # Origins without validators: an identical body is just as unchanged
+            if response.text == self.last_playlist_text:
+                self.note_poll(0)
+                metrics.PLAYLIST_POLLS_TOTAL.inc(result="unchanged", stream=self.id)
+                return []
+            self.last_playlist_text = response.text
+
+            playlist = m3u8.loads(response.text)
+            if not playlist.segments:
+                return []
+
+            first_seen = time.time()
+            first_sequence = playlist.media_sequence or 0
+            newest_sequence = first_sequence + len(playlist.segments) - 1
+            previous_sequence = self.last_media_sequence
+            self.note_playlist_timing(playlist)
+
+            if self.last_media_sequence is not None:
+                if newest_sequence < self.last_media_sequence - SEQUENCE_RESTART_MARGIN:
+                    print(f"🔄 Media sequence went back ({self.last_media_sequence} → {newest_sequence}), source restarted")
+                    self.last_media_sequence = None
+                elif first_sequence > self.last_media_sequence + 1:
+                    missed = first_sequence - self.last_media_sequence - 1
+                    print(f"🕳️  Missed {missed} segment(s) - they left the origin window before we polled")
+                    metrics.SEGMENTS_MISSED_TOTAL.inc(missed, reason="out_of_window", stream=self.id)
+
+            new_segments = []
+            for index, segment in enumerate(playlist.segments):
+                sequence = first_sequence + index
+                if self.last_media_sequence is not None and sequence <= self.last_media_sequence:
+                    continue
+
+                # Extract segment ID from URI
+                segment_id = segment.uri.split('_')[-1].split('.')[0]
+                if segment.gap_tag:
+                    print(f"🕳️  Segment {segment_id} is a gap at the source, skipping")
+                    metrics.SEGMENTS_MISSED_TOTAL.inc(reason="source_gap", stream=self.id)
+                    continue
+                if segment_id in self.recent_segments or int(segment_id) in self.pending_segments:
+                    # Prefetched before it was listed - still take its capture time
+                    if self.segment_timeline.get(segment_id, {}).get("availability_source") == "prefetch":
+                        self.note_segment_available(segment_id, segment, first_seen)
+                    continue
+
+                self.note_segment_available(segment_id, segment, first_seen)
+                self.pending_segments[int(segment_id)] = first_seen
+                new_segments.append(segment_id)
+
+            self.last_media_sequence = max(newest_sequence, self.last_media_sequence or newest_sequence)
+            self.live_edge_id = playlist.segments[-1].uri.split('_')[-1].split('.')[0]
+            # The first look (or a restart) shows where the live edge is, not when it moved
+            advanced = newest_sequence - previous_sequence if previous_sequence is not None else 0
+            self.note_poll(advanced)
+            # A prefetched live edge is new to the chunklist even though it's already queued
+            metrics.PLAYLIST_POLLS_TOTAL.inc(result="new" if new_segments or advanced > 0 else "unchanged", stream=self.id)
+
+            if new_segments:
+                backfill = f" ({len(new_segments) - 1} to backfill)" if len(new_segments) > 1 else ""
+                print(f"✨ New segment found: {new_segments[-1]}{backfill}")
+            else:
+                print(f"⏭️  Segment {playlist.segments[-1].uri.split('_')[-1].split('.')[0]} already processed")
+            return new_segments
+        except Exception as e:
+            print(f"❌ Error fetching segment: {e}")
+            metrics.ERRORS_TOTAL.inc(operation="playlist_fetch", stream=self.id)
+            metrics.PLAYLIST_POLLS_TOTAL.inc(result="error", stream=self.id)
+            return []
+
+    def get_origin_pool(self) -> OriginPool:
+        """The origin pool for the stream, rebuilt when base_url or origins change."""
+        urls = origin_urls(self.base_url, self.origins)
+        if self.origin_pool is None or self.origin_pool.base_urls != urls:
+            self.origin_pool = OriginPool(urls)
+        return self.origin_pool
+
+    def rendition_base_url(self, base_url: str, rendition=None) -> str:
+        """The chunklist_w base URL on an origin: its base URL, or the (selected) rendition's path on it."""
+        rendition = rendition or self.selected_rendition
+        return rendition.base_url(base_url) if rendition is not None else base_url
+
+    def chunklist_url(self, base_url: str) -> str:
+        suffix = self.selected_rendition.suffix if self.selected_rendition is not None else ""
+        return f"{self.rendition_base_url(base_url)}{self.chunklist_session}{suffix}.m3u8"
+
+    async def fetch_chunklist(self, client: httpx.AsyncClient, master: bool = False) -> httpx.Response:
+        """
+        GETs the chunklist (or with master, the master playlist) from the best
+        origin, falling over to the next one if it fails. Returns the response
+        (200 or 304); raises if every origin failed.
+        """
+        pool = self.get_origin_pool()
+        ranked = pool.ranked()
+        name = "Master playlist" if master else "Chunklist"
+        for index, origin in enumerate(ranked):
+            start = time.perf_counter()
+            try:
+                if master:
+                    response = await client.get(origin.base_url, headers=EARTHCAM_HEADERS, timeout=10.0)
+                else:
+                    response = await client.get(self.chunklist_url(origin.base_url),
+                                                headers={**EARTHCAM_HEADERS, **self.playlist_validators}, timeout=10.0)
+                if response.status_code != 304:
+                    response.raise_for_status()
+            except Exception as e:
+                pool.record_failure(origin)
+                if index + 1 == len(ranked):
+                    raise
+                print(f"↪️  {name} from {origin.host} failed ({e!r}), trying {ranked[index + 1].host}")
+                metrics.ORIGIN_FAILOVERS_TOTAL.inc(kind="playlist", stream=self.id)
+                continue
+            pool.record_success(origin, time.perf_counter() - start)
+            return response
+
+    async def select_rendition(self, client: httpx.AsyncClient):
+        """
+        With a master playlist as the stream URL, picks the variant to ingest:
+        the smallest one that covers the stream config's working_height. Fetches
+        the master the first time, and switches variants whenever working_height
+        changes - segment IDs are shared across variants, so the switch lands on
+        the next segment.
+        """
+        if not is_master_url(self.base_url):
+            return
+        working_height = int(self.get_segment_settings().get("working_height") or 0)
+        if self.renditions and working_height == self.rendition_working_height:
+            return
 
-        # Process (CPU-bound, runs in thread pool)
-        processed_content = await process_segment_async(segment_id)
-        if not processed_content:
+        if not self.renditions:
+            response = await self.fetch_chunklist(client, master=True)
+            self.renditions = parse_master(response.text, self.base_url)
+            print(f"🎚️  Master playlist lists {', '.join(r.label for r in self.renditions)}")
+        rendition = choose_rendition(self.renditions, working_height)
+        self.rendition_working_height = working_height
+        if rendition is self.selected_rendition:
             return
 
-        # Save processed segment for playback
-        processed_file = os.path.join(PROCESSED_DIR, f"{segment_id}.ts")
-        with open(processed_file, 'wb') as f:
-            f.write(processed_content)
-        print(f"💾 Saved processed segment {segment_id}")
-
-        # Add to ready segments (avoid duplicates)
-        segment_int = int(segment_id)
-        if segment_int not in ready_segments:
-            ready_segments.appendleft(segment_int)
-            print(f"✅ Added segment {segment_id} to ready queue (total: {len(ready_segments)})")
+        if self.selected_rendition is None:
+            print(f"🎚️  Ingesting the {rendition.label} rendition (working height {working_height})")
         else:
-            print(f"⏭️  Segment {segment_id} already in ready queue")
-
-        # Generate playlist
-        await generate_m3u8_playlist()
+            print(f"🎚️  Switching rendition {self.selected_rendition.label} → {rendition.label} "
+                  f"(working height {working_height})")
+            metrics.RENDITION_SWITCHES_TOTAL.inc(stream=self.id)
+        self.selected_rendition = rendition
+        # Another chunklist - the previous one's validators and body don't apply
+        self.playlist_validators.clear()
+        self.last_playlist_text = None
+
+    async def probe_origin(self, client: httpx.AsyncClient, origin):
+        """Times one unconditional chunklist request to an origin that isn't getting traffic."""
+        pool = self.get_origin_pool()
+        start = time.perf_counter()
+        try:
+            response = await client.get(self.chunklist_url(origin.base_url), headers=EARTHCAM_HEADERS, timeout=10.0)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"🩺 Origin probe to {origin.host} failed: {e!r}")
+            pool.record_failure(origin)
+            return
+        pool.record_success(origin, time.perf_counter() - start)
+
+    def probe_origins(self, client: httpx.AsyncClient):
+        """
+        Probes origins that haven't been sampled for a while, in the background -
+        off the polling path, so a slow or dead edge never delays discovery.
+        """
+        pool = self.get_origin_pool()
+        for origin in pool.due_for_probe():
+            self.spawn(self.probe_origin(client, origin))
+
+    def note_playlist_timing(self, playlist):
+        """Takes the expected segment interval from the chunklist itself."""
+        self.source_window_seconds = sum(float(segment.duration or 0) for segment in playlist.segments)
+        if playlist.target_duration:
+            self.target_duration = float(playlist.target_duration)
+        self.expected_segment_duration = float(playlist.segments[-1].duration or self.target_duration or DEFAULT_POLL_SECONDS)
+
+    def note_poll(self, advanced: int):
+        """
+        Records a poll: `advanced` is how many sequence numbers the live edge moved
+        since the previous poll. Moves feed the observed publish cadence.
+        """
+        now = time.monotonic()
+        if advanced <= 0:
+            if self.last_advance_at is not None and now >= self.last_advance_at + (self.segment_cadence or self.expected_segment_duration):
+                self.overdue_polls += 1
+            return
 
-        # Cleanup old files
-        await cleanup_old_segments(segment_id)
+        if self.last_advance_at is not None:
+            interval = (now - self.last_advance_at) / advanced
+            self.segment_cadence = interval if self.segment_cadence is None else (
+                CADENCE_SMOOTHING * interval + (1 - CADENCE_SMOOTHING) * self.segment_cadence
+            )
+        self.last_advance_at = now
+        self.overdue_polls = 0
+
+    def next_poll_delay(self) -> float:
+        """
+        Seconds until the next chunklist poll. Sleeps until the next segment is due
+        (one cadence after the live edge last moved, a fast retry early), then
+        retries quickly - backing off to half a target duration if the source stalls.
+        Until the live edge has been seen moving, polls at the fast interval to find
+        its phase.
+        """
+        if self.expected_segment_duration is None:
+            return DEFAULT_POLL_SECONDS
+        interval = self.segment_cadence or self.expected_segment_duration
+        fast = min(MAX_FAST_POLL_SECONDS, max(MIN_POLL_SECONDS, interval / 12))
+        if self.last_advance_at is None:
+            return fast
+
+        due_in = self.last_advance_at + interval - fast - time.monotonic()
+        if due_in > 0:
+            return max(fast, due_in)
+        return min(fast * 2 ** self.overdue_polls, max(fast, (self.target_duration or interval) / 2))
+
+    def reset_ingest(self):
+        """Forgets the source's sequence numbering and timing, e.g. when the stream URL changes."""
+        self.last_media_sequence = None
+        self.published_through = None
+        self.pending_segments.clear()
+        self.published_window.clear()
+        self.published_sequences.clear()
+        self.ready_backfills.clear()
+        self.prefetched_segments.clear()
+        self.chunklist_session = int(time.time())
+        self.playlist_validators.clear()
+        self.last_playlist_text = None
+        self.last_advance_at = None
+        self.segment_cadence = None
+        self.expected_segment_duration = None
+        self.target_duration = None
+        self.overdue_polls = 0
+        self.live_edge_id = None
+        self.prefetch_target = None
+        self.prefetch_misses = 0
+        self.source_window_seconds = None
+        self.renditions = []
+        self.selected_rendition = None
+        self.rendition_working_height = None
+
+    def segment_url(self, segment_id: str, timestamp: int, base_url: str | None = None, rendition=None) -> str:
+        """
+        Media URL for a segment: the base URL (the stream URL by default, or the
+        rendition's path on its origin) with chunklist_w replaced by media_w.
+        """
+        rendition = rendition or self.selected_rendition
+        segment_base_url = self.rendition_base_url(base_url or self.base_url, rendition).replace('/chunklist_w', '/media_w')
+        suffix = rendition.suffix if rendition is not None else ""
+        return f"{segment_base_url}{timestamp}{suffix}_{segment_id}.ts"
+
+    async def download_segment(self, client: httpx.AsyncClient, segment_id: str,
+                               sink: SegmentStream | None = None) -> bytes | None:
+        """
+        Downloads a video segment from the Abbey Road stream.
+        Returns the raw .ts file content. With a sink, the body is also fed to it
+        chunk by chunk as it arrives, so the decoder can start before the download
+        ends. Each attempt goes to the best-scoring origin that hasn't failed this
+        segment yet. A body cut off midway continues from the next origin with a
+        Range request; only if that can't be spliced on (a different file size)
+        after bytes reached the sink does it give up - the decoder can't rewind, so
+        the caller aborts the sink and starts over. The same goes for a body the
+        sink's integrity check rejects (the origin is scored as failed). Every
+        attempt fetches the rendition that was selected when the download started.
+        """
+        download_start = time.time()
+
+        # Fetched by the prefetcher already, or its request is in flight - share it
+        content = self.prefetched_segments.pop(segment_id, None)
+        request = self.prefetch_requests.get(segment_id)
+        if content is None and request is not None:
+            try:
+                response = await asyncio.shield(request)
+                if response.status_code == 200:
+                    content = self.prefetched_segments.pop(segment_id, None) or response.content
+                    download_time = time.time() - download_start
+                    self.download_times.append(download_time)
+                    metrics.SEGMENT_STAGE_SECONDS.observe(download_time, stage="download", stream=self.id)
+            except Exception:
+                pass  # Download it ourselves
+        if content is not None:
+            print(f"⏭️  Segment {segment_id} already downloaded by the prefetcher")
+            if sink is not None:
+                try:
+                    sink.feed(content)
+                    sink.finish()
+                except InvalidSegment as e:
+                    print(f"🧪 Prefetched segment {segment_id} failed the integrity check: {e.reason}")
+                    return None
+            return content
 
-        print(f"🎉 Completed segment {segment_id}\n")
+        # Download with retries, failing over between origins
+        rendition = self.selected_rendition
+        self.note_segment_rendition(segment_id, rendition)
+        pool = self.get_origin_pool()
+        deadline = self.download_deadline(segment_id)
+        body = []
+        received = 0
+        total_length = None                  # Size of the file, to check a resumed body belongs to it
+        failed = set()                       # Origins that failed this segment
+        attempt = 0
+        while True:
+            attempt += 1
+            origin = None
+            try:
+                ranked = pool.ranked()
+                origins = [o for o in ranked if o not in failed] + [o for o in ranked if o in failed]
+                action = f"Resuming segment {segment_id} at byte {received}" if received else f"Downloading segment {segment_id}"
+                print(f"📥 {action} from {origins[0].host} (attempt {attempt}/{MAX_DOWNLOAD_ATTEMPTS})...")
+                timeout = max(1.0, min(30.0, deadline - time.time()))
+                origin, response, chunks, first_chunk = await self.open_segment_hedged(
+                    client, segment_id, origins, timeout, received, rendition
+                )
+                try:
+                    length = content_length(response)
+                    if total_length is None:
+                        total_length = length
+                    elif length is not None and length != total_length:
+                        raise ResumeMismatch(f"{origin.host} has {length} bytes, expected {total_length}")
+                    # An origin that ignores Range sends the whole file again
+                    skip = received if response.status_code != 206 else 0
+                    chunk = first_chunk
+                    while chunk is not None:
+                        if skip:
+                            chunk, skip = chunk[skip:], max(0, skip - len(chunk))
+                        if chunk:
+                            body.append(chunk)
+                            received += len(chunk)
+                            if sink is not None:
+                                sink.feed(chunk)
+                        chunk = await anext(chunks, None)
+                    if sink is not None:
+                        sink.finish()
+                except Exception as e:
+                    if not isinstance(e, ResumeMismatch):
+                        pool.record_failure(origin)
+                    raise
+                finally:
+                    await response.aclose()
+                content = b"".join(body)
+                metrics.SOURCE_BYTES_TOTAL.inc(len(content), stream=self.id,
+                                               rendition=rendition.label if rendition else "default")
+
+                download_time = time.time() - download_start
+                self.download_times.append(download_time)
+                metrics.SEGMENT_STAGE_SECONDS.observe(download_time, stage="download", stream=self.id)
+                print(f"✅ Downloaded segment {segment_id} ({len(content) / 1024 / 1024:.2f} MB) "
+                      f"from {origin.host} in {download_time:.2f}s")
+                return content
 
-    except Exception as e:
-        print(f"❌ Pipeline error for segment {segment_id}: {e}")
-        import traceback
-        traceback.print_exc()
+            except Exception as e:
+                if isinstance(e, InvalidSegment):
+                    print(f"🧪 Segment {segment_id} from {origin.host} failed the integrity check: {e.reason}")
+                    return None
+                print(f"⚠️  Download attempt {attempt} failed: {e!r}")
+                if isinstance(e, OriginRequestError):
+                    failed.add(e.origin)
+                elif origin is not None:
+                    failed.add(origin)
+                if isinstance(e, ResumeMismatch):
+                    if sink is not None and sink.received:
+                        print(f"❌ Download of segment {segment_id} can't be resumed after decoding started")
+                        return None
+                    body.clear()
+                    received = 0
+                    total_length = None
+                # Another origin can be tried right away; the same one again after a
+                # full-jitter exponential backoff - as long as there's time for another attempt
+                failover = len(failed) < len(pool.origins)
+                backoff = 0.0 if failover else random.uniform(
+                    0, min(RETRY_MAX_BACKOFF, RETRY_BASE_BACKOFF * 2 ** (attempt - 1))
+                )
+                if attempt >= MAX_DOWNLOAD_ATTEMPTS or time.time() + backoff >= deadline:
+                    print(f"❌ Failed to download segment {segment_id} after {attempt} attempts")
+                    return None
+                metrics.RETRIES_TOTAL.inc(operation="download", stream=self.id)
+                if received:
+                    metrics.ORIGIN_FAILOVERS_TOTAL.inc(kind="resume", stream=self.id)
+                elif failover:
+                    metrics.ORIGIN_FAILOVERS_TOTAL.inc(kind="download", stream=self.id)
+                await asyncio.sleep(backoff)
+
+    def note_invalid_segment(self, segment_id: str, reason: str):
+        """Counts a segment the integrity check rejected, and the processing it didn't run (recent average)."""
+        saved = sum(self.processing_times) / len(self.processing_times) if self.processing_times else 0.0
+        metrics.SEGMENTS_INVALID_TOTAL.inc(reason=reason, stream=self.id)
+        metrics.PROCESSING_SAVED_SECONDS_TOTAL.inc(saved, stream=self.id)
+        print(f"🧪 Segment {segment_id} rejected ({reason}) before the effect ran, ~{saved:.1f}s of processing saved")
+
+    def download_deadline(self, segment_id: str) -> float:
+        """
+        Unix time after which retrying a download is pointless: when the segment
+        leaves the source's playlist window.
+        """
+        timeline = self.segment_timeline.get(segment_id)
+        if timeline is None or not self.source_window_seconds:
+            return time.time() + DEFAULT_DOWNLOAD_BUDGET
+        return timeline["available"] + self.source_window_seconds
+
+    def hedge_threshold(self) -> float:
+        """Seconds to wait for first bytes before hedging: recent p95, clamped."""
+        if len(self.first_byte_times) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_SECONDS
+        p95 = sorted(self.first_byte_times)[int(0.95 * (len(self.first_byte_times) - 1))]
+        return min(HEDGE_MAX_SECONDS, max(HEDGE_MIN_SECONDS, p95))
+
+    async def open_segment_response(self, client: httpx.AsyncClient, origin, segment_id: str, timeout: float,
+                                    offset: int = 0, rendition=None):
+        """
+        Sends one GET for a segment to an origin (from byte offset, with a Range
+        header) and waits for the first body bytes. Returns (origin, response,
+        iterator over the remaining chunks, first chunk); the caller closes the
+        response. Failures are scored against the origin and raised as
+        OriginRequestError.
+        """
+        pool = self.get_origin_pool()
+        start = time.perf_counter()
+        headers = {**EARTHCAM_HEADERS, "Range": f"bytes={offset}-"} if offset else EARTHCAM_HEADERS
+        # Generate fresh timestamp for each request to avoid stale URLs
+        request = client.build_request("GET", self.segment_url(segment_id, int(time.time()), origin.base_url, rendition),
+                                       headers=headers,
+                                       timeout=httpx.Timeout(timeout, read=min(timeout, DOWNLOAD_STALL_SECONDS)))
+        try:
+            response = await client.send(request, stream=True)
+            try:
+                response.raise_for_status()
+                chunks = response.aiter_bytes()
+                first_chunk = await anext(chunks, b"")
+            except BaseException:
+                await response.aclose()
+                raise
+        except asyncio.CancelledError:
+            # Lost to a hedge - it took at least this long
+            pool.record_latency(origin, time.perf_counter() - start)
+            raise
+        except Exception as e:
+            pool.record_failure(origin)
+            raise OriginRequestError(origin, e) from e
+        first_byte = time.perf_counter() - start
+        self.first_byte_times.append(first_byte)
+        metrics.DOWNLOAD_FIRST_BYTE_SECONDS.observe(first_byte, stream=self.id)
+        pool.record_success(origin, first_byte)
+        return origin, response, chunks, first_chunk
+
+    async def open_segment_hedged(self, client: httpx.AsyncClient, segment_id: str, origins: list, timeout: float,
+                                  offset: int = 0, rendition=None):
+        """
+        open_segment_response to the first origin, hedged: if it hasn't delivered
+        its first bytes within hedge_threshold(), a second request goes out - to
+        the next origin when there is one - and whichever delivers first wins (the
+        body then streams from it); the other is closed.
+        """
+        primary = asyncio.ensure_future(self.open_segment_response(client, origins[0], segment_id, timeout, offset, rendition))
+        if not HEDGING_ENABLED:
+            return await primary
+
+        threshold = self.hedge_threshold()
+        done, _ = await asyncio.wait({primary}, timeout=threshold)
+        if done:
+            return primary.result()
+
+        hedge_origin = origins[1] if len(origins) > 1 else origins[0]
+        print(f"🪃 Segment {segment_id} has no bytes after {threshold:.2f}s, hedging with a second request "
+              f"to {hedge_origin.host}")
+        hedge = asyncio.ensure_future(self.open_segment_response(client, hedge_origin, segment_id, timeout, offset, rendition))
+        names = {primary: "primary", hedge: "hedge"}
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        metrics.HEDGED_DOWNLOADS_TOTAL.inc(winner=names[task], stream=self.id)
+                        winner = task.result()
+                        # A request that also finished in this round is closed like the cancelled one
+                        for other in done - {task}:
+                            if other.exception() is None:
+                                await other.result()[1].aclose()
+                        return winner
+                    error = task.exception()
+            metrics.HEDGED_DOWNLOADS_TOTAL.inc(winner="none", stream=self.id)
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def save_raw_segment(self, segment_id: str, content: bytes):
+        """Writes the raw segment for the raw playlist (runs off the event loop)."""
+        self.check_open()
+        raw_file = os.path.join(self.raw_dir, f"{segment_id}.ts")
+        with open(raw_file, 'wb') as f:
+            f.write(content)
+        print(f"💾 Saved raw segment {segment_id}")
 
+    async def prefetch_segment(self, client: httpx.AsyncClient, segment_id: str, start_at: float, deadline: float):
+        """
+        Fetches a segment the chunklist doesn't list yet. Probes its media URL from
+        start_at, treating 404 as "not yet" with a short backoff, until it lands,
+        the chunklist lists it first, or the deadline passes. A hit is kept in
+        memory where download_segment finds it and goes straight into the pipeline, without
+        waiting for the next poll. If the poll queues it while a probe is in
+        flight, download_segment waits for that probe instead of starting another.
+        """
+        await asyncio.sleep(max(0.0, start_at - time.monotonic()))
+
+        rendition = self.selected_rendition
+        delay = PREFETCH_RETRY_SECONDS
+        while time.monotonic() < deadline:
+            if segment_id in self.recent_segments or int(segment_id) in self.pending_segments:
+                metrics.PREFETCH_TOTAL.inc(result="late", stream=self.id)
+                return
+            try:
+                download_start = time.time()
+                request = asyncio.ensure_future(
+                    client.get(self.segment_url(segment_id, int(time.time()), self.get_origin_pool().ranked()[0].base_url, rendition),
+                               headers=EARTHCAM_HEADERS, timeout=30.0)
+                )
+                self.prefetch_requests[segment_id] = request
+                try:
+                    response = await request
+                finally:
+                    self.prefetch_requests.pop(segment_id, None)
+                if response.status_code == 200:
+                    # Kept in memory for the pipeline - also when the poll queued it
+                    # while the body was in flight, in case its pipeline hasn't
+                    # started downloading yet. A pipeline that has started shared
+                    # this request already, so bytes stored for it would go stale
+                    if segment_id not in self.recent_segments:
+                        self.prefetched_segments[segment_id] = response.content
+                    metrics.SOURCE_BYTES_TOTAL.inc(len(response.content), stream=self.id,
+                                                   rendition=rendition.label if rendition else "default")
+                    if segment_id in self.recent_segments or int(segment_id) in self.pending_segments:
+                        self.note_segment_rendition(segment_id, rendition)
+                        metrics.PREFETCH_TOTAL.inc(result="late", stream=self.id)
+                        return
+                    download_time = time.time() - download_start
+                    self.download_times.append(download_time)
+                    metrics.SEGMENT_STAGE_SECONDS.observe(download_time, stage="download", stream=self.id)
+
+                    self.note_segment_prefetched(segment_id)
+                    self.note_segment_rendition(segment_id, rendition)
+                    self.pending_segments[int(segment_id)] = time.time()
+                    self.prefetch_misses = 0
+                    metrics.PREFETCH_TOTAL.inc(result="hit", stream=self.id)
+                    print(f"🔮 Prefetched segment {segment_id} before it was listed")
+                    self.spawn(self.process_pipeline(client, segment_id))
+                    return
+            except Exception as e:
+                print(f"⚠️  Prefetch of segment {segment_id} failed: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, PREFETCH_MAX_RETRY_SECONDS)
 
-def cleanup_all_data():
-    """
-    Clears all frames, segments, raw, and processed files on startup.
-    """
-    print("🧹 Cleaning up old data on startup...")
+        if segment_id in self.recent_segments or int(segment_id) in self.pending_segments:
+            metrics.PREFETCH_TOTAL.inc(result="late", stream=self.id)
+            return
+        self.prefetch_misses += 1
+        metrics.PREFETCH_TOTAL.inc(result="miss", stream=self.id)
+        if self.prefetch_misses == PREFETCH_MAX_MISSES:
+            print(f"🔮 Prefetch missed {PREFETCH_MAX_MISSES} times in a row - segment IDs don't look sequential, "
+                  f"turning it off for this stream")
+
+    def note_segment_prefetched(self, segment_id: str):
+        """Starts the timeline of a segment fetched before it was listed (available no later than now)."""
+        now = time.time()
+        duration = self.expected_segment_duration or 6.0
+        self.segment_timeline[segment_id] = {
+            "capture_start": now - duration,
+            "duration": duration,
+            "available": now,
+            "availability_source": "prefetch",
+            "stages": {"discovered": now},
+        }
+        while len(self.segment_timeline) > MAX_TIMELINE:
+            self.segment_timeline.popitem(last=False)
+
+    def schedule_prefetch(self, client: httpx.AsyncClient):
+        """
+        Starts prefetching the segment after the live edge, timed like the next
+        poll: from just before it's due until one interval after.
+        """
+        if (not PREFETCH_ENABLED or self.prefetch_misses >= PREFETCH_MAX_MISSES or self.live_edge_id is None
+                or not self.live_edge_id.isdigit() or self.last_advance_at is None):
+            return
+        target = str(int(self.live_edge_id) + 1)
+        if target == self.prefetch_target:
+            return
+        self.prefetch_target = target
+
+        interval = self.segment_cadence or self.expected_segment_duration
+        lead = min(MAX_FAST_POLL_SECONDS, max(MIN_POLL_SECONDS, interval / 12))
+        due_at = self.last_advance_at + interval
+        self.spawn(self.prefetch_segment(client, target, due_at - lead, due_at + interval))
+
+    def get_segment_settings(self) -> dict:
+        """
+        Snapshot of the stream's stylization config (the admin config for the
+        default stream), taken once per segment so a config change never lands
+        mid-segment.
+        """
+        if self.config is not None:
+            return self.config.dict()
+        from backend.api import admin
+        return admin.current_config.dict()
+
+    def get_background_model(self, engine_version, engine, settings: dict, fps: float):
+        """
+        Returns the stream's BackgroundModel (creating it on first use or when the
+        engine/parameters change), or None if background mode is off.
+        """
+        if not settings.get("background_model") or engine is None or not hasattr(engine, "BackgroundModel"):
+            return None
 
-    for directory in [FRAMES_DIR, SEGMENTS_DIR, RAW_DIR, PROCESSED_DIR]:
-        if os.path.exists(directory):
-            # Remove all subdirectories and files
-            for item in os.listdir(directory):
-                item_path = os.path.join(directory, item)
-                try:
-                    if os.path.isfile(item_path):
-                        os.remove(item_path)
-                    elif os.path.isdir(item_path):
-                        shutil.rmtree(item_path)
-                except Exception as e:
-                    print(f"⚠️  Failed to delete {item_path}: {e}")
+        restyle_interval = max(1, int(round(float(settings.get("background_restyle_seconds", 3.0)) * fps)))
+        lighting_threshold = float(settings.get("background_lighting_threshold", 8.0))
+        key = (engine_version, restyle_interval, lighting_threshold)
+
+        with self.background_model_lock:
+            if self.background_model is None or self.background_model_key != key:
+                self.background_model = engine.BackgroundModel(
+                    restyle_interval=restyle_interval,
+                    lighting_threshold=lighting_threshold
+                )
+                self.background_model_key = key
+                print(f"🏞️ Background model created (restyle every {restyle_interval} frames)")
+            return self.background_model
+
+    def reset_background_model(self):
+        """Drops the cached background, e.g. when the stream URL changes."""
+        with self.background_model_lock:
+            self.background_model = None
+            self.background_model_key = None
+
+    def process_segment_sync(self, segment_id: str, source) -> bytes | None:
+        """
+        Processes a video segment synchronously (CPU-bound, runs in thread pool).
+        Extracts frames, applies effects, encodes back to video.
+        source is the raw .ts content: bytes, or a SegmentStream the download is
+        still feeding (decoding then waits for bytes as they arrive).
+        Returns the encoded .ts video content.
+        """
+        process_start = time.time()
 
-    # Clear the deques
-    recent_segments.clear()
-    ready_segments.clear()
+        try:
+            self.check_open()
+            frames_dir = os.path.join(self.frames_dir, segment_id)
+            os.makedirs(frames_dir, exist_ok=True)
+
+            # Get London time for color scheme
+            london_time = datetime.now(pytz.timezone('Europe/London'))
+            edge_color, background_color = get_colors(london_time.hour, london_time.minute)
+
+            # Pin the engine for the whole segment - hot-swaps only land between segments
+            engine_version, engine = engine_loader.acquire_engine()
+            settings = self.get_segment_settings()
+
+            print(f"🎨 Processing segment {segment_id} (engine: {engine_version})...")
+            if engine_version == "python" and "inplace" not in engine_loader.loaded_engines:
+                metrics.FALLBACKS_TOTAL.inc(kind="python_engine")
+
+            # Open video container. A streamed source blocks on the network while
+            # decoding - that time is download_wait, not decode
+            decode_start = time.perf_counter()
+            container = av.open(BytesIO(source) if isinstance(source, bytes) else source, format='mpegts')
+            fps = float(container.streams.video[0].average_rate or 30)
+
+            # Prepare frame data for processing. Exact dedup hashes the decoder's
+            # luma plane here, before the BGR conversion
+            dedup_mode = settings.get("dedup_mode", "exact")
+            frame_data = []
+            fingerprints = []
+            for frame_number, frame in enumerate(container.decode(container.streams.video[0])):
+                fingerprints.append(dedup.decoded_fingerprint(frame, dedup_mode))
+                frame_data.append(
+                    (segment_id, frame_number, frame.to_ndarray(format='bgr24'),
+                     edge_color, background_color,
+                     london_time.year, london_time.month, london_time.day,
+                     london_time.hour, london_time.minute)
+                )
+
+            container.close()
+            self.check_open()
+            waited = source.wait_seconds if isinstance(source, SegmentStream) else 0.0
+            metrics.SEGMENT_STAGE_SECONDS.observe(time.perf_counter() - decode_start - waited,
+                                                  stage="decode", stream=self.id)
+            if isinstance(source, SegmentStream):
+                metrics.SEGMENT_STAGE_SECONDS.observe(waited, stage="download_wait", stream=self.id)
+
+            # Process frames in parallel - only every Nth frame runs the full effect,
+            # the rest are rebuilt in memory from the processed keyframes
+            every_nth = max(1, int(settings.get("process_every_nth_frame", 1)))
+            temporal_mode = settings.get("temporal_mode", "flow")
+            # Background mode: one model for the whole stream, keyframes feed it
+            # roughly in order (the executor picks them up in submission order)
+            background = self.get_background_model(engine_version, engine, settings, fps)
+            # Incremental mode: frames share a tile cache, so keyframes render in order
+            state = None
+            if (background is None and settings.get("incremental")
+                    and engine is not None and hasattr(engine, "FrameState")):
+                state = engine.FrameState(
+                    tile_size=int(settings.get("incremental_tile_size", 64)),
+                    threshold=float(settings.get("incremental_threshold", 3.0))
+                )
+            render_frame = partial(process_frame_fast_blobs, engine=engine, settings=settings, state=state,
+                                   background=background)
+
+            # Per-operation engine timings, collected from each worker thread after
+            # every frame so they add up to exactly this segment's frames. Profiling
+            # is requested per process_frame call (see image_processing), so
+            # segments with different settings don't switch each other's off
+            profiling = bool(settings.get("profile_engine")) and hasattr(engine, "take_thread_profile")
+            profile_lock = threading.Lock()
+            profile_totals = {}
+            profiled_frames = 0
+
+            def render(data):
+                nonlocal profiled_frames
+                self.check_open()
+                start = time.perf_counter()
+                output = render_frame(data)
+                metrics.FRAME_EFFECT_SECONDS.observe(time.perf_counter() - start, stream=self.id)
+                if output is None:
+                    metrics.FRAMES_DROPPED_TOTAL.inc(stream=self.id)
+                if profiling:
+                    frame_profile = engine.take_thread_profile()
+                    metrics.observe_engine_profile(frame_profile)
+                    with profile_lock:
+                        profiled_frames += frame_profile["frames"]
+                        for op, entry in frame_profile["ops"].items():
+                            profile_totals[op] = profile_totals.get(op, 0.0) + entry["ms"]
+                return output
+
+            # Frame work goes through the CPU scheduler shared by every stream
+            with scheduler.executor_for(self.id) as executor:
+                # Repeats of the previous frame reuse its output - only unique frames
+                # go through temporal subsampling and the engine. Dedup runs first,
+                # so every_nth counts unique frames, not decoded ones
+                frames = [data[2] for data in frame_data]
+                sources = dedup.find_duplicates(
+                    frames,
+                    dedup_mode,
+                    float(settings.get("dedup_threshold", 1.0)),
+                    map_fn=executor.map,
+                    fingerprints=fingerprints
+                )
+                unique = [i for i, source in enumerate(sources) if source is None]
+
+                unique_outputs, keyframes = temporal.render_segment(
+                    [frames[i] for i in unique],
+                    lambda index: render(frame_data[unique[index]]),
+                    every_nth,
+                    temporal_mode,
+                    executor,
+                    sequential=state is not None
+                )
+                outputs = dedup.expand(unique_outputs, sources)
+                reused = len(outputs) - len(unique)
+                print(f"⚡ Full effect on {keyframes}/{len(outputs)} frames (every {every_nth}, {temporal_mode}, "
+                      f"{reused} repeats reused)")
+
+                stats = {
+                    "segment_id": segment_id,
+                    "frames": len(outputs),
+                    "keyframes": keyframes,
+                    "reused_frames": reused,
+                    "engine": engine_version,
+                }
+                if state is not None:
+                    stats["tiles_recomputed_fraction"] = round(state.recompute_fraction, 3)
+                    print(f"🧩 Recomputed {stats['tiles_recomputed_fraction']:.1%} of tiles")
+                if profiled_frames:
+                    stats["engine_profile_ms"] = {
+                        op: round(total / profiled_frames, 3) for op, total in profile_totals.items()
+                    }
+                if background is not None:
+                    stats["background"] = {
+                        "restyles": background.restyles,
+                        "foreground_fraction": round(background.last_foreground_fraction, 3),
+                        "memory_kb": background.memory_bytes() // 1024,
+                    }
+                self.segment_stats.appendleft(stats)
+
+                # Write frames for the encoder (cv2.imwrite releases the GIL),
+                # repeats link to their source frame's JPEG
+                def write(i):
+                    self.check_open()
+                    return save_frame(frames_dir, i, outputs[i])
+
+                with metrics.SEGMENT_STAGE_SECONDS.time(stage="disk_write", stream=self.id):
+                    list(executor.map(write, unique))
+                    for i, source in enumerate(sources):
+                        if source is not None:
+                            link_frame(frames_dir, source, i)
+
+            print(f"🎬 Encoding segment {segment_id}...")
+
+            # Check if frames were actually created
+            frame_files = sorted([f for f in os.listdir(frames_dir) if f.endswith('.jpg')])
+            if not frame_files:
+                print(f"❌ No frames found in {frames_dir}")
+                return None
 
-    print("✅ Cleanup complete!\n")
+            print(f"📊 Found {len(frame_files)} frame files to encode")
+
+            # Verify frame numbering is consecutive
+            frame_numbers = sorted([int(f.replace('.jpg', '')) for f in frame_files])
+            print(f"🎬 Frame range: {frame_numbers[0]} to {frame_numbers[-1]}")
+
+            # Encode frames to video using FFmpeg with explicit start number
+            self.check_open()
+            with metrics.SEGMENT_STAGE_SECONDS.time(stage="encode", stream=self.id):
+                out, err = (
+                    ffmpeg
+                    .input(f'{frames_dir}/%d.jpg',
+                           framerate=30,
+                           start_number=0,
+                           f='image2')
+                    .output('pipe:',
+                            vcodec='libx264',
+                            crf=25,
+                            pix_fmt='yuv420p',
+                            format='mpegts',
+                            **{'loglevel': 'warning'})
+                    .run(capture_stdout=True, capture_stderr=True)
+                )
+
+            if err:
+                stderr_output = err.decode('utf-8')
+                print(f"⚠️  FFmpeg stderr: {stderr_output[:500]}")
+                # Check for actual errors (FFmpeg writes normal output to stderr too)
+                if 'error' in stderr_output.lower() or 'invalid' in stderr_output.lower():
+                    print(f"❌ FFmpeg encountered errors")
+
+            process_time = time.time() - process_start
+            self.processing_times.append(process_time)
+            print(f"✅ Processed segment {segment_id} ({len(out) / 1024 / 1024:.2f} MB) in {process_time:.2f}s")
+            return out
+
+        except StreamAborted as e:
+            print(f"⏭️  Stopped processing segment {segment_id}: {e}")
+            return None
+        except (CancelledError, StreamClosed):
+            print(f"⏭️  Stopped processing segment {segment_id}: the stream was removed")
+            return None
+        except Exception as e:
+            print(f"❌ Error processing segment {segment_id}: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
 
+    async def process_segment_async(self, segment_id: str, source) -> bytes | None:
+        """
+        Wrapper to run CPU-bound processing in a thread pool.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.run_segment_work, self.process_segment_sync, segment_id, source)
+
+    def assign_output_sequence(self, segment: int):
+        """
+        Numbers a segment the first time it's published. Output media sequence
+        numbers are consecutive even where source segments were missed; a hole
+        starts a new discontinuity sequence instead, and so does a switch of
+        source rendition (the resolution changes).
+        """
+        if segment in self.published_sequences:
+            return
+        if self.published_sequences:
+            last_segment, (last_sequence, last_discontinuity) = next(reversed(self.published_sequences.items()))
+            rendition = self.segment_timeline.get(str(segment), {}).get("rendition")
+            last_rendition = self.segment_timeline.get(str(last_segment), {}).get("rendition")
+            switched = rendition is not None and last_rendition is not None and rendition != last_rendition
+            entry = (last_sequence + 1, last_discontinuity + (segment != last_segment + 1 or switched))
+        else:
+            entry = (segment, 0)
+        self.published_sequences[segment] = entry
+        while len(self.published_sequences) > MAX_TIMELINE:
+            self.published_sequences.popitem(last=False)
+
+    def render_playlist(self, segments: list, segment_url) -> str:
+        """
+        Live M3U8 for published segments (oldest first); segment_url maps a segment
+        id to its URI.
+        """
+        first_sequence, first_discontinuity = self.published_sequences[segments[0]]
+        m3u8_content = (
+            f"#EXTM3U\n"
+            f"#EXT-X-VERSION:3\n"
+            f"#EXT-X-TARGETDURATION:6\n"
+            f"#EXT-X-MEDIA-SEQUENCE:{first_sequence}\n"
+        )
+        if first_discontinuity:
+            m3u8_content += f"#EXT-X-DISCONTINUITY-SEQUENCE:{first_discontinuity}\n"
+
+        previous = first_discontinuity
+        for segment in segments:
+            discontinuity = self.published_sequences[segment][1]
+            if discontinuity != previous:
+                m3u8_content += "#EXT-X-DISCONTINUITY\n"
+            previous = discontinuity
+            m3u8_content += f"{self.playlist_entry(segment)}{segment_url(segment)}\n"
+        return m3u8_content
+
+    async def generate_m3u8_playlist(self) -> bool:
+        """
+        Generates an M3U8 playlist from processed segments.
+        Uses a sliding window approach to ensure smooth continuous playback.
+        Segments are published in order: ready segments newer than one still being
+        backfilled wait for it (up to BACKFILL_HOLD_SECONDS), since a live playlist
+        can't have segments inserted into it later.
+        """
+        if self.closed:
+            return False
+        try:
+            now = time.time()
+            holding = [segment for segment, queued in self.pending_segments.items()
+                       if now - queued < BACKFILL_HOLD_SECONDS]
+            hold_from = min(holding) if holding else None
+            ready = sorted(
+                segment for segment in self.ready_segments
+                if (hold_from is None or segment < hold_from)
+                and (self.published_through is None or segment > self.published_through)
+            )
+
+            # Need at least 3 segments minimum to start
+            if self.published_through is None and len(ready) < 3:
+                print(f"⏭️  Only {len(ready)} segments ready, need at least 3 to start playback")
+                return False
+
+            # Number newly ready segments in order, then use a sliding window of the
+            # latest 10 - consecutive output sequence numbers, like the raw stream
+            for segment in ready:
+                self.assign_output_sequence(segment)
+            playlist_segments = list(self.published_sequences)[-10:]
+
+            if not playlist_segments:
+                print("⏭️  No segments available for playlist")
+                return False
 
-async def stream_processor():
-    """
-    Main background loop that continuously processes the stream.
-    Runs forever, checking for new segments every 2 seconds.
-    """
-    # Clean up old data on startup
-    cleanup_all_data()
+            # Use local API endpoint instead of S3
+            m3u8_content = self.render_playlist(
+                playlist_segments, lambda segment: self.playlist_segment_url.format(segment=segment)
+            )
+
+            # Save playlist locally
+            playlist_path = os.path.join(self.data_dir, "current_playlist.m3u8")
+            with open(playlist_path, 'w') as f:
+                f.write(m3u8_content)
+            previous_through = self.published_through
+            self.published_window[:] = playlist_segments
+            self.published_through = playlist_segments[-1]
+
+            print(f"📝 Playlist: segments {playlist_segments[0]}-{playlist_segments[-1]} ({len(playlist_segments)} segments)")
+            for segment in playlist_segments:
+                if previous_through is None or segment > previous_through:
+                    self.record_published(segment)
+            return True
 
-    print("🚀 Stream processor started!")
-    print(f"📁 Data directory: {DATA_DIR}")
-    print(f"🎬 Frames: {FRAMES_DIR}")
-    print(f"📹 Segments: {SEGMENTS_DIR}\n")
+        except Exception as e:
+            print(f"❌ Error generating playlist: {e}")
+            return False
 
-    async with httpx.AsyncClient() as client:
-        while True:
+    async def cleanup_old_segments(self, segment_id: str):
+        """
+        Removes old segment files to save disk space.
+        Keeps the segments in the playlist window and any still being processed.
+        """
+        if self.closed:
+            return
+        try:
+            if len(self.published_window) < 10:
+                return
+            oldest_kept = self.published_window[0]
+
+            # Remove temporary frame directories and old raw and processed segment files
+            removed = set()
+            for base_dir in [self.frames_dir, self.raw_dir, self.processed_dir]:
+                for name in os.listdir(base_dir):
+                    old_id = name.split('.')[0]
+                    if not old_id.isdigit() or int(old_id) >= oldest_kept or int(old_id) in self.pending_segments:
+                        continue
+                    old_path = os.path.join(base_dir, name)
+                    if os.path.isdir(old_path):
+                        shutil.rmtree(old_path)
+                    else:
+                        os.remove(old_path)
+                    removed.add(old_id)
+
+            for old_id in [old_id for old_id in self.prefetched_segments if int(old_id) < oldest_kept]:
+                self.prefetched_segments.pop(old_id, None)
+
+            for old_id in sorted(removed):
+                print(f"🗑️  Cleaned up old segment: {old_id}")
+        except Exception as e:
+            print(f"⚠️  Error cleaning up: {e}")
+
+    async def process_segment_prioritized(self, segment_id: str, backfill: bool, source) -> bytes | None:
+        """
+        Processes a segment with the live edge first: backfill segments wait until
+        no live-edge segment is processing, and at most BACKFILL_CONCURRENCY run.
+        """
+        if not backfill:
+            self.live_edge_active += 1
+            self.live_edge_idle.clear()
             try:
-                # Fetch new segment
-                segment_id = await fetch_new_segment(client)
+                return await self.process_segment_async(segment_id, source)
+            finally:
+                self.live_edge_active -= 1
+                if self.live_edge_active == 0:
+                    self.live_edge_idle.set()
+
+        async with self.backfill_semaphore:
+            await self.live_edge_idle.wait()
+            return await self.process_segment_async(segment_id, source)
+
+    async def process_pipeline(self, client: httpx.AsyncClient, segment_id: str, backfill: bool = False):
+        """
+        Main processing pipeline for a single segment.
+        Downloads → Processes → Saves locally → Updates playlist.
+        Processes segments in parallel for speed. Backfill segments download right
+        away (while they're still in the origin window) but process after the live edge.
+        """
+        pipeline_start = time.perf_counter()
+        queued = False
+        stream = None
+        try:
+            # Add to recent segments
+            self.recent_segments.appendleft(segment_id)
+
+            # Download, streamed into the decoder - processing (CPU-bound, runs in
+            # thread pool) starts while the rest of the segment is still arriving.
+            # The stream checks TS integrity on the way in; decoding collects every
+            # frame before the effect runs, so a bad segment never reaches it.
+            duration = self.segment_timeline.get(segment_id, {}).get("duration")
+            stream = SegmentStream(TSValidator(duration))
+            processing = asyncio.ensure_future(self.process_segment_prioritized(segment_id, backfill, stream))
+            ts_content = await self.download_segment(client, segment_id, sink=stream)
+            if not ts_content and (stream.received or stream.rejected):
+                # Failed mid-body or the integrity check: the decoder can't rewind,
+                # start over from a complete download (checked before it's processed)
+                if stream.rejected:
+                    self.note_invalid_segment(segment_id, stream.rejected)
+                stream.abort("download failed mid-segment")
+                processing.cancel()
+                await asyncio.gather(processing, return_exceptions=True)
+                ts_content = await self.download_segment(client, segment_id)
+                reason = validate_segment(ts_content, duration) if ts_content else None
+                if reason:
+                    self.note_invalid_segment(segment_id, reason)
+                    print(f"⏭️  Skipping segment {segment_id} - still invalid after a re-fetch ({reason})")
+                    metrics.SEGMENTS_TOTAL.inc(outcome="invalid", stream=self.id)
+                    return
+                if ts_content:
+                    processing = asyncio.ensure_future(self.process_segment_prioritized(segment_id, backfill, ts_content))
+            if not ts_content:
+                stream.abort("download failed")
+                processing.cancel()
+                await asyncio.gather(processing, return_exceptions=True)
+                print(f"⏭️  Skipping segment {segment_id} - download failed (likely 404, stream moved on)")
+                metrics.SEGMENTS_TOTAL.inc(outcome="download_failed", stream=self.id)
+                return
+            self.mark_stage(segment_id, "downloaded")
+
+            # Save raw segment for playback, off the event loop while processing runs
+            raw_saved = asyncio.ensure_future(
+                asyncio.to_thread(self.run_segment_work, self.save_raw_segment, segment_id, ts_content))
+
+            processed_content = await processing
+            await raw_saved
+            if not processed_content:
+                metrics.SEGMENTS_TOTAL.inc(outcome="process_failed", stream=self.id)
+                return
+            self.mark_stage(segment_id, "processed")
+
+            publish_start = time.perf_counter()
+
+            # Save processed segment for playback
+            self.check_open()
+            processed_file = os.path.join(self.processed_dir, f"{segment_id}.ts")
+            with open(processed_file, 'wb') as f:
+                f.write(processed_content)
+            print(f"💾 Saved processed segment {segment_id}")
+
+            # Add to ready segments (avoid duplicates). A backfill that finished after
+            # newer segments were published can't go into the playlist any more.
+            segment_int = int(segment_id)
+            self.pending_segments.pop(segment_int, None)
+            if self.published_through is not None and segment_int < self.published_through and segment_int not in self.ready_segments:
+                print(f"⏭️  Segment {segment_id} finished after newer segments were published, dropping")
+                metrics.SEGMENTS_TOTAL.inc(outcome="late", stream=self.id)
+                queued = True  # Nothing left to release
+                return
+            if backfill:
+                self.ready_backfills.add(segment_int)
+            if segment_int not in self.ready_segments:
+                self.ready_segments.appendleft(segment_int)
+                print(f"✅ Added segment {segment_id} to ready queue (total: {len(self.ready_segments)})")
+            else:
+                print(f"⏭️  Segment {segment_id} already in ready queue")
 
-                if segment_id:
-                    # Process in background (don't block polling)
-                    asyncio.create_task(process_pipeline(client, segment_id))
+            # Generate playlist - it counts the segment as published once it lists
+            # it, now or in a later write if it's held back
+            queued = True
+            await self.generate_m3u8_playlist()
 
-                # Wait 2 seconds before next check
-                await asyncio.sleep(2.0)
+            now = time.perf_counter()
+            metrics.SEGMENT_STAGE_SECONDS.observe(now - publish_start, stage="publish", stream=self.id)
+            metrics.SEGMENT_STAGE_SECONDS.observe(now - pipeline_start, stage="end_to_end", stream=self.id)
 
-            except Exception as e:
-                print(f"❌ Error in main loop: {e}")
-                await asyncio.sleep(5.0)  # Wait longer on error
+            # Cleanup old files
+            await self.cleanup_old_segments(segment_id)
 
+            print(f"🎉 Completed segment {segment_id}\n")
 
-def get_processor_status():
-    """
-    Returns current processor status for admin API.
-    """
-    avg_processing_time = sum(processing_times) / len(processing_times) if processing_times else 0
-    avg_download_time = sum(download_times) / len(download_times) if download_times else 0
-
-    return {
-        "running": True,
-        "recent_segments": list(recent_segments)[:5],
-        "ready_segments": list(ready_segments)[:5],
-        "total_processed": len(recent_segments),
-        "total_ready": len(ready_segments),
-        "avg_processing_time": round(avg_processing_time, 2),
-        "avg_download_time": round(avg_download_time, 2),
-        "avg_total_time": round(avg_processing_time + avg_download_time, 2)
-    }
+        except asyncio.CancelledError:
+            # The decoder thread may be waiting for bytes that won't come now
+            if stream is not None:
+                stream.abort("stream stopped")
+            raise
+        except StreamClosed:
+            print(f"⏭️  Dropped segment {segment_id}: the stream was removed")
+        except Exception as e:
+            print(f"❌ Pipeline error for segment {segment_id}: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            # A failed segment no longer holds back the newer ones behind it
+            if not queued and self.pending_segments.pop(int(segment_id), None) is not None:
+                await self.generate_m3u8_playlist()
+
+    def cleanup_all_data(self):
+        """
+        Clears all frames, raw, and processed files on startup.
+        """
+        print("🧹 Cleaning up old data on startup...")
+
+        for directory in [self.frames_dir, self.raw_dir, self.processed_dir]:
+            if os.path.exists(directory):
+                # Remove all subdirectories and files
+                for item in os.listdir(directory):
+                    item_path = os.path.join(directory, item)
+                    try:
+                        if os.path.isfile(item_path):
+                            os.remove(item_path)
+                        elif os.path.isdir(item_path):
+                            shutil.rmtree(item_path)
+                    except Exception as e:
+                        print(f"⚠️  Failed to delete {item_path}: {e}")
+
+        # Clear the deques
+        self.recent_segments.clear()
+        self.ready_segments.clear()
+        self.segment_timeline.clear()
+        self.reset_ingest()
+
+        print("✅ Cleanup complete!\n")
+
+    async def run(self):
+        """
+        Main background loop that continuously processes the stream.
+        Runs forever, polling the chunklist when the next segment is due
+        (see next_poll_delay).
+        """
+        # Clean up old data on startup
+        self.cleanup_all_data()
+
+        print("🚀 Stream processor started!")
+        print(f"📁 Data directory: {self.data_dir}")
+        print(f"🎬 Frames: {self.frames_dir}")
+        print(f"📹 Raw segments: {self.raw_dir}\n")
+
+        client_name = "processor" if self.id == "default" else f"processor-{self.id}"
+        async with http_client.create_async_client(client_name) as client:
+            try:
+                while True:
+                    try:
+                        # Fetch new segments (oldest first, the live edge last)
+                        segment_ids = await self.fetch_new_segments(client)
+
+                        # Process in background (don't block polling) - live edge first,
+                        # missed segments backfilled in parallel behind it
+                        for segment_id in reversed(segment_ids):
+                            backfill = segment_id != segment_ids[-1]
+                            self.spawn(self.process_pipeline(client, segment_id, backfill=backfill))
+
+                        # Go after the next segment before the chunklist lists it
+                        self.schedule_prefetch(client)
+                        # Keep the other origins' scores fresh
+                        self.probe_origins(client)
+
+                        # Wait until the next segment is due
+                        await asyncio.sleep(self.next_poll_delay())
+
+                    except Exception as e:
+                        print(f"❌ Error in main loop: {e}")
+                        await asyncio.sleep(5.0)  # Wait longer on error
+            finally:
+                # Stopped (stream removed or server shutting down) - take the
+                # segments in flight with it, before the client closes
+                tasks = list(self.background_tasks)
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_segment_timelines(self, limit: int = 5) -> list:
+        """Newest segment timelines with stage times relative to source availability."""
+        timelines = []
+        for segment_id, timeline in list(self.segment_timeline.items())[-limit:][::-1]:
+            timelines.append({
+                "segment_id": segment_id,
+                "available": round(timeline["available"], 3),
+                "availability_source": timeline["availability_source"],
+                "rendition": timeline.get("rendition"),
+                "stages_s": {stage: round(at - timeline["available"], 3) for stage, at in timeline["stages"].items()},
+            })
+        return timelines
+
+    def get_processor_status(self):
+        """
+        Returns current processor status for admin API.
+        """
+        avg_processing_time = sum(self.processing_times) / len(self.processing_times) if self.processing_times else 0
+        avg_download_time = sum(self.download_times) / len(self.download_times) if self.download_times else 0
+
+        return {
+            "running": True,
+            "stream": self.id,
+            "url": self.base_url,
+            "recent_segments": list(self.recent_segments)[:5],
+            "ready_segments": list(self.ready_segments)[:5],
+            "total_processed": len(self.recent_segments),
+            "total_ready": len(self.ready_segments),
+            "avg_processing_time": round(avg_processing_time, 2),
+            "avg_download_time": round(avg_download_time, 2),
+            "avg_total_time": round(avg_processing_time + avg_download_time, 2),
+            "engine": engine_loader.get_engine_status(),
+            "segment_stats": list(self.segment_stats)[:5],
+            "latency": metrics.get_latency_summary(self.id),
+            "shared_metrics": metrics.get_shared_summary(),
+            "live_edge_lag_s": round(self.last_live_edge_lag, 2) if self.last_live_edge_lag is not None else None,
+            "pending_segments": sorted(self.pending_segments),
+            "last_media_sequence": self.last_media_sequence,
+            "segment_cadence_s": round(self.segment_cadence, 2) if self.segment_cadence is not None else None,
+            "origins": self.get_origin_pool().snapshot(),
+            "rendition": self.selected_rendition.snapshot() if self.selected_rendition is not None else None,
+            "renditions": [rendition.snapshot() for rendition in self.renditions],
+            "http_clients": http_client.get_client_stats(),
+            "scheduler": scheduler.get_scheduler_status(),
+            "timelines": self.get_segment_timelines()
+        }
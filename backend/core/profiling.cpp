@@ -0,0 +1,74 @@
+#include "profiling.h"
+
+const char* const PROFILE_OP_NAMES[PROFILE_OP_COUNT] = {
+    "downsample",
+    "distortion",
+    "cached_stylize",
+    "oil_paint",
+    "smoothing",
+    "grayscale",
+    "detail_enhance",
+    "clahe",
+    "quantize",
+    "morphology",
+    "canny",
+    "edge_blur",
+    "edge_blend",
+    "upsample",
+    "total",
+};
+
+namespace {
+
+std::atomic<bool> g_profiling(false);
+
+// Only ever touched by its own thread
+struct ThreadProfile {
+    long long ns[PROFILE_OP_COUNT] = {};
+    long long calls[PROFILE_OP_COUNT] = {};
+    long long frames = 0;
+};
+
+thread_local ThreadProfile t_profile;
+
+}  // namespace
+
+FrameProfile::FrameProfile() {
+    for (int i = 0; i < PROFILE_OP_COUNT; i++) {
+        ns[i].store(0, std::memory_order_relaxed);
+        calls[i].store(0, std::memory_order_relaxed);
+    }
+}
+
+void FrameProfile::add(ProfileOp op, long long elapsed_ns) {
+    ns[op].fetch_add(elapsed_ns, std::memory_order_relaxed);
+    calls[op].fetch_add(1, std::memory_order_relaxed);
+}
+
+void set_profiling(bool enabled) {
+    g_profiling.store(enabled, std::memory_order_relaxed);
+}
+
+bool profiling_enabled() {
+    return g_profiling.load(std::memory_order_relaxed);
+}
+
+void commit_frame_profile(const FrameProfile& frame) {
+    for (int i = 0; i < PROFILE_OP_COUNT; i++) {
+        t_profile.ns[i] += frame.ns[i].load(std::memory_order_relaxed);
+        t_profile.calls[i] += frame.calls[i].load(std::memory_order_relaxed);
+    }
+    t_profile.frames++;
+}
+
+std::vector<OpTotal> take_thread_profile(long long& frames) {
+    std::vector<OpTotal> totals;
+    for (int i = 0; i < PROFILE_OP_COUNT; i++) {
+        if (t_profile.calls[i] > 0) {
+            totals.push_back({PROFILE_OP_NAMES[i], t_profile.ns[i] / 1e6, t_profile.calls[i]});
+        }
+    }
+    frames = t_profile.frames;
+    t_profile = ThreadProfile();
+    return totals;
+}
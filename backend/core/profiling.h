@@ -0,0 +1,91 @@
+#pragma once
+
+#include <atomic>
+#include <chrono>
+#include <string>
+#include <vector>
+
+/*
+ * Per-operation profiling for process_frame (implemented in profiling.cpp).
+ *
+ * Off by default. When enabled (process_frame's profile argument, or
+ * set_profiling for calls that don't pass one), every frame records the time
+ * spent in each internal operation into a FrameProfile shared by its tiles
+ * (tiles may run on OpenCV worker threads, so the counters are atomic). At the
+ * end of the frame the totals are added to a plain thread-local buffer of the
+ * thread that called process_frame, which Python drains with
+ * take_thread_profile() from the same thread - so a segment's worker threads
+ * collect exactly that segment's frames.
+ *
+ * When disabled the cost is one relaxed atomic load per frame: timers get a
+ * null profile and never read the clock.
+ *
+ * Times are summed over tiles, so in tiled mode they're CPU time rather than
+ * wall time. Operations nest: oil_paint includes smoothing, cached_stylize
+ * includes the oil_paint calls it makes.
+ */
+enum ProfileOp {
+    PROFILE_DOWNSAMPLE,      // input -> working resolution (INTER_AREA)
+    PROFILE_DISTORTION,      // distortion maps + remap
+    PROFILE_CACHED_STYLIZE,  // background model composite / incremental tile cache
+    PROFILE_OIL_PAINT,       // oil painting variant
+    PROFILE_SMOOTHING,       // edge-preserving smoothing (region variant)
+    PROFILE_GRAYSCALE,       // BGR -> gray
+    PROFILE_DETAIL_ENHANCE,  // cv::detailEnhance
+    PROFILE_CLAHE,           // adaptive histogram equalization
+    PROFILE_QUANTIZE,        // tonal quantization
+    PROFILE_MORPHOLOGY,      // opening / closing
+    PROFILE_CANNY,           // painterly edge detection
+    PROFILE_EDGE_BLUR,       // Gaussian blur of the edges
+    PROFILE_EDGE_BLEND,      // edges added onto the quantized frame
+    PROFILE_UPSAMPLE,        // nearest upsample + gray -> BGR into the output buffer
+    PROFILE_TOTAL,           // whole frame (without the GIL)
+    PROFILE_OP_COUNT
+};
+
+extern const char* const PROFILE_OP_NAMES[PROFILE_OP_COUNT];
+
+struct FrameProfile {
+    std::atomic<long long> ns[PROFILE_OP_COUNT];
+    std::atomic<long long> calls[PROFILE_OP_COUNT];
+
+    FrameProfile();
+    void add(ProfileOp op, long long elapsed_ns);
+};
+
+// Times the enclosing scope into `profile` (no-op when profile is null)
+class ScopedOpTimer {
+public:
+    ScopedOpTimer(FrameProfile* profile, ProfileOp op) : profile_(profile), op_(op) {
+        if (profile_) start_ = std::chrono::steady_clock::now();
+    }
+    ~ScopedOpTimer() {
+        if (profile_) {
+            profile_->add(op_, std::chrono::duration_cast<std::chrono::nanoseconds>(
+                std::chrono::steady_clock::now() - start_).count());
+        }
+    }
+    ScopedOpTimer(const ScopedOpTimer&) = delete;
+    ScopedOpTimer& operator=(const ScopedOpTimer&) = delete;
+
+private:
+    FrameProfile* profile_;
+    ProfileOp op_;
+    std::chrono::steady_clock::time_point start_;
+};
+
+void set_profiling(bool enabled);
+bool profiling_enabled();
+
+// Adds a finished frame to the calling thread's buffer
+void commit_frame_profile(const FrameProfile& frame);
+
+struct OpTotal {
+    std::string op;
+    double ms;
+    long long calls;
+};
+
+// Returns the calling thread's totals (operations that ran at least once) and
+// the number of frames they cover, then clears the buffer
+std::vector<OpTotal> take_thread_profile(long long& frames);
@@ -0,0 +1,472 @@
+"""
+Pure NumPy/OpenCV engine - the same pipeline as process_frame_cpp, for nodes
+without a C++ toolchain.
+
+Exposes the same API as the fast_processor extension (process_frame,
+oil_paint, smooth, engine_variants, smoothing_backends, and the profiling
+hooks set_profiling / take_thread_profile), so it can be pinned
+per segment like any native engine version. Per-pixel loops are replaced by
+lookup tables and whole-array operations; distortion grids and LUTs are cached.
+
+Not supported: incremental state (FrameState) and the background model.
+Tiled execution is accepted and ignored - OpenCV already parallelizes the
+whole-frame calls.
+"""
+import math
+import threading
+import time
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+ENGINE_VARIANTS = ["region", "multiscale", "box", "directional"]
+SMOOTHING_BACKENDS = ["bilateral", "guided", "domain_transform", "bilateral_downsampled"]
+
+# Smoothing parameters - kept in sync with smoothing.cpp
+GUIDED_RADIUS = 4
+GUIDED_EPS = np.float32(0.05 * 255.0 * 255.0)
+DT_SIGMA_S = np.float32(5.0)
+DT_SIGMA_R = np.float32(75.0)
+
+_ELLIPSE_3 = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+_RECT_2 = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+
+
+# Per-operation profiling (same operation names as profiling.h)
+_profiling = False
+_thread_profile = threading.local()
+
+
+def engine_variants():
+    return list(ENGINE_VARIANTS)
+
+
+def smoothing_backends():
+    return list(SMOOTHING_BACKENDS)
+
+
+def set_profiling(enabled):
+    """Turn per-operation timing on or off for process_frame calls without profile= (off by default)."""
+    global _profiling
+    _profiling = bool(enabled)
+
+
+def profiling_enabled():
+    return _profiling
+
+
+def take_thread_profile():
+    """
+    Per-operation totals of the frames this thread processed since the last
+    call ({"frames": n, "ops": {op: {"ms", "calls"}}}), then clears them.
+    """
+    ops = getattr(_thread_profile, "ops", {})
+    frames = getattr(_thread_profile, "frames", 0)
+    _thread_profile.ops = {}
+    _thread_profile.frames = 0
+    return {
+        "frames": frames,
+        "ops": {op: {"ms": ns / 1e6, "calls": calls} for op, (ns, calls) in ops.items()},
+    }
+
+
+class _OpTimer:
+    """Times a with-block into a frame's profile dict (no-op when it's None)."""
+    __slots__ = ("profile", "op", "start")
+
+    def __init__(self, profile, op):
+        self.profile = profile
+        self.op = op
+
+    def __enter__(self):
+        if self.profile is not None:
+            self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            ns, calls = self.profile.get(self.op, (0, 0))
+            self.profile[self.op] = (ns + time.perf_counter_ns() - self.start, calls + 1)
+
+
+def _commit_profile(profile):
+    ops = getattr(_thread_profile, "ops", None)
+    if ops is None:
+        ops = _thread_profile.ops = {}
+        _thread_profile.frames = 0
+    for op, (ns, calls) in profile.items():
+        total_ns, total_calls = ops.get(op, (0, 0))
+        ops[op] = (total_ns + ns, total_calls + calls)
+    _thread_profile.frames += 1
+
+
+def _to_uint8(image):
+    """float -> uint8 the way cv::Mat::convertTo does it (round half to even, saturate)."""
+    return np.clip(np.rint(image), 0, 255).astype(np.uint8)
+
+
+# ---------------------------------------------------------------------------
+# Lookup tables
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def _posterize_lut(levels: int):
+    """round(v / step) * step (posterize in fast_oil_painting.cpp)."""
+    step = np.float32(255.0) / np.float32(levels - 1)
+    scaled = np.arange(256, dtype=np.float32) / step
+    rounded = np.floor(scaled)
+    rounded += (scaled - rounded) >= 0.5  # std::round: half away from zero
+    return _to_uint8(rounded * step)
+
+
+@lru_cache(maxsize=None)
+def _region_lut(intensity_levels: int):
+    """Snap to the centre of one of max(6, levels / 2) bands (region variant)."""
+    levels = max(6, intensity_levels // 2)
+    step = 256 // levels
+    values = np.arange(256) // step * step + step // 2
+    return np.clip(values, 0, 255).astype(np.uint8)
+
+
+@lru_cache(maxsize=None)
+def _quantize_lut(quantization_levels: int):
+    """floor(v / step + 0.5) * step, truncated (tonal quantization)."""
+    step = np.float32(255.0) / np.float32(quantization_levels - 1)
+    values = np.floor(np.arange(256, dtype=np.float32) / step + np.float32(0.5)) * step
+    return np.clip(values, 0, 255).astype(np.uint8)
+
+
+@lru_cache(maxsize=None)
+def _edge_scale_lut(edge_blend_factor: float):
+    values = np.arange(256, dtype=np.float32) * np.float32(edge_blend_factor)
+    return np.minimum(values, 255).astype(np.uint8)
+
+
+@lru_cache(maxsize=8)
+def _grid(height: int, width: int):
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+    return xs, ys
+
+
+# ---------------------------------------------------------------------------
+# Edge-preserving smoothing (smoothing.cpp)
+# ---------------------------------------------------------------------------
+
+def _clamp_quality(quality: int) -> int:
+    return max(1, min(3, int(quality)))
+
+
+def _guided_filter(guide_full, guide_small, src_small, radius, eps):
+    ksize = (2 * radius + 1, 2 * radius + 1)
+
+    mean_i = cv2.boxFilter(guide_small, cv2.CV_32F, ksize)
+    mean_p = cv2.boxFilter(src_small, cv2.CV_32F, ksize)
+    corr_ii = cv2.boxFilter(guide_small * guide_small, cv2.CV_32F, ksize)
+    corr_ip = cv2.boxFilter(guide_small * src_small, cv2.CV_32F, ksize)
+
+    var_i = corr_ii - mean_i * mean_i
+    cov_ip = corr_ip - mean_i * mean_p
+
+    a = cov_ip / (var_i + np.float32(eps))
+    b = mean_p - a * mean_i
+
+    mean_a = cv2.boxFilter(a, cv2.CV_32F, ksize)
+    mean_b = cv2.boxFilter(b, cv2.CV_32F, ksize)
+
+    if guide_small.shape != guide_full.shape:
+        size = (guide_full.shape[1], guide_full.shape[0])
+        mean_a = cv2.resize(mean_a, size, interpolation=cv2.INTER_LINEAR)
+        mean_b = cv2.resize(mean_b, size, interpolation=cv2.INTER_LINEAR)
+
+    return _to_uint8(mean_a * guide_full + mean_b)
+
+
+def bilateral_smooth(image):
+    return cv2.bilateralFilter(image, 9, 75, 75)
+
+
+def guided_smooth(image, quality):
+    scale = 1 << (3 - _clamp_quality(quality))
+
+    guide = image.astype(np.float32)
+    guide_small = guide
+    if scale > 1:
+        size = (image.shape[1] // scale, image.shape[0] // scale)
+        guide_small = cv2.resize(guide, size, interpolation=cv2.INTER_AREA)
+
+    radius = max(1, GUIDED_RADIUS // scale)
+    return _guided_filter(guide, guide_small, guide_small, radius, GUIDED_EPS)
+
+
+def _recursive_filter(lines, weights):
+    """
+    One left-to-right and one right-to-left pass of the recursive filter along
+    axis 0, in place: lines[i] += weights[i] * (lines[i - 1] - lines[i]).
+    Each step updates a whole line (every row of the image at once), so the
+    Python loop runs once per line, not per pixel.
+    """
+    step = np.empty_like(lines[0])
+    for i in range(1, lines.shape[0]):
+        np.subtract(lines[i - 1], lines[i], out=step)
+        step *= weights[i]
+        lines[i] += step
+    for i in range(lines.shape[0] - 2, -1, -1):
+        np.subtract(lines[i + 1], lines[i], out=step)
+        step *= weights[i + 1]
+        lines[i] += step
+
+
+def domain_transform_smooth(image, quality):
+    iterations = _clamp_quality(quality)
+    image = image.astype(np.float32)
+
+    # Domain transform derivatives: 1 + sigma_s/sigma_r * sum_c |dI/dx|
+    ratio = DT_SIGMA_S / DT_SIGMA_R
+    dx = np.ones(image.shape[:2], dtype=np.float32)
+    dy = np.ones(image.shape[:2], dtype=np.float32)
+    dx[:, 1:] += ratio * np.abs(np.diff(image, axis=1)).sum(axis=2)
+    dy[1:, :] += ratio * np.abs(np.diff(image, axis=0)).sum(axis=2)
+    dx = np.ascontiguousarray(dx.T)
+
+    for i in range(iterations):
+        # Shrinking sigma per iteration so the total variance matches sigma_s
+        sigma_i = (DT_SIGMA_S * np.float32(math.sqrt(3.0)) * np.float32(2.0 ** (iterations - i - 1))
+                   / np.float32(math.sqrt(4.0 ** iterations - 1.0)))
+        log_a = np.float32(-math.sqrt(2.0)) / sigma_i
+
+        # Horizontal: filter the columns of the transposed image, so each step is
+        # one contiguous (rows x channels) array
+        columns = np.ascontiguousarray(image.transpose(1, 0, 2))
+        _recursive_filter(columns, np.exp(dx * log_a)[..., None])
+        image = np.ascontiguousarray(columns.transpose(1, 0, 2))
+
+        # Vertical: each step is one whole row
+        _recursive_filter(image, np.exp(dy * log_a)[..., None])
+
+    return _to_uint8(image)
+
+
+def downsampled_bilateral_smooth(image, quality):
+    scale = 1 << (3 - _clamp_quality(quality))
+    if scale == 1:
+        return bilateral_smooth(image)
+
+    small = cv2.resize(image, (image.shape[1] // scale, image.shape[0] // scale), interpolation=cv2.INTER_AREA)
+
+    # Kernel shrinks with the image so the spatial footprint stays the same
+    diameter = max(3, 9 // scale) | 1
+    small_smoothed = cv2.bilateralFilter(small, diameter, 75, 75 // scale)
+
+    # Joint upsampling against the full-resolution frame restores edges
+    return _guided_filter(image.astype(np.float32), small.astype(np.float32),
+                          small_smoothed.astype(np.float32), 1, 0.001 * 255.0 * 255.0)
+
+
+def edge_preserving_smooth(image, backend, quality):
+    if backend == "bilateral":
+        return bilateral_smooth(image)
+    if backend == "guided":
+        return guided_smooth(image, quality)
+    if backend == "domain_transform":
+        return domain_transform_smooth(image, quality)
+    if backend == "bilateral_downsampled":
+        return downsampled_bilateral_smooth(image, quality)
+    raise ValueError(f"Unknown smoothing backend: {backend}")
+
+
+# ---------------------------------------------------------------------------
+# Oil painting variants (fast_processor.cpp / fast_oil_painting.cpp)
+# ---------------------------------------------------------------------------
+
+def region_oil_painting(image, intensity_levels, smoothing_backend, smoothing_quality, profile=None):
+    with _OpTimer(profile, "smoothing"):
+        smoothed = edge_preserving_smooth(image, smoothing_backend, smoothing_quality)
+    posterized = cv2.LUT(smoothed, _region_lut(intensity_levels))
+
+    # Region boundaries: where the posterized colors change
+    gray = cv2.cvtColor(posterized, cv2.COLOR_BGR2GRAY)
+    grad_x = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3))
+    grad_y = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 0, 1, ksize=3))
+    edges = cv2.addWeighted(grad_x, 0.5, grad_y, 0.5, 0)
+    _, edges = cv2.threshold(edges, 20, 255, cv2.THRESH_BINARY)
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, _RECT_2)
+
+    # Dark outlines on boundaries, lightly blurred fill everywhere else
+    outlined = posterized.copy()
+    outline = edges > 128
+    outlined[outline] = 20
+    blurred = cv2.GaussianBlur(outlined, (5, 5), 1.5)
+    return np.where(outline[..., None], outlined, blurred)
+
+
+def multiscale_oil_painting(image, brush_size, intensity_levels, edge_threshold=30.0):
+    # The fine blur of the native variant never reaches the output, so it's skipped here
+    coarse = cv2.GaussianBlur(image, (brush_size * 2 + 1, brush_size * 2 + 1), 4.0)
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, edge_threshold, edge_threshold * 2)
+    edges = cv2.dilate(edges, _ELLIPSE_3)
+
+    blended = np.where((edges > 0)[..., None], image, coarse)
+    result = cv2.LUT(blended, _posterize_lut(intensity_levels))
+    return cv2.morphologyEx(result, cv2.MORPH_CLOSE, _ELLIPSE_3)
+
+
+def box_oil_painting(image, brush_size, intensity_levels):
+    result = cv2.boxFilter(image, -1, (brush_size, brush_size))
+    result = cv2.LUT(result, _posterize_lut(intensity_levels))
+    return cv2.morphologyEx(result, cv2.MORPH_CLOSE, _ELLIPSE_3)
+
+
+def directional_oil_painting(image, brush_size, intensity_levels):
+    result = cv2.GaussianBlur(image, (brush_size, brush_size), 3.0)
+    return cv2.LUT(result, _posterize_lut(intensity_levels))
+
+
+def apply_oil_variant(image, variant, brush_size, intensity_levels, edge_strength,
+                      smoothing_backend="bilateral", smoothing_quality=2, profile=None):
+    if variant == "region":
+        return region_oil_painting(image, intensity_levels, smoothing_backend, smoothing_quality, profile)
+    if variant == "multiscale":
+        return multiscale_oil_painting(image, brush_size, intensity_levels)
+    if variant == "box":
+        return box_oil_painting(image, brush_size, intensity_levels)
+    if variant == "directional":
+        return directional_oil_painting(image, brush_size, intensity_levels)
+    raise ValueError(f"Unknown engine variant: {variant}")
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+def apply_distortion(image, frame_number, amplitude, frequency, total_frames):
+    """Psychedelic sine distortion, float32 like apply_distortion_cpp."""
+    height, width = image.shape[:2]
+    time = np.float32((frame_number % total_frames) * (2.0 * math.pi / total_frames))
+
+    xs, ys = _grid(height, width)
+    x_dist = np.sin(time + xs[0] * np.float32(frequency / width)) * np.float32(width * amplitude)
+    y_dist = np.sin(time + ys[:, 0] * np.float32(frequency / height)) * np.float32(height * amplitude)
+
+    return cv2.remap(image, xs + x_dist[None, :], ys + y_dist[:, None],
+                     cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def process_frame(
+    input_frame,
+    frame_number,
+    psychedelic_amplitude=0.035,
+    psychedelic_frequency=8.0,
+    psychedelic_total_frames=180,
+    use_stylization=True,
+    stylize_sigma_s=60.0,
+    stylize_sigma_r=0.6,
+    detail_enhance=True,
+    detail_sigma_s=10.0,
+    detail_sigma_r=0.15,
+    bilateral_d=7,
+    bilateral_sigma_color=50,
+    bilateral_sigma_space=50,
+    quantization_levels=16,
+    use_adaptive_threshold=True,
+    edge_blend_factor=0.15,
+    downsample_factor=2,
+    canny_threshold_1=50,
+    canny_threshold_2=150,
+    morph_kernel_size=3,
+    apply_opening=False,
+    apply_closing_iterations=1,
+    edge_blur_amount=5,
+    engine_variant="region",
+    smoothing_backend="bilateral",
+    smoothing_quality=2,
+    state=None,
+    background=None,
+    tiled=False,
+    tile_size=128,
+    profile=None,
+):
+    """
+    Process a single frame with Dali-esque surrealist oil painting effects.
+    Same arguments and output as fast_processor.process_frame.
+    """
+    if input_frame.ndim != 3:
+        raise ValueError("Input should be 3-dimensional (H, W, C)")
+    if engine_variant not in ENGINE_VARIANTS:
+        raise ValueError(f"Unknown engine variant: {engine_variant}")
+    if smoothing_backend not in SMOOTHING_BACKENDS:
+        raise ValueError(f"Unknown smoothing backend: {smoothing_backend}")
+    if state is not None or background is not None:
+        raise ValueError("The Python engine doesn't support incremental state or the background model")
+
+    original_height, original_width = input_frame.shape[:2]
+    # profile=None follows set_profiling
+    profile = {} if (_profiling if profile is None else profile) else None
+    frame_start = time.perf_counter_ns()
+
+    # Process at 1/downsample_factor resolution, like the native engine
+    factor = max(1, int(downsample_factor))
+    with _OpTimer(profile, "downsample"):
+        working_frame = cv2.resize(input_frame, (original_width // factor, original_height // factor),
+                                   interpolation=cv2.INTER_AREA)
+
+    brush_size = max(3, min(15, int(stylize_sigma_s / 6)))
+    if brush_size % 2 == 0:
+        brush_size += 1
+
+    with _OpTimer(profile, "distortion"):
+        distorted = apply_distortion(working_frame, frame_number, psychedelic_amplitude,
+                                     psychedelic_frequency, psychedelic_total_frames)
+    if use_stylization:
+        with _OpTimer(profile, "oil_paint"):
+            distorted = apply_oil_variant(distorted, engine_variant, brush_size, quantization_levels,
+                                          stylize_sigma_r, smoothing_backend, smoothing_quality, profile)
+
+    if detail_enhance:
+        with _OpTimer(profile, "detail_enhance"):
+            distorted = cv2.detailEnhance(distorted, sigma_s=detail_sigma_s, sigma_r=detail_sigma_r)
+
+    with _OpTimer(profile, "grayscale"):
+        gray = cv2.cvtColor(distorted, cv2.COLOR_BGR2GRAY)
+
+    if use_adaptive_threshold:
+        with _OpTimer(profile, "clahe"):
+            gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+
+    with _OpTimer(profile, "quantize"):
+        quantized = cv2.LUT(gray, _quantize_lut(quantization_levels))
+
+    with _OpTimer(profile, "morphology"):
+        kernel = np.ones((morph_kernel_size, morph_kernel_size), np.uint8)
+        if apply_opening:
+            quantized = cv2.morphologyEx(quantized, cv2.MORPH_OPEN, kernel)
+        for _ in range(apply_closing_iterations):
+            quantized = cv2.morphologyEx(quantized, cv2.MORPH_CLOSE, kernel)
+
+    if edge_blend_factor > 0.0:
+        with _OpTimer(profile, "canny"):
+            edges = cv2.Canny(quantized, canny_threshold_1, canny_threshold_2)
+        with _OpTimer(profile, "edge_blur"):
+            edges = cv2.GaussianBlur(edges, (edge_blur_amount, edge_blur_amount), 0)
+        with _OpTimer(profile, "edge_blend"):
+            quantized = cv2.add(quantized, cv2.LUT(edges, _edge_scale_lut(float(edge_blend_factor))))
+
+    with _OpTimer(profile, "upsample"):
+        quantized = cv2.resize(quantized, (original_width, original_height), interpolation=cv2.INTER_NEAREST)
+        output = cv2.cvtColor(quantized, cv2.COLOR_GRAY2BGR)
+
+    if profile is not None:
+        profile["total"] = (time.perf_counter_ns() - frame_start, 1)
+        _commit_profile(profile)
+    return output
+
+
+def oil_paint(input_frame, variant="region", brush_size=9, intensity_levels=16, edge_strength=0.3):
+    """Apply a single oil painting engine variant to a BGR frame."""
+    return apply_oil_variant(input_frame, variant, brush_size, intensity_levels, edge_strength)
+
+
+def smooth(input_frame, backend="bilateral", quality=2):
+    """Apply a single edge-preserving smoothing backend to a BGR frame."""
+    return edge_preserving_smooth(input_frame, backend, quality)
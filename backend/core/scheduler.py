@@ -0,0 +1,140 @@
+"""
+Shared CPU scheduler - one pool of worker threads for every stream's frame
+work (dedup fingerprints, the effect, temporal rebuilds, JPEG writes).
+
+A thread pool per segment would run a live-edge segment next to a backfill -
+or two cameras - as several cpu_count-sized pools on the same cores. Instead
+each stream queues its tasks separately, and a free worker takes the next
+task from whichever stream with queued work has the fewest tasks running
+(ties go round-robin). A stream with a backlog can't starve the others: with
+N busy streams each gets about 1/N of the workers.
+
+executor_for(stream_id) returns a concurrent.futures.Executor for one
+stream, so it drops in where a ThreadPoolExecutor's submit/map was used.
+Tasks must not wait on other tasks in the pool (the processor's don't: a
+segment's thread submits them and collects the results).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future
+
+from backend.core import metrics
+
+CPU_WORKERS = int(os.getenv('CPU_WORKERS', '0')) or min(os.cpu_count() or 1, 8)
+
+
+class FairScheduler:
+    """Fixed worker threads serving per-stream task queues fairly."""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self.queues = OrderedDict()      # Stream id -> deque of (future, fn, args, kwargs), in serving order
+        self.running = {}                # Stream id -> tasks running now
+        self.condition = threading.Condition()
+        self.threads = []
+
+    def _start_workers(self):
+        # Started on first use, so importing the module doesn't spawn threads
+        while len(self.threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"cpu-worker-{len(self.threads)}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, stream_id: str, fn, *args, **kwargs) -> Future:
+        future = Future()
+        with self.condition:
+            self._start_workers()
+            self.queues.setdefault(stream_id, deque()).append((future, fn, args, kwargs))
+            self.condition.notify()
+        return future
+
+    def _next_task(self):
+        """(stream id, task) to run next, or None. Called with the condition held."""
+        waiting = [stream_id for stream_id, queue in self.queues.items() if queue]
+        if not waiting:
+            return None
+        stream_id = min(waiting, key=lambda s: self.running.get(s, 0))
+        self.queues.move_to_end(stream_id)
+        return stream_id, self.queues[stream_id].popleft()
+
+    def _work(self):
+        while True:
+            with self.condition:
+                task = self._next_task()
+                while task is None:
+                    self.condition.wait()
+                    task = self._next_task()
+                stream_id, (future, fn, args, kwargs) = task
+                self.running[stream_id] = self.running.get(stream_id, 0) + 1
+
+            if future.set_running_or_notify_cancel():
+                start = time.perf_counter()
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+                metrics.SCHEDULER_BUSY_SECONDS_TOTAL.inc(time.perf_counter() - start, stream=stream_id)
+            del future, fn, args, kwargs, task  # Don't hold the last result while idle
+
+            with self.condition:
+                self.running[stream_id] -= 1
+                if not self.running[stream_id] and stream_id not in self.queues:
+                    del self.running[stream_id]
+
+    def remove_stream(self, stream_id: str):
+        """Cancels a removed stream's queued tasks (running ones finish)."""
+        with self.condition:
+            queue = self.queues.pop(stream_id, deque())
+            if not self.running.get(stream_id):
+                self.running.pop(stream_id, None)
+        for future, *_ in queue:
+            future.cancel()
+        if queue:
+            print(f"🗑️  Cancelled {len(queue)} queued tasks of stream {stream_id}")
+
+    def queued_tasks(self) -> dict:
+        with self.condition:
+            return {(stream_id,): len(queue) for stream_id, queue in self.queues.items()}
+
+    def snapshot(self) -> dict:
+        with self.condition:
+            return {
+                "workers": self.workers,
+                "streams": {
+                    stream_id: {"queued": len(self.queues.get(stream_id, ())), "running": self.running.get(stream_id, 0)}
+                    for stream_id in {*self.queues, *self.running}
+                },
+            }
+
+
+class StreamExecutor(Executor):
+    """One stream's view of the shared scheduler."""
+
+    def __init__(self, scheduler: FairScheduler, stream_id: str):
+        self.scheduler = scheduler
+        self.stream_id = stream_id
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self.scheduler.submit(self.stream_id, fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        # The workers are shared - leaving a `with` block doesn't stop them
+        pass
+
+
+scheduler = FairScheduler(CPU_WORKERS)
+metrics.SCHEDULER_TASKS_QUEUED.callback = scheduler.queued_tasks
+
+
+def executor_for(stream_id: str) -> StreamExecutor:
+    return StreamExecutor(scheduler, stream_id)
+
+
+def remove_stream(stream_id: str):
+    scheduler.remove_stream(stream_id)
+
+
+def get_scheduler_status() -> dict:
+    return scheduler.snapshot()
@@ -0,0 +1,106 @@
+"""
+Streaming segment input - the HTTP body of a segment, fed chunk by chunk from
+the event loop and read by PyAV on a worker thread, so demuxing and decoding
+start while the rest of the segment is still downloading.
+
+read() blocks until bytes arrive, the download finishes (EOF) or fails. A
+failure is raised from read() as StreamAborted, which PyAV passes through to
+the decoder's caller. Chunks are released as they're read. wait_seconds adds
+up the time read() spent blocked on the network, so the decode stage can be
+timed without it.
+
+With a TSValidator, every chunk is checked before the decoder sees it and the
+end of the body is checked before EOF: a segment that fails is aborted, and
+feed()/finish() raise InvalidSegment to the downloader.
+"""
+import io
+import threading
+import time
+from collections import deque
+
+from backend.core.ts_validation import InvalidSegment
+
+
+class StreamAborted(Exception):
+    """The download feeding a SegmentStream failed or was abandoned."""
+
+
+class SegmentStream(io.RawIOBase):
+    """Non-seekable file-like object for av.open(), fed by the downloader."""
+
+    def __init__(self, validator=None):
+        super().__init__()
+        self._chunks = deque()
+        self._condition = threading.Condition()
+        self._finished = False
+        self._error = None
+        self._error_raised = False
+        self.validator = validator
+        self.received = 0  # Bytes fed so far
+        self.wait_seconds = 0.0  # Time the reader spent blocked waiting for bytes
+        self.rejected = None  # Why the validator rejected the segment
+
+    # -- writer side (event loop) -------------------------------------------
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        self._validate("feed", chunk)
+        with self._condition:
+            self._chunks.append(memoryview(chunk))
+            self.received += len(chunk)
+            self._condition.notify_all()
+
+    def finish(self):
+        """The whole body has been fed - read() returns EOF once it's consumed."""
+        self._validate("finish")
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def abort(self, reason: str):
+        """Fails pending and future reads (the bytes fed so far are dropped)."""
+        with self._condition:
+            if not self._finished:
+                self._error = StreamAborted(reason)
+                self._chunks.clear()
+            self._condition.notify_all()
+
+    def _validate(self, check: str, *args):
+        if self.validator is None:
+            return
+        try:
+            getattr(self.validator, check)(*args)
+        except InvalidSegment as e:
+            self.rejected = e.reason
+            self.abort(f"invalid segment ({e.reason})")
+            raise
+
+    # -- reader side (decoder thread) ---------------------------------------
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        with self._condition:
+            if not self._chunks and not self._finished and self._error is None:
+                start = time.perf_counter()
+                while not self._chunks and not self._finished and self._error is None:
+                    self._condition.wait()
+                self.wait_seconds += time.perf_counter() - start
+            if self._error is not None:
+                if self._error_raised:
+                    return 0  # FFmpeg retries reads - PyAV already holds the error
+                self._error_raised = True
+                raise self._error
+            if not self._chunks:
+                return 0
+
+            chunk = self._chunks[0]
+            size = min(len(buffer), len(chunk))
+            buffer[:size] = chunk[:size]
+            if size == len(chunk):
+                self._chunks.popleft()
+            else:
+                self._chunks[0] = chunk[size:]
+            return size
@@ -0,0 +1,242 @@
+#include "smoothing.h"
+#include <algorithm>
+#include <cmath>
+#include <stdexcept>
+
+/*
+ * EDGE-PRESERVING SMOOTHING BACKENDS
+ *
+ * cv::bilateralFilter(9, 75, 75) dominates the cost of the region effect and
+ * scales with the kernel area. Everything here is O(1) per pixel regardless
+ * of the smoothing radius:
+ *
+ * - guided:               He et al. guided filter (self-guided, per channel),
+ *                         computed at reduced resolution for lower quality levels
+ * - domain_transform:     Gastal & Oliveira recursive filter, 1-3 iterations
+ * - bilateral_downsampled: bilateral at 1/2 or 1/4 resolution, then joint
+ *                         (guided) upsampling against the full-res frame
+ */
+
+const std::vector<std::string> SMOOTHING_BACKENDS = {
+    "bilateral",
+    "guided",
+    "domain_transform",
+    "bilateral_downsampled"
+};
+
+// Parameters matched to bilateralFilter(9, 75, 75) on 0-255 BGR
+static const int GUIDED_RADIUS = 4;
+static const double GUIDED_EPS = 0.05 * 255.0 * 255.0;
+static const float DT_SIGMA_S = 5.0f;
+static const float DT_SIGMA_R = 75.0f;
+
+static int clamp_quality(int quality) {
+    return std::max(1, std::min(3, quality));
+}
+
+// Guided filter coefficients: output = mean(a) * guide + mean(b)
+// guide and src are CV_32FC3, filtered per channel (channels don't mix)
+static void guided_coefficients(const cv::Mat& guide, const cv::Mat& src, int radius, double eps,
+                                cv::Mat& mean_a, cv::Mat& mean_b) {
+    cv::Size ksize(2 * radius + 1, 2 * radius + 1);
+
+    cv::Mat mean_i, mean_p, corr_ii, corr_ip;
+    cv::boxFilter(guide, mean_i, CV_32F, ksize);
+    cv::boxFilter(src, mean_p, CV_32F, ksize);
+    cv::boxFilter(guide.mul(guide), corr_ii, CV_32F, ksize);
+    cv::boxFilter(guide.mul(src), corr_ip, CV_32F, ksize);
+
+    cv::Mat var_i = corr_ii - mean_i.mul(mean_i);
+    cv::Mat cov_ip = corr_ip - mean_i.mul(mean_p);
+
+    cv::Mat a, b;
+    cv::divide(cov_ip, var_i + cv::Scalar::all(eps), a);
+    b = mean_p - a.mul(mean_i);
+
+    cv::boxFilter(a, mean_a, CV_32F, ksize);
+    cv::boxFilter(b, mean_b, CV_32F, ksize);
+}
+
+// Fast guided filter: coefficients at 1/scale resolution, applied at full resolution
+static cv::Mat guided_filter(const cv::Mat& guide_full, const cv::Mat& guide_small, const cv::Mat& src_small,
+                             int radius, double eps) {
+    cv::Mat mean_a, mean_b;
+    guided_coefficients(guide_small, src_small, radius, eps, mean_a, mean_b);
+
+    if (guide_small.size() != guide_full.size()) {
+        cv::resize(mean_a, mean_a, guide_full.size(), 0, 0, cv::INTER_LINEAR);
+        cv::resize(mean_b, mean_b, guide_full.size(), 0, 0, cv::INTER_LINEAR);
+    }
+
+    cv::Mat out_f = mean_a.mul(guide_full) + mean_b;
+    cv::Mat out;
+    out_f.convertTo(out, CV_8UC3);
+    return out;
+}
+
+cv::Mat bilateral_smooth(const cv::Mat& input) {
+    cv::Mat smoothed;
+    cv::bilateralFilter(input, smoothed, 9, 75, 75);
+    return smoothed;
+}
+
+int smoothing_scale(const std::string& backend, int quality) {
+    // quality 3: full resolution, 2: half, 1: quarter
+    if (backend == "guided" || backend == "bilateral_downsampled") {
+        return 1 << (3 - clamp_quality(quality));
+    }
+    return 1;
+}
+
+cv::Mat guided_smooth(const cv::Mat& input, int quality) {
+    int scale = smoothing_scale("guided", quality);
+
+    cv::Mat guide;
+    input.convertTo(guide, CV_32FC3);
+
+    cv::Mat guide_small = guide;
+    if (scale > 1) {
+        cv::resize(guide, guide_small, cv::Size(input.cols / scale, input.rows / scale), 0, 0, cv::INTER_AREA);
+    }
+
+    int radius = std::max(1, GUIDED_RADIUS / scale);
+    return guided_filter(guide, guide_small, guide_small, radius, GUIDED_EPS);
+}
+
+// One recursive filter pass along rows: left-to-right then right-to-left.
+// weights(y, x) is the feedback coefficient between pixel x-1 and x.
+static void recursive_filter_rows(cv::Mat& image, const cv::Mat& weights) {
+    const int channels = image.channels();
+
+    for (int y = 0; y < image.rows; y++) {
+        float* row = image.ptr<float>(y);
+        const float* w = weights.ptr<float>(y);
+
+        for (int x = 1; x < image.cols; x++) {
+            for (int c = 0; c < channels; c++) {
+                float& cur = row[x * channels + c];
+                cur += w[x] * (row[(x - 1) * channels + c] - cur);
+            }
+        }
+        for (int x = image.cols - 2; x >= 0; x--) {
+            for (int c = 0; c < channels; c++) {
+                float& cur = row[x * channels + c];
+                cur += w[x + 1] * (row[(x + 1) * channels + c] - cur);
+            }
+        }
+    }
+}
+
+// Same recursion down the columns, walking whole rows at a time so memory
+// access stays sequential
+static void recursive_filter_cols(cv::Mat& image, const cv::Mat& weights) {
+    const int width = image.cols * image.channels();
+    const int channels = image.channels();
+
+    for (int y = 1; y < image.rows; y++) {
+        float* row = image.ptr<float>(y);
+        const float* prev = image.ptr<float>(y - 1);
+        const float* w = weights.ptr<float>(y);
+        for (int i = 0; i < width; i++) {
+            row[i] += w[i / channels] * (prev[i] - row[i]);
+        }
+    }
+    for (int y = image.rows - 2; y >= 0; y--) {
+        float* row = image.ptr<float>(y);
+        const float* next = image.ptr<float>(y + 1);
+        const float* w = weights.ptr<float>(y + 1);
+        for (int i = 0; i < width; i++) {
+            row[i] += w[i / channels] * (next[i] - row[i]);
+        }
+    }
+}
+
+cv::Mat domain_transform_smooth(const cv::Mat& input, int quality) {
+    // quality = number of horizontal+vertical iterations
+    const int iterations = clamp_quality(quality);
+
+    cv::Mat image;
+    input.convertTo(image, CV_32FC3);
+
+    // Domain transform derivatives: 1 + sigma_s/sigma_r * sum_c |dI/dx|
+    const float ratio = DT_SIGMA_S / DT_SIGMA_R;
+    cv::Mat dx(image.size(), CV_32F, cv::Scalar(1.0f));
+    cv::Mat dy(image.size(), CV_32F, cv::Scalar(1.0f));
+
+    for (int y = 0; y < image.rows; y++) {
+        const cv::Vec3f* row = image.ptr<cv::Vec3f>(y);
+        const cv::Vec3f* prev = y > 0 ? image.ptr<cv::Vec3f>(y - 1) : nullptr;
+        float* dx_row = dx.ptr<float>(y);
+        float* dy_row = dy.ptr<float>(y);
+
+        for (int x = 0; x < image.cols; x++) {
+            if (x > 0) {
+                cv::Vec3f d = row[x] - row[x - 1];
+                dx_row[x] += ratio * (std::abs(d[0]) + std::abs(d[1]) + std::abs(d[2]));
+            }
+            if (prev) {
+                cv::Vec3f d = row[x] - prev[x];
+                dy_row[x] += ratio * (std::abs(d[0]) + std::abs(d[1]) + std::abs(d[2]));
+            }
+        }
+    }
+
+    cv::Mat weights_x, weights_y;
+    for (int i = 0; i < iterations; i++) {
+        // Shrinking sigma per iteration so the total variance matches sigma_s
+        float sigma_i = DT_SIGMA_S * std::sqrt(3.0f) * std::pow(2.0f, iterations - i - 1)
+                        / std::sqrt(std::pow(4.0f, iterations) - 1.0f);
+        float log_a = -std::sqrt(2.0f) / sigma_i;
+
+        // a^d = exp(d * ln a)
+        cv::exp(dx * log_a, weights_x);
+        cv::exp(dy * log_a, weights_y);
+
+        recursive_filter_rows(image, weights_x);
+        recursive_filter_cols(image, weights_y);
+    }
+
+    cv::Mat out;
+    image.convertTo(out, CV_8UC3);
+    return out;
+}
+
+cv::Mat downsampled_bilateral_smooth(const cv::Mat& input, int quality) {
+    int scale = smoothing_scale("bilateral_downsampled", quality);
+    if (scale == 1) {
+        return bilateral_smooth(input);
+    }
+
+    cv::Mat small;
+    cv::resize(input, small, cv::Size(input.cols / scale, input.rows / scale), 0, 0, cv::INTER_AREA);
+
+    // Kernel shrinks with the image so the spatial footprint stays the same
+    int diameter = std::max(3, 9 / scale) | 1;
+    cv::Mat small_smoothed;
+    cv::bilateralFilter(small, small_smoothed, diameter, 75, 75 / scale);
+
+    // Joint upsampling: fit smoothed = a * input locally at low resolution,
+    // then apply the fit against the full-resolution frame to restore edges
+    cv::Mat guide_full, guide_small, src_small;
+    input.convertTo(guide_full, CV_32FC3);
+    small.convertTo(guide_small, CV_32FC3);
+    small_smoothed.convertTo(src_small, CV_32FC3);
+
+    return guided_filter(guide_full, guide_small, src_small, 1, 0.001 * 255.0 * 255.0);
+}
+
+cv::Mat edge_preserving_smooth(const cv::Mat& input, const std::string& backend, int quality) {
+    if (backend == "bilateral") {
+        return bilateral_smooth(input);
+    }
+    if (backend == "guided") {
+        return guided_smooth(input, quality);
+    }
+    if (backend == "domain_transform") {
+        return domain_transform_smooth(input, quality);
+    }
+    if (backend == "bilateral_downsampled") {
+        return downsampled_bilateral_smooth(input, quality);
+    }
+    throw std::invalid_argument("Unknown smoothing backend: " + backend);
+}
@@ -0,0 +1,28 @@
+#pragma once
+
+#include <opencv2/opencv.hpp>
+#include <string>
+#include <vector>
+
+/*
+ * Edge-preserving smoothing backends (implemented in smoothing.cpp).
+ * Drop-in replacements for the per-frame bilateral filter in
+ * fast_oil_painting_effect, selected with the smoothing_backend argument.
+ *
+ * quality: 1 (fastest) .. 3 (closest to the full bilateral filter)
+ */
+
+extern const std::vector<std::string> SMOOTHING_BACKENDS;
+
+// Dispatch by backend name; throws std::invalid_argument for unknown names
+cv::Mat edge_preserving_smooth(const cv::Mat& input, const std::string& backend, int quality);
+
+// Factor a backend downsamples by (1 = full resolution). Its output only
+// matches on a crop whose origin and size are multiples of this.
+int smoothing_scale(const std::string& backend, int quality);
+
+// Individual backends (BGR uint8 in, BGR uint8 out)
+cv::Mat bilateral_smooth(const cv::Mat& input);
+cv::Mat guided_smooth(const cv::Mat& input, int quality);
+cv::Mat domain_transform_smooth(const cv::Mat& input, int quality);
+cv::Mat downsampled_bilateral_smooth(const cv::Mat& input, int quality);
@@ -0,0 +1,222 @@
+"""
+Stream registry - several cameras morphed by one server.
+
+Every stream has its own processor.StreamPipeline, which holds all of the
+pipeline's state - ingest and polling, segment queues, the published
+playlist, the background model - so per stream there is:
+- a source URL and origins, and a StylizationConfig (pipeline.config)
+- data under data/streams/<id>/ (frames, raw, processed, the playlist)
+- playlists at /api/streams/<id>/stream and /api/streams/<id>/raw
+- an ingest loop (pipeline.run) running as its own asyncio task
+
+Shared across streams: the event loop, the engine (engine_loader), the
+/metrics registry (pipeline metrics carry a stream label) and the CPU - frame
+work goes through one scheduler with a queue per stream (see scheduler.py).
+
+The "default" stream follows the admin config and keeps its data directly
+under data/, so /api/stream, /api/admin/config and /api/admin/stream-url keep
+working on it; it can't be removed. Added streams are saved to streams.json and restored at startup.
+"""
+import asyncio
+import json
+import os
+import re
+import shutil
+import time
+from collections import OrderedDict
+
+from backend.core import processor, scheduler
+
+DEFAULT_STREAM = "default"
+STREAMS_PATH = os.path.join(os.path.dirname(__file__), "streams.json")
+STREAMS_DIR = os.path.join(processor.DATA_DIR, "streams")
+STREAM_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,31}$")
+MAX_STREAMS = int(os.getenv('MAX_STREAMS', '8'))
+API_URL = "http://localhost:8000/api"
+
+
+class Stream:
+    """One camera: its pipeline and the task running its ingest loop."""
+
+    def __init__(self, stream_id: str, pipeline: processor.StreamPipeline):
+        self.id = stream_id
+        self.pipeline = pipeline
+        self.task = None
+        self.added = time.time()
+
+    @property
+    def config(self):
+        if self.pipeline.config is None:
+            from backend.api import admin
+            return admin.current_config
+        return self.pipeline.config
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self):
+        if not self.running:
+            self.task = asyncio.create_task(self.pipeline.run())
+            print(f"▶️  Stream {self.id} started ({self.pipeline.base_url})")
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+        print(f"⏹️  Stream {self.id} stopped")
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "url": self.pipeline.base_url,
+            "origins": list(self.pipeline.origins),
+            "running": self.running,
+            "added": self.added,
+            "playlist": f"{API_URL}/streams/{self.id}/stream",
+            "raw_playlist": f"{API_URL}/streams/{self.id}/raw",
+            "published_through": self.pipeline.published_through,
+            "live_edge_lag_s": (round(self.pipeline.last_live_edge_lag, 2)
+                                if self.pipeline.last_live_edge_lag is not None else None),
+        }
+
+
+# Stream id -> Stream, in the order they were added
+streams = OrderedDict()
+streams[DEFAULT_STREAM] = Stream(DEFAULT_STREAM, processor.StreamPipeline(
+    DEFAULT_STREAM, processor.STREAM_BASE_URL, processor.STREAM_ORIGINS))
+started = False                      # Streams added after start() begin ingesting right away
+
+
+def get_stream(stream_id: str) -> Stream | None:
+    return streams.get(stream_id)
+
+
+def add_stream(stream_id: str, url: str, origins: list | None = None, config=None, save: bool = True) -> Stream:
+    """
+    Registers a stream (and starts it, once the registry has started). config
+    defaults to a copy of the admin config. Raises ValueError for an invalid
+    or taken id, or when MAX_STREAMS are registered.
+    """
+    if not STREAM_ID_RE.match(stream_id):
+        raise ValueError("Stream ids are 1-32 lowercase letters, digits, '-' or '_'")
+    if stream_id in streams:
+        raise ValueError(f"Stream {stream_id} already exists")
+    if len(streams) >= MAX_STREAMS:
+        raise ValueError(f"Already running {MAX_STREAMS} streams (MAX_STREAMS)")
+
+    if config is None:
+        from backend.api import admin
+        config = admin.current_config.copy()
+    pipeline = processor.StreamPipeline(
+        stream_id, url, origins, config,
+        data_dir=os.path.join(STREAMS_DIR, stream_id),
+        playlist_segment_url=f"{API_URL}/streams/{stream_id}/segments/{{segment}}.ts",
+    )
+
+    stream = Stream(stream_id, pipeline)
+    streams[stream_id] = stream
+    if save:
+        save_streams()
+    print(f"➕ Stream {stream_id} added ({url})")
+    if started:
+        stream.start()
+    return stream
+
+
+async def remove_stream(stream_id: str):
+    """
+    Stops a stream, cancels its queued frame work and deletes its data once
+    the segments it was processing have stopped.
+    """
+    if stream_id == DEFAULT_STREAM:
+        raise ValueError("The default stream can't be removed")
+    stream = streams.pop(stream_id)
+    save_streams()
+    # Segment threads stop at their next check instead of writing into data_dir
+    stream.pipeline.close()
+    await stream.stop()
+    scheduler.remove_stream(stream_id)
+    await stream.pipeline.wait_idle()
+    await asyncio.to_thread(shutil.rmtree, stream.pipeline.data_dir, True)
+    print(f"➖ Stream {stream_id} removed")
+
+
+def set_stream_url(stream_id: str, url: str, origins: list | None = None):
+    """Points a stream at another source, starting its ingest over."""
+    pipeline = streams[stream_id].pipeline
+    pipeline.base_url = url
+    if origins is not None:
+        pipeline.origins = origins
+    # The cached background belongs to the old camera
+    pipeline.reset_background_model()
+    # ...and so does its media sequence numbering
+    pipeline.reset_ingest()
+    if stream_id != DEFAULT_STREAM:
+        save_streams()
+
+
+def set_stream_config(stream_id: str, config):
+    """Replaces an added stream's config; it takes effect at the next segment."""
+    streams[stream_id].pipeline.config = config
+    save_streams()
+
+
+def save_streams():
+    """Writes the added streams (not the default one) to STREAMS_PATH."""
+    entries = [
+        {"id": stream.id, "url": stream.pipeline.base_url, "origins": stream.pipeline.origins,
+         "config": stream.pipeline.config.dict()}
+        for stream in streams.values() if stream.id != DEFAULT_STREAM
+    ]
+    try:
+        with open(STREAMS_PATH, 'w') as f:
+            json.dump(entries, f, indent=2)
+    except Exception as e:
+        print(f"⚠️  Failed to save streams: {e}")
+
+
+def load_streams():
+    """Re-adds the streams saved in STREAMS_PATH."""
+    if not os.path.exists(STREAMS_PATH):
+        return
+    from backend.api import admin
+    try:
+        with open(STREAMS_PATH, 'r') as f:
+            entries = json.load(f)
+    except Exception as e:
+        print(f"⚠️  Failed to load streams: {e}")
+        return
+    for entry in entries:
+        if entry.get("id") in streams:
+            continue
+        try:
+            add_stream(entry["id"], entry["url"], entry.get("origins"),
+                       admin.StylizationConfig(**entry.get("config", {})), save=False)
+        except Exception as e:
+            print(f"⚠️  Failed to restore stream {entry.get('id')}: {e}")
+
+
+def start():
+    """Restores the saved streams and starts every stream's ingest loop."""
+    global started
+    load_streams()
+    started = True
+    for stream in streams.values():
+        stream.start()
+
+
+async def stop():
+    global started
+    started = False
+    await asyncio.gather(*(stream.stop() for stream in streams.values()))
+
+
+def get_streams_status() -> dict:
+    return {
+        "streams": [stream.snapshot() for stream in streams.values()],
+        "max_streams": MAX_STREAMS,
+        "scheduler": scheduler.get_scheduler_status(),
+    }
@@ -0,0 +1,128 @@
+"""
+Temporal subsampling - only every Nth frame runs the full effect.
+Skipped frames are rebuilt in memory from the processed keyframes:
+
+- hold:  repeat the last processed keyframe
+- blend: cross-fade between the surrounding keyframes
+- flow:  warp the last keyframe's output along the optical flow (DIS on
+         downsampled gray) from the keyframe input to the current input
+"""
+import threading
+
+import cv2
+import numpy as np
+
+TEMPORAL_MODES = ("hold", "blend", "flow")
+
+# Optical flow runs on gray frames downsampled by this factor
+FLOW_SCALE = 4
+
+# DIS instances aren't thread-safe - one per worker thread
+_thread_state = threading.local()
+
+# Pixel grids for remap, cached per (height, width)
+_grid_cache = {}
+_grid_lock = threading.Lock()
+
+
+def _get_dis():
+    dis = getattr(_thread_state, "dis", None)
+    if dis is None:
+        dis = cv2.DISOpticalFlow_create(cv2.DISOPTICAL_FLOW_PRESET_ULTRAFAST)
+        _thread_state.dis = dis
+    return dis
+
+
+def _get_grid(height: int, width: int):
+    key = (height, width)
+    grid = _grid_cache.get(key)
+    if grid is None:
+        with _grid_lock:
+            grid = _grid_cache.get(key)
+            if grid is None:
+                ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+                grid = (xs, ys)
+                _grid_cache[key] = grid
+    return grid
+
+
+def _small_gray(frame):
+    height, width = frame.shape[:2]
+    small = cv2.resize(frame, (width // FLOW_SCALE, height // FLOW_SCALE), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+def warp_with_flow(key_input, current_input, key_output):
+    """
+    Moves the keyframe's processed output to where the scene is in the current
+    frame. Flow is computed backwards (current -> keyframe) so every output
+    pixel knows where to sample from.
+    """
+    flow = _get_dis().calc(_small_gray(current_input), _small_gray(key_input), None)
+
+    # Back to output resolution, with vectors scaled from small-frame pixels
+    height, width = key_output.shape[:2]
+    small_height, small_width = flow.shape[:2]
+    flow = cv2.resize(flow, (width, height), interpolation=cv2.INTER_LINEAR)
+    flow[..., 0] *= width / small_width
+    flow[..., 1] *= height / small_height
+
+    xs, ys = _get_grid(height, width)
+    return cv2.remap(key_output, xs + flow[..., 0], ys + flow[..., 1],
+                     cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def reconstruct_frame(index, frames, outputs, every_nth, mode):
+    """
+    Rebuilds a skipped frame from the processed keyframes around it.
+    """
+    prev_key = (index // every_nth) * every_nth
+    prev_output = outputs[prev_key]
+    if prev_output is None:
+        return None
+
+    if mode == "blend":
+        next_key = prev_key + every_nth
+        if next_key < len(outputs) and outputs[next_key] is not None:
+            t = (index - prev_key) / every_nth
+            return cv2.addWeighted(prev_output, 1.0 - t, outputs[next_key], t, 0)
+        return prev_output
+
+    if mode == "flow":
+        return warp_with_flow(frames[prev_key], frames[index], prev_output)
+
+    return prev_output
+
+
+def render_segment(frames, render, every_nth, mode, executor, sequential=False):
+    """
+    Renders a segment with temporal subsampling.
+
+    frames: decoded BGR frames (kept for flow estimation)
+    render: callable(index) -> processed frame, runs the full effect
+    every_nth: run the full effect on every Nth frame (1 = all frames)
+    mode: how skipped frames are rebuilt (hold | blend | flow)
+    executor: thread pool shared with the rest of the segment
+    sequential: render keyframes in order on the calling thread (required
+        when render carries frame-to-frame state, e.g. incremental tiles)
+
+    Returns (outputs, keyframe_count).
+    """
+    if mode not in TEMPORAL_MODES:
+        raise ValueError(f"Unknown temporal mode: {mode}")
+
+    every_nth = max(1, int(every_nth))
+    outputs = [None] * len(frames)
+
+    keyframes = list(range(0, len(frames), every_nth))
+    rendered = map(render, keyframes) if sequential else executor.map(render, keyframes)
+    for index, output in zip(keyframes, rendered):
+        outputs[index] = output
+
+    if every_nth > 1:
+        skipped = [i for i in range(len(frames)) if i % every_nth != 0]
+        rebuilt = executor.map(lambda i: reconstruct_frame(i, frames, outputs, every_nth, mode), skipped)
+        for index, output in zip(skipped, rebuilt):
+            outputs[index] = output
+
+    return outputs, len(keyframes)
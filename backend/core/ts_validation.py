@@ -0,0 +1,192 @@
+"""
+MPEG-TS integrity check for downloaded segments. Runs on the bytes as they
+arrive (see SegmentStream), so a truncated or corrupt segment is rejected
+before the effect runs on any of its frames.
+
+Reads 188-byte packet headers only, no decoding:
+- sync:      every packet starts with 0x47
+- truncated: the body ends partway through a packet
+- no_pat:    no Program Association Table (PID 0) in the first packets
+- no_pmt:    no Program Map Table for the program the PAT lists
+- no_video:  the PMT lists no video stream
+- short:     the video PTS span is under MIN_DURATION_RATIO of the
+             playlist's EXTINF for the segment
+"""
+import numpy as np
+
+PACKET_SIZE = 188
+SYNC_BYTE = 0x47
+PSI_DEADLINE_PACKETS = 400           # PAT/PMT repeat every ~100 ms, 400 packets is ~75 KB
+MIN_DURATION_RATIO = 0.75
+PTS_HZ = 90000
+# MPEG-1/2 video, MPEG-4 part 2, H.264, HEVC
+VIDEO_STREAM_TYPES = {0x01, 0x02, 0x10, 0x1B, 0x24}
+
+
+class InvalidSegment(Exception):
+    """A segment failed the integrity check."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def packet_payload(packet) -> bytes | None:
+    """The payload of one TS packet (after any adaptation field), or None."""
+    control = (packet[3] >> 4) & 0x3
+    if not control & 0x1:
+        return None
+    offset = 4
+    if control & 0x2:
+        offset += 1 + int(packet[4])
+    if offset >= PACKET_SIZE:
+        return None
+    return bytes(packet[offset:])
+
+
+def psi_section(packet) -> bytes | None:
+    """The table section starting in a packet (skipping the pointer field)."""
+    payload = packet_payload(packet)
+    if not payload:
+        return None
+    start = 1 + payload[0]
+    if start + 3 > len(payload):
+        return None
+    section = payload[start:]
+    length = ((section[1] & 0x0F) << 8) | section[2]
+    return section[:3 + length]
+
+
+def parse_pat(section: bytes) -> int | None:
+    """PID of the first program's PMT."""
+    if section[0] != 0x00:
+        return None
+    # Program entries from byte 8 to the CRC
+    for offset in range(8, len(section) - 4 - 3, 4):
+        program = (section[offset] << 8) | section[offset + 1]
+        if program != 0:  # 0 is the network PID
+            return ((section[offset + 2] & 0x1F) << 8) | section[offset + 3]
+    return None
+
+
+def parse_pmt(section: bytes) -> int | None:
+    """PID of the program's first video stream (-1 if it lists none)."""
+    if section[0] != 0x02 or len(section) < 12:
+        return None
+    offset = 12 + (((section[10] & 0x0F) << 8) | section[11])
+    while offset + 5 <= len(section) - 4:
+        stream_type = section[offset]
+        pid = ((section[offset + 1] & 0x1F) << 8) | section[offset + 2]
+        if stream_type in VIDEO_STREAM_TYPES:
+            return pid
+        offset += 5 + (((section[offset + 3] & 0x0F) << 8) | section[offset + 4])
+    return -1
+
+
+def pes_pts(packet) -> int | None:
+    """Presentation timestamp of the PES packet starting in a TS packet."""
+    payload = packet_payload(packet)
+    if not payload or len(payload) < 14 or payload[:3] != b"\x00\x00\x01" or not payload[7] & 0x80:
+        return None
+    p = payload[9:14]
+    return (((p[0] >> 1) & 0x7) << 30) | (p[1] << 22) | ((p[2] >> 1) << 15) | (p[3] << 7) | (p[4] >> 1)
+
+
+class TSValidator:
+    """
+    Incremental check: feed() each chunk as it arrives, finish() at the end of
+    the body. Both raise InvalidSegment; after a failure every call does.
+    """
+
+    def __init__(self, expected_duration: float | None = None):
+        self.expected_duration = expected_duration
+        self.remainder = b""         # Partial packet carried into the next chunk
+        self.packets = 0
+        self.pmt_pid = None
+        self.video_pid = None
+        self.frames = 0              # Video PES packets with a PTS
+        self.min_pts = None
+        self.max_pts = None
+        self.reason = None
+
+    def _reject(self, reason: str):
+        self.reason = reason
+        raise InvalidSegment(reason)
+
+    def feed(self, chunk: bytes):
+        if self.reason is not None:
+            raise InvalidSegment(self.reason)
+        data = self.remainder + bytes(chunk) if self.remainder else bytes(chunk)
+        count = len(data) // PACKET_SIZE
+        self.remainder = data[count * PACKET_SIZE:]
+        if count:
+            packets = np.frombuffer(data, dtype=np.uint8, count=count * PACKET_SIZE).reshape(count, PACKET_SIZE)
+            self._check_packets(packets)
+            self.packets += count
+        if self.packets >= PSI_DEADLINE_PACKETS:
+            self._require_tables()
+
+    def _check_packets(self, packets):
+        if not (packets[:, 0] == SYNC_BYTE).all():
+            self._reject("sync")
+        pids = ((packets[:, 1].astype(np.uint16) & 0x1F) << 8) | packets[:, 2]
+        # Tables and PES headers only start in packets with payload_unit_start_indicator
+        for index in np.flatnonzero(packets[:, 1] & 0x40):
+            pid = int(pids[index])
+            if pid == 0 and self.pmt_pid is None:
+                section = psi_section(packets[index])
+                self.pmt_pid = parse_pat(section) if section else None
+            elif pid == self.pmt_pid and self.video_pid is None:
+                section = psi_section(packets[index])
+                self.video_pid = parse_pmt(section) if section else None
+                if self.video_pid == -1:
+                    self._reject("no_video")
+            elif pid == self.video_pid:
+                pts = pes_pts(packets[index])
+                if pts is not None:
+                    self.frames += 1
+                    self.min_pts = pts if self.min_pts is None else min(self.min_pts, pts)
+                    self.max_pts = pts if self.max_pts is None else max(self.max_pts, pts)
+
+    def _require_tables(self):
+        if self.pmt_pid is None:
+            self._reject("no_pat")
+        if self.video_pid is None:
+            self._reject("no_pmt")
+
+    def finish(self):
+        if self.reason is not None:
+            raise InvalidSegment(self.reason)
+        if self.remainder:
+            self._reject("truncated")
+        self._require_tables()
+        if self.expected_duration:
+            self._check_duration()
+
+    def _check_duration(self):
+        if self.frames < 2:
+            self._reject("short")
+        span = self.max_pts - self.min_pts
+        if span > 2 ** 32:
+            return  # The 33-bit PTS wrapped inside this segment
+        # Add one frame interval: the span runs from the first frame's start to the last one's
+        duration = span / PTS_HZ * self.frames / (self.frames - 1)
+        if duration < self.expected_duration * MIN_DURATION_RATIO:
+            self._reject("short")
+
+    def duration(self) -> float | None:
+        """Video duration seen so far, from the PTS span."""
+        if self.frames < 2:
+            return None
+        return (self.max_pts - self.min_pts) / PTS_HZ * self.frames / (self.frames - 1)
+
+
+def validate_segment(content: bytes, expected_duration: float | None = None) -> str | None:
+    """Checks a complete segment. Returns the reason it's invalid, or None."""
+    validator = TSValidator(expected_duration)
+    try:
+        validator.feed(content)
+        validator.finish()
+    except InvalidSegment as e:
+        return e.reason
+    return None
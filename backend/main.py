@@ -1,36 +1,33 @@
 """
 Main FastAPI application entry point.
 Serves both the stream API and admin API.
-Starts the background stream processor.
+Starts the background stream processors (one per registered stream).
 """
-import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.api import stream, admin
-from backend.core.processor import stream_processor
+from backend.core import metrics, streams
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifecycle manager for the FastAPI app.
-    Starts the stream processor on startup, stops it on shutdown.
+    Starts the stream processors on startup, stops them on shutdown.
     """
-    # Startup: Start the background processor
-    processor_task = asyncio.create_task(stream_processor())
-    print("✅ Stream processor started in background")
+    # Startup: Start the default stream and any streams added at runtime before
+    streams.start()
+    print(f"✅ {len(streams.streams)} stream processor(s) started in background")
 
     yield
 
-    # Shutdown: Cancel the processor
-    processor_task.cancel()
-    try:
-        await processor_task
-    except asyncio.CancelledError:
-        print("✅ Stream processor stopped")
+    # Shutdown: Cancel the processors
+    await streams.stop()
+    print("✅ Stream processors stopped")
 
 
 app = FastAPI(
@@ -58,6 +55,12 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Pipeline latency histograms and counters in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API info"""
@@ -67,9 +70,12 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "stream": "/api/stream",
+            "streams": "/api/streams/{id}/stream",
+            "admin_streams": "/api/admin/streams",
             "admin_config": "/api/admin/config",
             "admin_status": "/api/admin/status",
-            "health": "/health"
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
 
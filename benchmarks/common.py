@@ -0,0 +1,158 @@
+"""
+Shared helpers for the benchmark scripts.
+Frame loading, timing statistics and image similarity metrics.
+"""
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+RESULTS_DIR = os.path.join(DATA_DIR, "benchmarks")
+
+
+def synthetic_frame(width=1920, height=1080, seed=0):
+    """
+    Deterministic street-like test frame: sky gradient, blocky buildings and a
+    few high-contrast shapes. Much closer to real footage than random noise,
+    which makes every edge-preserving filter look equally bad.
+    """
+    rng = np.random.default_rng(seed)
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+
+    # Sky gradient
+    sky = np.linspace(230, 120, height // 2, dtype=np.float32)
+    frame[:height // 2] = sky[:, None, None].astype(np.uint8)
+
+    # Road
+    frame[height // 2:] = (70, 72, 75)
+
+    # Buildings
+    for _ in range(12):
+        x0 = int(rng.integers(0, width - 100))
+        w = int(rng.integers(80, 300))
+        top = int(rng.integers(height // 8, height // 2))
+        color = tuple(int(c) for c in rng.integers(40, 200, 3))
+        cv2.rectangle(frame, (x0, top), (x0 + w, height // 2), color, -1)
+
+    # Crossing stripes
+    for i in range(8):
+        x = i * width // 8
+        cv2.rectangle(frame, (x, int(height * 0.7)), (x + width // 16, int(height * 0.8)), (235, 235, 235), -1)
+
+    # Light sensor noise
+    noise = rng.normal(0, 4, frame.shape).astype(np.int16)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def load_frames(source=None, limit=30):
+    """
+    Loads BGR frames for benchmarking.
+
+    source: a .ts/.mp4 file, a directory of .jpg/.png frames, or None to use the
+    first raw segment in data/raw (falling back to synthetic frames).
+    """
+    if source is None:
+        raw_segments = sorted(glob.glob(os.path.join(DATA_DIR, "raw", "*.ts")))
+        source = raw_segments[0] if raw_segments else None
+
+    if source is None:
+        return [synthetic_frame(seed=i) for i in range(min(limit, 5))], "synthetic"
+
+    if os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, "*.jpg")) + glob.glob(os.path.join(source, "*.png")))
+        return [cv2.imread(p) for p in paths[:limit]], source
+
+    import av
+    frames = []
+    with av.open(source) as container:
+        for frame in container.decode(container.streams.video[0]):
+            frames.append(frame.to_ndarray(format='bgr24'))
+            if len(frames) >= limit:
+                break
+    return frames, source
+
+
+def time_call(fn, *args, **kwargs):
+    """Returns (result, elapsed milliseconds)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def summarize_ms(samples):
+    """p50/p95/mean/min/max of a list of millisecond timings."""
+    arr = np.asarray(samples, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "mean": round(float(arr.mean()), 3),
+        "min": round(float(arr.min()), 3),
+        "max": round(float(arr.max()), 3),
+        "samples": int(arr.size),
+    }
+
+
+def _to_gray_float(image):
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image.astype(np.float32)
+
+
+def ssim(a, b):
+    """
+    Structural similarity (Wang et al. 2004) on luma with an 11x11 Gaussian window.
+    1.0 means identical structure.
+    """
+    if a.shape[:2] != b.shape[:2]:
+        b = cv2.resize(b, (a.shape[1], a.shape[0]), interpolation=cv2.INTER_AREA)
+
+    x = _to_gray_float(a)
+    y = _to_gray_float(b)
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+
+    mu_x = cv2.GaussianBlur(x, (11, 11), 1.5)
+    mu_y = cv2.GaussianBlur(y, (11, 11), 1.5)
+    sigma_x = cv2.GaussianBlur(x * x, (11, 11), 1.5) - mu_x * mu_x
+    sigma_y = cv2.GaussianBlur(y * y, (11, 11), 1.5) - mu_y * mu_y
+    sigma_xy = cv2.GaussianBlur(x * y, (11, 11), 1.5) - mu_x * mu_y
+
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * sigma_xy + c2)) / (
+        (mu_x * mu_x + mu_y * mu_y + c1) * (sigma_x + sigma_y + c2)
+    )
+    return float(ssim_map.mean())
+
+
+def psnr(a, b):
+    """Peak signal-to-noise ratio in dB (inf for identical images)."""
+    if a.shape != b.shape:
+        b = cv2.resize(b, (a.shape[1], a.shape[0]), interpolation=cv2.INTER_AREA)
+    mse = float(np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2))
+    if mse == 0:
+        return float("inf")
+    return 10.0 * np.log10(255.0 ** 2 / mse)
+
+
+def write_results(name, results):
+    """Writes a JSON report to data/benchmarks/<name>.json and returns the path."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{name}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def markdown_table(headers, rows):
+    """Formats rows as a GitHub-flavored markdown table."""
+    lines = [
+        "| " + " | ".join(headers) + " |",
+        "|" + "|".join("---" for _ in headers) + "|",
+    ]
+    for row in rows:
+        lines.append("| " + " | ".join(str(cell) for cell in row) + " |")
+    return "\n".join(lines)
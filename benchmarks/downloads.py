@@ -0,0 +1,110 @@
+"""
+Segment download tail latency against the local origin emulator, with and
+without hedged requests.
+
+Each mode gets a fresh origin with the same seed and fault rates (slow
+responses and 404s by default), then downloads the live-edge segment
+--downloads times in a row through StreamPipeline.download_segment. Reports
+p50/p95/p99/max download time, how often a hedge went out and which request
+won, and retries.
+
+Usage:
+    python -m benchmarks.downloads [--downloads 200] [--slow 0.05]
+        [--slow-seconds 3.0] [--p404 0.02] [--seed 0] [--source data/raw]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.common import markdown_table, summarize_ms, write_results
+from benchmarks.origin import Origin, serve, source_segments
+
+
+async def run_downloads(pipeline, origin, count):
+    """Downloads the current live-edge segment count times; returns per-download ms (None = failed)."""
+    times = []
+    async with httpx.AsyncClient() as client:
+        for _ in range(count):
+            segment_id = str(origin.live_sequences()[-1])
+            start = time.perf_counter()
+            content = await pipeline.download_segment(client, segment_id)
+            times.append((time.perf_counter() - start) * 1000.0 if content else None)
+    return times
+
+
+def run_mode(processor, metrics, paths, args, hedging, port):
+    origin = Origin(paths, window=3, p404=args.p404, slow=args.slow, slow_seconds=args.slow_seconds,
+                    seed=args.seed)
+    # Start a loop in, so the playlist window is already full
+    origin.started -= sum(origin.durations)
+    server = serve(origin, port=port)
+    pipeline = processor.StreamPipeline("downloads", f"http://127.0.0.1:{port}/fecnetwork/AbbeyRoadHD1.flv/chunklist_w")
+    processor.HEDGING_ENABLED = hedging
+    hedges_before = metrics.HEDGED_DOWNLOADS_TOTAL.snapshot(stream=pipeline.id)
+    retries_before = metrics.RETRIES_TOTAL.snapshot(stream=pipeline.id).get("download", 0)
+
+    try:
+        # The processor logs every attempt - keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            times = asyncio.run(run_downloads(pipeline, origin, args.downloads))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    hedges = {
+        winner: count - hedges_before.get(winner, 0)
+        for winner, count in metrics.HEDGED_DOWNLOADS_TOTAL.snapshot(stream=pipeline.id).items()
+    }
+    succeeded = [t for t in times if t is not None]
+    summary = summarize_ms(succeeded)
+    summary["p99"] = round(float(np.percentile(succeeded, 99)), 3)
+    return {
+        "download_ms": summary,
+        "failed": len(times) - len(succeeded),
+        "hedged": {winner: count for winner, count in hedges.items() if count},
+        "retries": metrics.RETRIES_TOTAL.snapshot(stream=pipeline.id).get("download", 0) - retries_before,
+        "origin": dict(origin.stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--downloads", type=int, default=200)
+    parser.add_argument("--slow", type=float, default=0.05, help="Probability a request is delayed")
+    parser.add_argument("--slow-seconds", type=float, default=3.0)
+    parser.add_argument("--p404", type=float, default=0.02, help="Probability a segment request gets a 404")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", help="Directory of .ts segments (default: data/raw or synthetic fixtures)")
+    parser.add_argument("--port", type=int, default=8091)
+    args = parser.parse_args()
+
+    paths, source = source_segments(args.source)
+    from backend.core import metrics, processor
+
+    print(f"📥 {args.downloads} downloads per mode from {source} "
+          f"(slow {args.slow:.0%} x {args.slow_seconds}s, 404 {args.p404:.0%})...")
+    results = {"downloads": args.downloads, "slow": args.slow, "slow_seconds": args.slow_seconds,
+               "p404": args.p404, "seed": args.seed, "modes": {}}
+    for mode, hedging in (("single", False), ("hedged", True)):
+        results["modes"][mode] = run_mode(processor, metrics, paths, args, hedging, args.port)
+
+    rows = []
+    for mode, result in results["modes"].items():
+        ms = result["download_ms"]
+        hedged = ", ".join(f"{winner} {count}" for winner, count in result["hedged"].items()) or "-"
+        rows.append([mode, ms["p50"], ms["p95"], ms["p99"], ms["max"], hedged, result["retries"], result["failed"]])
+    print()
+    print(markdown_table(["mode", "p50 ms", "p95 ms", "p99 ms", "max ms", "hedges (winner)", "retries", "failed"],
+                         rows))
+
+    path = write_results("downloads", results)
+    print(f"\n💾 Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+End-to-end segment benchmark: the reference for performance work on
+backend/core/processor.py.
+
+Generates deterministic H.264 .ts fixtures (see benchmarks/fixtures.py), serves
+them through a stubbed network (httpx.MockTransport answering the EarthCam
+chunklist/media URLs) and runs the real pipeline - fetch → download →
+process_segment_sync (decode, effect, encode) → playlist - for a series of
+segments, exactly as the live loop does.
+
+Reports per stage wall time, CPU time (all threads, plus the ffmpeg encoder
+subprocess) and RSS, overall peak RSS, and the sustained segments/minute
+(the live stream needs 10/min for 6 s segments). Only segments the playlist
+actually published count (livestream_segments_total{outcome="published"});
+failures are reported by outcome, and the run exits non-zero unless every
+segment was published. Engine profiling is on, so the report also breaks
+the per-frame effect down by engine operation.
+
+Usage:
+    python -m benchmarks.e2e [--segments 9] [--motion static low high]
+        [--seconds 6] [--fps 30] [--width 1920] [--height 1080]
+        [--concurrency 1] [--engine inplace] [--config '{"process_every_nth_frame": 2}']
+        [--no-profile]
+
+Work happens in a temporary data directory; data/raw, data/processed and the
+playlist of a running server are never touched.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import resource
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from functools import wraps
+
+import httpx
+
+from benchmarks.common import markdown_table, summarize_ms, write_results
+from benchmarks.fixtures import MOTION_LEVELS, make_fixtures
+
+FIRST_SEGMENT_ID = 1000
+
+
+def rss_mb():
+    """Current resident set size (Linux /proc, falls back to the peak)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class StageTimer:
+    """
+    Wraps pipeline functions to record wall time, CPU time and RSS per call.
+    CPU time is process-wide (every thread) plus finished child processes, so
+    with --concurrency > 1 overlapping stages share their CPU samples.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(lambda: {"wall_ms": [], "cpu_ms": [], "rss_mb": []})
+
+    def _record(self, stage, start):
+        wall, cpu, children = start
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        sample = self.samples[stage]
+        sample["wall_ms"].append((time.perf_counter() - wall) * 1000.0)
+        sample["cpu_ms"].append((time.process_time() - cpu + usage.ru_utime + usage.ru_stime - children) * 1000.0)
+        sample["rss_mb"].append(rss_mb())
+
+    @staticmethod
+    def _start():
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return time.perf_counter(), time.process_time(), usage.ru_utime + usage.ru_stime
+
+    def wrap(self, target, name, stage=None):
+        fn = getattr(target, name)
+        stage = stage or name
+
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def timed(*args, **kwargs):
+                start = self._start()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self._record(stage, start)
+        else:
+            @wraps(fn)
+            def timed(*args, **kwargs):
+                start = self._start()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self._record(stage, start)
+
+        setattr(target, name, timed)
+
+    def summary(self):
+        return {
+            stage: {
+                "wall_ms": summarize_ms(sample["wall_ms"]),
+                "cpu_ms": summarize_ms(sample["cpu_ms"]),
+                "rss_mb_max": max(sample["rss_mb"]),
+            }
+            for stage, sample in self.samples.items()
+        }
+
+
+class FakeOrigin:
+    """
+    Stubbed stream origin: the chunklist always lists the next segment, media
+    requests return the fixture bytes for that segment id.
+    """
+
+    def __init__(self, fixture_bytes, seconds):
+        self.fixture_bytes = fixture_bytes  # one entry per segment, in order
+        self.seconds = seconds              # Fixture segment length, listed as each segment's EXTINF
+        self.next_index = 0
+        self.requests = 0
+
+    def segment_id(self, index):
+        return str(FIRST_SEGMENT_ID + index)
+
+    def advance(self):
+        self.next_index += 1
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        path = request.url.path
+        if "/chunklist_w" in path:
+            index = min(self.next_index, len(self.fixture_bytes) - 1)
+            segment_id = self.segment_id(index)
+            body = (
+                f"#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:{math.ceil(self.seconds)}\n"
+                f"#EXT-X-MEDIA-SEQUENCE:{segment_id}\n"
+                f"#EXTINF:{self.seconds:.1f},\nmedia_w0_{segment_id}.ts\n"
+            )
+            return httpx.Response(200, text=body)
+
+        match = re.search(r"/media_w\d+_(\d+)\.ts$", path)
+        if match:
+            index = int(match.group(1)) - FIRST_SEGMENT_ID
+            if 0 <= index < len(self.fixture_bytes):
+                return httpx.Response(200, content=self.fixture_bytes[index])
+        return httpx.Response(404)
+
+
+async def run_segments(pipeline, origin, count, concurrency):
+    """
+    Runs count segments through fetch_new_segments + process_pipeline, keeping
+    at most `concurrency` pipelines in flight. Returns per-segment wall times.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    segment_times = {}
+
+    async def run_pipeline(client, segment_id):
+        start = time.perf_counter()
+        try:
+            await pipeline.process_pipeline(client, segment_id)
+        finally:
+            segment_times[segment_id] = (time.perf_counter() - start) * 1000.0
+            semaphore.release()
+
+    transport = httpx.MockTransport(origin.handler)
+    async with httpx.AsyncClient(transport=transport) as client:
+        tasks = []
+        for _ in range(count):
+            await semaphore.acquire()
+            segment_ids = await pipeline.fetch_new_segments(client)
+            origin.advance()
+            if not segment_ids:
+                semaphore.release()
+                continue
+            # The chunklist lists one segment, so there's never a backfill
+            tasks.append(asyncio.create_task(run_pipeline(client, segment_ids[-1])))
+        await asyncio.gather(*tasks)
+    return segment_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=9, help="Segments to run (cycles through the motion levels)")
+    parser.add_argument("--motion", nargs="+", default=list(MOTION_LEVELS), choices=list(MOTION_LEVELS))
+    parser.add_argument("--seconds", type=int, default=6)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--concurrency", type=int, default=1, help="Segment pipelines in flight at once")
+    parser.add_argument("--engine", help="Engine version to use (default: the loader's active engine)")
+    parser.add_argument("--config", default="{}", help="JSON overrides for the stylization config")
+    parser.add_argument("--no-profile", action="store_true", help="Don't time engine operations")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch data directory")
+    args = parser.parse_args()
+
+    print(f"🎞️  Preparing fixtures ({', '.join(args.motion)}, {args.seconds}s {args.width}x{args.height}@{args.fps})...")
+    fixtures = make_fixtures(args.motion, seconds=args.seconds, fps=args.fps, width=args.width, height=args.height)
+    fixture_bytes = {}
+    for motion, path in fixtures.items():
+        with open(path, "rb") as f:
+            fixture_bytes[motion] = f.read()
+    plan = [args.motion[i % len(args.motion)] for i in range(args.segments)]
+
+    from backend.api import admin
+    from backend.core import engine_loader, metrics, processor
+
+    overrides = {"profile_engine": not args.no_profile, **json.loads(args.config)}
+    admin.current_config = admin.StylizationConfig(**{**admin.current_config.dict(), **overrides})
+    if args.engine:
+        engine_loader.activate(args.engine)
+
+    data_dir = tempfile.mkdtemp(prefix="e2e-")
+    pipeline = processor.StreamPipeline("e2e", data_dir=data_dir)
+
+    timer = StageTimer()
+    timer.wrap(pipeline, "fetch_new_segments", "fetch")
+    timer.wrap(pipeline, "download_segment", "download")
+    timer.wrap(pipeline, "process_segment_sync", "process")
+    timer.wrap(pipeline, "generate_m3u8_playlist", "playlist")
+    timer.wrap(pipeline, "cleanup_old_segments", "cleanup")
+
+    origin = FakeOrigin([fixture_bytes[motion] for motion in plan], args.seconds)
+    outcomes_before = metrics.SEGMENTS_TOTAL.snapshot(stream=pipeline.id)
+    print(f"🚀 Running {args.segments} segments (concurrency {args.concurrency})...")
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        segment_times = asyncio.run(run_segments(pipeline, origin, args.segments, args.concurrency))
+    finally:
+        if not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    total_wall = time.perf_counter() - start_wall
+    total_cpu = time.process_time() - start_cpu
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    stages = timer.summary()
+    # Segment outcomes of this run: published once a playlist write listed them
+    outcomes = {outcome: count - outcomes_before.get(outcome, 0)
+                for outcome, count in metrics.SEGMENTS_TOTAL.snapshot(stream=pipeline.id).items()}
+    completed = outcomes.pop("published", 0)
+    failures = {outcome: count for outcome, count in outcomes.items() if count}
+    by_motion = defaultdict(list)
+    for segment_id, elapsed in segment_times.items():
+        by_motion[plan[int(segment_id) - FIRST_SEGMENT_ID]].append(elapsed)
+
+    # Engine operations, ms per rendered frame averaged over segments
+    engine_ops = defaultdict(list)
+    for stats in pipeline.segment_stats:
+        for op, ms in stats.get("engine_profile_ms", {}).items():
+            engine_ops[op].append(ms)
+    engine_ops = {op: round(sum(values) / len(values), 3) for op, values in engine_ops.items()}
+
+    results = {
+        "generated_at": time.time(),
+        "fixture": {"seconds": args.seconds, "fps": args.fps, "width": args.width, "height": args.height},
+        "plan": plan,
+        "concurrency": args.concurrency,
+        "config_overrides": json.loads(args.config),
+        "engine": engine_loader.active_version,
+        "cores": os.cpu_count(),
+        "segments_published": completed,
+        "segments_failed": failures,
+        "segments_unpublished": args.segments - completed - sum(failures.values()),
+        "total_wall_s": round(total_wall, 2),
+        "total_cpu_s": round(total_cpu + children.ru_utime + children.ru_stime, 2),
+        "segments_per_minute": round(completed / total_wall * 60.0, 2) if total_wall > 0 else 0.0,
+        "realtime_factor": round(completed * args.seconds / total_wall, 3) if total_wall > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+        "segment_ms_by_motion": {motion: summarize_ms(times) for motion, times in by_motion.items()},
+        "engine_ops_ms_per_frame": engine_ops,
+        "segment_stats": list(pipeline.segment_stats),
+    }
+
+    print()
+    print(markdown_table(
+        ["stage", "p50 wall ms", "p95 wall ms", "p50 CPU ms", "max RSS MB"],
+        [[stage, s["wall_ms"]["p50"], s["wall_ms"]["p95"], s["cpu_ms"]["p50"], s["rss_mb_max"]]
+         for stage, s in stages.items()]
+    ))
+    print()
+    print(markdown_table(
+        ["motion", "p50 segment ms", "p95 segment ms"],
+        [[motion, s["p50"], s["p95"]] for motion, s in results["segment_ms_by_motion"].items()]
+    ))
+    if engine_ops:
+        total = engine_ops.get("total") or 1.0
+        print()
+        print(markdown_table(
+            ["engine op", "ms/frame", "share of frame"],
+            [[op, ms, f"{ms / total:.1%}"] for op, ms in sorted(engine_ops.items(), key=lambda item: -item[1])]
+        ))
+    not_published = [f"{count} {outcome}" for outcome, count in failures.items()]
+    if results["segments_unpublished"]:
+        not_published.append(f"{results['segments_unpublished']} never listed in a playlist")
+    if not_published:
+        print(f"\n⚠️  Not published: {', '.join(not_published)}")
+    print(f"\n{completed}/{args.segments} segments published in {results['total_wall_s']}s: "
+          f"{results['segments_per_minute']} segments/min sustained "
+          f"({results['realtime_factor']}x real time, live needs ≥ 1.0), peak RSS {results['peak_rss_mb']} MB")
+
+    path = write_results("e2e", results)
+    print(f"💾 Results written to {path}")
+    if not completed:
+        print("❌ No segment was published")
+    return 0 if completed == args.segments else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""
+Benchmark the oil painting engine variants compiled into fast_processor.
+
+For every variant it reports full-pipeline ms/frame (p50/p95) and two quality
+numbers, so operators can pick a variant by cost:
+  - ssim_vs_input:   how much scene structure survives the effect
+  - ssim_vs_region:  drift from the default "region" variant
+
+Usage:
+    python -m benchmarks.engine_variants [--source data/raw/123.ts] [--frames 30]
+
+Results are printed as a markdown table and written to
+data/benchmarks/engine_variants.json (served by GET /api/admin/engine/variants).
+"""
+import argparse
+import time
+
+from benchmarks.common import load_frames, markdown_table, ssim, summarize_ms, time_call, write_results
+
+# Mirrors the production settings in image_processing.process_frame_fast_blobs
+PIPELINE_KWARGS = dict(
+    psychedelic_amplitude=0.01,
+    psychedelic_frequency=20.0,
+    psychedelic_total_frames=180,
+    use_stylization=True,
+    stylize_sigma_s=60.0,
+    stylize_sigma_r=0.6,
+    detail_enhance=False,
+    detail_sigma_s=10.0,
+    detail_sigma_r=0.15,
+    bilateral_d=5,
+    bilateral_sigma_color=50,
+    bilateral_sigma_space=50,
+    quantization_levels=16,
+    use_adaptive_threshold=True,
+    edge_blend_factor=0.0,
+    downsample_factor=2,
+    canny_threshold_1=50,
+    canny_threshold_2=150,
+    morph_kernel_size=3,
+    apply_opening=False,
+    apply_closing_iterations=1,
+    edge_blur_amount=5,
+)
+
+
+def run(engine, frames, variants, warmup=3):
+    outputs = {}
+    results = {}
+
+    for variant in variants:
+        for i in range(min(warmup, len(frames))):
+            engine.process_frame(frames[i], frame_number=i, engine_variant=variant, **PIPELINE_KWARGS)
+
+        timings = []
+        outputs[variant] = []
+        for i, frame in enumerate(frames):
+            result, elapsed = time_call(
+                engine.process_frame, frame, frame_number=i, engine_variant=variant, **PIPELINE_KWARGS
+            )
+            timings.append(elapsed)
+            outputs[variant].append(result)
+
+        results[variant] = {"ms_per_frame": summarize_ms(timings)}
+        print(f"  {variant:12s} {results[variant]['ms_per_frame']['p50']:8.2f} ms/frame (p50)")
+
+    for variant in variants:
+        pairs = list(zip(frames, outputs[variant]))
+        results[variant]["ssim_vs_input"] = round(
+            sum(ssim(frame, out) for frame, out in pairs) / len(pairs), 4
+        )
+        if "region" in outputs:
+            results[variant]["ssim_vs_region"] = round(
+                sum(ssim(ref, out) for ref, out in zip(outputs["region"], outputs[variant])) / len(pairs), 4
+            )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help=".ts file or directory of frames (default: data/raw or synthetic)")
+    parser.add_argument("--frames", type=int, default=30, help="Number of frames to benchmark")
+    parser.add_argument("--variants", nargs="*", help="Subset of variants to run (default: all)")
+    args = parser.parse_args()
+
+    import fast_processor
+
+    frames, source = load_frames(args.source, args.frames)
+    variants = args.variants or fast_processor.engine_variants()
+    print(f"🎨 Benchmarking {len(variants)} variants on {len(frames)} frames from {source}")
+
+    results = run(fast_processor, frames, variants)
+
+    rows = []
+    for variant in variants:
+        r = results[variant]
+        rows.append([
+            variant,
+            r["ms_per_frame"]["p50"],
+            r["ms_per_frame"]["p95"],
+            r["ssim_vs_input"],
+            r.get("ssim_vs_region", "-"),
+        ])
+    print()
+    print(markdown_table(["variant", "p50 ms/frame", "p95 ms/frame", "SSIM vs input", "SSIM vs region"], rows))
+
+    path = write_results("engine_variants", {
+        "generated_at": time.time(),
+        "source": source,
+        "frame_shape": list(frames[0].shape),
+        "variants": results,
+    })
+    print(f"\n💾 Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
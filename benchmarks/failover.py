@@ -0,0 +1,157 @@
+"""
+Origin failover: ingest from several local edges of different speeds while
+the fastest one goes down, comes back and degrades.
+
+Serves one origin emulator stream on --edges consecutive ports, each with its
+own added latency (--edge-latency), and points a StreamPipeline at all of
+them (its base URL plus origins). Then runs the ingest loop - chunklist
+polls, origin probes and a download of every new segment, without the effect -
+through four phases of --phase-seconds each:
+
+    baseline   all edges up
+    down       the fastest edge drops every connection
+    recovered  it's back
+    degraded   it answers, but --degraded-latency seconds slower
+
+Reports per phase: downloads, p50/p95/max download time, failures, requests
+per edge, failovers (playlist, download, resume) and the best-scoring edge at
+the end. --cut stops a share of segment bodies halfway, to exercise resuming
+mid-segment on another edge. Probes run every --probe-seconds (30 s in
+production) so recovery shows up within a phase.
+
+Usage:
+    python -m benchmarks.failover [--edges 3] [--edge-latency 0.02,0.15,0.4]
+        [--phase-seconds 30] [--speed 3] [--cut 0.05] [--degraded-latency 1.0]
+        [--probe-seconds 5] [--seed 0] [--source data/raw]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+import httpx
+
+from benchmarks.common import markdown_table, summarize_ms, write_results
+from benchmarks.origin import Origin, serve, source_segments
+
+PHASES = ("baseline", "down", "recovered", "degraded")
+
+
+def counter_delta(counter, before, **match):
+    return {key: value - before.get(key, 0) for key, value in counter.snapshot(**match).items()
+            if value - before.get(key, 0)}
+
+
+async def ingest(pipeline, client, seconds):
+    """Polls and downloads every new segment for `seconds`; returns per-download ms (None = failed)."""
+    async def timed_download(segment_id):
+        start = time.perf_counter()
+        content = await pipeline.download_segment(client, segment_id)
+        pipeline.pending_segments.pop(int(segment_id), None)
+        return (time.perf_counter() - start) * 1000.0 if content else None
+
+    downloads = []
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for segment_id in await pipeline.fetch_new_segments(client):
+            pipeline.recent_segments.appendleft(segment_id)
+            downloads.append(asyncio.ensure_future(timed_download(segment_id)))
+        pipeline.probe_origins(client)
+        await asyncio.sleep(min(pipeline.next_poll_delay(), max(0.0, end - time.monotonic())))
+    return await asyncio.gather(*downloads)
+
+
+async def run_phases(pipeline, metrics, servers, fastest, args):
+    results = {}
+    async with httpx.AsyncClient() as client:
+        for phase in PHASES:
+            servers[fastest].down = phase == "down"
+            servers[fastest].latency = args.latencies[fastest] + (args.degraded_latency if phase == "degraded" else 0.0)
+            requests_before = metrics.ORIGIN_REQUESTS_TOTAL.snapshot()
+            failovers_before = metrics.ORIGIN_FAILOVERS_TOTAL.snapshot(stream=pipeline.id)
+
+            times = await ingest(pipeline, client, args.phase_seconds)
+
+            succeeded = [t for t in times if t is not None]
+            results[phase] = {
+                "download_ms": summarize_ms(succeeded) if succeeded else None,
+                "downloads": len(times),
+                "failed": len(times) - len(succeeded),
+                "requests": counter_delta(metrics.ORIGIN_REQUESTS_TOTAL, requests_before),
+                "failovers": counter_delta(metrics.ORIGIN_FAILOVERS_TOTAL, failovers_before, stream=pipeline.id),
+                "best": pipeline.get_origin_pool().ranked()[0].host,
+                "origins": pipeline.get_origin_pool().snapshot(),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edges", type=int, default=3)
+    parser.add_argument("--edge-latency", default="0.02,0.15,0.4",
+                        help="Comma-separated seconds added to each edge's responses")
+    parser.add_argument("--phase-seconds", type=float, default=30.0)
+    parser.add_argument("--speed", type=float, default=3.0, help="Stream clock multiplier")
+    parser.add_argument("--cut", type=float, default=0.05, help="Probability a segment body stops halfway")
+    parser.add_argument("--degraded-latency", type=float, default=1.0)
+    parser.add_argument("--probe-seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", help="Directory of .ts segments (default: data/raw or synthetic fixtures)")
+    parser.add_argument("--port", type=int, default=8092)
+    args = parser.parse_args()
+    args.latencies = [float(value) for value in args.edge_latency.split(",") if value.strip()]
+    args.latencies += [0.0] * (args.edges - len(args.latencies))
+    args.latencies = args.latencies[:args.edges]
+
+    paths, source = source_segments(args.source)
+    from backend.core import metrics, origins, processor
+
+    origin = Origin(paths, window=3, speed=args.speed, cut=args.cut, seed=args.seed)
+    # Start a loop in, so the playlist window is already full
+    origin.started -= sum(origin.durations) / args.speed
+    servers = [serve(origin, port=args.port + index, latency=latency) for index, latency in enumerate(args.latencies)]
+    hosts = [f"127.0.0.1:{server.server_address[1]}" for server in servers]
+    fastest = args.latencies.index(min(args.latencies))
+
+    pipeline = processor.StreamPipeline(
+        "failover", f"http://{hosts[0]}/fecnetwork/AbbeyRoadHD1.flv/chunklist_w", hosts[1:])
+    origins.PROBE_SECONDS = args.probe_seconds
+
+    print(f"🌐 {args.edges} edges ({', '.join(f'{host} +{latency:g}s' for host, latency in zip(hosts, args.latencies))}) "
+          f"serving {source} at {args.speed:g}x, {args.phase_seconds:g}s per phase, cut {args.cut:.0%}...")
+    try:
+        # The processor logs every request - keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            phases = asyncio.run(run_phases(pipeline, metrics, servers, fastest, args))
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    rows = []
+    for phase, result in phases.items():
+        ms = result["download_ms"] or {"p50": "-", "p95": "-", "max": "-"}
+        requests = " / ".join(
+            f"{result['requests'].get(f'{host},ok', 0)}"
+            + (f" ({result['requests'][f'{host},error']} err)" if result["requests"].get(f"{host},error") else "")
+            for host in hosts
+        )
+        failovers = ", ".join(f"{kind} {count}" for kind, count in result["failovers"].items()) or "-"
+        rows.append([phase, result["downloads"], ms["p50"], ms["p95"], ms["max"], result["failed"], requests,
+                     failovers, result["best"]])
+    print()
+    print(markdown_table(["phase", "downloads", "p50 ms", "p95 ms", "max ms", "failed",
+                          "requests (" + " / ".join(hosts) + ")", "failovers", "best at end"], rows))
+
+    path = write_results("failover", {
+        "edges": dict(zip(hosts, args.latencies)), "fastest": hosts[fastest], "speed": args.speed,
+        "cut": args.cut, "phase_seconds": args.phase_seconds, "degraded_latency": args.degraded_latency,
+        "probe_seconds": args.probe_seconds, "seed": args.seed, "phases": phases,
+        "origin": dict(origin.stats),
+    })
+    print(f"\n💾 Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Deterministic H.264 .ts fixtures for end-to-end benchmarks.
+
+Segments are rendered from synthetic_frame() with moving objects and encoded
+with PyAV (libx264, MPEG-TS) the first time they're needed, then cached in
+data/benchmarks/fixtures. The same arguments always give the same pictures, so
+runs on different machines/commits process identical content.
+
+make_rendition scales any segment down to another height, for the smaller
+variants of a master playlist (see origin.py --renditions).
+
+Motion levels:
+- static: a frozen camera - identical source frames, which only differ after decoding
+          by encoder refinement noise (exercises perceptual duplicate detection)
+- low:    a handful of slow pedestrians plus light sensor noise
+- high:   many fast cars/pedestrians, a slow camera pan and heavier noise
+"""
+import os
+from fractions import Fraction
+
+import cv2
+import numpy as np
+
+from benchmarks.common import RESULTS_DIR, synthetic_frame
+
+FIXTURES_DIR = os.path.join(RESULTS_DIR, "fixtures")
+
+MOTION_LEVELS = {
+    # objects, max speed (px/frame), noise sigma, pan (px/frame)
+    "static": (0, 0, 0.0, 0.0),
+    "low": (4, 3, 2.0, 0.0),
+    "high": (24, 18, 4.0, 0.5),
+}
+
+
+def fixture_path(motion, seconds=6, fps=30, width=1920, height=1080):
+    return os.path.join(FIXTURES_DIR, f"{motion}_{width}x{height}_{fps}fps_{seconds}s.ts")
+
+
+def fixture_frames(motion, seconds=6, fps=30, width=1920, height=1080, seed=0):
+    """Yields the BGR frames of a fixture segment."""
+    if motion not in MOTION_LEVELS:
+        raise ValueError(f"Unknown motion level: {motion}")
+    count, speed, noise, pan = MOTION_LEVELS[motion]
+    rng = np.random.default_rng(seed)
+
+    # Scene is rendered wider than the frame so the camera can pan across it
+    margin = int(pan * seconds * fps) + 1
+    scene = synthetic_frame(width + margin, height, seed=seed)
+    objects = [
+        {
+            "pos": rng.uniform((0, height * 0.5), (width, height * 0.95)),
+            "vel": rng.uniform(-speed, speed, 2) * (1.0, 0.2),
+            "size": rng.integers((20, 40), (160, 90)),
+            "color": tuple(int(c) for c in rng.integers(0, 255, 3)),
+        }
+        for _ in range(count)
+    ]
+
+    for index in range(seconds * fps):
+        x0 = int(pan * index)
+        frame = scene[:, x0:x0 + width].copy()
+        for obj in objects:
+            x, y = (obj["pos"] + obj["vel"] * index).astype(int)
+            x %= width
+            w, h = obj["size"]
+            cv2.rectangle(frame, (int(x), int(y)), (int(x + w), int(y + h)), obj["color"], -1)
+        if noise > 0:
+            grain = rng.normal(0, noise, frame.shape).astype(np.int16)
+            frame = np.clip(frame.astype(np.int16) + grain, 0, 255).astype(np.uint8)
+        yield frame
+
+
+def make_fixture(motion, seconds=6, fps=30, width=1920, height=1080, seed=0, force=False):
+    """
+    Returns the path of the fixture .ts, encoding it first if it isn't cached.
+    Encoder settings roughly follow the live feed: High profile, 2s GOP, no B-frame pyramid.
+    """
+    path = fixture_path(motion, seconds, fps, width, height)
+    if os.path.exists(path) and not force:
+        return path
+
+    import av
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with av.open(tmp_path, mode="w", format="mpegts") as container:
+        stream = container.add_stream("libx264", rate=fps)
+        stream.width = width
+        stream.height = height
+        stream.pix_fmt = "yuv420p"
+        stream.options = {"preset": "veryfast", "crf": "23", "g": str(fps * 2), "bf": "2", "threads": "1"}
+        for frame in fixture_frames(motion, seconds, fps, width, height, seed):
+            for packet in stream.encode(av.VideoFrame.from_ndarray(frame, format="bgr24")):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+    os.replace(tmp_path, path)
+    return path
+
+
+def make_fixtures(motions=tuple(MOTION_LEVELS), **kwargs):
+    """Returns {motion: path} for every requested motion level."""
+    return {motion: make_fixture(motion, **kwargs) for motion in motions}
+
+
+def rendition_path(path, height):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(FIXTURES_DIR, "renditions", f"{name}_{height}p.ts")
+
+
+def make_rendition(path, height, force=False):
+    """
+    Returns the path of a copy of the .ts at path scaled to height rows (width
+    keeps the aspect ratio, rounded to even), encoding it first if it isn't
+    cached. Same encoder settings as make_fixture - like an ABR ladder rung.
+    """
+    out_path = rendition_path(path, height)
+    if os.path.exists(out_path) and not force:
+        return out_path
+
+    import av
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    with av.open(path) as source, av.open(tmp_path, mode="w", format="mpegts") as container:
+        source_stream = source.streams.video[0]
+        fps = source_stream.average_rate or 30
+        width = int(round(source_stream.width * height / source_stream.height / 2)) * 2
+        stream = container.add_stream("libx264", rate=fps)
+        stream.width = width
+        stream.height = height
+        stream.pix_fmt = "yuv420p"
+        stream.options = {"preset": "veryfast", "crf": "23", "g": str(int(fps) * 2), "bf": "2", "threads": "1"}
+        for index, frame in enumerate(source.decode(source_stream)):
+            scaled = frame.reformat(width=width, height=height, format="yuv420p")
+            # Renumbered in the output's time base (reformat keeps the source's)
+            scaled.pts = index
+            scaled.time_base = Fraction(1) / fps
+            for packet in stream.encode(scaled):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+    os.replace(tmp_path, out_path)
+    return out_path
@@ -0,0 +1,386 @@
+"""
+Golden-output regression and performance harness for the effect engines.
+
+Reference frames live in benchmarks/golden/frames (checked in: three 480x270
+frames of the synthetic "high" motion fixture segment; recorded Abbey Road
+segments work too). Golden outputs per engine and config live in
+benchmarks/golden/outputs/<engine>/<config>/. Every change to the C++ engine
+sources (or python_engine.py) is checked for both visual drift and speed:
+
+    python -m benchmarks.golden capture [--source data/raw | --fixture high] [--count 6] [--stride 45]
+        Extract reference frames from recorded .ts segments or a fixture segment
+
+    python -m benchmarks.golden bless [--engine native|python]
+        Render and store golden outputs (after an intended visual change)
+
+    python -m benchmarks.golden check [--engine native|python] [--repeat 3]
+        Compare against the goldens (SSIM/PSNR tolerance) and measure
+        ms/frame p50/p95, per-operation timing (the engine's profiling hooks),
+        allocations and throughput per core.
+        Writes data/benchmarks/golden.json and exits non-zero on drift.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from benchmarks.common import BASE_DIR, DATA_DIR, markdown_table, psnr, ssim, summarize_ms, time_call, write_results
+from benchmarks.engine_variants import PIPELINE_KWARGS
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+FRAMES_DIR = os.path.join(GOLDEN_DIR, "frames")
+OUTPUTS_DIR = os.path.join(GOLDEN_DIR, "outputs")
+MANIFEST_PATH = os.path.join(GOLDEN_DIR, "manifest.json")
+
+# Configs under test: production settings plus one override per feature
+CONFIGS = {
+    "production": {},
+    "edges": dict(edge_blend_factor=0.15, apply_opening=True),
+    "detail": dict(detail_enhance=True),
+    "multiscale": dict(engine_variant="multiscale"),
+    "box": dict(engine_variant="box"),
+    "directional": dict(engine_variant="directional"),
+    "guided": dict(smoothing_backend="guided"),
+    "domain_transform": dict(smoothing_backend="domain_transform"),
+    "bilateral_downsampled": dict(smoothing_backend="bilateral_downsampled"),
+    "tiled": dict(tiled=True),
+}
+
+# Drift tolerance against the goldens (mean SSIM over frames, worst-frame PSNR)
+DEFAULT_TOLERANCE = {"min_ssim": 0.995, "min_psnr": 40.0}
+
+
+def get_engines():
+    """Engines available in this environment, by name."""
+    from backend.core import python_engine
+    engines = {"python": python_engine}
+    try:
+        import fast_processor
+        engines["native"] = fast_processor
+    except ImportError:
+        pass
+    return engines
+
+
+def source_hash(engine_name):
+    """Hash of the engine source the goldens were rendered with."""
+    if engine_name == "native":
+        # fast_processor.cpp and every source linked with it, like engine builds
+        from backend.core import engine_loader
+        with open(engine_loader.SOURCE_PATH, "r") as f:
+            return engine_loader.source_version(f.read())
+    path = os.path.join(BASE_DIR, "backend", "core", "python_engine.py")
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def engine_build(engine):
+    """The file an engine was loaded from and its hash - the build the goldens came from."""
+    with open(engine.__file__, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:12]
+    return {"module": os.path.basename(engine.__file__), "module_sha": digest}
+
+
+def load_reference_frames():
+    paths = sorted(glob.glob(os.path.join(FRAMES_DIR, "*.png")))
+    return [(os.path.splitext(os.path.basename(p))[0], cv2.imread(p)) for p in paths]
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {"tolerance": DEFAULT_TOLERANCE, "engines": {}}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def render(engine, frame, index, config, **kwargs):
+    return engine.process_frame(frame, frame_number=index, **dict(PIPELINE_KWARGS, **CONFIGS[config], **kwargs))
+
+
+def golden_path(engine_name, config, frame_name):
+    return os.path.join(OUTPUTS_DIR, engine_name, config, f"{frame_name}.png")
+
+
+# ---------------------------------------------------------------------------
+# capture
+# ---------------------------------------------------------------------------
+
+def capture(args):
+    import av
+
+    if args.fixture:
+        from benchmarks.fixtures import make_fixture
+        source = make_fixture(args.fixture, seconds=2, width=args.width, height=args.height)
+    else:
+        source = args.source or os.path.join(DATA_DIR, "raw")
+    segments = sorted(glob.glob(os.path.join(source, "*.ts"))) if os.path.isdir(source) else [source]
+    if not segments:
+        print(f"❌ No .ts segments in {source} - record a few from the live feed first")
+        return 1
+
+    os.makedirs(FRAMES_DIR, exist_ok=True)
+
+    # Spread the frames over the available segments (different traffic / light)
+    selected = segments[::max(1, len(segments) // args.count)]
+    per_segment = -(-args.count // len(selected))
+    captured = 0
+    for segment in selected:
+        taken = 0
+        with av.open(segment) as container:
+            for i, frame in enumerate(container.decode(container.streams.video[0])):
+                if i % args.stride:
+                    continue
+                path = os.path.join(FRAMES_DIR, f"{captured:03d}.png")
+                cv2.imwrite(path, frame.to_ndarray(format="bgr24"))
+                print(f"📸 {os.path.basename(segment)} frame {i} -> {path}")
+                captured += 1
+                taken += 1
+                if taken >= per_segment or captured >= args.count:
+                    break
+        if captured >= args.count:
+            break
+
+    print(f"✅ Captured {captured} reference frames - run 'bless' to render the goldens")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# bless
+# ---------------------------------------------------------------------------
+
+def bless(args):
+    frames = load_reference_frames()
+    if not frames:
+        print("❌ No reference frames - run 'capture' first")
+        return 1
+
+    engines = get_engines()
+    names = [args.engine] if args.engine else list(engines)
+    manifest = load_manifest()
+
+    for name in names:
+        if name not in engines:
+            print(f"❌ Engine {name} is not available")
+            return 1
+        for config in CONFIGS:
+            for index, (frame_name, frame) in enumerate(frames):
+                path = golden_path(name, config, frame_name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                cv2.imwrite(path, render(engines[name], frame, index, config))
+        manifest["engines"][name] = {
+            "blessed_at": time.time(),
+            "source": source_hash(name),
+            **engine_build(engines[name]),
+            "opencv": cv2.__version__,
+            "frames": [frame_name for frame_name, _ in frames],
+            "configs": list(CONFIGS),
+        }
+        print(f"✅ Blessed {len(CONFIGS)} configs x {len(frames)} frames for the {name} engine "
+              f"({engine_build(engines[name])['module']})")
+
+    save_manifest(manifest)
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# check
+# ---------------------------------------------------------------------------
+
+def stage_timings(engine, frames, repeat):
+    """
+    Per-operation cost of the production config, from the profile process_frame
+    itself records (profile=True / take_thread_profile - the same timings the
+    processor reports with profile_engine), so every stage is measured inside
+    the real pipeline.
+    """
+    samples = {}
+    engine.take_thread_profile()  # Drop anything recorded earlier on this thread
+    for _ in range(repeat):
+        for index, frame in enumerate(frames):
+            render(engine, frame, index, "production", profile=True)
+            for op, entry in engine.take_thread_profile()["ops"].items():
+                samples.setdefault(op, []).append(entry["ms"])
+    return {op: summarize_ms(ms) for op, ms in samples.items()}
+
+
+def allocations(engine, frames):
+    """Peak Python-heap allocation per frame (numpy buffers are tracked) and process peak RSS."""
+    tracemalloc.start()
+    peaks = []
+    for index, frame in enumerate(frames):
+        tracemalloc.reset_peak()
+        render(engine, frame, index, "production")
+        peaks.append(tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return {
+        "python_peak_kb_per_frame": round(max(peaks) / 1024, 1),
+        "rss_peak_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def throughput(engine, frames, repeat):
+    """Frames/sec on one thread and on every core (the native engine releases the GIL)."""
+    cores = os.cpu_count() or 1
+    work = [(index, frame) for _ in range(repeat) for index, frame in enumerate(frames)]
+
+    start = time.perf_counter()
+    for index, frame in work:
+        render(engine, frame, index, "production")
+    single = len(work) / (time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=cores) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda item: render(engine, item[1], item[0], "production"), work))
+        parallel = len(work) / (time.perf_counter() - start)
+
+    return {
+        "cores": cores,
+        "fps_single_thread": round(single, 2),
+        "fps_all_cores": round(parallel, 2),
+        "fps_per_core": round(parallel / cores, 2),
+    }
+
+
+def check_engine(name, engine, frames, manifest, tolerance, repeat):
+    blessed = manifest["engines"].get(name)
+    report = {
+        "source": source_hash(name),
+        "golden_source": blessed["source"] if blessed else None,
+        **engine_build(engine),
+        "configs": {},
+    }
+    failures = []
+    if blessed and blessed.get("opencv") != cv2.__version__:
+        print(f"⚠️  Goldens for {name} were blessed with OpenCV {blessed.get('opencv')}, "
+              f"running {cv2.__version__} - small drift may come from OpenCV itself")
+
+    for config in CONFIGS:
+        timings, scores = [], []
+        for _ in range(repeat):
+            for index, (frame_name, frame) in enumerate(frames):
+                output, elapsed = time_call(render, engine, frame, index, config)
+                timings.append(elapsed)
+                if len(scores) < len(frames):
+                    golden = cv2.imread(golden_path(name, config, frame_name))
+                    scores.append(None if golden is None else (ssim(golden, output), psnr(golden, output)))
+
+        entry = {"ms_per_frame": summarize_ms(timings)}
+        if None in scores:
+            entry["status"] = "no golden"
+            failures.append(f"{name}/{config} (no golden)")
+        else:
+            mean_ssim = sum(s for s, _ in scores) / len(scores)
+            min_psnr = min(p for _, p in scores)
+            ok = mean_ssim >= tolerance["min_ssim"] and min_psnr >= tolerance["min_psnr"]
+            entry.update({
+                "ssim": round(mean_ssim, 5),
+                "min_psnr": round(min_psnr, 2) if min_psnr != float("inf") else "inf",
+                "status": "ok" if ok else "drift",
+            })
+            if not ok:
+                failures.append(f"{name}/{config}")
+        report["configs"][config] = entry
+
+    report["stages_ms"] = stage_timings(engine, [frame for _, frame in frames], repeat)
+    report["allocations"] = allocations(engine, [frame for _, frame in frames])
+    report["throughput"] = throughput(engine, [frame for _, frame in frames], repeat)
+    return report, failures
+
+
+def check(args):
+    frames = load_reference_frames()
+    if not frames:
+        print("❌ No reference frames - run 'capture' first")
+        return 2
+
+    engines = get_engines()
+    names = [args.engine] if args.engine else list(engines)
+    manifest = load_manifest()
+    tolerance = dict(DEFAULT_TOLERANCE, **manifest.get("tolerance", {}))
+
+    results = {
+        "generated_at": time.time(),
+        "frames": [frame_name for frame_name, _ in frames],
+        "frame_shape": list(frames[0][1].shape),
+        "tolerance": tolerance,
+        "engines": {},
+    }
+    failures = []
+
+    for name in names:
+        if name not in engines:
+            print(f"❌ Engine {name} is not available")
+            return 2
+        print(f"🔍 Checking the {name} engine on {len(frames)} reference frames...")
+        report, engine_failures = check_engine(name, engines[name], frames, manifest, tolerance, args.repeat)
+        results["engines"][name] = report
+        failures += engine_failures
+
+        rows = [[config, r["ms_per_frame"]["p50"], r["ms_per_frame"]["p95"], r.get("ssim", "-"),
+                 r.get("min_psnr", "-"), r["status"]] for config, r in report["configs"].items()]
+        print(markdown_table(["config", "p50 ms/frame", "p95 ms/frame", "SSIM", "min PSNR", "status"], rows))
+        stages = sorted(report["stages_ms"].items(), key=lambda item: -item[1]["p50"])
+        print()
+        print(markdown_table(["operation", "p50 ms", "p95 ms"], [[op, timing["p50"], timing["p95"]] for op, timing in stages]))
+        t = report["throughput"]
+        print(f"\n  {t['fps_single_thread']} fps single thread, {t['fps_all_cores']} fps on {t['cores']} cores "
+              f"({t['fps_per_core']} per core), peak {report['allocations']['python_peak_kb_per_frame']} KB "
+              f"allocated per frame\n")
+
+    results["failures"] = failures
+    path = write_results("golden", results)
+    print(f"💾 Report written to {path}")
+
+    if failures:
+        print(f"❌ Drift or missing goldens: {', '.join(failures)}")
+        return 1
+    print("✅ All configs within tolerance")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command")
+
+    capture_parser = commands.add_parser("capture", help="Extract reference frames from recorded segments")
+    capture_parser.add_argument("--source", help=".ts file or directory of .ts files (default: data/raw)")
+    capture_parser.add_argument("--fixture", choices=["static", "low", "high"],
+                                help="Capture from a synthetic fixture segment instead (benchmarks/fixtures.py)")
+    capture_parser.add_argument("--width", type=int, default=480, help="Fixture width (with --fixture)")
+    capture_parser.add_argument("--height", type=int, default=270)
+    capture_parser.add_argument("--count", type=int, default=6, help="Number of reference frames")
+    capture_parser.add_argument("--stride", type=int, default=45, help="Take every Nth frame of a segment")
+
+    bless_parser = commands.add_parser("bless", help="Render and store golden outputs")
+    bless_parser.add_argument("--engine", choices=["native", "python"], help="Default: every available engine")
+
+    check_parser = commands.add_parser("check", help="Compare against goldens and measure performance")
+    check_parser.add_argument("--engine", choices=["native", "python"], help="Default: every available engine")
+    check_parser.add_argument("--repeat", type=int, default=3, help="Timing passes over the reference frames")
+
+    args = parser.parse_args()
+    if args.command == "capture":
+        return capture(args)
+    if args.command == "bless":
+        return bless(args)
+    if args.command is None:
+        args = check_parser.parse_args([])
+    return check(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Benchmark incremental (changed tiles only) and background model stylization
+on recorded footage.
+
+Runs the same frames in order through the engine three times - in full, with a
+FrameState tile cache, and with a BackgroundModel - and reports the fraction of
+tiles recomputed, the foreground fraction, ms/frame for each and the speedups.
+
+Usage:
+    python -m benchmarks.incremental --source data/raw/123.ts [--frames 180]
+        [--tile-size 64] [--threshold 3.0] [--restyle-interval 90]
+
+Static footage gives the most honest numbers: record a few segments from the
+live feed (data/raw/*.ts) rather than using the synthetic fallback.
+"""
+import argparse
+import time
+
+from benchmarks.common import load_frames, markdown_table, ssim, summarize_ms, time_call, write_results
+from benchmarks.engine_variants import PIPELINE_KWARGS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help=".ts file or directory of frames (default: data/raw or synthetic)")
+    parser.add_argument("--frames", type=int, default=180, help="Number of consecutive frames")
+    parser.add_argument("--tile-size", type=int, default=64)
+    parser.add_argument("--threshold", type=float, default=3.0)
+    parser.add_argument("--restyle-interval", type=int, default=90, help="Frames between background re-stylizes")
+    args = parser.parse_args()
+
+    import fast_processor
+
+    frames, source = load_frames(args.source, args.frames)
+    print(f"🧩 Incremental stylization on {len(frames)} frames from {source}")
+
+    full_times, full_outputs = [], []
+    for i, frame in enumerate(frames):
+        out, elapsed = time_call(fast_processor.process_frame, frame, frame_number=i, **PIPELINE_KWARGS)
+        full_times.append(elapsed)
+        full_outputs.append(out)
+
+    state = fast_processor.FrameState(tile_size=args.tile_size, threshold=args.threshold)
+    incremental_times, fractions, similarity = [], [], []
+    for i, frame in enumerate(frames):
+        out, elapsed = time_call(
+            fast_processor.process_frame, frame, frame_number=i, state=state, **PIPELINE_KWARGS
+        )
+        incremental_times.append(elapsed)
+        fractions.append(state.last_fraction)
+        similarity.append(ssim(full_outputs[i], out))
+
+    background = fast_processor.BackgroundModel(restyle_interval=args.restyle_interval)
+    background_times, foreground, background_similarity = [], [], []
+    for i, frame in enumerate(frames):
+        out, elapsed = time_call(
+            fast_processor.process_frame, frame, frame_number=i, background=background, **PIPELINE_KWARGS
+        )
+        background_times.append(elapsed)
+        foreground.append(background.last_foreground_fraction)
+        background_similarity.append(ssim(full_outputs[i], out))
+
+    full = summarize_ms(full_times)
+    incremental = summarize_ms(incremental_times)
+    background_ms = summarize_ms(background_times)
+    results = {
+        "generated_at": time.time(),
+        "source": source,
+        "tile_size": args.tile_size,
+        "threshold": args.threshold,
+        "full_ms": full,
+        "incremental_ms": incremental,
+        "tiles_recomputed_fraction": round(state.recompute_fraction, 4),
+        "tiles_recomputed_fraction_after_first": round(sum(fractions[1:]) / max(1, len(fractions) - 1), 4),
+        "speedup": round(full["mean"] / incremental["mean"], 2),
+        "ssim_vs_full": round(sum(similarity) / len(similarity), 4),
+        "background": {
+            "restyle_interval": args.restyle_interval,
+            "ms": background_ms,
+            "restyles": background.restyles,
+            "foreground_fraction": round(sum(foreground) / len(foreground), 4),
+            "memory_kb": background.memory_bytes() // 1024,
+            "speedup": round(full["mean"] / background_ms["mean"], 2),
+            "ssim_vs_full": round(sum(background_similarity) / len(background_similarity), 4),
+        },
+    }
+
+    print()
+    print(markdown_table(
+        ["mode", "p50 ms/frame", "p95 ms/frame", "pixels restyled", "SSIM vs full"],
+        [
+            ["full", full["p50"], full["p95"], "100%", 1.0],
+            ["incremental", incremental["p50"], incremental["p95"],
+             f"{results['tiles_recomputed_fraction']:.1%}", results["ssim_vs_full"]],
+            ["background", background_ms["p50"], background_ms["p95"],
+             f"{results['background']['foreground_fraction']:.1%}", results["background"]["ssim_vs_full"]],
+        ]
+    ))
+    print(f"\nSpeedup: incremental {results['speedup']}x, background {results['background']['speedup']}x "
+          f"({background.restyles} background restyles)")
+
+    path = write_results("incremental", results)
+    print(f"💾 Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""
+Local HLS origin emulator for ingest, soak and latency testing.
+
+Replays a directory of recorded .ts segments as a live sliding-window stream
+with the same URL shapes as the EarthCam CDN, so fetch_new_segments and
+download_segment run unmodified against it:
+
+    /<path>/chunklist_w<anything>.m3u8   live playlist (last --window segments)
+    /<path>/media_w<anything>_<id>.ts    segment <id>
+    /<path>/playlist.m3u8                master playlist (with --renditions)
+    /stats                               JSON counters (requests, faults)
+
+Segments are published on a real-time clock: segment n becomes available once
+its predecessors' durations have elapsed (scaled by --speed), and the source
+files loop forever. Segment requests honour "Range: bytes=N-". Faults are
+injected per request (404s, slow responses, bodies cut off halfway, corrupt
+or short segments) or per segment (gaps: a segment listed with #EXT-X-GAP whose media is never
+available; jitter: a segment published late). Per-segment faults are seeded by
+the sequence number so every run sees the same stream.
+
+Each segment carries EXT-X-PROGRAM-DATE-TIME (its capture start on the wall
+clock) unless --no-program-date-time, to test latency tracking either way.
+Playlists carry ETag and Last-Modified and answer conditional requests with
+304 unless --no-validators, to test polling either way.
+
+With --renditions 1080,540,360 a master playlist lists one variant per
+height, each with its own chunklist (chunklist_w<session>_b<bitrate>.m3u8) and
+media (media_w<session>_b<bitrate>_<id>.ts) - the source segments scaled down
+once with make_rendition and cached. The unsuffixed URLs keep serving the
+source, and /stats counts bytes served per variant.
+
+With --edges N the same stream is served on N consecutive ports, like
+equivalent CDN edges; --edge-latency adds a fixed delay to each edge's
+responses (comma-separated, one per edge) to test origin selection.
+
+Usage:
+    python -m benchmarks.origin [--source data/raw] [--port 8090] [--window 3]
+        [--speed 1.0] [--p404 0.0] [--slow 0.0 --slow-seconds 3.0]
+        [--cut 0.0] [--corrupt 0.0] [--short 0.0] [--gaps 0.0] [--jitter 0.0] [--seed 0] [--no-program-date-time]
+        [--no-validators] [--edges 1 --edge-latency 0,0.2,...] [--renditions 1080,540,360]
+
+Then point the processor at it, e.g. in .env:
+    STREAM_BASE_URL=http://localhost:8090/fecnetwork/AbbeyRoadHD1.flv/chunklist_w
+or at runtime with POST /api/admin/stream-url.
+
+Without --source (and no recorded segments in data/raw) the synthetic
+benchmark fixtures are used.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import DATA_DIR
+
+MASTER_RE = re.compile(r"/playlist\.m3u8$")
+CHUNKLIST_RE = re.compile(r"/chunklist_w\d*(?P<suffix>[^/]*)\.m3u8$")
+MEDIA_RE = re.compile(r"/media_w\d*(?P<suffix>[^/]*)_(?P<id>\d+)\.ts$")
+RANGE_RE = re.compile(r"^bytes=(\d+)-$")
+
+
+def segment_duration(path, default=6.0):
+    """Duration of a .ts file in seconds (PyAV probe, default if unknown)."""
+    try:
+        import av
+        with av.open(path) as container:
+            if container.duration:
+                return container.duration / 1_000_000
+    except Exception:
+        pass
+    return default
+
+
+def segment_resolution(path):
+    """(width, height) of a .ts file's video stream (PyAV probe)."""
+    import av
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        return stream.width, stream.height
+
+
+class Origin:
+    """
+    The live stream model: which segments exist at a given time and which
+    faults apply to them. Thread-safe - the HTTP server calls it from many threads.
+    """
+
+    def __init__(self, paths, window=3, speed=1.0, first_sequence=1000, p404=0.0, slow=0.0,
+                 slow_seconds=3.0, cut=0.0, corrupt=0.0, short=0.0, gaps=0.0, jitter=0.0, seed=0, retention=6, program_date_time=True,
+                 validators=True, renditions=()):
+        if not paths:
+            raise ValueError("No .ts segments to serve")
+        self.paths = list(paths)
+        self.durations = [segment_duration(path) for path in self.paths]
+        self.window = window
+        self.speed = speed
+        self.first_sequence = first_sequence
+        self.p404 = p404
+        self.slow = slow
+        self.slow_seconds = slow_seconds
+        self.cut = cut
+        self.corrupt = corrupt
+        self.short = short
+        self.gaps = gaps
+        self.jitter = jitter
+        self.seed = seed
+        self.retention = retention  # segments behind the window still downloadable
+        self.program_date_time = program_date_time
+        self.validators = validators
+        self.session = random.Random(seed).randint(10_000_000, 99_999_999)
+        # Variants by the suffix in their chunklist/media names - "" is the source itself
+        self.variants = {"": {"paths": self.paths}}
+        self.master = bool(renditions)
+        if renditions:
+            self.variants.update(self.make_variants(renditions))
+
+        self.started = time.monotonic()
+        self.started_wall = time.time()
+        self.lock = threading.Lock()
+        self.request_rng = random.Random(seed)
+        self.cache = {}
+        self.stats = {"playlists": 0, "segments": 0, "not_found": 0, "injected_404": 0, "slow": 0,
+                      "not_modified": 0, "cut": 0, "corrupt": 0,
+                      "short": 0, "bytes": 0, "variant_bytes": {}}
+
+    def make_variants(self, heights):
+        """Master playlist variants, tallest first: the source scaled to each height."""
+        from benchmarks.fixtures import make_rendition
+
+        source_height = segment_resolution(self.paths[0])[1]
+        variants = {}
+        for height in sorted(set(heights), reverse=True):
+            paths = self.paths if height == source_height else [make_rendition(path, height) for path in self.paths]
+            width = segment_resolution(paths[0])[0]
+            bandwidth = int(sum(os.path.getsize(path) for path in paths) * 8 / sum(self.durations))
+            variants[f"_b{bandwidth}"] = {"paths": paths, "width": width, "height": height, "bandwidth": bandwidth}
+        return variants
+
+    # -- timeline -----------------------------------------------------------
+
+    def _segment_rng(self, sequence, kind):
+        return random.Random(f"{self.seed}:{kind}:{sequence}")
+
+    def duration(self, sequence):
+        return self.durations[(sequence - self.first_sequence) % len(self.paths)]
+
+    def is_gap(self, sequence):
+        return self.gaps > 0 and self._segment_rng(sequence, "gap").random() < self.gaps
+
+    def nominal_end(self, sequence):
+        """Stream time (seconds since start) at which a segment's last frame was captured."""
+        index = sequence - self.first_sequence
+        loops, offset = divmod(index, len(self.paths))
+        return loops * sum(self.durations) + sum(self.durations[:offset + 1])
+
+    def capture_start(self, sequence):
+        """Wall-clock time of a segment's first frame (its EXT-X-PROGRAM-DATE-TIME)."""
+        return self.started_wall + (self.nominal_end(sequence) - self.duration(sequence)) / self.speed
+
+    def published_at(self, sequence):
+        """Stream time (seconds since start) at which a segment appears in the playlist."""
+        end = self.nominal_end(sequence)
+        if self.jitter > 0:
+            end += self._segment_rng(sequence, "jitter").uniform(0, self.jitter)
+        return end
+
+    def now(self):
+        return (time.monotonic() - self.started) * self.speed
+
+    def live_sequences(self):
+        """Media sequence numbers currently in the playlist window, oldest first."""
+        now = self.now()
+        # Newest segment whose nominal end has passed (whole loops first, then
+        # the files of the current loop)
+        loops = int(now // sum(self.durations))
+        index = loops * len(self.paths)
+        total = loops * sum(self.durations)
+        while total + self.durations[index % len(self.paths)] <= now:
+            total += self.durations[index % len(self.paths)]
+            index += 1
+        newest = self.first_sequence + index - 1
+
+        # Jittered segments aren't listed until they're late-published, the
+        # window then ends before them
+        while newest >= self.first_sequence and self.published_at(newest) > now:
+            newest -= 1
+        oldest = max(self.first_sequence, newest - self.window + 1)
+        return list(range(oldest, newest + 1))
+
+    # -- responses ----------------------------------------------------------
+
+    def master_playlist(self):
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+        for suffix, variant in self.variants.items():
+            if suffix:
+                lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={variant['bandwidth']},"
+                             f"RESOLUTION={variant['width']}x{variant['height']}")
+                lines.append(f"chunklist_w{self.session}{suffix}.m3u8")
+        return ("\n".join(lines) + "\n").encode()
+
+    def playlist(self, suffix=""):
+        """
+        The playlist body and its validators: ETag (body hash) and Last-Modified
+        (when the newest listed segment was published).
+        """
+        sequences = self.live_sequences()
+        with self.lock:
+            self.stats["playlists"] += 1
+        body = self.render_playlist(sequences, suffix).encode()
+        modified = self.started_wall + (self.published_at(sequences[-1]) / self.speed if sequences else 0)
+        return body, {
+            "ETag": '"' + hashlib.sha1(body).hexdigest()[:16] + '"',
+            "Last-Modified": formatdate(modified, usegmt=True),
+        }
+
+    def render_playlist(self, sequences, suffix=""):
+        target = int(max(self.durations) + 0.999)
+        lines = ["#EXTM3U", "#EXT-X-VERSION:8", f"#EXT-X-TARGETDURATION:{target}",
+                 f"#EXT-X-MEDIA-SEQUENCE:{sequences[0] if sequences else self.first_sequence}"]
+        for sequence in sequences:
+            if self.program_date_time:
+                stamp = datetime.fromtimestamp(self.capture_start(sequence), timezone.utc)
+                lines.append(f"#EXT-X-PROGRAM-DATE-TIME:{stamp.isoformat(timespec='milliseconds')}".replace("+00:00", "Z"))
+            if self.is_gap(sequence):
+                # Listed so the media sequence numbering stays intact, but never downloadable
+                lines.append("#EXT-X-GAP")
+            lines.append(f"#EXTINF:{self.duration(sequence):.3f},")
+            lines.append(f"media_w{self.session}{suffix}_{sequence}.ts")
+        return "\n".join(lines) + "\n"
+
+    def segment(self, sequence, suffix=""):
+        """
+        Segment bytes (of the variant with that suffix), or None if it doesn't
+        exist (yet/any more) or a 404 is injected.
+        """
+        now = self.now()
+        live = self.live_sequences()
+        oldest = (live[0] if live else self.first_sequence) - self.retention
+        with self.lock:
+            if (sequence < max(self.first_sequence, oldest) or self.is_gap(sequence)
+                    or self.published_at(sequence) > now):
+                self.stats["not_found"] += 1
+                return None
+            if self.p404 > 0 and self.request_rng.random() < self.p404:
+                self.stats["injected_404"] += 1
+                return None
+            variant = self.variants[suffix]
+            path = variant["paths"][(sequence - self.first_sequence) % len(self.paths)]
+            if path not in self.cache:
+                with open(path, "rb") as f:
+                    self.cache[path] = f.read()
+            self.stats["segments"] += 1
+            self.stats["bytes"] += len(self.cache[path])
+            label = f"{variant['width']}x{variant['height']}" if suffix else "source"
+            self.stats["variant_bytes"][label] = self.stats["variant_bytes"].get(label, 0) + len(self.cache[path])
+            return self.cache[path]
+
+    def response_delay(self):
+        """Seconds to stall before answering (0 unless a slow response is injected)."""
+        if self.slow <= 0:
+            return 0.0
+        with self.lock:
+            if self.request_rng.random() >= self.slow:
+                return 0.0
+            self.stats["slow"] += 1
+        return self.slow_seconds
+
+    def damaged(self, content):
+        """
+        The segment as served: occasionally with 1 KB zeroed in the middle
+        (corrupt), or only its first third as a complete, smaller file (short).
+        """
+        if self.corrupt <= 0 and self.short <= 0:
+            return content
+        with self.lock:
+            roll = self.request_rng.random()
+            if roll < self.corrupt:
+                self.stats["corrupt"] += 1
+                middle = len(content) // 2
+                return content[:middle] + bytes(1024) + content[middle + 1024:]
+            if roll < self.corrupt + self.short:
+                self.stats["short"] += 1
+                return content[:len(content) // 3 // 188 * 188]
+        return content
+
+    def cut_response(self):
+        """Whether to drop the connection halfway through a segment body."""
+        if self.cut <= 0:
+            return False
+        with self.lock:
+            if self.request_rng.random() >= self.cut:
+                return False
+            self.stats["cut"] += 1
+        return True
+
+
+class OriginServer(ThreadingHTTPServer):
+    """
+    One edge serving an Origin. latency delays every response; while down is
+    set, every request's connection is dropped without an answer.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, handler, latency=0.0):
+        super().__init__(address, handler)
+        self.latency = latency
+        self.down = False
+
+    def handle_error(self, request, client_address):
+        # Clients hang up mid-response on purpose (hedged downloads, cancelled prefetches)
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def make_handler(origin):
+    class OriginHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body=b"", content_type="text/plain", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+
+            if self.server.down:
+                self.close_connection = True
+                return
+
+            if path == "/stats":
+                with origin.lock:
+                    stats = dict(origin.stats)
+                stats["live"] = origin.live_sequences()
+                self._send(200, json.dumps(stats).encode(), "application/json")
+                return
+
+            delay = origin.response_delay() + self.server.latency
+            if delay:
+                time.sleep(delay)
+
+            if MASTER_RE.search(path) and origin.master:
+                self._send(200, origin.master_playlist(), "application/vnd.apple.mpegurl")
+                return
+
+            match = CHUNKLIST_RE.search(path)
+            if match and match["suffix"] in origin.variants:
+                body, validators = origin.playlist(match["suffix"])
+                if not origin.validators:
+                    self._send(200, body, "application/vnd.apple.mpegurl")
+                    return
+                if self._not_modified(validators):
+                    with origin.lock:
+                        origin.stats["not_modified"] += 1
+                    self._send(304, headers=validators)
+                    return
+                self._send(200, body, "application/vnd.apple.mpegurl", validators)
+                return
+
+            match = MEDIA_RE.search(path)
+            if match and match["suffix"] in origin.variants:
+                content = origin.segment(int(match["id"]), match["suffix"])
+                if content is not None:
+                    self._send_segment(origin.damaged(content))
+                    return
+
+            self._send(404, b"Not Found")
+
+        def _send_segment(self, content):
+            status, headers, body = 200, {"Accept-Ranges": "bytes"}, content
+            requested = RANGE_RE.match(self.headers.get("Range", ""))
+            if requested:
+                start = int(requested.group(1))
+                if start >= len(content):
+                    self._send(416, headers={"Content-Range": f"bytes */{len(content)}"})
+                    return
+                status, body = 206, content[start:]
+                headers["Content-Range"] = f"bytes {start}-{len(content) - 1}/{len(content)}"
+
+            if not origin.cut_response():
+                self._send(status, body, "video/MP2T", headers)
+                return
+            # Promise the whole body, send half and hang up
+            self.send_response(status)
+            self.send_header("Content-Type", "video/MP2T")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+
+        def _not_modified(self, validators):
+            # If-None-Match wins over If-Modified-Since (RFC 9110)
+            etag = self.headers.get("If-None-Match")
+            if etag is not None:
+                return etag == validators["ETag"]
+            since = self.headers.get("If-Modified-Since")
+            if since is None:
+                return False
+            try:
+                return parsedate_to_datetime(validators["Last-Modified"]) <= parsedate_to_datetime(since)
+            except (TypeError, ValueError):
+                return False
+
+        def log_message(self, format, *args):
+            pass  # Per-request logging would drown the processor's output
+
+    return OriginHandler
+
+
+def serve(origin, host="127.0.0.1", port=8090, latency=0.0):
+    """Starts the origin on a background thread and returns the server (call .shutdown() to stop)."""
+    server = OriginServer((host, port), make_handler(origin), latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def source_segments(source=None):
+    """Recorded .ts files to replay: --source, else data/raw, else the synthetic fixtures."""
+    if source is None:
+        paths = sorted(glob.glob(os.path.join(DATA_DIR, "raw", "*.ts")))
+        if paths:
+            return paths, os.path.join(DATA_DIR, "raw")
+        from benchmarks.fixtures import make_fixtures
+        return list(make_fixtures().values()), "synthetic fixtures"
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.ts"))), source
+    return [source], source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="Directory of .ts segments (default: data/raw or synthetic fixtures)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--window", type=int, default=3, help="Segments listed in the playlist")
+    parser.add_argument("--speed", type=float, default=1.0, help="Stream clock multiplier (2.0 = twice real time)")
+    parser.add_argument("--first-sequence", type=int, default=1000)
+    parser.add_argument("--p404", type=float, default=0.0, help="Probability a segment request gets a 404")
+    parser.add_argument("--slow", type=float, default=0.0, help="Probability a request is delayed")
+    parser.add_argument("--slow-seconds", type=float, default=3.0)
+    parser.add_argument("--cut", type=float, default=0.0,
+                        help="Probability a segment response is cut off halfway")
+    parser.add_argument("--corrupt", type=float, default=0.0,
+                        help="Probability a segment is served with 1 KB of zeros in the middle")
+    parser.add_argument("--short", type=float, default=0.0,
+                        help="Probability a segment is served as only its first third")
+    parser.add_argument("--gaps", type=float, default=0.0, help="Probability a segment is a gap (listed, never downloadable)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Max seconds a segment is published late")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-program-date-time", action="store_true",
+                        help="Leave EXT-X-PROGRAM-DATE-TIME out of the playlist")
+    parser.add_argument("--no-validators", action="store_true",
+                        help="No ETag/Last-Modified, never answer 304")
+    parser.add_argument("--edges", type=int, default=1, help="Serve the stream on this many consecutive ports")
+    parser.add_argument("--edge-latency", default="",
+                        help="Comma-separated seconds added to each edge's responses, e.g. 0,0.2,1")
+    parser.add_argument("--renditions", default="",
+                        help="Comma-separated heights to list in a master playlist, e.g. 1080,540,360")
+    args = parser.parse_args()
+    latencies = [float(value) for value in args.edge_latency.split(",") if value.strip()]
+    latencies += [0.0] * (args.edges - len(latencies))
+
+    paths, source = source_segments(args.source)
+    origin = Origin(paths, window=args.window, speed=args.speed, first_sequence=args.first_sequence,
+                    p404=args.p404, slow=args.slow, slow_seconds=args.slow_seconds, cut=args.cut,
+                    corrupt=args.corrupt, short=args.short, gaps=args.gaps, jitter=args.jitter, seed=args.seed,
+                    program_date_time=not args.no_program_date_time, validators=not args.no_validators,
+                    renditions=[int(height) for height in args.renditions.split(",") if height.strip()])
+    # Extra edges serve from background threads, the first one from this thread
+    edges = [serve(origin, args.host, args.port + index, latencies[index]) for index in range(1, args.edges)]
+    server = OriginServer((args.host, args.port), make_handler(origin), latency=latencies[0])
+
+    base = f"http://{args.host}:{args.port}/fecnetwork/AbbeyRoadHD1.flv/"
+    base += "playlist.m3u8" if origin.master else "chunklist_w"
+    print(f"📡 Serving {len(paths)} segments from {source} ({sum(origin.durations):.1f}s loop)")
+    print(f"   STREAM_BASE_URL={base}")
+    if origin.master:
+        labels = [f"{variant['width']}x{variant['height']}" for suffix, variant in origin.variants.items() if suffix]
+        print(f"   Renditions: {', '.join(labels)}")
+    if edges:
+        print(f"   STREAM_ORIGINS={','.join(f'{args.host}:{edge.server_address[1]}' for edge in edges)}")
+    print(f"   Stats: http://{args.host}:{args.port}/stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Origin stopped")
+    finally:
+        server.server_close()
+        for edge in edges:
+            edge.shutdown()
+            edge.server_close()
+
+if __name__ == "__main__":
+    main()
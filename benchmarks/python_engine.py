@@ -0,0 +1,114 @@
+"""
+Parity and throughput of the pure NumPy/OpenCV engine (backend/core/python_engine.py).
+
+Parity: every variant (and every smoothing backend of the region variant) is
+rendered by both engines and compared - mean SSIM, worst-frame PSNR and the
+fraction of differing pixels. Exits non-zero if any combination is outside
+the tolerance, so it can gate changes to either engine.
+
+Throughput: ms/frame of the production settings for both engines, so nodes
+without a compiler run at a known speed.
+
+Usage:
+    python -m benchmarks.python_engine [--source data/raw/123.ts] [--frames 10]
+        [--min-ssim 0.99] [--min-psnr 35]
+
+Without the native extension only the Python engine's throughput is reported.
+"""
+import argparse
+import sys
+import time
+
+from backend.core import python_engine
+from benchmarks.common import load_frames, markdown_table, psnr, ssim, summarize_ms, time_call, write_results
+from benchmarks.engine_variants import PIPELINE_KWARGS
+
+# Exercise the optional stages too (off in production)
+PARITY_KWARGS = dict(PIPELINE_KWARGS, edge_blend_factor=0.15, apply_opening=True)
+
+
+def combinations():
+    for variant in python_engine.ENGINE_VARIANTS:
+        backends = python_engine.SMOOTHING_BACKENDS if variant == "region" else ["bilateral"]
+        for backend in backends:
+            yield variant, backend
+
+
+def throughput(engine, frames):
+    engine.process_frame(frames[0], frame_number=0, **PIPELINE_KWARGS)
+    timings = [time_call(engine.process_frame, frame, frame_number=i, **PIPELINE_KWARGS)[1]
+               for i, frame in enumerate(frames)]
+    return summarize_ms(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help=".ts file or directory of frames (default: data/raw or synthetic)")
+    parser.add_argument("--frames", type=int, default=10, help="Number of frames to compare")
+    parser.add_argument("--min-ssim", type=float, default=0.99, help="Lowest acceptable mean SSIM")
+    parser.add_argument("--min-psnr", type=float, default=35.0, help="Lowest acceptable per-frame PSNR (dB)")
+    args = parser.parse_args()
+
+    try:
+        import fast_processor
+    except ImportError:
+        fast_processor = None
+
+    frames, source = load_frames(args.source, args.frames)
+    print(f"🐍 Python engine on {len(frames)} frames from {source}")
+
+    results = {"python_ms": throughput(python_engine, frames)}
+    print(f"  python  {results['python_ms']['p50']:8.2f} ms/frame (p50)")
+
+    if fast_processor is None:
+        print("⚠️  Native engine not built - skipping parity")
+        path = write_results("python_engine", dict(results, generated_at=time.time(), source=source))
+        print(f"💾 Results written to {path}")
+        return
+
+    results["native_ms"] = throughput(fast_processor, frames)
+    print(f"  native  {results['native_ms']['p50']:8.2f} ms/frame (p50)")
+
+    failures = []
+    rows = []
+    results["parity"] = {}
+    for variant, backend in combinations():
+        kwargs = dict(PARITY_KWARGS, engine_variant=variant, smoothing_backend=backend)
+        pairs = [
+            (fast_processor.process_frame(frame, frame_number=i, **kwargs),
+             python_engine.process_frame(frame, frame_number=i, **kwargs))
+            for i, frame in enumerate(frames)
+        ]
+        mean_ssim = sum(ssim(a, b) for a, b in pairs) / len(pairs)
+        min_psnr = min(psnr(a, b) for a, b in pairs)
+        differing = sum(float((a != b).mean()) for a, b in pairs) / len(pairs)
+        ok = mean_ssim >= args.min_ssim and min_psnr >= args.min_psnr
+
+        key = f"{variant}/{backend}"
+        results["parity"][key] = {
+            "ssim": round(mean_ssim, 5),
+            "min_psnr": round(min_psnr, 2) if min_psnr != float("inf") else "inf",
+            "pixels_differing": round(differing, 6),
+            "ok": ok,
+        }
+        rows.append([key, results["parity"][key]["ssim"], results["parity"][key]["min_psnr"],
+                     f"{differing:.4%}", "✅" if ok else "❌"])
+        if not ok:
+            failures.append(key)
+
+    print()
+    print(markdown_table(["variant/backend", "SSIM", "min PSNR", "pixels differing", "parity"], rows))
+    print(f"\nPython engine: {results['python_ms']['p50']} ms/frame vs native {results['native_ms']['p50']} ms/frame "
+          f"({results['python_ms']['p50'] / results['native_ms']['p50']:.1f}x slower)")
+
+    path = write_results("python_engine", dict(results, generated_at=time.time(), source=source,
+                                               tolerance={"min_ssim": args.min_ssim, "min_psnr": args.min_psnr}))
+    print(f"💾 Results written to {path}")
+
+    if failures:
+        print(f"❌ Parity failed for: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
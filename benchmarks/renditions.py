@@ -0,0 +1,176 @@
+"""
+Rendition selection: ingest a master playlist at several working heights and
+compare what each costs up to and including the effect.
+
+Serves the origin emulator with a master playlist of --renditions variants
+(the source scaled down, see fixtures.make_rendition). A baseline phase first
+ingests the source's own chunklist at --baseline-height, as ingest did before
+master playlists. Then the pipeline is pointed at the master and, for each
+--working-heights value in turn, the admin config's working_height is set and
+the ingest loop - chunklist polls and a download of every new segment - runs
+for --phase-seconds. Ingest isn't restarted between these phases, so each
+change is a live rendition switch. The downloaded segments are decoded the way
+the pipeline decodes them, and the effect is timed on --effect-frames frames
+of each phase at that working height.
+
+Reports per phase: the rendition ingested, segments, KB per segment, download
+p50, decode ms per segment and effect ms per frame.
+
+Usage:
+    python -m benchmarks.renditions [--renditions 1080,720,540,360]
+        [--working-heights 1080,540,360] [--baseline-height 540] [--phase-seconds 20] [--speed 3]
+        [--effect-frames 5] [--source data/raw]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+import av
+import httpx
+
+from benchmarks.common import markdown_table, summarize_ms, write_results
+from benchmarks.origin import Origin, serve, source_segments
+
+
+async def ingest(pipeline, client, seconds):
+    """Polls and downloads every new segment for `seconds`; returns [(download ms, content)] of the ones that landed."""
+    async def timed_download(segment_id):
+        start = time.perf_counter()
+        content = await pipeline.download_segment(client, segment_id)
+        pipeline.pending_segments.pop(int(segment_id), None)
+        return (time.perf_counter() - start) * 1000.0, content
+
+    downloads = []
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for segment_id in await pipeline.fetch_new_segments(client):
+            pipeline.recent_segments.appendleft(segment_id)
+            downloads.append(asyncio.ensure_future(timed_download(segment_id)))
+        await asyncio.sleep(min(pipeline.next_poll_delay(), max(0.0, end - time.monotonic())))
+    return [(ms, content) for ms, content in await asyncio.gather(*downloads) if content]
+
+
+def decode(content):
+    """BGR frames of a segment, decoded like process_segment_sync; and the ms it took."""
+    start = time.perf_counter()
+    with av.open(io.BytesIO(content), format="mpegts") as container:
+        frames = [frame.to_ndarray(format="bgr24") for frame in container.decode(container.streams.video[0])]
+    return frames, (time.perf_counter() - start) * 1000.0
+
+
+def effect_ms(frames, settings, count):
+    """ms per frame for the full effect on the first `count` frames."""
+    from backend.core import engine_loader
+    from backend.core.image_processing import get_colors, process_frame_fast_blobs
+
+    _, engine = engine_loader.acquire_engine()
+    edge_color, background_color = get_colors(12, 0)
+    times = []
+    for index, frame in enumerate(frames[:count]):
+        start = time.perf_counter()
+        process_frame_fast_blobs(("0", index, frame, edge_color, background_color, 2024, 1, 1, 12, 0),
+                                 engine=engine, settings=settings)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return summarize_ms(times)["p50"] if times else None
+
+
+async def run_phases(pipeline, admin, args, base_url):
+    results = {}
+    async with httpx.AsyncClient() as client:
+        phases = [("source", args.baseline_height)] + [(str(height), height) for height in args.working_heights]
+        for name, height in phases:
+            if name == "source":
+                pipeline.base_url = base_url + "chunklist_w"
+            elif pipeline.base_url != base_url + "playlist.m3u8":
+                pipeline.base_url = base_url + "playlist.m3u8"
+                pipeline.reset_ingest()
+            admin.current_config = admin.current_config.copy(update={"working_height": height})
+            downloads = await ingest(pipeline, client, args.phase_seconds)
+            rendition = pipeline.selected_rendition
+            results[name] = {"working_height": height, "rendition": rendition.label if rendition else "source",
+                             "downloads": downloads}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renditions", default="1080,720,540,360", help="Comma-separated variant heights")
+    parser.add_argument("--working-heights", default="1080,540,360",
+                        help="Comma-separated working_height values, one phase each")
+    parser.add_argument("--baseline-height", type=int, default=540,
+                        help="working_height for the baseline phase on the source chunklist")
+    parser.add_argument("--phase-seconds", type=float, default=20.0)
+    parser.add_argument("--speed", type=float, default=3.0, help="Stream clock multiplier")
+    parser.add_argument("--effect-frames", type=int, default=5, help="Frames per phase to time the effect on")
+    parser.add_argument("--source", help="Directory of .ts segments (default: data/raw or synthetic fixtures)")
+    parser.add_argument("--port", type=int, default=8095)
+    args = parser.parse_args()
+    args.working_heights = [int(value) for value in args.working_heights.split(",") if value.strip()]
+
+    paths, source = source_segments(args.source)
+    from backend.api import admin
+    from backend.core import metrics, processor
+
+    heights = [int(value) for value in args.renditions.split(",") if value.strip()]
+    print(f"🎚️  Preparing {', '.join(f'{h}p' for h in heights)} variants of {source}...")
+    origin = Origin(paths, window=3, speed=args.speed, renditions=heights)
+    # Start a loop in, so the playlist window is already full
+    origin.started -= sum(origin.durations) / args.speed
+    server = serve(origin, port=args.port)
+
+    base_url = f"http://127.0.0.1:{args.port}/fecnetwork/AbbeyRoadHD1.flv/"
+    # config None: the pipeline follows the admin config each phase sets
+    pipeline = processor.StreamPipeline("renditions", base_url + "chunklist_w")
+    switches_before = metrics.RENDITION_SWITCHES_TOTAL.snapshot(stream=pipeline.id).get("total", 0)
+    config_before = admin.current_config
+
+    print(f"🌐 Ingesting the source chunklist, then the master at working heights "
+          f"{', '.join(map(str, args.working_heights))}, "
+          f"{args.phase_seconds:g}s each at {args.speed:g}x...")
+    try:
+        # The processor logs every request - keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            phases = asyncio.run(run_phases(pipeline, admin, args, base_url))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    rows = []
+    report = {}
+    for name, phase in phases.items():
+        downloads = phase["downloads"]
+        settings = {**config_before.dict(), "working_height": phase["working_height"]}
+        decoded = [decode(content) for _, content in downloads]
+        entry = {
+            "working_height": phase["working_height"],
+            "rendition": phase["rendition"],
+            "segments": len(downloads),
+            "kb_per_segment": round(sum(len(c) for _, c in downloads) / len(downloads) / 1024, 1) if downloads else None,
+            "download_ms": summarize_ms([ms for ms, _ in downloads]) if downloads else None,
+            "decode_ms": summarize_ms([ms for _, ms in decoded]) if decoded else None,
+            "effect_ms_per_frame": effect_ms(decoded[0][0], settings, args.effect_frames) if decoded else None,
+        }
+        report[name] = entry
+        rows.append([name, phase["working_height"], entry["rendition"], entry["segments"], entry["kb_per_segment"] or "-",
+                     entry["download_ms"]["p50"] if downloads else "-",
+                     entry["decode_ms"]["p50"] if decoded else "-", entry["effect_ms_per_frame"] or "-"])
+    admin.current_config = config_before
+
+    switches = metrics.RENDITION_SWITCHES_TOTAL.snapshot(stream=pipeline.id).get("total", 0) - switches_before
+    print()
+    print(markdown_table(["phase", "working height", "rendition", "segments", "KB/segment", "download p50 ms",
+                          "decode p50 ms", "effect ms/frame"], rows))
+    print(f"\n🔀 {switches:g} rendition switches")
+
+    path = write_results("renditions", {
+        "renditions": heights, "speed": args.speed, "phase_seconds": args.phase_seconds,
+        "effect_frames": args.effect_frames, "phases": report, "switches": switches,
+        "origin": dict(origin.stats),
+    })
+    print(f"\n💾 Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
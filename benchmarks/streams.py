@@ -0,0 +1,137 @@
+"""
+Multi-stream processing: run several streams through the full pipeline in one
+process and see how they share the CPU.
+
+Serves the origin emulator and registers streams against it through the
+stream registry (backend/core/streams.py), each with its own StreamPipeline,
+data directory and config. Two phases of --phase-seconds each: one stream
+alone, then --streams streams at once. Every stream runs its real ingest loop
+- polls, downloads, the effect, encode, playlist - and all frame work goes
+through the shared CPU scheduler (backend/core/scheduler.py).
+
+Reports per stream and phase: segments published, publish lag after source
+availability (p50/p95), CPU worker seconds and that stream's share of them.
+--nth sets each stream's process_every_nth_frame (cycled), to give the
+streams different costs.
+
+Usage:
+    python -m benchmarks.streams [--streams 3] [--nth 1,1,2] [--phase-seconds 30]
+        [--speed 1] [--width 640] [--height 360] [--seconds 2] [--source data/raw]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import shutil
+import tempfile
+
+from benchmarks.common import markdown_table, summarize_ms, write_results
+from benchmarks.fixtures import make_fixture
+from benchmarks.origin import Origin, serve, source_segments
+
+
+async def run_phase(streams, admin, metrics, ids, nths, base_url, seconds):
+    """Runs the streams `ids` for `seconds`; returns per-stream results."""
+    busy_before = metrics.SCHEDULER_BUSY_SECONDS_TOTAL.snapshot()
+    registered = []
+    for stream_id, nth in zip(ids, nths):
+        config = admin.StylizationConfig(**{**admin.current_config.dict(), "process_every_nth_frame": nth})
+        stream = streams.add_stream(stream_id, base_url, config=config, save=False)
+        stream.start()
+        registered.append(stream)
+
+    await asyncio.sleep(seconds)
+
+    results = {}
+    for stream, nth in zip(registered, nths):
+        lags = [(timeline["stages"]["published"] - timeline["available"]) * 1000.0
+                for timeline in stream.pipeline.segment_timeline.values() if "published" in timeline["stages"]]
+        results[stream.id] = {"every_nth": nth, "published": len(lags),
+                              "lag_ms": summarize_ms(lags) if lags else None}
+        await streams.remove_stream(stream.id)
+
+    busy = metrics.SCHEDULER_BUSY_SECONDS_TOTAL.snapshot()
+    total = sum(busy.get(stream_id, 0) - busy_before.get(stream_id, 0) for stream_id in ids) or 1.0
+    for stream_id in ids:
+        cpu = busy.get(stream_id, 0) - busy_before.get(stream_id, 0)
+        results[stream_id]["cpu_s"] = round(cpu, 2)
+        results[stream_id]["cpu_share"] = round(cpu / total, 3)
+    return results
+
+
+async def run_phases(args, base_url):
+    from backend.api import admin
+    from backend.core import metrics, processor, streams
+
+    processor.MAX_TIMELINE = 1000  # Keep every segment's timeline for the report
+    ids = [f"cam-{index + 1}" for index in range(args.streams)]
+    nths = [args.nth[index % len(args.nth)] for index in range(args.streams)]
+    return {
+        "alone": await run_phase(streams, admin, metrics, ["alone"], nths[:1], base_url, args.phase_seconds),
+        "together": await run_phase(streams, admin, metrics, ids, nths, base_url, args.phase_seconds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=3)
+    parser.add_argument("--nth", default="1,1,2", help="Comma-separated process_every_nth_frame per stream (cycled)")
+    parser.add_argument("--phase-seconds", type=float, default=30.0)
+    parser.add_argument("--speed", type=float, default=1.0, help="Stream clock multiplier")
+    parser.add_argument("--width", type=int, default=640, help="Synthetic fixture width (without --source)")
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--seconds", type=int, default=2, help="Synthetic fixture segment length")
+    parser.add_argument("--source", help="Directory of .ts segments (default: synthetic fixtures)")
+    parser.add_argument("--port", type=int, default=8096)
+    args = parser.parse_args()
+    args.nth = [int(value) for value in args.nth.split(",") if value.strip()]
+
+    if args.source:
+        paths, source = source_segments(args.source)
+    else:
+        paths = [make_fixture(motion, seconds=args.seconds, width=args.width, height=args.height)
+                 for motion in ("static", "low", "high")]
+        source = f"synthetic {args.width}x{args.height} fixtures"
+    from backend.core import scheduler, streams
+
+    origin = Origin(paths, window=3, speed=args.speed)
+    # Start a loop in, so the playlist window is already full
+    origin.started -= sum(origin.durations) / args.speed
+    server = serve(origin, port=args.port)
+    base_url = f"http://127.0.0.1:{args.port}/fecnetwork/AbbeyRoadHD1.flv/chunklist_w"
+
+    # Scratch registry: nothing saved, no data under data/streams
+    scratch = tempfile.mkdtemp(prefix="streams-")
+    streams.STREAMS_PATH = f"{scratch}/streams.json"
+    streams.STREAMS_DIR = scratch
+
+    print(f"📺 1 stream, then {args.streams} streams (every nth {', '.join(map(str, args.nth))}) of {source} "
+          f"at {args.speed:g}x, {args.phase_seconds:g}s each, {scheduler.CPU_WORKERS} CPU workers...")
+    try:
+        # The processors log every segment - keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            phases = asyncio.run(run_phases(args, base_url))
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    rows = []
+    for phase, results in phases.items():
+        for stream_id, result in results.items():
+            lag = result["lag_ms"] or {"p50": "-", "p95": "-"}
+            rows.append([phase, stream_id, result["every_nth"], result["published"], lag["p50"], lag["p95"],
+                         result["cpu_s"], f"{result['cpu_share']:.0%}"])
+    print()
+    print(markdown_table(["phase", "stream", "every nth", "published", "lag p50 ms", "lag p95 ms",
+                          "CPU s", "CPU share"], rows))
+
+    path = write_results("streams", {
+        "streams": args.streams, "nth": args.nth, "speed": args.speed, "phase_seconds": args.phase_seconds,
+        "source": source, "cpu_workers": scheduler.CPU_WORKERS, "phases": phases, "origin": dict(origin.stats),
+    })
+    print(f"\n💾 Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
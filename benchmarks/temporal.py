@@ -0,0 +1,74 @@
+"""
+Benchmark temporal subsampling: full effect on every Nth frame, skipped frames
+rebuilt by hold / blend / flow.
+
+Reports segment render time (effect + reconstruction) and SSIM of every mode
+against rendering all frames, for N = 1..4.
+
+Usage:
+    python -m benchmarks.temporal [--source data/raw/123.ts] [--frames 60]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.core import temporal
+from backend.core.image_processing import get_colors, process_frame_fast_blobs
+from benchmarks.common import load_frames, markdown_table, ssim, write_results
+
+
+def render_all(frames, every_nth, mode, executor):
+    edge_color, background_color = get_colors(12, 0)
+    frame_data = [
+        ("0", i, frame, edge_color, background_color, 2024, 1, 1, 12, 0) for i, frame in enumerate(frames)
+    ]
+    start = time.perf_counter()
+    outputs, keyframes = temporal.render_segment(
+        frames, lambda index: process_frame_fast_blobs(frame_data[index]), every_nth, mode, executor
+    )
+    return outputs, keyframes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help=".ts file or directory of frames (default: data/raw or synthetic)")
+    parser.add_argument("--frames", type=int, default=60, help="Number of frames per run")
+    parser.add_argument("--workers", type=int, default=4, help="Thread pool size")
+    args = parser.parse_args()
+
+    frames, source = load_frames(args.source, args.frames)
+    print(f"⏱️  Temporal subsampling on {len(frames)} frames from {source}")
+
+    results = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        reference, _, full_time = render_all(frames, 1, "hold", executor)
+        results.append({"every_nth": 1, "mode": "-", "keyframes": len(frames),
+                        "seconds": round(full_time, 3), "speedup": 1.0, "ssim_vs_full": 1.0})
+
+        for every_nth in (2, 3, 4):
+            for mode in temporal.TEMPORAL_MODES:
+                outputs, keyframes, elapsed = render_all(frames, every_nth, mode, executor)
+                similarity = sum(ssim(ref, out) for ref, out in zip(reference, outputs)) / len(outputs)
+                results.append({
+                    "every_nth": every_nth,
+                    "mode": mode,
+                    "keyframes": keyframes,
+                    "seconds": round(elapsed, 3),
+                    "speedup": round(full_time / elapsed, 2),
+                    "ssim_vs_full": round(similarity, 4),
+                })
+                print(f"  N={every_nth} {mode:5s} {elapsed:6.2f}s  SSIM {similarity:.4f}")
+
+    print()
+    print(markdown_table(
+        ["N", "mode", "full-effect frames", "seconds", "speedup", "SSIM vs all frames"],
+        [[r["every_nth"], r["mode"], r["keyframes"], r["seconds"], f"{r['speedup']}x", r["ssim_vs_full"]]
+         for r in results]
+    ))
+
+    path = write_results("temporal", {"generated_at": time.time(), "source": source, "results": results})
+    print(f"\n💾 Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
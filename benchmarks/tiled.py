@@ -0,0 +1,134 @@
+"""
+Benchmark tiled (intra-frame parallel) execution against whole-frame execution.
+
+For each tile size it reports ms/frame with one frame in flight (latency, where
+tiling matters most) and frames/sec with several frames in flight (throughput),
+plus how close the tiled output is to the whole-frame output. Then it checks
+tiled against whole-frame output for every oil painting variant and smoothing
+backend, with painterly edges on, on the first --exactness-frames frames.
+
+Usage:
+    python -m benchmarks.tiled [--source data/raw/123.ts] [--frames 30]
+        [--tile-sizes 64 128 256] [--in-flight 4] [--exactness-frames 3]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.common import load_frames, markdown_table, psnr, ssim, summarize_ms, time_call, write_results
+from benchmarks.engine_variants import PIPELINE_KWARGS
+
+
+def render_all(engine, frames, **kwargs):
+    outputs, timings = [], []
+    for i, frame in enumerate(frames):
+        out, elapsed = time_call(engine.process_frame, frame, frame_number=i, **kwargs)
+        outputs.append(out)
+        timings.append(elapsed)
+    return outputs, timings
+
+
+def throughput(engine, frames, in_flight, **kwargs):
+    """Frames/sec with in_flight frames rendering concurrently (the engine releases the GIL)."""
+    with ThreadPoolExecutor(max_workers=in_flight) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda i: engine.process_frame(frames[i], frame_number=i, **kwargs), range(len(frames))))
+        return len(frames) / (time.perf_counter() - start)
+
+
+def exactness(engine, frames, tile_size):
+    """
+    Share of output pixels where tiled and whole-frame differ, per variant (and
+    backend for region, at quality 1 too - the 1/4 resolution smoothing grid).
+    """
+    combos = [(variant, backend, quality) for variant in engine.engine_variants()
+              for backend in (engine.smoothing_backends() if variant == "region" else ["bilateral"])
+              for quality in ((2, 1) if variant == "region" and backend != "bilateral" else (2,))]
+    results = {}
+    for variant, backend, quality in combos:
+        kwargs = dict(PIPELINE_KWARGS, engine_variant=variant, smoothing_backend=backend, smoothing_quality=quality,
+                      edge_blend_factor=0.3)
+        differing = [
+            float(np.mean(engine.process_frame(frame, frame_number=i, **kwargs)
+                          != engine.process_frame(frame, frame_number=i, tiled=True, tile_size=tile_size, **kwargs)))
+            for i, frame in enumerate(frames)
+        ]
+        results[f"{variant}/{backend}" + (f"/q{quality}" if quality != 2 else "")] = round(max(differing), 6)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help=".ts file or directory of frames (default: data/raw or synthetic)")
+    parser.add_argument("--frames", type=int, default=30, help="Number of frames to benchmark")
+    parser.add_argument("--tile-sizes", type=int, nargs="*", default=[64, 128, 256])
+    parser.add_argument("--in-flight", type=int, default=4, help="Concurrent frames for the throughput run")
+    parser.add_argument("--exactness-frames", type=int, default=3,
+                        help="Frames to compare tiled and whole-frame output on, per variant")
+    args = parser.parse_args()
+
+    import fast_processor
+
+    frames, source = load_frames(args.source, args.frames)
+    print(f"🧱 Tiled execution on {len(frames)} frames from {source}")
+
+    # Warm up thread pools and allocations
+    fast_processor.process_frame(frames[0], frame_number=0, **PIPELINE_KWARGS)
+    fast_processor.process_frame(frames[0], frame_number=0, tiled=True, **PIPELINE_KWARGS)
+
+    reference, timings = render_all(fast_processor, frames, **PIPELINE_KWARGS)
+    results = {
+        "whole_frame": {
+            "ms_per_frame": summarize_ms(timings),
+            "fps_in_flight": round(throughput(fast_processor, frames, args.in_flight, **PIPELINE_KWARGS), 2),
+        }
+    }
+
+    for tile_size in args.tile_sizes:
+        kwargs = dict(PIPELINE_KWARGS, tiled=True, tile_size=tile_size)
+        outputs, timings = render_all(fast_processor, frames, **kwargs)
+        results[f"tiled_{tile_size}"] = {
+            "ms_per_frame": summarize_ms(timings),
+            "fps_in_flight": round(throughput(fast_processor, frames, args.in_flight, **kwargs), 2),
+            "ssim_vs_whole": round(sum(ssim(r, o) for r, o in zip(reference, outputs)) / len(frames), 4),
+            "psnr_vs_whole": round(min(psnr(r, o) for r, o in zip(reference, outputs)), 2),
+            "pixels_differing": round(float(np.mean([np.mean(r != o) for r, o in zip(reference, outputs)])), 5),
+        }
+        print(f"  tile {tile_size:4d}: {results[f'tiled_{tile_size}']['ms_per_frame']['p50']:8.2f} ms/frame (p50)")
+
+    rows = []
+    for mode, r in results.items():
+        rows.append([
+            mode,
+            r["ms_per_frame"]["p50"],
+            r["ms_per_frame"]["p95"],
+            r["fps_in_flight"],
+            r.get("ssim_vs_whole", 1.0),
+            r.get("pixels_differing", 0.0),
+        ])
+    print()
+    print(markdown_table(
+        ["mode", "p50 ms/frame", "p95 ms/frame", f"fps ({args.in_flight} in flight)", "SSIM vs whole", "pixels differing"],
+        rows
+    ))
+
+    exact = exactness(fast_processor, frames[:args.exactness_frames], args.tile_sizes[0])
+    print()
+    print(markdown_table(["variant/backend", f"pixels differing (tile {args.tile_sizes[0]})"],
+                         [[combo, differing] for combo, differing in exact.items()]))
+
+    path = write_results("tiled", {
+        "generated_at": time.time(),
+        "source": source,
+        "frame_shape": list(frames[0].shape),
+        "in_flight": args.in_flight,
+        "modes": results,
+        "exactness": exact,
+    })
+    print(f"\n💾 Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
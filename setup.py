@@ -1,8 +1,13 @@
 from setuptools import setup, Extension
 import pybind11
+import os
 import subprocess
 import sys
 
+# Overridden by backend/core/engine_loader.py for versioned hot-swap builds
+ENGINE_MODULE_NAME = os.environ.get('ENGINE_MODULE_NAME', 'fast_processor')
+ENGINE_SOURCE = os.environ.get('ENGINE_SOURCE', 'backend/core/fast_processor.cpp')
+
 # Get OpenCV paths using pkg-config
 def get_opencv_flags():
     try:
@@ -20,13 +25,13 @@ def get_opencv_flags():
             # Common macOS homebrew paths
             return (
                 ['-I/opt/homebrew/include/opencv4', '-I/usr/local/include/opencv4'],
-                ['-L/opt/homebrew/lib', '-L/usr/local/lib', '-lopencv_core', '-lopencv_imgproc']
+                ['-L/opt/homebrew/lib', '-L/usr/local/lib', '-lopencv_core', '-lopencv_imgproc', '-lopencv_video']
             )
 
 cflags, libs = get_opencv_flags()
 
 # Parse flags
-include_dirs = [pybind11.get_include()]
+include_dirs = [pybind11.get_include(), 'backend/core']
 library_dirs = []
 libraries = []
 extra_compile_args = ['-std=c++14', '-O3']
@@ -48,8 +53,10 @@ for flag in libs:
 
 ext_modules = [
     Extension(
-        'fast_processor',
-        ['backend/core/fast_processor.cpp'],
+        ENGINE_MODULE_NAME,
+        [ENGINE_SOURCE, 'backend/core/fast_oil_painting.cpp', 'backend/core/smoothing.cpp',
+         'backend/core/incremental.cpp', 'backend/core/background.cpp', 'backend/core/profiling.cpp'],
+        define_macros=[('ENGINE_MODULE_NAME', ENGINE_MODULE_NAME)],
         include_dirs=include_dirs,
         library_dirs=library_dirs,
         libraries=libraries,
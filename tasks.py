@@ -1,7 +1,6 @@
 from celery import Celery
 from concurrent.futures import ThreadPoolExecutor
 import os
-import requests
 import m3u8
 import shutil
 import time
@@ -16,6 +15,7 @@ from io import BytesIO
 
 # Import processing functions from separate file
 from image_processing import get_colors, process_frame_fast_blobs
+from backend.core.http_client import get_sync_client
 
 load_dotenv(override=True)
 
@@ -49,7 +49,7 @@ def fetch_new_segment():
             'sec-ch-ua-mobile': '?0',
             'sec-ch-ua-platform': '"macOS"'
         }
-    m3u8_response = requests.get(f"https://videos-3.earthcam.com/fecnetwork/AbbeyRoadHD1.flv/chunklist_w{int(time.time())}.m3u8", headers=headers)
+    m3u8_response = get_sync_client("tasks").get(f"https://videos-3.earthcam.com/fecnetwork/AbbeyRoadHD1.flv/chunklist_w{int(time.time())}.m3u8", headers=headers)
     playlist = m3u8.loads(m3u8_response.text)
     if playlist.segments:
         new_segment = playlist.segments[0].uri.split('_')[-1].split('.')[0]
@@ -116,7 +116,7 @@ def download_segment(segment, max_retries=3, delay=.2):
                     'sec-ch-ua-mobile': '?0',
                     'sec-ch-ua-platform': '"macOS"'
                 }
-                response = requests.get(
+                response = get_sync_client("tasks").get(
                     f"https://videos-3.earthcam.com/fecnetwork/AbbeyRoadHD1.flv/media_w{int(time.time())}_{segment}.ts",
                     headers=headers
                 )
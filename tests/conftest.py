@@ -0,0 +1,22 @@
+import av
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="session")
+def ts_segment(tmp_path_factory):
+    """A 1 s, 30 fps, 64x48 H.264 MPEG-TS segment (bytes)."""
+    path = tmp_path_factory.mktemp("ts") / "segment.ts"
+    with av.open(str(path), mode="w", format="mpegts") as container:
+        stream = container.add_stream("libx264", rate=30)
+        stream.width = 64
+        stream.height = 48
+        stream.pix_fmt = "yuv420p"
+        stream.options = {"preset": "veryfast", "threads": "1"}
+        for i in range(30):
+            image = np.full((48, 64, 3), (i * 8) % 256, dtype=np.uint8)
+            for packet in stream.encode(av.VideoFrame.from_ndarray(image, format="bgr24")):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+    return path.read_bytes()
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from backend.core import dedup
+
+
+def frame(value, noise=0.0, seed=0):
+    image = np.full((36, 64, 3), value, dtype=np.float32)
+    if noise:
+        image += np.random.default_rng(seed).normal(0, noise, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def test_exact_repeats_point_at_the_first_of_a_run():
+    frames = [frame(10), frame(10), frame(10), frame(50), frame(50), frame(10)]
+    assert dedup.find_duplicates(frames, "exact") == [None, 0, 0, None, 3, None]
+
+
+def test_off_renders_everything():
+    frames = [frame(10), frame(10)]
+    assert dedup.find_duplicates(frames, "off") == [None, None]
+
+
+def test_perceptual_tolerates_noise_but_not_drift():
+    noisy = [frame(100, noise=1.0, seed=i) for i in range(3)]
+    assert dedup.find_duplicates(noisy, "exact") == [None, None, None]
+    assert dedup.find_duplicates(noisy, "perceptual", threshold=1.0) == [None, 0, 0]
+    # Each step is within the threshold, but the run is compared with its first frame
+    drifting = [frame(100), frame(101), frame(102), frame(103)]
+    assert dedup.find_duplicates(drifting, "perceptual", threshold=1.0) == [None, 0, None, 2]
+
+
+def test_decode_fingerprints_are_used():
+    frames = [frame(10), frame(20)]
+    same = dedup.fingerprint(frame(10), "exact")
+    assert dedup.find_duplicates(frames, "exact", fingerprints=[same, same]) == [None, 0]
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        dedup.find_duplicates([frame(0)], "fuzzy")
+
+
+def test_expand_shares_outputs():
+    outputs = dedup.expand(["a", "b"], [None, 0, 0, None, 3])
+    assert outputs == ["a", "a", "a", "b", "b"]
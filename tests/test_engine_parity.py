@@ -0,0 +1,48 @@
+"""
+Python engine parity with the C++ extension. Skipped when fast_processor
+isn't built (make build-cpp) - test_python_engine.py covers the Python
+engine on its own.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from backend.core import python_engine
+
+fast_processor = pytest.importorskip("fast_processor")
+
+
+@pytest.fixture(scope="module")
+def frame():
+    # Smooth noise with hard-edged blocks: gradients for the smoothing, edges for Canny
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (180, 320, 3), dtype=np.uint8), (0, 0), 2)
+    rows, cols = np.mgrid[0:180, 0:320]
+    image[(cols // 40 + rows // 30) % 2 == 0] //= 3
+    return image
+
+
+def assert_close(actual, expected):
+    assert actual.shape == expected.shape and actual.dtype == expected.dtype
+    diff = np.abs(actual.astype(np.int16) - expected.astype(np.int16))
+    # Float rounding differs between NumPy and the C++ loops by a level at most
+    assert diff.mean() < 0.25
+    assert (diff > 1).mean() < 0.01
+
+
+@pytest.mark.parametrize("backend", python_engine.smoothing_backends())
+@pytest.mark.parametrize("quality", [1, 2, 3])
+def test_smooth_matches_extension(frame, backend, quality):
+    assert_close(python_engine.smooth(frame, backend, quality), fast_processor.smooth(frame, backend, quality))
+
+
+@pytest.mark.parametrize("variant", python_engine.engine_variants())
+def test_oil_paint_matches_extension(frame, variant):
+    assert_close(python_engine.oil_paint(frame, variant), fast_processor.oil_paint(frame, variant))
+
+
+@pytest.mark.parametrize("variant", python_engine.engine_variants())
+@pytest.mark.parametrize("backend", ["bilateral", "domain_transform"])
+def test_process_frame_matches_extension(frame, variant, backend):
+    settings = dict(frame_number=3, engine_variant=variant, smoothing_backend=backend, edge_blend_factor=0.3)
+    assert_close(python_engine.process_frame(frame, **settings), fast_processor.process_frame(frame, **settings))
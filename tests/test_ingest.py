@@ -0,0 +1,170 @@
+"""
+Chunklist polling and publishing in StreamPipeline: diffing by media sequence
+(backfill), missed and gap segments, EXT-X-PROGRAM-DATE-TIME timelines and
+live-edge lag, and in-order publishing behind a backfill.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from backend.core import metrics
+from backend.core.processor import StreamPipeline
+
+BASE_URL = "http://origin.test/fecnetwork/AbbeyRoadHD1.flv/chunklist_w"
+
+
+def chunklist(media_sequence, segment_ids, program_date_time=None, gap=None):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:6", f"#EXT-X-MEDIA-SEQUENCE:{media_sequence}"]
+    for index, segment_id in enumerate(segment_ids):
+        if program_date_time is not None:
+            stamp = datetime.fromtimestamp(program_date_time + 6 * index, timezone.utc)
+            lines.append(f"#EXT-X-PROGRAM-DATE-TIME:{stamp.isoformat().replace('+00:00', 'Z')}")
+        if segment_id == gap:
+            lines.append("#EXT-X-GAP")
+        lines += ["#EXTINF:6.0,", f"media_w123_{segment_id}.ts"]
+    return "\n".join(lines) + "\n"
+
+
+class Source:
+    """Serves whatever chunklist the test sets."""
+
+    def __init__(self):
+        self.text = ""
+        self.requests = []
+
+    def handle(self, request):
+        self.requests.append(request)
+        return httpx.Response(200, text=self.text)
+
+
+def poll(pipeline, source, *texts):
+    """Polls once per chunklist text; returns each poll's new segment ids."""
+    async def run():
+        results = []
+        async with httpx.AsyncClient(transport=httpx.MockTransport(source.handle)) as client:
+            for text in texts:
+                source.text = text
+                results.append(await pipeline.fetch_new_segments(client))
+        return results
+    return asyncio.run(run())
+
+
+def make_pipeline(tmp_path, stream_id):
+    return StreamPipeline(stream_id, BASE_URL, data_dir=str(tmp_path))
+
+
+def test_first_poll_backfills_the_window_then_diffs(tmp_path):
+    pipeline = make_pipeline(tmp_path, "ingest-diff")
+    first, second, unchanged = poll(
+        pipeline, Source(),
+        chunklist(10, [1000, 1001, 1002]),
+        chunklist(11, [1001, 1002, 1003]),
+        chunklist(11, [1001, 1002, 1003]),
+    )
+    # Oldest first: the last one is the live edge, the rest are backfill
+    assert first == ["1000", "1001", "1002"]
+    assert second == ["1003"]
+    assert unchanged == []
+    assert pipeline.last_media_sequence == 13
+    assert sorted(pipeline.pending_segments) == [1000, 1001, 1002, 1003]
+    assert pipeline.live_edge_id == "1003"
+
+
+def test_failed_poll_moves_to_the_next_origin(tmp_path):
+    pipeline = StreamPipeline("ingest-failover", BASE_URL, ["backup.test"], data_dir=str(tmp_path))
+    source = Source()
+
+    def handle(request):
+        if request.url.host == "origin.test":
+            return httpx.Response(503)
+        return source.handle(request)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+            source.text = chunklist(10, [1000, 1001])
+            return await pipeline.fetch_new_segments(client)
+
+    assert asyncio.run(run()) == ["1000", "1001"]
+    assert metrics.ORIGIN_FAILOVERS_TOTAL.snapshot(stream="ingest-failover") == {"playlist": 1}
+    assert pipeline.get_origin_pool().ranked()[0].host == "backup.test"
+
+
+def test_segments_that_left_the_window_are_counted_missed(tmp_path):
+    pipeline = make_pipeline(tmp_path, "ingest-missed")
+    _, late = poll(pipeline, Source(), chunklist(10, [1000, 1001, 1002]), chunklist(15, [1005, 1006, 1007]))
+    # Sequence 13 and 14 (1003, 1004) were never listed to us
+    assert late == ["1005", "1006", "1007"]
+    assert metrics.SEGMENTS_MISSED_TOTAL.snapshot(stream="ingest-missed") == {"out_of_window": 2}
+
+
+def test_gap_segments_are_skipped(tmp_path):
+    pipeline = make_pipeline(tmp_path, "ingest-gap")
+    [segments] = poll(pipeline, Source(), chunklist(10, [1000, 1001, 1002], gap=1001))
+    assert segments == ["1000", "1002"]
+    assert metrics.SEGMENTS_MISSED_TOTAL.snapshot(stream="ingest-gap") == {"source_gap": 1}
+
+
+def test_source_restart_starts_over(tmp_path):
+    pipeline = make_pipeline(tmp_path, "ingest-restart")
+    _, restarted = poll(pipeline, Source(), chunklist(500, [1000, 1001]), chunklist(0, [2000, 2001]))
+    assert restarted == ["2000", "2001"]
+    assert pipeline.last_media_sequence == 1
+
+
+def test_program_date_time_sets_availability(tmp_path):
+    pipeline = make_pipeline(tmp_path, "ingest-pdt")
+    captured = time.time() - 30.0
+    poll(pipeline, Source(), chunklist(10, [1000, 1001], program_date_time=captured))
+
+    timeline = pipeline.segment_timeline["1001"]
+    assert timeline["availability_source"] == "program_date_time"
+    assert abs(timeline["capture_start"] - (captured + 6)) < 0.01
+    # Complete at the source once its 6 s were captured
+    assert abs(timeline["available"] - (captured + 12)) < 0.01
+    stamp = datetime.fromtimestamp(captured + 6, timezone.utc).isoformat(timespec="milliseconds")
+    assert pipeline.playlist_entry(1001) == \
+        f"#EXT-X-PROGRAM-DATE-TIME:{stamp.replace('+00:00', 'Z')}\n#EXTINF:6.000,\n"
+
+
+def test_without_program_date_time_first_seen_is_used(tmp_path):
+    pipeline = make_pipeline(tmp_path, "ingest-no-pdt")
+    before = time.time()
+    poll(pipeline, Source(), chunklist(10, [1000]))
+    timeline = pipeline.segment_timeline["1000"]
+    assert timeline["availability_source"] == "first_seen"
+    assert before <= timeline["available"] <= time.time()
+
+
+def test_publishing_records_live_edge_lag(tmp_path):
+    pipeline = make_pipeline(tmp_path, "ingest-lag")
+    poll(pipeline, Source(), chunklist(10, [1000], program_date_time=time.time() - 20.0))
+    pipeline.record_published(1000)
+    # Captured 20 s ago, complete 14 s ago
+    assert 13.5 < pipeline.last_live_edge_lag < 15.0
+    assert metrics.LIVE_EDGE_LAG_SECONDS.quantiles(stream="ingest-lag")["total"]["count"] == 1
+    assert metrics.SEGMENTS_TOTAL.snapshot(stream="ingest-lag") == {"published": 1}
+
+
+def test_ready_segments_wait_for_an_older_backfill(tmp_path):
+    pipeline = make_pipeline(tmp_path, "ingest-hold")
+    pipeline.ready_segments.extend([1001, 1002, 1003])
+    pipeline.pending_segments[1000] = time.time()  # Still being backfilled
+    assert asyncio.run(pipeline.generate_m3u8_playlist()) is False
+
+    # Once it's ready, everything goes out in order
+    del pipeline.pending_segments[1000]
+    pipeline.ready_segments.append(1000)
+    assert asyncio.run(pipeline.generate_m3u8_playlist()) is True
+    assert pipeline.published_window == [1000, 1001, 1002, 1003]
+    playlist = (tmp_path / "current_playlist.m3u8").read_text()
+    assert playlist.index("1000.ts") < playlist.index("1003.ts")
+
+
+def test_a_stale_backfill_hold_expires(tmp_path):
+    pipeline = make_pipeline(tmp_path, "ingest-expire")
+    pipeline.ready_segments.extend([1001, 1002, 1003])
+    pipeline.pending_segments[1000] = time.time() - 60.0  # Queued long past BACKFILL_HOLD_SECONDS
+    assert asyncio.run(pipeline.generate_m3u8_playlist()) is True
+    assert pipeline.published_window == [1001, 1002, 1003]
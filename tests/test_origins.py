@@ -0,0 +1,68 @@
+from backend.core import origins
+from backend.core.origins import OriginPool, origin_urls
+
+BASE = "https://videos-3.earthcam.com/fecnetwork/AbbeyRoadHD1.flv/chunklist_w"
+
+
+def test_origin_urls_keep_the_path():
+    urls = origin_urls(BASE, ["videos-1.earthcam.com", "http://127.0.0.1:8091", "videos-3.earthcam.com"])
+    assert urls == [
+        BASE,
+        "https://videos-1.earthcam.com/fecnetwork/AbbeyRoadHD1.flv/chunklist_w",
+        "http://127.0.0.1:8091/fecnetwork/AbbeyRoadHD1.flv/chunklist_w",
+    ]
+
+
+def test_faster_origin_ranks_first():
+    pool = OriginPool(origin_urls(BASE, ["fast.example", "slow.example"]))
+    primary, fast, slow = pool.origins
+    pool.record_success(primary, 0.3)
+    pool.record_success(fast, 0.05)
+    pool.record_success(slow, 1.0)
+    assert [origin.host for origin in pool.ranked()] == ["fast.example", primary.host, "slow.example"]
+
+
+def test_errors_move_traffic_to_the_next_origin():
+    pool = OriginPool(origin_urls(BASE, ["backup.example"]))
+    primary, backup = pool.origins
+    pool.record_success(primary, 0.1)
+    pool.record_success(backup, 0.15)
+    assert pool.ranked()[0] is primary
+    pool.record_failure(primary)
+    # One failure in five requests doubles the score: 0.1 * (1 + 10 * 0.2) > 0.15
+    assert pool.ranked()[0] is backup
+
+
+def test_repeated_failures_bench_an_origin():
+    pool = OriginPool(origin_urls(BASE, ["slow.example"]))
+    primary, slow = pool.origins
+    pool.record_success(slow, 5.0)
+    for _ in range(origins.BENCH_AFTER_FAILURES):
+        pool.record_failure(primary)
+    assert primary.benched_until > 0
+    assert pool.ranked()[-1] is primary
+    assert pool.snapshot()[-1]["benched_s"] > 0
+
+    # A success clears the failure streak; the bench expires on its own
+    pool.record_success(primary, 0.1)
+    assert primary.consecutive_failures == 0
+
+
+def test_bench_doubles_up_to_the_maximum():
+    pool = OriginPool([BASE])
+    origin = pool.origins[0]
+    lengths = []
+    for _ in range(origins.BENCH_AFTER_FAILURES + 6):
+        pool.record_failure(origin)
+        lengths.append(round(origin.benched_until - origin.last_sampled, 1))
+    benched = lengths[origins.BENCH_AFTER_FAILURES - 1:]
+    assert benched[:3] == [origins.BENCH_SECONDS, origins.BENCH_SECONDS * 2, origins.BENCH_SECONDS * 4]
+    assert benched[-1] == origins.MAX_BENCH_SECONDS
+
+
+def test_idle_origins_are_probed_once():
+    pool = OriginPool(origin_urls(BASE, ["a.example", "b.example"]))
+    due = pool.due_for_probe()
+    # Everything but the best origin, then nothing until PROBE_SECONDS pass
+    assert len(due) == 2 and pool.ranked()[0] not in due
+    assert pool.due_for_probe() == []
@@ -0,0 +1,82 @@
+"""
+The Python engine on its own - runs without a compiler. Outputs are checked
+against the checked-in goldens (benchmarks/golden/outputs/python) with the
+golden check's tolerance; test_engine_parity.py compares it with the C++ build.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from backend.core import python_engine
+from benchmarks import golden
+from benchmarks.common import psnr, ssim
+
+FRAMES = golden.load_reference_frames()
+
+
+@pytest.mark.parametrize("config", list(golden.CONFIGS))
+def test_matches_goldens(config):
+    tolerance = dict(golden.DEFAULT_TOLERANCE, **golden.load_manifest().get("tolerance", {}))
+    scores = []
+    for index, (frame_name, frame) in enumerate(FRAMES):
+        expected = cv2.imread(golden.golden_path("python", config, frame_name))
+        assert expected is not None, f"missing golden python/{config}/{frame_name}"
+        output = golden.render(python_engine, frame, index, config)
+        assert output.shape == expected.shape and output.dtype == np.uint8
+        scores.append((ssim(expected, output), psnr(expected, output)))
+    assert sum(s for s, _ in scores) / len(scores) >= tolerance["min_ssim"]
+    assert min(p for _, p in scores) >= tolerance["min_psnr"]
+
+
+@pytest.mark.parametrize("levels", [2, 8, 16])
+def test_quantize_lut(levels):
+    lut = python_engine._quantize_lut(levels)
+    step = np.float32(255.0) / np.float32(levels - 1)
+    assert lut.dtype == np.uint8 and lut.shape == (256,)
+    # The top level is truncated: (levels - 1) * step can land just under 255
+    assert lut[0] == 0 and lut[255] >= 254
+    assert np.all(np.diff(lut.astype(int)) >= 0)
+    assert len(np.unique(lut)) == levels
+    # floor(v / step + 0.5) * step, truncated
+    for value in (0, 17, 100, 128, 200, 254):
+        assert lut[value] == int(np.floor(np.float32(value) / step + np.float32(0.5)) * step)
+
+
+@pytest.mark.parametrize("factor", [0.0, 0.15, 1.0, 2.0])
+def test_edge_scale_lut(factor):
+    lut = python_engine._edge_scale_lut(factor)
+    expected = np.minimum(np.arange(256) * np.float32(factor), 255).astype(np.uint8)
+    assert np.array_equal(lut, expected)
+    assert lut.max() <= 255 and lut[0] == 0
+
+
+def test_posterize_lut_rounds_half_away_from_zero():
+    lut = python_engine._posterize_lut(3)  # step 127.5: 0, 127/128, 255
+    assert set(np.unique(lut)) == {0, 128, 255}
+    assert lut[63] == 0 and lut[64] == 128 and lut[191] == 128 and lut[192] == 255
+
+
+def test_region_lut_snaps_to_band_centres():
+    lut = python_engine._region_lut(16)  # max(6, 8) = 8 bands of 32
+    assert np.array_equal(np.unique(lut), np.arange(8) * 32 + 16)
+    assert lut[0] == 16 and lut[31] == 16 and lut[32] == 48 and lut[255] == 240
+
+
+def test_profile_is_per_call():
+    frame = FRAMES[0][1]
+    python_engine.take_thread_profile()
+    python_engine.process_frame(frame, frame_number=0, profile=True)
+    profile = python_engine.take_thread_profile()
+    assert profile["frames"] == 1 and {"total", "oil_paint", "quantize"} <= set(profile["ops"])
+    python_engine.process_frame(frame, frame_number=0, profile=False)
+    assert python_engine.take_thread_profile()["frames"] == 0
+
+
+def test_rejects_unknown_settings():
+    frame = FRAMES[0][1]
+    with pytest.raises(ValueError):
+        python_engine.process_frame(frame, frame_number=0, engine_variant="nope")
+    with pytest.raises(ValueError):
+        python_engine.process_frame(frame, frame_number=0, smoothing_backend="nope")
+    with pytest.raises(ValueError):
+        python_engine.process_frame(frame[:, :, 0], frame_number=0)
@@ -0,0 +1,52 @@
+import pytest
+
+from backend.core.renditions import choose_rendition, is_master_url, parse_master
+
+MASTER_URL = "https://videos-3.earthcam.com/fecnetwork/AbbeyRoadHD1.flv/playlist.m3u8"
+MASTER = """#EXTM3U
+#EXT-X-VERSION:3
+#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080
+chunklist_w123_b5000000.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=1200000,RESOLUTION=960x540
+chunklist_w123_b1200000.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=600000,RESOLUTION=640x360
+chunklist_w123_b600000.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=300000,RESOLUTION=426x240
+other/variant_240.m3u8
+"""
+
+
+def test_is_master_url():
+    assert is_master_url(MASTER_URL)
+    assert not is_master_url("https://videos-3.earthcam.com/fecnetwork/AbbeyRoadHD1.flv/chunklist_w")
+
+
+def test_parse_master_lists_chunklist_variants_smallest_first():
+    renditions = parse_master(MASTER, MASTER_URL)
+    # The variant without chunklist_w naming is skipped
+    assert [r.label for r in renditions] == ["640x360", "960x540", "1920x1080"]
+    assert renditions[0].suffix == "_b600000"
+    assert renditions[0].base_url("http://127.0.0.1:8090/fecnetwork/AbbeyRoadHD1.flv/chunklist_w") == \
+        "http://127.0.0.1:8090/fecnetwork/AbbeyRoadHD1.flv/chunklist_w"
+
+
+def test_parse_master_rejects_a_chunklist():
+    with pytest.raises(ValueError):
+        parse_master("#EXTM3U\n#EXT-X-TARGETDURATION:6\n#EXTINF:6.0,\nmedia_w1_1000.ts\n", MASTER_URL)
+
+
+@pytest.mark.parametrize("working_height, label", [
+    (540, "960x540"),     # Exact match
+    (400, "960x540"),     # Smallest that still covers it
+    (360, "640x360"),
+    (100, "640x360"),
+    (2160, "1920x1080"),  # None tall enough: the tallest
+])
+def test_choose_rendition_by_height(working_height, label):
+    assert choose_rendition(parse_master(MASTER, MASTER_URL), working_height).label == label
+
+
+def test_choose_rendition_without_resolutions_takes_the_highest_bandwidth():
+    master = MASTER.replace(",RESOLUTION=1920x1080", "").replace(",RESOLUTION=960x540", "") \
+        .replace(",RESOLUTION=640x360", "")
+    assert choose_rendition(parse_master(master, MASTER_URL), 540).bandwidth == 5000000
@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from backend.core.scheduler import FairScheduler, StreamExecutor
+
+
+def block(scheduler, stream_id):
+    """Occupies a worker until the returned event is set."""
+    started, gate = threading.Event(), threading.Event()
+    future = scheduler.submit(stream_id, lambda: started.set() or gate.wait())
+    assert started.wait(5)
+    return future, gate
+
+
+def test_executor_map_keeps_order():
+    executor = StreamExecutor(FairScheduler(3), "cam")
+    assert list(executor.map(lambda x: x * x, range(10))) == [x * x for x in range(10)]
+
+
+def test_streams_take_turns():
+    scheduler = FairScheduler(1)
+    order = []
+    # Hold the only worker while both streams queue up
+    blocker, gate = block(scheduler, "busy")
+    futures = [scheduler.submit("busy", order.append, f"busy-{i}") for i in range(4)]
+    futures += [scheduler.submit("quiet", order.append, f"quiet-{i}") for i in range(2)]
+    gate.set()
+    for future in [blocker, *futures]:
+        future.result(timeout=5)
+    # The quiet stream isn't stuck behind the busy stream's backlog
+    assert order.index("quiet-1") < order.index("busy-3")
+    assert order[:4] == ["busy-0", "quiet-0", "busy-1", "quiet-1"]
+
+
+def test_remove_stream_cancels_queued_tasks():
+    scheduler = FairScheduler(1)
+    running, gate = block(scheduler, "cam")
+    queued = [scheduler.submit("cam", lambda: "ran") for _ in range(3)]
+    scheduler.remove_stream("cam")
+    gate.set()
+    assert running.result(timeout=5) is True  # Already running - it finishes
+    for future in queued:
+        with pytest.raises(CancelledError):
+            future.result(timeout=5)
+
+
+def test_exceptions_reach_the_caller():
+    scheduler = FairScheduler(1)
+    with pytest.raises(ZeroDivisionError):
+        scheduler.submit("cam", lambda: 1 / 0).result(timeout=5)
@@ -0,0 +1,71 @@
+"""
+Removing a stream: segment work stops at its next check, remove waits for the
+threads still running, and the status API reads only the stream's own metrics.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.core import metrics
+from backend.core.processor import StreamClosed, StreamPipeline
+
+
+def make_pipeline(tmp_path, stream_id="cam"):
+    return StreamPipeline(stream_id, "http://127.0.0.1:1/chunklist_w", data_dir=str(tmp_path))
+
+
+def test_closed_pipeline_skips_new_work(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    assert pipeline.run_segment_work(lambda: "done") == "done"
+    pipeline.close()
+    assert pipeline.run_segment_work(lambda: "done") is None
+    with pytest.raises(StreamClosed):
+        pipeline.check_open()
+    with pytest.raises(StreamClosed):
+        pipeline.save_raw_segment("1000", b"ts")
+    assert not (tmp_path / "raw" / "1000.ts").exists()
+
+
+def test_wait_idle_waits_for_running_segment_threads(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    started = threading.Event()
+    finished = []
+
+    def work():
+        started.set()
+        time.sleep(0.2)
+        finished.append(True)
+
+    async def remove():
+        thread = asyncio.ensure_future(asyncio.to_thread(pipeline.run_segment_work, work))
+        await asyncio.to_thread(started.wait)
+        pipeline.close()
+        await pipeline.wait_idle()
+        assert finished
+        await thread
+
+    asyncio.run(remove())
+
+
+def test_closed_pipeline_publishes_nothing(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    pipeline.ready_segments.extend([1000, 1001, 1002])
+    pipeline.close()
+    assert asyncio.run(pipeline.generate_m3u8_playlist()) is False
+    assert not (tmp_path / "current_playlist.m3u8").exists()
+
+
+def test_status_metrics_are_per_stream():
+    metrics.SEGMENTS_TOTAL.inc(stream="test-a", outcome="published")
+    metrics.SEGMENTS_TOTAL.inc(stream="test-a", outcome="late")
+    metrics.SEGMENTS_TOTAL.inc(3, stream="test-b", outcome="published")
+    metrics.SEGMENT_STAGE_SECONDS.observe(0.5, stream="test-a", stage="decode")
+    metrics.SEGMENT_STAGE_SECONDS.observe(0.1, stream="test-b", stage="decode")
+
+    summary = metrics.get_latency_summary("test-a")
+    assert summary["segments"] == {"published": 1, "late": 1}
+    assert summary["stages_ms"]["decode"]["p50"] == 500.0
+    assert metrics.get_latency_summary("test-b")["segments"] == {"published": 3}
+    assert 'livestream_segments_total{stream="test-b",outcome="published"} 3' in metrics.render()
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from backend.core import temporal
+
+
+def frames(count):
+    return [np.full((36, 64, 3), i * 10, dtype=np.uint8) for i in range(count)]
+
+
+def render_segment(count, every_nth, mode, **kwargs):
+    rendered = []
+
+    def render(index):
+        rendered.append(index)
+        return np.full((36, 64, 3), index * 10, dtype=np.uint8)
+
+    with ThreadPoolExecutor(2) as executor:
+        outputs, keyframes = temporal.render_segment(frames(count), render, every_nth, mode, executor, **kwargs)
+    return outputs, keyframes, rendered
+
+
+def test_every_frame_renders_at_n1():
+    outputs, keyframes, rendered = render_segment(5, 1, "hold")
+    assert keyframes == 5 and sorted(rendered) == [0, 1, 2, 3, 4]
+    assert [int(o[0, 0, 0]) for o in outputs] == [0, 10, 20, 30, 40]
+
+
+def test_hold_repeats_the_previous_keyframe():
+    outputs, keyframes, rendered = render_segment(7, 3, "hold")
+    assert keyframes == 3 and sorted(rendered) == [0, 3, 6]
+    assert [int(o[0, 0, 0]) for o in outputs] == [0, 0, 0, 30, 30, 30, 60]
+
+
+def test_blend_interpolates_between_keyframes():
+    outputs, _, _ = render_segment(5, 2, "blend")
+    # Frame 1 is halfway between keyframes 0 and 2; frame 4 is a keyframe, 3 blends 2 and 4
+    assert [int(o[0, 0, 0]) for o in outputs] == [0, 10, 20, 30, 40]
+
+
+def test_blend_holds_past_the_last_keyframe():
+    outputs, _, _ = render_segment(4, 2, "blend")
+    assert int(outputs[3][0, 0, 0]) == 20
+
+
+def test_flow_keeps_the_frame_shape():
+    outputs, _, _ = render_segment(4, 2, "flow")
+    assert all(o.shape == (36, 64, 3) and o.dtype == np.uint8 for o in outputs)
+
+
+def test_sequential_renders_in_order():
+    _, _, rendered = render_segment(9, 2, "hold", sequential=True)
+    assert rendered == [0, 2, 4, 6, 8]
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        render_segment(3, 2, "smear")
@@ -0,0 +1,30 @@
+"""
+Tiled execution matches whole-frame output. Skipped when fast_processor isn't
+built (make build-cpp).
+"""
+import cv2
+import numpy as np
+import pytest
+
+fast_processor = pytest.importorskip("fast_processor")
+
+
+def make_frame(width, height):
+    rng = np.random.default_rng(1)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    rows, cols = np.mgrid[0:height, 0:width]
+    image[(cols // 50 + rows // 40) % 2 == 0] //= 3
+    return image
+
+
+# 640x360 works at 320x180 (on the 1/4 smoothing grid), 480x270 at 240x135 (off it)
+@pytest.mark.parametrize("size", [(640, 360), (480, 270)])
+@pytest.mark.parametrize("backend", ["bilateral", "guided", "bilateral_downsampled"])
+@pytest.mark.parametrize("quality", [1, 2])
+@pytest.mark.parametrize("tile_size", [64, 130])
+def test_tiled_matches_whole_frame(size, backend, quality, tile_size):
+    frame = make_frame(*size)
+    settings = dict(frame_number=2, smoothing_backend=backend, smoothing_quality=quality, edge_blend_factor=0.3)
+    whole = fast_processor.process_frame(frame, **settings)
+    tiled = fast_processor.process_frame(frame, tiled=True, tile_size=tile_size, **settings)
+    assert np.array_equal(whole, tiled)
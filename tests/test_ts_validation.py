@@ -0,0 +1,48 @@
+import pytest
+
+from backend.core.ts_validation import PACKET_SIZE, InvalidSegment, TSValidator, validate_segment
+
+
+def test_valid_segment(ts_segment):
+    assert validate_segment(ts_segment) is None
+    assert validate_segment(ts_segment, expected_duration=1.0) is None
+
+
+def test_truncated_segment(ts_segment):
+    assert validate_segment(ts_segment[:-100]) == "truncated"
+
+
+def test_lost_sync(ts_segment):
+    corrupt = bytearray(ts_segment)
+    corrupt[PACKET_SIZE * 3] = 0x00
+    assert validate_segment(bytes(corrupt)) == "sync"
+
+
+def test_short_segment(ts_segment):
+    # 1 s of video where the playlist promised 6 s
+    assert validate_segment(ts_segment, expected_duration=6.0) == "short"
+
+
+def test_missing_pat(ts_segment):
+    packets = [ts_segment[i:i + PACKET_SIZE] for i in range(0, len(ts_segment), PACKET_SIZE)]
+    without_pat = b"".join(p for p in packets if ((p[1] & 0x1F) << 8 | p[2]) != 0)
+    assert validate_segment(without_pat) == "no_pat"
+
+
+def test_incremental_feed_matches_whole(ts_segment):
+    validator = TSValidator(expected_duration=1.0)
+    # Chunks that split packets
+    for start in range(0, len(ts_segment), 1000):
+        validator.feed(ts_segment[start:start + 1000])
+    validator.finish()
+    assert validator.duration() == pytest.approx(1.0, abs=0.05)
+
+
+def test_failure_is_sticky(ts_segment):
+    validator = TSValidator()
+    validator.feed(ts_segment[:-100])
+    with pytest.raises(InvalidSegment) as error:
+        validator.finish()
+    assert error.value.reason == "truncated"
+    with pytest.raises(InvalidSegment):
+        validator.feed(ts_segment)